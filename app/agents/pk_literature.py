@@ -3,6 +3,8 @@ agents/pk_literature.py — PK Literature Agent.
 Ищет фармакокинетические параметры по МНН для проектирования БЭ-исследования.
 
 ПРИОРИТЕТ ИСТОЧНИКОВ CVintra:
+0. Своя таблица ФК (services/pk/inhouse_table.py) — валидированные значения
+   наших исследований; если в ней есть CVintra и T½, внешний поиск не нужен
 1. PubMed BE-статьи по базовому МНН без соли (CVintra из реальных исследований)
 2. FDA/EMA BE Guidance Documents (если нет статей)
 3. LLM-fallback (Cmax, AUC, T½ — общая ФК-литература)
@@ -12,6 +14,7 @@ agents/pk_literature.py — PK Literature Agent.
   НЕ ищем по "Вемлиди" — это референтный препарат, не действующее вещество.
 """
 
+import asyncio
 import json
 import os
 import re
@@ -20,6 +23,9 @@ from pydantic import ValidationError
 
 from app.agents.base import BaseAgent, AgentResult
 from app.models.pk import PKResult, PKParameter, PKSource
+from app.utils.deadline import ensure_deadline
+from app.services.pk.evidence_pool import EvidencePool
+from app.services.circuit_breaker import CircuitOpenError
 
 
 # ── Нормализация МНН ──
@@ -90,7 +96,7 @@ class PKLiteratureAgent(BaseAgent):
 
     Алгоритм:
     1. Нормализуем МНН (убираем соль: "фумарат", "гидрохлорид" и т.д.)
-    2. Ищем CVintra по базовому МНН (без соли) — search_cv_intra()
+    2. Ищем CVintra по базовому МНН (без соли) — search_cv_intra_async()
     3. Если не нашли — пробуем полный МНН (с солью)
     4. LLM извлекает остальные параметры (Cmax, AUC, T½)
     5. CVintra из поиска приоритетнее CVintra из LLM
@@ -113,6 +119,14 @@ class PKLiteratureAgent(BaseAgent):
         user_cv = input_data.get("cv_intra")
         user_t_half = input_data.get("t_half_hours")
 
+        # Бюджет времени агента: каждый поиск получает долю оставшегося,
+        # по истечении — лучшее из найденного (LLM-шаг выполняется всегда)
+        deadline = ensure_deadline(input_data.get("deadline"))
+
+        # Общий пул ответов GenSearch: протоколы, CVintra и ФК-параметры
+        # не повторяют запросы и используют факты из ответов друг друга
+        pool = EvidencePool()
+
         # ══════════════════════════════════════════
         # Шаг 0: Нормализация МНН — убираем соль
         # ══════════════════════════════════════════
@@ -122,49 +136,78 @@ class PKLiteratureAgent(BaseAgent):
         if inn_ru_base != inn_ru or (inn_en and inn_en_base != inn_en):
             print(f"  МНН базовое: {inn_ru_base}" + (f" ({inn_en_base})" if inn_en_base else ""))
 
+        # ══════════════════════════════════════════
+        # Шаг 0.2: Своя таблица ФК-параметров
+        # ══════════════════════════════════════════
+        # Валидированные значения наших исследований — раньше любого внешнего
+        # поиска. Покрыты обязательные параметры (CVintra, T½) — каскад
+        # поисков (протоколы, CVintra, PubMed) не запускается.
+        inhouse = None
+        try:
+            try:
+                from app.services.pk.inhouse_table import lookup_inhouse_pk
+            except ImportError:
+                from inhouse_table import lookup_inhouse_pk
+            inhouse = lookup_inhouse_pk(
+                inn_ru_base, inn_en_base or inn_en, dosage_form, input_data.get("release_type"),
+            )
+        except ImportError:
+            pass
+        inhouse_covered = inhouse is not None and inhouse.covers(
+            cv_intra=user_cv, t_half_hours=user_t_half,
+        )
+        if inhouse is not None:
+            print(f"📒 Своя таблица ФК: {inhouse.summary()}")
+            if inhouse_covered:
+                print("  ✅ CVintra и T½ известны — внешний поиск пропускается")
+
         # ══════════════════════════════════════════
         # Шаг 0.5: Поиск существующих протоколов БЭ
         # ══════════════════════════════════════════
         # ПРИОРИТЕТ ВЫШЕ PubMed статей. Если найден реальный протокол —
         # берём CVintra, дизайн, выборку, режим приёма оттуда.
         protocol_data = None
-        try:
+        if not inhouse_covered:
             try:
-                from app.services.search.protocol_search import search_existing_protocols
+                try:
+                    from app.services.search.protocol_search import search_existing_protocols
+                except ImportError:
+                    from protocol_search import search_existing_protocols
+
+                ref_drug_name_raw = (
+                    input_data.get("reference_drug_name")
+                    or input_data.get("ref_drug")
+                    or ""
+                )
+                print(f"🔎 Поиск существующих протоколов БЭ для '{inn_en_base or inn_ru_base}'...")
+                protocol_data = await asyncio.to_thread(
+                    search_existing_protocols,
+                    inn_ru=inn_ru_base,
+                    inn_en=inn_en_base or inn_en,
+                    ref_drug_name=ref_drug_name_raw,
+                    deadline=deadline.slice(0.25),
+                    pool=pool,
+                )
+
+                if protocol_data and protocol_data.get("found"):
+                    src = protocol_data.get("source", "?")
+                    nct = protocol_data.get("nct_id", "")
+                    design = protocol_data.get("design_type", "")
+                    n_subj = protocol_data.get("n_subjects", "")
+                    cv = protocol_data.get("cv_intra")
+                    print(f"  ✅ Найден протокол ({src}): {nct}")
+                    if design:
+                        print(f"     Дизайн: {design}")
+                    if cv:
+                        print(f"     CVintra: {cv}%")
+                    if n_subj:
+                        print(f"     Выборка: {n_subj}")
+                else:
+                    print(f"  ⚠️ Существующих протоколов БЭ не найдено")
             except ImportError:
-                from protocol_search import search_existing_protocols
-
-            ref_drug_name_raw = (
-                input_data.get("reference_drug_name")
-                or input_data.get("ref_drug")
-                or ""
-            )
-            print(f"🔎 Поиск существующих протоколов БЭ для '{inn_en_base or inn_ru_base}'...")
-            protocol_data = search_existing_protocols(
-                inn_ru=inn_ru_base,
-                inn_en=inn_en_base or inn_en,
-                ref_drug_name=ref_drug_name_raw,
-            )
-
-            if protocol_data and protocol_data.get("found"):
-                src = protocol_data.get("source", "?")
-                nct = protocol_data.get("nct_id", "")
-                design = protocol_data.get("design_type", "")
-                n_subj = protocol_data.get("n_subjects", "")
-                cv = protocol_data.get("cv_intra")
-                print(f"  ✅ Найден протокол ({src}): {nct}")
-                if design:
-                    print(f"     Дизайн: {design}")
-                if cv:
-                    print(f"     CVintra: {cv}%")
-                if n_subj:
-                    print(f"     Выборка: {n_subj}")
-            else:
-                print(f"  ⚠️ Существующих протоколов БЭ не найдено")
-        except ImportError:
-            print("  ⚠️ protocol_search модуль не найден")
-        except Exception as e:
-            print(f"  ⚠️ Поиск протоколов: {type(e).__name__}: {e}")
+                print("  ⚠️ protocol_search модуль не найден")
+            except Exception as e:
+                print(f"  ⚠️ Поиск протоколов: {type(e).__name__}: {e}")
 
         # ══════════════════════════════════════════
         # Шаг 1: CVintra — поиск по PubMed
@@ -177,9 +220,11 @@ class PKLiteratureAgent(BaseAgent):
         hvd_cv_value = None     # его CVintra
         component_cv_results = {}  # {component_en: CVintraResult}
 
-        if user_cv is None:
+        if user_cv is None and (inhouse is None or inhouse.cv_intra is None):
             try:
-                from app.services.pk.cv_intra import search_cv_intra
+                from app.services.pk.cv_intra import search_cv_intra_async, SearchBudget
+
+                cv_deadline = deadline.slice(0.5)
 
                 # Разбиваем комбинацию на компоненты
                 components_ru = [c.strip() for c in inn_ru_base.split('+') if c.strip()]
@@ -198,20 +243,24 @@ class PKLiteratureAgent(BaseAgent):
                     search_inn_ru = inn_ru_base or inn_ru
 
                     print(f"🔎 Поиск CVintra для '{search_inn_en or search_inn_ru}'...")
-                    cv_result = search_cv_intra(
+                    cv_result = await search_cv_intra_async(
                         inn_en=search_inn_en,
                         inn_ru=search_inn_ru,
                         ref_drug_name="",
+                        deadline=cv_deadline,
+                        pool=pool,
                     )
 
                     if cv_result.source == "default" and (
                         inn_ru_base != inn_ru or inn_en_base != inn_en
-                    ):
+                    ) and not cv_deadline.exhausted("cv_intra"):
                         print(f"  ↳ Не найдено. Пробуем полный МНН: '{inn_en or inn_ru}'...")
-                        cv_result = search_cv_intra(
+                        cv_result = await search_cv_intra_async(
                             inn_en=inn_en,
                             inn_ru=inn_ru,
                             ref_drug_name="",
+                            deadline=cv_deadline,
+                            pool=pool,
                         )
 
                     if cv_result.source != "default":
@@ -223,19 +272,34 @@ class PKLiteratureAgent(BaseAgent):
                     else:
                         print(f"⚠️  CVintra не найден — используем {cv_result.cv_intra}% (default)")
                 else:
-                    # КОМБИНАЦИЯ — ищем по каждому компоненту отдельно
+                    # КОМБИНАЦИЯ — ищем по каждому компоненту отдельно.
+                    # Компоненты ищутся параллельно (корутинами в event loop
+                    # агента) с общим бюджетом и лимитом запросов GenSearch.
                     print(f"🔎 Комбинированный препарат: {len(components)} компонентов")
                     best_cv = None
                     best_cv_result = None
 
+                    budget = SearchBudget()
                     for comp_ru, comp_en in components:
-                        search_term = comp_en or comp_ru
-                        print(f"  🔎 CVintra для '{search_term}'...")
-                        comp_cv = search_cv_intra(
+                        print(f"  🔎 CVintra для '{comp_en or comp_ru}'...")
+                    comp_results = await asyncio.gather(*[
+                        search_cv_intra_async(
                             inn_en=comp_en,
                             inn_ru=comp_ru,
                             ref_drug_name="",
+                            budget=budget,
+                            deadline=cv_deadline,
+                            pool=pool,
                         )
+                        for comp_ru, comp_en in components
+                    ], return_exceptions=True)
+
+                    # Сводим результаты в исходном порядке компонентов
+                    for (comp_ru, comp_en), comp_cv in zip(components, comp_results):
+                        search_term = comp_en or comp_ru
+                        if isinstance(comp_cv, Exception):
+                            print(f"     ⚠️ {search_term}: {type(comp_cv).__name__}: {comp_cv}")
+                            continue
                         component_cv_results[comp_en or comp_ru] = comp_cv
 
                         if comp_cv.source != "default":
@@ -273,24 +337,42 @@ class PKLiteratureAgent(BaseAgent):
         # Шаг 2: PubMed → T½, Tmax, Cmax
         # ══════════════════════════════════════════
         pk_params = None
-        try:
-            from app.services.pk.cv_intra import search_pk_params
-            print(f"🔎 Поиск T½/Tmax/Cmax по PubMed для '{inn_en_base or inn_ru_base}'...")
-            pk_params = search_pk_params(
-                inn_en=inn_en_base or inn_en,
-                inn_ru=inn_ru_base or inn_ru,
-            )
-            if pk_params and pk_params.t_half_hours:
-                t_display = f"{pk_params.t_half_hours} ч"
-                if pk_params.t_half_hours >= 48:
-                    t_display = f"{pk_params.t_half_hours/24:.1f} дней ({pk_params.t_half_hours} ч)"
-                print(f"  ✅ T½ = {t_display} (PubMed)")
-            else:
-                print(f"  ⚠️ T½ не найден в PubMed")
-        except ImportError:
-            print("  ⚠️ search_pk_params не доступен")
-        except Exception as e:
-            print(f"  ⚠️ Поиск PK: {type(e).__name__}: {e}")
+        if inhouse is None or inhouse.t_half_hours is None:
+            try:
+                from app.services.pk.cv_intra import search_pk_params
+                print(f"🔎 Поиск T½/Tmax/Cmax по PubMed для '{inn_en_base or inn_ru_base}'...")
+                pk_params = await asyncio.to_thread(
+                    search_pk_params,
+                    inn_en=inn_en_base or inn_en,
+                    inn_ru=inn_ru_base or inn_ru,
+                    deadline=deadline.slice(0.5),
+                    pool=pool,
+                )
+                if pk_params and pk_params.t_half_hours:
+                    t_display = f"{pk_params.t_half_hours} ч"
+                    if pk_params.t_half_hours >= 48:
+                        t_display = f"{pk_params.t_half_hours/24:.1f} дней ({pk_params.t_half_hours} ч)"
+                    print(f"  ✅ T½ = {t_display} (PubMed)")
+                else:
+                    print(f"  ⚠️ T½ не найден в PubMed")
+            except ImportError:
+                print("  ⚠️ search_pk_params не доступен")
+            except Exception as e:
+                print(f"  ⚠️ Поиск PK: {type(e).__name__}: {e}")
+
+        # CVintra не найден, но 90% CI попался в ответах других поисков (пул)
+        is_combination = "+" in inn_ru_base
+        if (user_cv is None and not is_combination and (cv_result is None or cv_result.source == "default")
+                and (inhouse is None or inhouse.cv_intra is None)):
+            try:
+                from app.services.pk.cv_intra import cv_from_pool
+                pooled_cv = cv_from_pool(pool)
+                if pooled_cv:
+                    cv_result = pooled_cv
+                    print(f"📊 CVintra = {cv_result.cv_intra}% из 90% CI в ответах пула [{cv_result.source_detail}]")
+            except ImportError:
+                pass
+        print(f"♻️  Пул ответов GenSearch: {pool.summary()}")
 
         # ══════════════════════════════════════════
         # Шаг 3: Инструкция → состав, хранение, пол, приём
@@ -303,6 +385,23 @@ class PKLiteratureAgent(BaseAgent):
             or input_data.get("ref_drug")
             or ""
         )
+        # Локальный реестр ГРЛС: сверка названия референта; если референт
+        # не задан — догадка по самому раннему действующему РУ (для инструкции)
+        try:
+            try:
+                from app.services.search.grls_registry import reference_product, registered_reference
+            except ImportError:
+                from grls_registry import reference_product, registered_reference
+        except ImportError:
+            reference_product = registered_reference = None
+        user_ref_name = ref_drug_name
+        guessed_ref = None
+        if not ref_drug_name and reference_product is not None:
+            guessed_ref = reference_product(inn_ru_base)
+            if guessed_ref is not None:
+                ref_drug_name = guessed_ref.trade_name
+                print(f"📒 Вероятный референт из ГРЛС (самое раннее РУ): {guessed_ref.trade_name} "
+                      f"({guessed_ref.reg_number}, {guessed_ref.manufacturer})")
         try:
             try:
                 from app.utils.drug_info_parser import fetch_drug_info
@@ -314,6 +413,7 @@ class PKLiteratureAgent(BaseAgent):
                 drug_name=ref_drug_name or inn_ru_base,
                 inn=inn_ru_base,
                 dosage=dosage,
+                deadline=deadline,
             )
             if drug_info and (drug_info.excipients or drug_info.storage_conditions):
                 print(f"  ✅ Инструкция найдена ({drug_info.source_url or 'vidal/grls'})")
@@ -336,22 +436,31 @@ class PKLiteratureAgent(BaseAgent):
             dosage=dosage,
         )
 
-        raw = await self.llm.generate(prompt)
-
         try:
-            cleaned = raw.strip()
-            if cleaned.startswith("```"):
-                cleaned = cleaned.split("\n", 1)[-1]
-                cleaned = cleaned.rsplit("```", 1)[0]
-            data = json.loads(cleaned)
-            result = PKResult.model_validate(data)
-        except (json.JSONDecodeError, ValidationError):
-            result = PKResult(
-                inn_ru=inn_ru,
-                inn_en=inn_en,
-                literature_review=f"LLM вернул невалидный ответ. Raw: {raw[:500]}",
-            )
-            return AgentResult(data=result, sources=["llm_parse_error"])
+            raw = await self.llm.generate(prompt)
+        except CircuitOpenError:
+            # LLM недоступна (предохранитель разомкнут) — результат строится
+            # из уже найденных значений, а не обрывает весь прогон
+            print("  🔌 LLM недоступна — ФК-параметры только из найденных источников")
+            raw = None
+
+        if raw is None:
+            result = PKResult(inn_ru=inn_ru, inn_en=inn_en)
+        else:
+            try:
+                cleaned = raw.strip()
+                if cleaned.startswith("```"):
+                    cleaned = cleaned.split("\n", 1)[-1]
+                    cleaned = cleaned.rsplit("```", 1)[0]
+                data = json.loads(cleaned)
+                result = PKResult.model_validate(data)
+            except (json.JSONDecodeError, ValidationError):
+                result = PKResult(
+                    inn_ru=inn_ru,
+                    inn_en=inn_en,
+                    literature_review=f"LLM вернул невалидный ответ. Raw: {raw[:500]}",
+                )
+                return AgentResult(data=result, sources=["llm_parse_error"])
 
         # ══════════════════════════════════════════
         # Шаг 5: Наложение приоритетов
@@ -400,11 +509,51 @@ class PKLiteratureAgent(BaseAgent):
             ))
             print(f"  📋 CVintra из протокола: {proto_cv}% (приоритет над PubMed)")
 
+        # Своя таблица ФК > протоколы и литература (выше — только ввод пользователя)
+        if inhouse is not None:
+            if inhouse.cv_intra is not None:
+                result.cv_intra_cmax = PKParameter(
+                    value=inhouse.cv_intra, unit="%", source=inhouse.provenance["cv_intra"],
+                )
+            if inhouse.t_half_hours is not None:
+                result.t_half = PKParameter(
+                    value=inhouse.t_half_hours, unit="ч", source=inhouse.provenance["t_half_hours"],
+                )
+            if inhouse.tmax_hours is not None:
+                result.tmax = PKParameter(
+                    value=inhouse.tmax_hours, unit="ч", source=inhouse.provenance["tmax_hours"],
+                )
+            if inhouse.cmax_value is not None:
+                result.cmax = PKParameter(
+                    value=inhouse.cmax_value, unit=inhouse.cmax_unit or "нг/мл",
+                    source=inhouse.provenance["cmax_value"],
+                )
+            for title in dict.fromkeys(inhouse.provenance.values()):
+                result.sources.append(PKSource(source_type="inhouse", title=title, url=""))
+
         # Пользовательские данные → высший приоритет
         if user_cv is not None:
             result.cv_intra_cmax = PKParameter(value=user_cv, unit="%", source="user_input")
         if user_t_half is not None:
             result.t_half = PKParameter(value=user_t_half, unit="ч", source="user_input")
+        # Референт (пользователь > LLM) сверяется с ГРЛС: найден с тем же МНН —
+        # название как в реестре и номер РУ. Не найден никакой — догадка по ГРЛС
+        found_ref_name = user_ref_name or result.reference_drug
+        if found_ref_name and registered_reference is not None:
+            registered = registered_reference(found_ref_name, inn_ru_base)
+            if registered is not None:
+                result.reference_drug = registered.trade_name
+                result.reference_source = ", ".join(
+                    x for x in (result.reference_source, f"ГРЛС: {registered.reg_number}") if x
+                )
+            else:
+                print(f"  ⚠️ Референт '{found_ref_name}' не найден в ГРЛС для МНН '{inn_ru_base}'")
+        elif not found_ref_name and guessed_ref is not None:
+            result.reference_drug = guessed_ref.trade_name
+            result.reference_source = (
+                f"ГРЛС: {guessed_ref.reg_number} (предположительно: самое раннее "
+                f"действующее РУ, не подтверждено как референтный препарат)"
+            )
 
 
         # ══════════════════════════════════════════
@@ -414,7 +563,9 @@ class PKLiteratureAgent(BaseAgent):
         if cv_max is not None and cv_max >= 30.0:
             result.is_hvd = True
 
-        source_labels = [s.source_type for s in result.sources] or ["llm"]
+        source_labels = [s.source_type for s in result.sources] or (["llm"] if raw is not None else [])
+        if raw is None:
+            source_labels.append("llm_unavailable")
 
         # Прикрепляем drug_info для использования в synopsis_generator
         if drug_info and drug_info.source_url:
@@ -9,8 +9,10 @@ AI НЕ генерирует критерии включения/невключ
 остальные сдвигаются.
 """
 
+import asyncio
 from typing import Any, Dict, List
 from app.agents.base import BaseAgent, AgentResult
+from app.utils.deadline import ensure_deadline
 import logging
 
 logger = logging.getLogger(__name__)
@@ -343,6 +345,8 @@ class SynopsisGeneratorAgent(BaseAgent):
         sex = input_data.get("sex_restriction", "males_only")
         age_min = input_data.get("age_min", 18)
         age_max = input_data.get("age_max", 45)
+        # Бюджет времени: по истечении поиски пропускаются, поля остаются как введены
+        deadline = ensure_deadline(input_data.get("deadline"))
         smoking = input_data.get("smoking_restriction", "non_smokers")
 
         pk = input_data.get("pk", {})
@@ -482,6 +486,7 @@ class SynopsisGeneratorAgent(BaseAgent):
                         drug_name=_drug_name_for_fetch,
                         inn=inn_ru,
                         dosage=dosage,
+                        deadline=deadline,
                     )
                     ref_dict = drug_info_to_dict(ref_info)
                     synopsis.update(ref_dict)
@@ -509,25 +514,15 @@ class SynopsisGeneratorAgent(BaseAgent):
         else:
             print(f"  🔎 Поиск организаций: спонсор={sponsor}, центр={center}, лаб={lab}, страховая={insurance}")
 
-            import time
-            _org_query_count = 0
-
-            def _org_search_with_delay(name: str, country: str = "Россия"):
-                """Поиск с паузой 1.5 сек между запросами (Yandex rate limit: 1 req/sec)."""
-                nonlocal _org_query_count
-                if _org_query_count > 0:
-                    time.sleep(1.5)
-                _org_query_count += 1
-                return search_organization_info(name, country)
-
+        # Паузы между запросами не нужны: лимит RPS соблюдает GenSearch-клиент;
+        # блокирующие поиски — в потоках, event loop сервера не простаивает
         if _has_org_search:
-            import time as _time
             sponsor_country = input_data.get("sponsor_country", "Россия")
 
             # Спонсор
-            if sponsor and sponsor != "________":
+            if sponsor and sponsor != "________" and not deadline.exhausted("organizations"):
                 try:
-                    org_info = _org_search_with_delay(sponsor, sponsor_country)
+                    org_info = await asyncio.to_thread(search_organization_info, sponsor, sponsor_country)
                     if org_info.get("address") or org_info.get("phone"):
                         sponsor_full = format_sponsor_field(org_info)
                         synopsis["sponsor"] = sponsor_full
@@ -538,13 +533,10 @@ class SynopsisGeneratorAgent(BaseAgent):
                     print(f"  ⚠️ Спонсор ошибка: {e}")
                     logger.warning(f"⚠️ Спонсор: {e}")
 
-            # Пауза между запросами к Yandex GenSearch
-            _time.sleep(1)
-
             # Исследовательский центр
-            if center and center != "________":
+            if center and center != "________" and not deadline.exhausted("organizations"):
                 try:
-                    center_info = _org_search_with_delay(center, "Россия")
+                    center_info = await asyncio.to_thread(search_organization_info, center, "Россия")
                     if center_info.get("address") or center_info.get("phone"):
                         center_full = format_sponsor_field(center_info)
                         synopsis["research_center"] = center_full
@@ -555,8 +547,6 @@ class SynopsisGeneratorAgent(BaseAgent):
                     print(f"  ⚠️ Центр ошибка: {e}")
                     logger.warning(f"⚠️ Центр: {e}")
 
-            _time.sleep(1)
-
             # Биоаналитическая лаборатория
             if lab and lab != "________":
                 try:
@@ -564,8 +554,8 @@ class SynopsisGeneratorAgent(BaseAgent):
                     if lab == center and synopsis.get("research_center"):
                         synopsis["bioanalytical_lab"] = synopsis["research_center"]
                         print(f"  ✅ Лаборатория = Центр (пропускаем повторный поиск)")
-                    else:
-                        lab_info = _org_search_with_delay(lab, "Россия")
+                    elif not deadline.exhausted("organizations"):
+                        lab_info = await asyncio.to_thread(search_organization_info, lab, "Россия")
                         if lab_info.get("address") or lab_info.get("phone"):
                             lab_full = format_sponsor_field(lab_info)
                             synopsis["bioanalytical_lab"] = lab_full
@@ -576,12 +566,10 @@ class SynopsisGeneratorAgent(BaseAgent):
                     print(f"  ⚠️ Лаборатория ошибка: {e}")
                     logger.warning(f"⚠️ Лаборатория: {e}")
 
-            _time.sleep(1)
-
             # Страховая компания
-            if insurance and insurance != "________":
+            if insurance and insurance != "________" and not deadline.exhausted("organizations"):
                 try:
-                    ins_info = _org_search_with_delay(insurance, "Россия")
+                    ins_info = await asyncio.to_thread(search_organization_info, insurance, "Россия")
                     if ins_info.get("address") or ins_info.get("phone"):
                         ins_full = format_sponsor_field(ins_info)
                         synopsis["insurance_company"] = ins_full
@@ -620,9 +608,10 @@ class SynopsisGeneratorAgent(BaseAgent):
                     from yandex_search import search_intake_mode
                 except ImportError:
                     search_intake_mode = None
-            if search_intake_mode:
+            if search_intake_mode and not deadline.exhausted("intake_mode"):
                 try:
-                    _intake_result = search_intake_mode(
+                    _intake_result = await asyncio.to_thread(
+                        search_intake_mode,
                         ref_drug_name=_drug_name_for_fetch,
                         inn_ru=inn_ru,
                     )
@@ -813,16 +802,16 @@ class SynopsisGeneratorAgent(BaseAgent):
         # ── Пост-обработка: перевод EN → RU ──
         # Все поля синопсиса должны быть на русском языке.
         # Переводим через Yandex Translate любые поля с латиницей.
-        _translate_fn = None
+        _translate_many = None
         try:
-            from app.utils.inn_utils import ensure_russian_text as _translate_fn
+            from app.utils.inn_utils import ensure_russian_texts as _translate_many
         except ImportError:
             try:
-                from inn_utils import ensure_russian_text as _translate_fn
+                from inn_utils import ensure_russian_texts as _translate_many
             except ImportError:
                 pass
 
-        if _translate_fn:
+        if _translate_many:
             # Поля, которые должны быть на русском в документе
             _fields_to_translate = [
                 "ref_manufacturer",
@@ -832,12 +821,16 @@ class SynopsisGeneratorAgent(BaseAgent):
                 "protocol_title",
                 "study_design_description",
             ]
-            for fld in _fields_to_translate:
-                val = synopsis.get(fld, "")
-                if val and isinstance(val, str):
-                    translated = _translate_fn(val)
-                    if translated != val:
-                        print(f"  🌐 {fld}: '{val}' → '{translated}'")
-                        synopsis[fld] = translated
+            _fields = [
+                fld for fld in _fields_to_translate
+                if synopsis.get(fld, "") and isinstance(synopsis.get(fld), str)
+            ]
+            # Один запрос к Yandex Translate на все поля
+            _translated = _translate_many([synopsis[fld] for fld in _fields])
+            for fld, translated in zip(_fields, _translated):
+                val = synopsis[fld]
+                if translated != val:
+                    print(f"  🌐 {fld}: '{val}' → '{translated}'")
+                    synopsis[fld] = translated
 
         return AgentResult(data=synopsis, sources=["synopsis_template", "decision_85"])
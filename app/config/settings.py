@@ -36,6 +36,82 @@ class Settings:
 
     # === Cache ===
     PK_CACHE_TTL_DAYS: int = int(os.getenv("PK_CACHE_TTL_DAYS", "30"))
+    PK_CACHE_ENABLED: bool = os.getenv("PK_CACHE_ENABLED", "1") not in ("0", "false", "no")
+    ORG_INFO_CACHE_TTL_DAYS: float = float(os.getenv("ORG_INFO_CACHE_TTL_DAYS", "180"))
+    REFERENCE_CACHE_TTL_DAYS: float = float(os.getenv("REFERENCE_CACHE_TTL_DAYS", "30"))
+
+    # === Кэш страниц инструкций ===
+    PAGE_CACHE_ENABLED: bool = os.getenv("PAGE_CACHE_ENABLED", "1") not in ("0", "false", "no")
+    PAGE_CACHE_DIR: str = os.getenv("PAGE_CACHE_DIR", os.path.join("data", "page_cache"))
+    PAGE_CACHE_MAX_MB: float = float(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+    PAGE_CACHE_TTL_DAYS: float = float(os.getenv("PAGE_CACHE_TTL_DAYS", "14"))
+    # Сколько помнить 404/410 (slug'и, которых нет на сайте)
+    PAGE_CACHE_NEGATIVE_TTL_DAYS: float = float(os.getenv("PAGE_CACHE_NEGATIVE_TTL_DAYS", "7"))
+
+    # === Yandex GenSearch ===
+    GENSEARCH_RPS: float = float(os.getenv("GENSEARCH_RPS", "5"))
+    GENSEARCH_BURST: int = int(os.getenv("GENSEARCH_BURST", "5"))
+    GENSEARCH_MAX_RETRIES: int = int(os.getenv("GENSEARCH_MAX_RETRIES", "3"))
+    # Дублирующий запрос, если ответа нет дольше перцентиля задержек (hedging)
+    GENSEARCH_HEDGE: bool = os.getenv("GENSEARCH_HEDGE", "0") not in ("0", "false", "no")
+    GENSEARCH_HEDGE_PERCENTILE: float = float(os.getenv("GENSEARCH_HEDGE_PERCENTILE", "95"))
+    GENSEARCH_HEDGE_MAX_RATE: float = float(os.getenv("GENSEARCH_HEDGE_MAX_RATE", "0.05"))
+    GENSEARCH_HEDGE_MIN_DELAY_S: float = float(os.getenv("GENSEARCH_HEDGE_MIN_DELAY_S", "1.0"))
+
+    # === Справочники (автодополнение) ===
+    # Кэш подсказок Yandex Suggest / DaData: записей и срок жизни (сек)
+    SUGGEST_CACHE_SIZE: int = int(os.getenv("SUGGEST_CACHE_SIZE", "2000"))
+    SUGGEST_CACHE_TTL_S: float = float(os.getenv("SUGGEST_CACHE_TTL_S", "3600"))
+    # Локальный словарь МНН (JSON)
+    INN_DICTIONARY_PATH: str = os.getenv("INN_DICTIONARY_PATH", os.path.join("data", "inn_dictionary.json"))
+    # Частые контрагенты (спонсоры, центры, лаборатории, страховые) — без DaData
+    COUNTERPARTIES_PATH: str = os.getenv("COUNTERPARTIES_PATH", os.path.join("data", "counterparties.json"))
+
+    # === HTTP-клиент (общий пул keep-alive соединений) ===
+    # Размер пула и соединений на хост; для отдельного сервиса —
+    # HTTP_POOL_PER_HOST_<SERVICE> и HTTP_TIMEOUT_<SERVICE> (читаются в http_client)
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+    HTTP_POOL_PER_HOST: int = int(os.getenv("HTTP_POOL_PER_HOST", "10"))
+
+    # === Инструкции к препаратам ===
+    # Сколько страниц инструкций (vidal, rlsnet, ...) загружаются одновременно
+    DRUG_INFO_CONCURRENCY: int = int(os.getenv("DRUG_INFO_CONCURRENCY", "4"))
+
+    # === Предохранители (circuit breaker) ===
+    CB_ENABLED: bool = os.getenv("CB_ENABLED", "1") not in ("0", "false", "no")
+    # Доля отказов в окне CB_WINDOW_S (при минимуме CB_MIN_CALLS вызовов), после которой цепь размыкается
+    CB_FAILURE_RATE: float = float(os.getenv("CB_FAILURE_RATE", "0.5"))
+    CB_MIN_CALLS: int = int(os.getenv("CB_MIN_CALLS", "5"))
+    CB_WINDOW_S: float = float(os.getenv("CB_WINDOW_S", "60"))
+    # Сколько секунд разомкнутая цепь отклоняет вызовы
+    CB_OPEN_S: float = float(os.getenv("CB_OPEN_S", "30"))
+
+    # === Поиск CVintra ===
+    # Сколько запросов GenSearch одного термина выполняются одновременно
+    CV_SEARCH_CONCURRENCY: int = int(os.getenv("CV_SEARCH_CONCURRENCY", "6"))
+    # Общий лимит запросов на поиск компонентов комбинации (0 — без ограничения)
+    CV_SEARCH_BUDGET: int = int(os.getenv("CV_SEARCH_BUDGET", "60"))
+    # Статистика шаблонов запросов: шаблон, давший значение реже PRUNE_RATE
+    # за MIN_ATTEMPTS попыток, пропускается (с вероятностью EXPLORE — нет)
+    SOURCE_STATS_ENABLED: bool = os.getenv("SOURCE_STATS_ENABLED", "1") not in ("0", "false", "no")
+    SOURCE_STATS_MIN_ATTEMPTS: int = int(os.getenv("SOURCE_STATS_MIN_ATTEMPTS", "8"))
+    SOURCE_STATS_PRUNE_RATE: float = float(os.getenv("SOURCE_STATS_PRUNE_RATE", "0.05"))
+    SOURCE_STATS_EXPLORE: float = float(os.getenv("SOURCE_STATS_EXPLORE", "0.1"))
+
+    # === Локальные индексы (импорт — import_*.py) ===
+    # Индекс исследований БЭ из выгрузки ClinicalTrials.gov
+    CTGOV_INDEX_PATH: str = os.getenv("CTGOV_INDEX_PATH", "data/ctgov_be.db")
+    # Значения ФК из рефератов MEDLINE/PubMed
+    MEDLINE_INDEX_PATH: str = os.getenv("MEDLINE_INDEX_PATH", "data/medline_pk.db")
+    # Государственный реестр лекарственных средств (выгрузка ГРЛС)
+    GRLS_REGISTRY_PATH: str = os.getenv("GRLS_REGISTRY_PATH", "data/grls.db")
+    # Собственная таблица ФК (CSV/Parquet) и как часто проверять её mtime (сек)
+    INHOUSE_PK_PATH: str = os.getenv("INHOUSE_PK_PATH", "data/inhouse_pk.csv")
+    INHOUSE_PK_CHECK_S: float = float(os.getenv("INHOUSE_PK_CHECK_S", "2"))
+
+    # === Pipeline ===
+    # Бюджет времени прогона по умолчанию (сек, 0 — без ограничений)
+    PIPELINE_TIME_BUDGET_S: float = float(os.getenv("PIPELINE_TIME_BUDGET_S", "0"))
 
     # === Security ===
     JWT_SECRET: str = _get_env("JWT_SECRET", "change-me-in-production")
@@ -225,4 +225,16 @@ class PipelineInput(BaseModel):
         description="Минимальный отмывочный период (дни). "
                     "По умолчанию: max(7, ceil(5 × T½ / 24))",
         ge=1,
+    )
+
+    # ═══════════════════════════════════════════
+    # Бюджет времени
+    # ═══════════════════════════════════════════
+
+    time_budget_s: Optional[float] = Field(
+        None,
+        description="Бюджет времени прогона (сек). По истечении поиски "
+                    "прекращаются и используется найденное. "
+                    "Если не задан — PIPELINE_TIME_BUDGET_S (0 = без ограничений)",
+        ge=10,
     )
\ No newline at end of file
@@ -13,16 +13,23 @@ DAG зависимостей:
 Шаг 4: Synopsis Generator получает ВСЁ
 
 Каждому агенту передаются ТОЛЬКО нужные ему поля, не весь JSON.
+
+Бюджет времени (time_budget_s / PIPELINE_TIME_BUDGET_S): PK Agent получает
+долю бюджета, Synopsis Generator — остаток. По истечении доли поиски
+не начинают новых запросов и отдают найденное; пропущенные этапы
+попадают в sources как "budget_exhausted:<этап>".
 """
 
 import asyncio
 from typing import Any, Dict
 
+from app.config.settings import settings
 from app.models.common import PipelineInput
 from app.models.pk import PKResult
 from app.models.design import DesignResult
 from app.models.sample_size import SampleSizeResult
 from app.services.llm.factory import build_llm_client
+from app.utils.deadline import Deadline
 
 from app.agents.pk_literature import PKLiteratureAgent
 from app.agents.regulatory import RegulatoryAgent
@@ -31,6 +38,10 @@ from app.agents.sample_size import SampleSizeAgent
 from app.agents.synopsis_generator import SynopsisGeneratorAgent
 
 
+# Доля бюджета времени на шаг 1 (поиски PK Agent); остаток — синопсису
+PK_BUDGET_SHARE = 0.7
+
+
 class Pipeline:
     def __init__(self) -> None:
         llm_fast = build_llm_client("fast")
@@ -47,6 +58,9 @@ class Pipeline:
 
     async def run(self, payload: PipelineInput) -> Dict[str, Any]:
         user_input = payload.model_dump()
+        deadline = Deadline(payload.time_budget_s or settings.PIPELINE_TIME_BUDGET_S)
+        if not deadline.unlimited:
+            print(f"  ⏱️ Бюджет времени: {deadline.budget_s:.0f} с")
 
         # ═══════════════════════════════════════
         # ШАГ 1: PK + Regulatory ПАРАЛЛЕЛЬНО
@@ -55,7 +69,7 @@ class Pipeline:
         # не друг от друга → запускаем одновременно (экономим время).
 
         pk_res, reg_res = await asyncio.gather(
-            self.pk_agent.run(user_input),
+            self.pk_agent.run({**user_input, "deadline": deadline.slice(PK_BUDGET_SHARE)}),
             self.reg_agent.run(user_input),
         )
 
@@ -157,12 +171,14 @@ class Pipeline:
             "regulatory": reg_res.data,
             "design": design_data,
             "sample_size": size_data,
+            "deadline": deadline,
         }
         syn_res = await self.syn_agent.run(syn_input)
 
         all_sources = []
         for res in [pk_res, reg_res, design_res, size_res, syn_res]:
             all_sources.extend(res.sources)
+        all_sources.extend(deadline.shortfalls)
 
         return {
             "pk": pk_data,
@@ -171,4 +187,9 @@ class Pipeline:
             "sample_size": size_data,
             "synopsis": syn_res.data,
             "sources": list(set(all_sources)),  # убираем дубли
+            "budget": {
+                "time_budget_s": deadline.budget_s,
+                "elapsed_s": round(deadline.elapsed(), 1),
+                "shortfalls": deadline.shortfalls,
+            },
         }
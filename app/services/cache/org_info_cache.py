@@ -0,0 +1,142 @@
+"""
+services/cache/org_info_cache.py — Персистентный кэш реквизитов организаций.
+
+search_organization_info (спонсор, центр, лаборатория, страховая) — это
+GenSearch-запрос до 30 с с повторами, а организации в протоколах одни
+и те же. Разобранный результат хранится в SQLite (namespace "org_info"):
+
+    ключ:     normalize_org_name(name) | страна
+              'ООО «ИФАРМА»' / 'ИФАРМА' / 'ООО "ИФАРМА"' → 'ифарма|россия'
+    значение: {"info": {...search_organization_info...}}
+
+Текст для синопсиса (format_sponsor_field) не хранится: он зависит от
+написания названия у вызывающего и строится заново за микросекунды.
+
+Срок жизни — ORG_INFO_CACHE_TTL_DAYS (0 — кэш выключен). Устаревшая
+запись возвращается сразу, а обновляется в фоновом потоке; если upstream
+ничего не вернул, остаётся прежняя. Кэшируются только результаты
+с адресом или телефоном.
+
+Ручные правки — data/counterparties.json (services/search/counterparties):
+записи с заполненным адресом имеют приоритет над кэшем и не устаревают.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.config.settings import settings
+from app.services.cache.sqlite_store import SQLiteStore, get_store
+
+try:
+    from app.services.search.counterparties import normalize_org_name
+except ImportError:
+    from counterparties import normalize_org_name
+
+
+_NAMESPACE = "org_info"
+
+
+def org_cache_key(name: str, country: str = "Россия") -> str:
+    """Ключ кэша: нормализованное имя (без ОПФ и кавычек) + страна."""
+    base = normalize_org_name(name)
+    if not base:
+        return ""
+    return f"{base}|{(country or '').strip().lower()}"
+
+
+class OrgInfoCache:
+    """Кэш search_organization_info поверх SQLiteStore."""
+
+    def __init__(self, store: SQLiteStore, ttl_days: float, enabled: bool = True):
+        self.store = store
+        self.ttl_s = ttl_days * 86400
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "refreshes": 0}
+
+    def get(self, name: str, country: str = "Россия") -> Optional[Dict[str, Any]]:
+        """
+        {"info": ..., "stale": bool} или None.
+        Ошибки БД не ломают поиск — считаем промахом.
+        """
+        key = org_cache_key(name, country)
+        if not self.enabled or not key:
+            return None
+        try:
+            entry = self.store.get_entry(_NAMESPACE, key)
+        except Exception as e:
+            print(f"  ⚠️ Кэш организаций: {type(e).__name__}: {e}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, stored_at = entry
+            stale = time.time() - stored_at > self.ttl_s
+            self.stats["stale" if stale else "hits"] += 1
+        return {"info": value.get("info", {}), "stale": stale}
+
+    def put(self, name: str, country: str, info: Dict[str, Any]) -> None:
+        """Сохраняет результат с адресом или телефоном."""
+        key = org_cache_key(name, country)
+        if not self.enabled or not key:
+            return
+        if not (info.get("address") or info.get("phone")):
+            return
+        try:
+            self.store.set(_NAMESPACE, key, {"info": info})
+        except Exception as e:
+            print(f"  ⚠️ Кэш организаций: {type(e).__name__}: {e}")
+
+    def refresh_in_background(
+        self, name: str, country: str, fetch: Callable[[], Dict[str, Any]],
+    ) -> None:
+        """
+        Обновляет устаревшую запись, не задерживая ответ: fetch() (запрос
+        к GenSearch) выполняется в фоновом потоке, полезный результат
+        записывается через put. Одна организация обновляется одним потоком.
+        """
+        key = org_cache_key(name, country)
+        if not self.enabled or not key:
+            return
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.stats["refreshes"] += 1
+
+        def _refresh():
+            try:
+                self.put(name, country, fetch())
+            except Exception as e:
+                print(f"  ⚠️ Фоновое обновление «{name}»: {type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, name=f"org-refresh:{key}", daemon=True).start()
+
+    def invalidate(self, name: Optional[str] = None, country: str = "Россия") -> int:
+        """Удаляет запись организации (или весь кэш при name=None)."""
+        key = org_cache_key(name, country) if name else None
+        return self.store.delete(_NAMESPACE, key)
+
+
+_org_cache: Optional[OrgInfoCache] = None
+_org_cache_lock = threading.Lock()
+
+
+def get_org_info_cache() -> OrgInfoCache:
+    """Общий экземпляр кэша (ленивая инициализация)."""
+    global _org_cache
+    with _org_cache_lock:
+        if _org_cache is None:
+            _org_cache = OrgInfoCache(
+                store=get_store(),
+                ttl_days=settings.ORG_INFO_CACHE_TTL_DAYS,
+                enabled=settings.ORG_INFO_CACHE_TTL_DAYS > 0,
+            )
+        return _org_cache
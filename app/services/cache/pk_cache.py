@@ -0,0 +1,148 @@
+"""
+services/cache/pk_cache.py — Персистентный кэш PK-данных по МНН.
+
+Хранит результаты дорогих поисков через Yandex GenSearch:
+  - cv_intra   → CVintraResult (search_cv_intra)
+  - pk_params  → PKParamsResult (search_pk_params)
+  - protocols  → dict (search_existing_protocols)
+
+Ключ — нормализованный МНН (без соли, на английском если известен):
+    "амлодипина безилат" / "Amlodipine besylate" → "amlodipine"
+
+Срок жизни записи — PK_CACHE_TTL_DAYS (по умолчанию 30 дней).
+Кэшируются только найденные значения: default-результаты и пустые
+ответы (в т.ч. при недоступности Yandex) в кэш не попадают.
+"""
+
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+from app.services.cache.sqlite_store import SQLiteStore, get_store
+
+try:
+    from app.utils.inn_utils import normalize_inn, strip_salt_en
+except ImportError:
+    from inn_utils import normalize_inn, strip_salt_en
+
+
+PK_CACHE_KINDS = ("cv_intra", "pk_params", "protocols")
+
+
+def pk_cache_key(inn_ru: str = "", inn_en: str = "") -> str:
+    """
+    Нормализованный ключ кэша по МНН.
+
+    Английское базовое МНН приоритетнее русского — так запросы
+    "амлодипин" и "Amlodipine besylate" попадают в одну запись.
+    """
+    inn_ru = (inn_ru or "").strip()
+    inn_en = (inn_en or "").strip()
+
+    if inn_ru:
+        ru_base, en_base = normalize_inn(inn_ru, inn_en or None)
+    else:
+        ru_base, en_base = "", strip_salt_en(inn_en) if inn_en else ""
+
+    key = (en_base or ru_base).lower()
+    return re.sub(r'\s+', ' ', key).strip()
+
+
+class PKEvidenceCache:
+    """
+    Кэш PK-данных поверх SQLiteStore с TTL и счётчиками попаданий.
+
+    Namespace в хранилище: "pk:<kind>", ключ — pk_cache_key().
+    """
+
+    def __init__(self, store: SQLiteStore, ttl_days: float, enabled: bool = True):
+        self.store = store
+        self.ttl_s = ttl_days * 86400
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {k: 0 for k in PK_CACHE_KINDS}
+        self._misses: Dict[str, int] = {k: 0 for k in PK_CACHE_KINDS}
+
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Запись по ключу или None (нет / истёк TTL / кэш выключен)."""
+        if not self.enabled or not key:
+            return None
+        value = self.store.get(f"pk:{kind}", key, max_age_s=self.ttl_s)
+        with self._lock:
+            if value is None:
+                self._misses[kind] = self._misses.get(kind, 0) + 1
+            else:
+                self._hits[kind] = self._hits.get(kind, 0) + 1
+        return value
+
+    def put(self, kind: str, key: str, value: Dict[str, Any]) -> None:
+        """Сохраняет запись (перезаписывает)."""
+        if not self.enabled or not key:
+            return
+        self.store.set(f"pk:{kind}", key, value)
+
+    def invalidate(self, key: Optional[str] = None, kind: Optional[str] = None) -> int:
+        """
+        Ручная инвалидация.
+
+            invalidate("amlodipine")               → все виды для МНН
+            invalidate("amlodipine", "cv_intra")   → только CVintra
+            invalidate(kind="protocols")           → все протоколы
+            invalidate()                           → весь кэш
+
+        Returns:
+            Количество удалённых записей.
+        """
+        kinds = [kind] if kind else list(PK_CACHE_KINDS)
+        removed = 0
+        for k in kinds:
+            removed += self.store.delete(f"pk:{k}", key)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики попаданий/промахов по видам + число записей."""
+        with self._lock:
+            hits = dict(self._hits)
+            misses = dict(self._misses)
+        return {
+            "enabled": self.enabled,
+            "ttl_days": self.ttl_s / 86400,
+            "hits": hits,
+            "misses": misses,
+            "entries": {k: len(self.store.keys(f"pk:{k}")) for k in PK_CACHE_KINDS},
+        }
+
+
+_pk_cache: Optional[PKEvidenceCache] = None
+_pk_cache_lock = threading.Lock()
+
+
+def get_pk_cache() -> PKEvidenceCache:
+    """Общий экземпляр кэша (ленивая инициализация)."""
+    global _pk_cache
+    with _pk_cache_lock:
+        if _pk_cache is None:
+            _pk_cache = PKEvidenceCache(
+                store=get_store(),
+                ttl_days=settings.PK_CACHE_TTL_DAYS,
+                enabled=settings.PK_CACHE_ENABLED,
+            )
+        return _pk_cache
+
+
+def load_cached(kind: str, key: str) -> Optional[Dict[str, Any]]:
+    """Безопасное чтение: ошибки БД не должны ломать поиск."""
+    try:
+        return get_pk_cache().get(kind, key)
+    except Exception as e:
+        print(f"   ⚠️  PK-кэш ({kind}): {type(e).__name__}: {e}")
+        return None
+
+
+def store_cached(kind: str, key: str, value: Dict[str, Any]) -> None:
+    """Безопасная запись: ошибки БД не должны ломать поиск."""
+    try:
+        get_pk_cache().put(kind, key, value)
+    except Exception as e:
+        print(f"   ⚠️  PK-кэш ({kind}): {type(e).__name__}: {e}")
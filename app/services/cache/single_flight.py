@@ -0,0 +1,228 @@
+"""
+services/cache/single_flight.py — Объединение одинаковых одновременных запросов.
+
+Когда несколько пайплайнов одновременно ищут данные по одному МНН,
+upstream-запрос выполняет только первый («лидер»), остальные ждут
+его результат:
+
+    @single_flight(lambda inn_en, inn_ru="", **kw: (inn_en or inn_ru).lower())
+    def search_cv_intra(inn_en, inn_ru="", ...): ...
+
+Работает для обычных и async-функций, между потоками и event loop'ами
+(общий concurrent.futures.Future). Ожидающие получают копию результата,
+чтобы изменения одного вызывающего не влияли на других.
+
+Параметры декоратора (получают аргументы вызова):
+  - wait_timeout(*args, **kwargs) — сколько ожидающий готов ждать лидера
+    (его собственный дедлайн); не дождался — выполняет запрос сам;
+  - shareable(result, *args, **kwargs) — можно ли отдать результат лидера
+    другим (например, не урезан ли он дедлайном лидера); нет — ожидающие
+    выполняют запрос сами;
+  - adopt((args, kwargs) лидера, (args, kwargs) ожидающего) — перенести
+    побочные данные лидера ожидающему (ответы пула прогона и т.п.).
+
+Для функций с аргументами deadline= / pool= готовые варианты —
+deadline_wait, deadline_shareable, pool_adopt.
+"""
+
+import asyncio
+import copy
+import functools
+import re
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _LeaderCancelled(Exception):
+    """Лидер отменён или его результат не для других — ожидающие выполняют запрос сами."""
+
+
+class SingleFlight:
+    """Реестр запросов «в полёте» для одной функции."""
+
+    def __init__(
+        self,
+        name: str,
+        wait_timeout: Optional[Callable[..., Optional[float]]] = None,
+        shareable: Optional[Callable[..., bool]] = None,
+        adopt: Optional[Callable[[Tuple, Tuple], None]] = None,
+    ):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.shareable = shareable
+        self.adopt = adopt
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.leaders = 0
+        self.shared = 0
+        self.own = 0   # ожидающие, выполнившие запрос сами (тайм-аут / результат не для них)
+
+    def _join(self, key: str):
+        """(future, is_leader)"""
+        with self._lock:
+            fut = self._calls.get(key)
+            # Завершённый, но ещё не снятый лидер — не ждём его, а начинаем заново
+            if fut is not None and not fut.done():
+                self.shared += 1
+                return fut, False
+            fut = Future()
+            self._calls[key] = fut
+            self.leaders += 1
+            return fut, True
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def _publish(self, fut: Future, result: Any, args: Tuple, kwargs: Dict) -> None:
+        """Результат лидера ожидающим — или отказ, если он не для других."""
+        if self.shareable is not None and not self.shareable(result, *args, **kwargs):
+            fut.set_exception(_LeaderCancelled())
+        else:
+            fut.set_result((result, args, kwargs))
+
+    def _receive(self, shared: Tuple, args: Tuple, kwargs: Dict) -> Any:
+        result, leader_args, leader_kwargs = shared
+        if self.adopt is not None:
+            self.adopt((leader_args, leader_kwargs), (args, kwargs))
+        return copy.deepcopy(result)
+
+    def _own_call(self, key: str, reason: str) -> None:
+        with self._lock:
+            self.own += 1
+        print(f"  🔗 {self.name}({key}): {reason} — выполняем запрос сами")
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Синхронный вызов с объединением по key."""
+        timeout = self.wait_timeout(*args, **kwargs) if self.wait_timeout else None
+        while True:
+            fut, leader = self._join(key)
+            if leader:
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    fut.set_exception(e)
+                    raise
+                else:
+                    self._publish(fut, result, args, kwargs)
+                    return result
+                finally:
+                    self._finish(key)
+
+            print(f"  🔗 {self.name}({key}): ждём уже идущий запрос")
+            try:
+                return self._receive(fut.result(timeout=timeout), args, kwargs)
+            except _LeaderCancelled:
+                continue
+            except FutureTimeout:
+                self._own_call(key, f"лидер не успел за {timeout:.1f}с")
+                return fn(*args, **kwargs)
+
+    async def do_async(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Асинхронный вызов с объединением по key."""
+        timeout = self.wait_timeout(*args, **kwargs) if self.wait_timeout else None
+        while True:
+            fut, leader = self._join(key)
+            if leader:
+                try:
+                    result = await fn(*args, **kwargs)
+                except asyncio.CancelledError:
+                    fut.set_exception(_LeaderCancelled())
+                    raise
+                except BaseException as e:
+                    fut.set_exception(e)
+                    raise
+                else:
+                    self._publish(fut, result, args, kwargs)
+                    return result
+                finally:
+                    self._finish(key)
+
+            print(f"  🔗 {self.name}({key}): ждём уже идущий запрос")
+            try:
+                # shield: тайм-аут ожидающего не должен отменять общий future лидера
+                shared = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), timeout)
+                return self._receive(shared, args, kwargs)
+            except _LeaderCancelled:
+                continue
+            except asyncio.TimeoutError:
+                self._own_call(key, f"лидер не успел за {timeout:.1f}с")
+                return await fn(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"leaders": self.leaders, "shared": self.shared, "own": self.own, "in_flight": in_flight}
+
+
+_flights: Dict[str, SingleFlight] = {}
+
+
+def single_flight(
+    key_fn: Callable[..., Optional[str]],
+    name: Optional[str] = None,
+    wait_timeout: Optional[Callable[..., Optional[float]]] = None,
+    shareable: Optional[Callable[..., bool]] = None,
+    adopt: Optional[Callable[[Tuple, Tuple], None]] = None,
+):
+    """
+    Декоратор: одновременные вызовы с одинаковым key_fn(*args, **kwargs)
+    выполняются один раз. Пустой ключ — вызов без объединения.
+    wait_timeout / shareable / adopt — см. описание модуля.
+    """
+    def decorator(fn: Callable) -> Callable:
+        flight = SingleFlight(name or fn.__name__, wait_timeout, shareable, adopt)
+        _flights[flight.name] = flight
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = key_fn(*args, **kwargs)
+                if not key:
+                    return await fn(*args, **kwargs)
+                return await flight.do_async(key, fn, *args, **kwargs)
+            async_wrapper.flight = flight
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_fn(*args, **kwargs)
+            if not key:
+                return fn(*args, **kwargs)
+            return flight.do(key, fn, *args, **kwargs)
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
+
+
+def deadline_wait(*args, deadline=None, **kwargs) -> Optional[float]:
+    """wait_timeout: ожидающий ждёт лидера не дольше своего дедлайна."""
+    return deadline.timeout() if deadline is not None else None
+
+
+def deadline_shareable(result: Any, *args, deadline=None, **kwargs) -> bool:
+    """shareable: результат, урезанный дедлайном лидера, другим не отдаётся."""
+    return deadline is None or not deadline.expired()
+
+
+def pool_adopt(leader: Tuple, follower: Tuple) -> None:
+    """adopt: ответы из пула прогона лидера (pool=) — в пул ожидающего."""
+    leader_pool, follower_pool = leader[1].get("pool"), follower[1].get("pool")
+    if leader_pool is not None and follower_pool is not None and follower_pool is not leader_pool:
+        follower_pool.merge(leader_pool)
+
+
+def normalize_key(*parts: Optional[str]) -> str:
+    """Ключ из строк: нижний регистр, без ®™«»" и лишних пробелов."""
+    cleaned = []
+    for part in parts:
+        text = re.sub(r'[®™©«»"„“”\']', '', (part or "").lower())
+        cleaned.append(re.sub(r'\s+', ' ', text).strip())
+    return "|".join(cleaned) if any(cleaned) else ""
+
+
+def flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Статистика объединения по всем функциям."""
+    return {name: f.stats() for name, f in _flights.items()}
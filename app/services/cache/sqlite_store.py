@@ -0,0 +1,184 @@
+"""
+services/cache/sqlite_store.py — Персистентное key-value хранилище на SQLite.
+
+Общая основа для кэшей, которые должны переживать перезапуск процесса
+(PK-данные по МНН, переводы, справочники). Значения хранятся как JSON
+с временем записи — срок жизни (TTL) проверяет вызывающий код.
+
+Путь к БД берётся из DATABASE_URL (по умолчанию sqlite:///./ifarma.db).
+Режим WAL позволяет нескольким процессам (сервер + CLI) читать и писать
+одну и ту же БД одновременно.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_DB_PATH = "./ifarma.db"
+
+
+def sqlite_path_from_url(url: str) -> str:
+    """
+    Извлекает путь к файлу из SQLAlchemy-подобного URL.
+
+        "sqlite:///./ifarma.db"   → "./ifarma.db"
+        "sqlite:////var/db/x.db"  → "/var/db/x.db"
+
+    Для не-SQLite URL возвращает путь по умолчанию.
+    """
+    if not url:
+        return DEFAULT_DB_PATH
+    if url.startswith("sqlite:///"):
+        return url[len("sqlite:///"):] or DEFAULT_DB_PATH
+    if url.startswith("sqlite://"):
+        return url[len("sqlite://"):] or DEFAULT_DB_PATH
+    print(f"  ⚠️ DATABASE_URL '{url.split(':', 1)[0]}' не SQLite — кэш в {DEFAULT_DB_PATH}")
+    return DEFAULT_DB_PATH
+
+
+class SQLiteStore:
+    """
+    Потокобезопасное key-value хранилище: (namespace, key) → JSON.
+
+    Одно соединение на процесс, операции сериализуются через lock.
+    """
+
+    def __init__(self, path: str, table: str = "kv_cache"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                f"  namespace TEXT NOT NULL,"
+                f"  key TEXT NOT NULL,"
+                f"  value TEXT NOT NULL,"
+                f"  stored_at REAL NOT NULL,"
+                f"  PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def get_entry(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Возвращает (значение, время записи) или None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), row[1]
+        except json.JSONDecodeError:
+            return None
+
+    def get(self, namespace: str, key: str, max_age_s: Optional[float] = None) -> Optional[Any]:
+        """Значение по ключу; None если нет или старше max_age_s."""
+        entry = self.get_entry(namespace, key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if max_age_s is not None and time.time() - stored_at > max_age_s:
+            return None
+        return value
+
+    def get_many(self, namespace: str, keys: List[str]) -> Dict[str, Any]:
+        """Пакетное чтение: {key: value} для найденных ключей."""
+        if not keys:
+            return {}
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} "
+                    f"WHERE namespace = ? AND key IN ({placeholders})",
+                    (namespace, *chunk),
+                ).fetchall()
+                for k, v in rows:
+                    try:
+                        found[k] = json.loads(v)
+                    except json.JSONDecodeError:
+                        continue
+        return found
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        """Записывает значение (перезаписывает существующее)."""
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (namespace, key, value, stored_at) "
+                f"VALUES (?, ?, ?, ?)",
+                (namespace, key, payload, time.time()),
+            )
+            self._conn.commit()
+
+    def set_many(self, namespace: str, items: Dict[str, Any]) -> None:
+        """Пакетная запись в одной транзакции."""
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (namespace, k, json.dumps(v, ensure_ascii=False, default=str), now)
+            for k, v in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (namespace, key, value, stored_at) "
+                f"VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> int:
+        """Удаляет ключ (или весь namespace, если key=None). Возвращает число строк."""
+        with self._lock:
+            if key is None:
+                cur = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE namespace = ?", (namespace,)
+                )
+            else:
+                cur = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                )
+            self._conn.commit()
+            return cur.rowcount
+
+    def keys(self, namespace: str) -> List[str]:
+        """Все ключи namespace."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM {self.table} WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+
+# ── Общие экземпляры (одно соединение на файл БД) ──
+
+_stores: Dict[str, SQLiteStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: Optional[str] = None) -> SQLiteStore:
+    """Возвращает общий SQLiteStore для пути (по умолчанию — из DATABASE_URL)."""
+    if path is None:
+        from app.config.settings import settings
+        path = sqlite_path_from_url(settings.DATABASE_URL)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = SQLiteStore(path)
+            _stores[path] = store
+        return store
@@ -0,0 +1,234 @@
+"""
+services/circuit_breaker.py — Предохранители (circuit breaker) для внешних сервисов.
+
+Когда upstream деградирует (Yandex Cloud, vidal.ru, Groq), каждый вызов
+ждёт полный тайм-аут, а пайплайн делает десятки вызовов. Предохранитель
+считает ошибки в скользящем окне и при превышении доли отказов «размыкается»:
+вызовы сразу получают отказ, не дожидаясь тайм-аута.
+
+Состояния:
+  closed    — вызовы идут, ошибки считаются;
+  open      — вызовы отклоняются CB_OPEN_S секунд;
+  half_open — пропускается одна пробная попытка: успех → closed,
+              ошибка → снова open.
+
+Использование:
+    from app.services.circuit_breaker import get_breaker
+
+    breaker = get_breaker("gensearch")
+    if not breaker.allow():
+        return None                      # быстрый отказ
+    try:
+        resp = ...
+    except Timeout:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+Настройки (settings): CB_FAILURE_RATE=0.5, CB_MIN_CALLS=5, CB_WINDOW_S=60,
+CB_OPEN_S=30. CB_ENABLED=0 отключает предохранители.
+Состояние всех предохранителей — GET /api/health/circuits.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Имена предохранителей
+GENSEARCH = "gensearch"
+TRANSLATE = "translate"
+SUGGEST = "suggest"
+DADATA = "dadata"
+GROQ = "groq"
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён: предохранитель разомкнут."""
+
+    def __init__(self, name: str):
+        super().__init__(f"circuit '{name}' is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """Потокобезопасный предохранитель с порогом доли отказов."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_s: float = 60,
+        open_s: float = 30,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_s = window_s
+        self.open_s = open_s
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (время, успех)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.rejected = 0
+        self.trips = 0
+
+    # ── Состояние ──
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_s:
+            self._calls.popleft()
+
+    def _current_state(self, now: float) -> str:
+        if self._state == STATE_OPEN and now - self._opened_at >= self.open_s:
+            self._state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def is_open(self) -> bool:
+        """Разомкнут и пробовать ещё рано (half_open считается доступным)."""
+        if not self.enabled:
+            return False
+        return self.state == STATE_OPEN
+
+    # ── Вызовы ──
+
+    def allow(self) -> bool:
+        """
+        Можно ли выполнить вызов. В half_open — только одна проба за раз
+        (зависшая проба без record_* через open_s уступает место новой).
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and (
+                not self._probe_in_flight or now - self._probe_started > self.open_s
+            ):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == STATE_HALF_OPEN:
+                print(f"  🔌 Предохранитель {self.name}: восстановлен")
+                self._state = STATE_CLOSED
+                self._calls.clear()
+                self._probe_in_flight = False
+            self._calls.append((now, True))
+            self._trim(now)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._calls.append((now, False))
+            self._trim(now)
+            if state == STATE_HALF_OPEN:
+                self._open(now)
+                return
+            if state != STATE_CLOSED or len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.trips += 1
+        print(f"  🔌 Предохранитель {self.name}: разомкнут на {self.open_s:.0f}с")
+
+    def reset(self) -> None:
+        """Ручное замыкание (после починки upstream)."""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._calls.clear()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._trim(now)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            retry_in = max(0.0, self.open_s - (now - self._opened_at)) if state == STATE_OPEN else 0.0
+            return {
+                "state": state if self.enabled else "disabled",
+                "calls": len(self._calls),
+                "failures": failures,
+                "failure_rate": round(failures / len(self._calls), 3) if self._calls else 0.0,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "retry_in_s": round(retry_in, 1),
+            }
+
+
+# ── Реестр ──
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Предохранитель по имени (создаётся при первом обращении, настройки из settings)."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            from app.config.settings import settings
+            breaker = CircuitBreaker(
+                name,
+                failure_rate=settings.CB_FAILURE_RATE,
+                min_calls=settings.CB_MIN_CALLS,
+                window_s=settings.CB_WINDOW_S,
+                open_s=settings.CB_OPEN_S,
+                enabled=settings.CB_ENABLED,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def host_breaker_name(url: str) -> str:
+    """Имя предохранителя для хоста: 'https://www.vidal.ru/x' → 'host:vidal.ru'."""
+    from urllib.parse import urlparse
+    host = (urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"host:{host}"
+
+
+def circuit_is_open(name: str) -> bool:
+    """Быстрая проверка без создания лишних предохранителей."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+    return breaker.is_open() if breaker else False
+
+
+def circuits_snapshot(name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Состояние всех (или одного) предохранителей — для API."""
+    with _breakers_lock:
+        items = [(n, b) for n, b in _breakers.items() if name is None or n == name]
+    return {n: b.snapshot() for n, b in sorted(items)}
@@ -0,0 +1,359 @@
+"""
+services/http_client.py — Общий HTTP-клиент процесса.
+
+Все внешние HTTP-вызовы (GenSearch, Translate, Suggest, DaData, страницы
+инструкций vidal/rlsnet/...) идут через одну aiohttp-сессию:
+
+  - свой пул keep-alive соединений на каждый сервис (HTTP_POOL_PER_HOST
+    на хост, для GenSearch — больше, см. SERVICE_POOL_PER_HOST;
+    HTTP_POOL_PER_HOST_<СЕРВИС> переопределяет) и кэш DNS — TLS-рукопожатие
+    и DNS-запрос делаются один раз на процесс, а не на каждый запрос;
+    всплеск запросов одного сервиса не занимает соединения другого;
+  - тайм-ауты по сервисам (SERVICE_TIMEOUTS, переопределяются
+    HTTP_TIMEOUT_<СЕРВИС>, например HTTP_TIMEOUT_SUGGEST=3) — на установку
+    соединения и на ожидание данных от сервера; ожидание свободного
+    соединения в пуле в тайм-аут не входит, чтобы очередь внутри процесса
+    не выглядела как сбой upstream (и не размыкала circuit breaker);
+    с момента получения соединения весь запрос ограничен
+    TOTAL_TIMEOUT_FACTOR × тайм-аут сервиса (сервер, отдающий байты
+    медленнее паузы sock_read, не держит запрос бесконечно);
+  - синхронный фасад ждёт результат не дольше этого предела плюс
+    SYNC_POOL_WAIT_S на очередь в пуле;
+  - сессия живёт в собственном фоновом event loop, поэтому ей можно
+    пользоваться и из корутин (FastAPI, asyncio.run в CLI), и из потоков
+    синхронного кода (sync-фасад *_sync) — пул общий для всех.
+
+Ответ читается целиком: HttpResponse(status, url, headers, text).
+Сетевые ошибки — HttpError, тайм-аут — HttpTimeout (подкласс HttpError).
+
+Использование:
+    from app.services.http_client import get_http_client, HttpError
+
+    http = get_http_client()
+    resp = await http.get(url, service="suggest")               # async
+    resp = http.post_sync(url, json=body, service="gensearch")  # sync
+    if resp.status == 200:
+        data = resp.json()
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import json as jsonlib
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import aiohttp
+from multidict import CIMultiDict
+
+
+DEFAULT_TIMEOUT_S = 15.0
+
+# Тайм-ауты по умолчанию (сек): на соединение и на паузу в получении ответа
+SERVICE_TIMEOUTS: Dict[str, float] = {
+    "gensearch": 25.0,
+    "translate": 10.0,
+    "suggest": 2.0,
+    "dadata": 5.0,
+    "instructions": 15.0,
+}
+
+# Предел на весь запрос после получения соединения — во столько раз больше
+# тайм-аута сервиса
+TOTAL_TIMEOUT_FACTOR = 3.0
+
+# Сколько синхронный вызов готов ждать свободного соединения в пуле сверх
+# предела самого запроса
+SYNC_POOL_WAIT_S = 60.0
+
+# Соединений на хост для сервисов с большой параллельностью. GenSearch:
+# CV_SEARCH_CONCURRENCY запросов на термин × компоненты × пайплайны + дубли;
+# фактическую частоту всё равно ограничивает bucket GenSearch-клиента.
+SERVICE_POOL_PER_HOST: Dict[str, int] = {
+    "gensearch": 64,
+}
+
+
+class HttpError(Exception):
+    """Сетевая ошибка: соединение, DNS, TLS, обрыв ответа."""
+
+
+class HttpTimeout(HttpError):
+    """Запрос не уложился в тайм-аут сервиса."""
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    url: str
+    headers: CIMultiDict = field(default_factory=CIMultiDict)  # без учёта регистра
+    text: str = ""
+
+    def json(self) -> Any:
+        """Разбор тела как JSON (ValueError — невалидный JSON)."""
+        return jsonlib.loads(self.text)
+
+
+class HttpClient:
+    """
+    aiohttp-сессия в фоновом event loop + синхронный фасад.
+
+    Счётчики (stats): запросы и ошибки по сервисам, число открытых
+    соединений и DNS-запросов — видно, насколько пул переиспользуется.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10,
+                 keepalive_s: float = 60, dns_ttl_s: int = 300):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_s = keepalive_s
+        self.dns_ttl_s = dns_ttl_s
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.stats: Dict[str, Any] = {
+            "requests": {}, "errors": {}, "timeouts": {},
+            "connections_opened": 0, "dns_lookups": 0,
+        }
+
+    # ── Фоновый loop ──
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="http-client", daemon=True,
+                )
+                thread.start()
+                self._loop, self._thread, self._sessions = loop, thread, {}
+            return self._loop
+
+    def pool_per_host(self, service: str) -> int:
+        env = os.getenv(f"HTTP_POOL_PER_HOST_{service.upper()}")
+        if env:
+            return int(env)
+        return SERVICE_POOL_PER_HOST.get(service, self.limit_per_host)
+
+    def _get_session(self, service: str) -> aiohttp.ClientSession:
+        """Сессия (пул соединений) сервиса. Вызывается только в фоновом loop."""
+        session = self._sessions.get(service)
+        if session is None or session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection)
+            trace.on_connection_create_end.append(self._on_acquired)
+            trace.on_connection_reuseconn.append(self._on_acquired)
+            trace.on_dns_resolvehost_end.append(self._on_dns)
+            per_host = self.pool_per_host(service)
+            session = self._sessions[service] = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=max(self.limit, per_host),
+                    limit_per_host=per_host,
+                    keepalive_timeout=self.keepalive_s,
+                    ttl_dns_cache=self.dns_ttl_s,
+                ),
+                trace_configs=[trace],
+            )
+        return session
+
+    async def _on_connection(self, session, ctx, params) -> None:
+        self._count("connections_opened")
+
+    async def _on_dns(self, session, ctx, params) -> None:
+        self._count("dns_lookups")
+
+    async def _on_acquired(self, session, ctx, params) -> None:
+        """Соединение получено (новое или из пула) — пошёл отсчёт предела запроса."""
+        if isinstance(ctx.trace_request_ctx, asyncio.Event):
+            ctx.trace_request_ctx.set()
+
+    def _count(self, key: str, service: Optional[str] = None) -> None:
+        with self._lock:
+            if service is None:
+                self.stats[key] += 1
+            else:
+                self.stats[key][service] = self.stats[key].get(service, 0) + 1
+
+    @staticmethod
+    def timeout_for(service: str) -> float:
+        env = os.getenv(f"HTTP_TIMEOUT_{service.upper()}")
+        if env:
+            return float(env)
+        return SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUT_S)
+
+    def total_timeout_for(self, service: str, timeout: Optional[float] = None) -> float:
+        """Предел на весь запрос после получения соединения."""
+        limit = timeout if timeout is not None else self.timeout_for(service)
+        return limit * TOTAL_TIMEOUT_FACTOR
+
+    def sync_timeout_for(self, service: str, timeout: Optional[float] = None) -> float:
+        """Сколько синхронный вызов ждёт результат: предел запроса + очередь в пуле."""
+        return self.total_timeout_for(service, timeout) + SYNC_POOL_WAIT_S
+
+    async def _send(self, method: str, url: str, service: str,
+                    client_timeout: aiohttp.ClientTimeout,
+                    acquired: asyncio.Event, kwargs: Dict[str, Any]) -> HttpResponse:
+        async with self._get_session(service).request(
+            method, url, timeout=client_timeout, trace_request_ctx=acquired, **kwargs,
+        ) as resp:
+            text = await resp.text(errors="replace")
+            return HttpResponse(
+                status=resp.status, url=str(resp.url),
+                headers=CIMultiDict(resp.headers), text=text,
+            )
+
+    async def _do(self, method: str, url: str, service: str,
+                  timeout: Optional[float], **kwargs) -> HttpResponse:
+        self._count("requests", service)
+        limit = timeout if timeout is not None else self.timeout_for(service)
+        total = self.total_timeout_for(service, timeout)
+        # Без total и connect: они включают ожидание свободного соединения в пуле
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=limit, sock_read=limit)
+        acquired = asyncio.Event()
+        send = asyncio.ensure_future(
+            self._send(method, url, service, client_timeout, acquired, kwargs),
+        )
+        waiter = asyncio.ensure_future(acquired.wait())
+        try:
+            # Очередь в пуле — без предела; с получения соединения — не дольше total
+            await asyncio.wait({send, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            return await asyncio.wait_for(send, total)
+        except asyncio.TimeoutError:
+            self._count("timeouts", service)
+            raise HttpTimeout(f"{service}: тайм-аут {limit:g}с / {total:g}с ({url})") from None
+        except aiohttp.ClientError as e:
+            self._count("errors", service)
+            raise HttpError(f"{type(e).__name__}: {e}") from e
+        finally:
+            waiter.cancel()
+            if not send.done():
+                send.cancel()
+
+    # ── Асинхронный API ──
+
+    async def request(self, method: str, url: str, *, service: str = "default",
+                      timeout: Optional[float] = None, **kwargs) -> HttpResponse:
+        """
+        Запрос из любого event loop. kwargs — как у aiohttp
+        (params, json, data, headers, allow_redirects).
+        Отмена вызывающей корутины отменяет и запрос.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._do(method, url, service, timeout, **kwargs), self._ensure_loop(),
+        )
+        return await asyncio.wrap_future(future)
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    # ── Синхронный фасад (CLI, потоки пайплайна) ──
+
+    def request_sync(self, method: str, url: str, *, service: str = "default",
+                     timeout: Optional[float] = None, **kwargs) -> HttpResponse:
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("request_sync нельзя вызывать из фонового loop HTTP-клиента")
+        future = asyncio.run_coroutine_threadsafe(
+            self._do(method, url, service, timeout, **kwargs), loop,
+        )
+        return self._result(future, self.sync_timeout_for(service, timeout))
+
+    def get_sync(self, url: str, **kwargs) -> HttpResponse:
+        return self.request_sync("GET", url, **kwargs)
+
+    def post_sync(self, url: str, **kwargs) -> HttpResponse:
+        return self.request_sync("POST", url, **kwargs)
+
+    def run_sync(self, coro, timeout: float) -> Any:
+        """
+        Выполняет корутину в фоновом loop клиента и ждёт результат
+        не дольше timeout (затем корутина отменяется, HttpTimeout).
+
+        Для сценариев из нескольких запросов (например, дублирующий запрос
+        GenSearch с отменой проигравшего) из синхронного кода.
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_sync нельзя вызывать из фонового loop HTTP-клиента")
+        return self._result(asyncio.run_coroutine_threadsafe(coro, loop), timeout)
+
+    async def run(self, coro, timeout: float) -> Any:
+        """
+        То же, что run_sync, из любого event loop: корутина выполняется
+        в фоновом loop клиента, результат ждём не дольше timeout.
+        Отмена вызывающей корутины отменяет и её.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise HttpTimeout(f"нет результата за {timeout:g}с") from None
+
+    @staticmethod
+    def _result(future: concurrent.futures.Future, timeout: float) -> Any:
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise HttpTimeout(f"нет результата за {timeout:g}с") from None
+
+    # ── Завершение ──
+
+    async def _close_session(self) -> None:
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+    def close(self, timeout: float = 5) -> None:
+        """Закрывает соединения и останавливает фоновый loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    async def aclose(self) -> None:
+        """close() для async-кода (shutdown FastAPI)."""
+        await asyncio.to_thread(self.close)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": dict(self.stats["requests"]),
+                "errors": dict(self.stats["errors"]),
+                "timeouts": dict(self.stats["timeouts"]),
+                "connections_opened": self.stats["connections_opened"],
+                "dns_lookups": self.stats["dns_lookups"],
+            }
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Общий клиент процесса (ленивая инициализация, размеры пула из settings)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from app.config.settings import settings
+            _client = HttpClient(
+                limit=settings.HTTP_POOL_LIMIT,
+                limit_per_host=settings.HTTP_POOL_PER_HOST,  # кроме SERVICE_POOL_PER_HOST
+            )
+            atexit.register(_client.close)
+        return _client
@@ -1,11 +1,15 @@
 """
 services/llm/groq_client.py — Groq LLM-клиент.
+
+При серии сбоев Groq (тайм-ауты, 5xx) предохранитель "groq" размыкается,
+и generate() сразу бросает CircuitOpenError вместо ожидания тайм-аута.
 """
 
 import asyncio
 from typing import Optional
 
 from app.services.llm.base import LLMClient
+from app.services.circuit_breaker import get_breaker, CircuitOpenError, GROQ
 
 
 class GroqLLMClient(LLMClient):
@@ -27,6 +31,10 @@ class GroqLLMClient(LLMClient):
         images: Optional[list[bytes]] = None,
         system_prompt: Optional[str] = None,
     ) -> str:
+        breaker = get_breaker(GROQ)
+        if not breaker.allow():
+            raise CircuitOpenError(GROQ)
+
         def _call() -> str:
             messages = []
             if system_prompt:
@@ -40,7 +48,17 @@ class GroqLLMClient(LLMClient):
             )
             return (resp.choices[0].message.content or "").strip()
 
-        return await asyncio.to_thread(_call)
+        try:
+            result = await asyncio.to_thread(_call)
+        except Exception as e:
+            # 4xx (ключ, лимит, запрос) — Groq отвечает, это не сбой сервиса
+            if getattr(e, "status_code", 500) >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
 
     async def embed(self, text: str) -> list[float]:
         raise NotImplementedError("Groq does not support embeddings.")
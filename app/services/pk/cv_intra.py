@@ -7,6 +7,7 @@ services/pk/cv_intra.py — Модуль определения CVintra.
 
 ПРИОРИТЕТ (ИЗМЕНЁН — PubMed ПЕРВЫМ!):
 1. Пользователь передал --cv-intra → используем
+   (затем — офлайн-корпус MEDLINE, services/pk/medline_index.py, если построен)
 2. PubMed: статья с 90% CI из BE-исследования → расчёт CVintra
 3. PubMed: статья с прямым CVintra из BE-исследования
 4. FDA/EMA BE Guidance Document → CVintra (НО: 30% = порог, пропускаем)
@@ -22,22 +23,39 @@ services/pk/cv_intra.py — Модуль определения CVintra.
     CVintra = √(exp(σ²w) − 1) × 100%
     Эквивалентно функции CVfromCI() из R-пакета PowerTOST.
 
-ИСПРАВЛЕНИЕ v2 (_extract_cv_from_text):
-    Sentence-boundary контекст вместо regex-паттернов.
-    Фильтрация inter-subject / between-subject CV.
-    Приоритизация intra-subject + Cmax.
+ИЗВЛЕЧЕНИЕ ИЗ ОТВЕТОВ (services/pk/extraction.py):
+    Ответ разбирается один раз: sentence-boundary контекст CVintra,
+    фильтрация inter-subject / between-subject CV, приоритизация
+    intra-subject + Cmax, 90% CI, T½ / Tmax / Cmax.
+
+ПАРАЛЛЕЛЬНЫЙ ПОИСК:
+    Запросы всех уровней (PubMed CI → PubMed direct → Guidance → интернет)
+    по одному термину выполняются одновременно (settings.CV_SEARCH_CONCURRENCY,
+    по умолчанию 6). Приоритет уровней при выборе значения сохранён,
+    менее приоритетные запросы отменяются, как только победитель ясен.
+
+АДАПТИВНЫЙ ПЛАН (services/pk/source_stats.py):
+    Шаблоны внутри уровня упорядочиваются по истории попаданий для группы
+    препарата, малорезультативные отсеиваются. Порядок уровней (и выбор
+    значения) не меняется.
 """
 
+import asyncio
 import math
 import os
-import re
-import requests
-from typing import Optional, Tuple, Dict, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Optional, Dict, List
 from scipy import stats
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
+from app.config.settings import settings
 
-YANDEX_GEN_SEARCH_URL = "https://searchapi.api.cloud.yandex.net/v2/gen/search"
+
+# Сколько запросов GenSearch одного термина выполняются одновременно
+CV_SEARCH_CONCURRENCY = max(1, settings.CV_SEARCH_CONCURRENCY)
 
 
 # ════════════════════════════════════════════════════════
@@ -88,6 +106,118 @@ if not _HAS_INN_UTILS:
         return ""  # без словаря не можем перевести
 
 
+# Общий клиент GenSearch (лимит RPS, повторы при 429)
+try:
+    from app.services.search.gensearch_client import (
+        get_gensearch_client, answer_text, answer_sources, LANE_BACKGROUND,
+    )
+except ImportError:
+    from gensearch_client import (
+        get_gensearch_client, answer_text, answer_sources, LANE_BACKGROUND,
+    )
+
+
+# Предохранитель GenSearch: при деградации Yandex Cloud — сразу значения по умолчанию
+try:
+    from app.services.circuit_breaker import circuit_is_open, get_breaker, GENSEARCH
+except ImportError:
+    GENSEARCH = "gensearch"
+    def circuit_is_open(name):
+        return False
+    get_breaker = None
+
+
+def _gensearch_trips() -> int:
+    """Сколько раз размыкался предохранитель GenSearch (0 — модуль недоступен)."""
+    return get_breaker(GENSEARCH).trips if get_breaker is not None else 0
+
+
+# Разбор ответов GenSearch (один проход, скомпилированные шаблоны)
+try:
+    from app.services.pk.extraction import extract
+except ImportError:
+    from extraction import extract
+
+
+# Пул ответов прогона: запросы без повторов, все факты из каждого ответа
+try:
+    from app.services.pk.evidence_pool import EvidencePool
+except ImportError:
+    from evidence_pool import EvidencePool
+
+
+# История результативности шаблонов: порядок и отсев запросов по группе препарата
+try:
+    from app.services.pk.source_stats import get_source_stats, query_template, QueryOutcome
+    _HAS_SOURCE_STATS = True
+except ImportError:
+    _HAS_SOURCE_STATS = False
+
+
+# Бюджет времени прогона: по истечении — лучшее из найденного
+try:
+    from app.utils.deadline import Deadline, ensure_deadline
+except ImportError:
+    from deadline import Deadline, ensure_deadline
+
+
+# Персистентный кэш PK-данных (SQLite, TTL = PK_CACHE_TTL_DAYS)
+try:
+    from app.services.cache.pk_cache import pk_cache_key, load_cached, store_cached
+    _HAS_PK_CACHE = True
+except ImportError:
+    _HAS_PK_CACHE = False
+
+# Офлайн-корпус MEDLINE: кандидаты CVintra / T½ по МНН (строится import_medline.py)
+try:
+    from app.services.pk.medline_index import lookup_cv, lookup_pk
+    _HAS_MEDLINE = True
+except ImportError:
+    _HAS_MEDLINE = False
+
+# Объединение одинаковых одновременных запросов (несколько пайплайнов на один МНН)
+try:
+    from app.services.cache.single_flight import (
+        single_flight, normalize_key, deadline_wait, pool_adopt,
+    )
+except ImportError:
+    def single_flight(key_fn, name=None, **options):
+        return lambda fn: fn
+    def normalize_key(*parts):
+        return "|".join((p or "").lower().strip() for p in parts)
+    deadline_wait = pool_adopt = None
+
+
+def _inn_flight_key(inn_en: str = "", inn_ru: str = "", *args, **kwargs) -> str:
+    """Ключ объединения поисков по МНН — тот же, что у PK-кэша."""
+    if _HAS_PK_CACHE:
+        return pk_cache_key(inn_ru, inn_en)
+    return normalize_key(inn_en or inn_ru)
+
+
+def _search_complete(deadline: Optional[Deadline], budget: Optional["SearchBudget"]) -> bool:
+    """Поиск не урезан дедлайном, исчерпанным бюджетом запросов или предохранителем."""
+    if deadline is not None and deadline.expired():
+        return False
+    if budget is not None and budget.exhausted:
+        return False
+    return not circuit_is_open(GENSEARCH)
+
+
+def _flight_shareable(result, *args, deadline: Optional[Deadline] = None,
+                      budget: Optional["SearchBudget"] = None, **kwargs) -> bool:
+    """
+    Результат лидера отдаётся другим, только если он полный (_search_complete —
+    то же условие, что для записи в кэш).
+    """
+    return _search_complete(deadline, budget)
+
+
+# Ожидающий ждёт лидера не дольше своего дедлайна; ответы пула лидера —
+# в пул ожидающего (для следующих этапов его прогона)
+_FLIGHT_OPTIONS = dict(wait_timeout=deadline_wait, shareable=_flight_shareable, adopt=pool_adopt)
+
+
 @dataclass
 class CVintraResult:
     """Результат определения CVintra."""
@@ -99,6 +229,60 @@ class CVintraResult:
     ci_data: Optional[Dict] = None
 
 
+class SearchBudget:
+    """
+    Общий бюджет запросов GenSearch для группы параллельных поисков
+    (например, компоненты комбинированного препарата).
+
+    - max_calls — сколько запросов можно сделать всего (0 = без ограничения)
+    - max_concurrent — сколько запросов одновременно по всей группе
+
+    Потокобезопасен и не привязан к event loop: слот ждётся асинхронно
+    (опросом, как TokenBucket.acquire_async), поэтому поиски группы могут
+    идти и в разных потоках, и корутинами одного loop.
+    """
+
+    def __init__(self, max_calls: Optional[int] = None, max_concurrent: Optional[int] = None):
+        if max_calls is None:
+            max_calls = settings.CV_SEARCH_BUDGET
+        self.max_calls = max(0, max_calls)
+        self.max_concurrent = max(1, max_concurrent or CV_SEARCH_CONCURRENCY)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._exhausted_reported = False
+
+    @property
+    def exhausted(self) -> bool:
+        """Был ли отказ из-за лимита запросов (результат группы мог быть неполным)."""
+        return self._exhausted_reported
+
+    def try_spend(self) -> bool:
+        """Списывает один запрос; False если бюджет исчерпан."""
+        with self._lock:
+            if self.max_calls and self.calls >= self.max_calls:
+                if not self._exhausted_reported:
+                    self._exhausted_reported = True
+                    print(f"   ⚠️  Бюджет GenSearch исчерпан ({self.max_calls} запросов)")
+                return False
+            self.calls += 1
+            return True
+
+    async def run(self, send: Callable[[], Awaitable[str]]) -> str:
+        """
+        send() в слоте группы; "" без вызова — бюджет исчерпан.
+        Отмена (победитель уже есть) снимает и ожидание слота, и запрос.
+        """
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        try:
+            if not self.try_spend():
+                return ""
+            return await send()
+        finally:
+            self._slots.release()
+
+
 # ════════════════════════════════════════════════════════
 # РАСЧЁТ CVintra ИЗ 90% CI
 # ════════════════════════════════════════════════════════
@@ -144,12 +328,16 @@ def _get_df(n: int, design: str) -> int:
 # ПОИСК CVintra
 # ════════════════════════════════════════════════════════
 
-def search_cv_intra(
+@single_flight(_inn_flight_key, name="search_cv_intra", **_FLIGHT_OPTIONS)
+async def search_cv_intra_async(
     inn_en: str,
     inn_ru: str = "",
     ref_drug_name: str = "",
     folder_id: Optional[str] = None,
     api_key: Optional[str] = None,
+    budget: Optional[SearchBudget] = None,
+    deadline: Optional[Deadline] = None,
+    pool: Optional[EvidencePool] = None,
 ) -> CVintraResult:
     """
     Комплексный поиск CVintra.
@@ -166,21 +354,109 @@ def search_cv_intra(
     4. Широкий интернет
     5. Повтор 1-4 с полным МНН (с солью)
     6. Default = 30%
+
+    Найденное значение сохраняется в персистентный кэш по нормализованному
+    МНН — повторный запуск для того же МНН не обращается к Yandex.
+    До сетевого поиска проверяется офлайн-корпус MEDLINE (medline_index.py).
+
+    budget — общий SearchBudget, если несколько поисков идут параллельно
+    (компоненты комбинации): делят лимит запросов и параллельности.
+
+    deadline — бюджет времени: по истечении новые запросы не начинаются,
+    возвращается лучший из полученных ответов (или default). Результат,
+    найденный с урезанным временем, исчерпанным budget или при разомкнувшемся
+    во время поиска предохранителе GenSearch, в кэш не пишется.
+
+    pool — пул ответов прогона (EvidencePool): повторные запросы берутся
+    из него, а ответы доступны поиску ФК-параметров и протоколов.
+
+    Запросы идут корутинами в текущем event loop (PKLiteratureAgent
+    ждёт их напрямую); синхронная обёртка — search_cv_intra.
     """
     folder_id = folder_id or os.getenv("YANDEX_FOLDER_ID", "")
     api_key = api_key or os.getenv("YANDEX_API_KEY", "")
 
+    cache_key = pk_cache_key(inn_ru, inn_en) if _HAS_PK_CACHE else ""
+    if cache_key:
+        cached = load_cached("cv_intra", cache_key)
+        if cached:
+            print(f"  💾 CVintra из кэша ({cache_key}): {cached['cv_intra']}% [{cached['source']}]")
+            return CVintraResult(**cached)
+
+    if _HAS_MEDLINE and cache_key:
+        offline = lookup_cv(cache_key)
+        if offline:
+            print(f"  📚 CVintra из корпуса MEDLINE ({cache_key}): {offline['cv_intra']}% [{offline['source_detail']}]")
+            return CVintraResult(**offline)
+
     if not folder_id or not api_key:
         return _default_result()
+    if circuit_is_open(GENSEARCH):
+        print("  🔌 GenSearch недоступен — CVintra по умолчанию")
+        return _default_result()
+    deadline = ensure_deadline(deadline)
+    if deadline.exhausted("cv_intra"):
+        return _default_result()
+
+    trips = _gensearch_trips()
+    result = await _search_cv_intra_rounds(inn_en, inn_ru, folder_id, api_key, budget, deadline, pool)
+    if result is None:
+        return _default_result()
+
+    # Запросы приоритетных уровней, не выполненные из-за бюджета или
+    # предохранителя, отдали бы победу менее надёжному уровню — такой
+    # результат не кэшируется (иначе поиск не повторится PK_CACHE_TTL_DAYS)
+    if cache_key and _search_complete(deadline, budget) and _gensearch_trips() == trips:
+        store_cached("cv_intra", cache_key, asdict(result))
+    return result
+
+
+def search_cv_intra(
+    inn_en: str,
+    inn_ru: str = "",
+    ref_drug_name: str = "",
+    folder_id: Optional[str] = None,
+    api_key: Optional[str] = None,
+    budget: Optional[SearchBudget] = None,
+    deadline: Optional[Deadline] = None,
+    pool: Optional[EvidencePool] = None,
+) -> CVintraResult:
+    """
+    Синхронная обёртка над search_cv_intra_async (CLI, скрипты, потоки).
+
+    Если в текущем потоке уже работает event loop — поиск выполняется
+    в отдельном потоке; из корутин вызывайте search_cv_intra_async.
+    """
+    coro = search_cv_intra_async(
+        inn_en, inn_ru, ref_drug_name, folder_id, api_key,
+        budget=budget, deadline=deadline, pool=pool,
+    )
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, coro).result()
+
+
+async def _search_cv_intra_rounds(
+    inn_en: str, inn_ru: str, folder_id: str, api_key: str,
+    budget: Optional[SearchBudget] = None,
+    deadline: Optional[Deadline] = None,
+    pool: Optional[EvidencePool] = None,
+) -> Optional[CVintraResult]:
+    """Раунды поиска: базовый МНН → полный МНН (с солью) → русский МНН."""
 
     # ═══════════════════════════════════════
     # НОРМАЛИЗАЦИЯ: убираем соль + авто-перевод ru→en
     # ═══════════════════════════════════════
     inn_ru_base, inn_en_base = normalize_inn(inn_ru, inn_en if inn_en else None)
+    deadline = ensure_deadline(deadline)
 
     # Если normalize_inn не нашёл перевод — пробуем resolve_inn_en
+    # (может обратиться к Yandex Translate — не в event loop)
     if not inn_en_base and inn_ru:
-        inn_en_base = resolve_inn_en(inn_ru)
+        inn_en_base = await asyncio.to_thread(resolve_inn_en, inn_ru)
 
     # Основной термин — английский без соли
     search_base = inn_en_base or (strip_salt_en(inn_en) if inn_en else "") or inn_ru_base or inn_ru
@@ -195,16 +471,22 @@ def search_cv_intra(
     # ═══════════════════════════════════════
     # РАУНД 1: базовый МНН (без соли)
     # ═══════════════════════════════════════
-    result = _search_all_sources(search_base, folder_id, api_key)
+    result = await _search_all_sources(
+        search_base, folder_id, api_key, budget=budget, deadline=deadline, pool=pool,
+    )
     if result:
         return result
 
     # ═══════════════════════════════════════
     # РАУНД 2: полный МНН (с солью)
     # ═══════════════════════════════════════
+    if circuit_is_open(GENSEARCH) or deadline.exhausted("cv_intra"):
+        return None
     if search_full.lower() != search_base.lower():
         print(f"  ↳ Не найдено по '{search_base}'. Пробуем '{search_full}'...")
-        result = _search_all_sources(search_full, folder_id, api_key)
+        result = await _search_all_sources(
+            search_full, folder_id, api_key, budget=budget, deadline=deadline, pool=pool,
+        )
         if result:
             return result
 
@@ -212,440 +494,390 @@ def search_cv_intra(
     # РАУНД 3: русский МНН (fallback)
     # ═══════════════════════════════════════
     for term in _unique([inn_ru_base, inn_ru]):
+        if circuit_is_open(GENSEARCH) or deadline.exhausted("cv_intra"):
+            return None
         if term and term.lower() not in (search_base.lower(), search_full.lower()):
             print(f"  ↳ Пробуем русский МНН: '{term}'...")
-            result = _search_all_sources(term, folder_id, api_key)
+            result = await _search_all_sources(
+                term, folder_id, api_key, budget=budget, deadline=deadline, pool=pool,
+            )
             if result:
                 return result
 
-    return _default_result()
+    return None
 
 
-def _search_all_sources(
-    term: str, folder_id: str, api_key: str,
-) -> Optional[CVintraResult]:
-    """Поиск CVintra по одному термину во всех источниках."""
-    # 1. PubMed CI → расчёт
-    result = _search_pubmed_ci(term, folder_id, api_key)
-    if result:
-        return result
+# ════════════════════════════════════════════════════════
+# ИСТОЧНИКИ CVintra — ТАБЛИЦА УРОВНЕЙ
+# ════════════════════════════════════════════════════════
+# Каждый уровень = список запросов + разбор ответа. Порядок в таблице —
+# приоритет источника: при параллельном поиске побеждает результат
+# самого приоритетного уровня (и самого раннего запроса внутри уровня),
+# ровно как при прежнем последовательном переборе.
 
-    # 2. PubMed direct
-    result = _search_pubmed_direct(term, folder_id, api_key)
-    if result:
-        return result
+@dataclass
+class _SourceTier:
+    """Уровень источников CVintra."""
+    name: str
+    label: str
+    queries: Callable[[str], List[str]]
+    evaluate: Callable[[str, str], Optional[CVintraResult]]
 
-    # 3. FDA BE Guidance
-    result = _search_fda_guidance(term, folder_id, api_key)
-    if result:
-        return result
 
-    # 4. Broad internet
-    result = _search_broad_internet(term, folder_id, api_key)
-    if result:
-        return result
+def _pubmed_ci_queries(term: str) -> List[str]:
+    return [
+        f'{term} bioequivalence study 90% confidence interval Cmax results',
+        f'{term} bioequivalence Cmax AUC 90 CI healthy volunteers crossover',
+    ]
 
-    return None
 
+def _eval_pubmed_ci(answer: str, term: str) -> Optional[CVintraResult]:
+    """90% CI из PubMed BE-статьи → расчёт CVintra."""
+    ci = extract(answer).ci
+    if ci is None:
+        return None
 
-def _search_fda_guidance(
-    term: str, folder_id: str, api_key: str,
-) -> Optional[CVintraResult]:
-    """
-    Ищет CVintra в FDA/EMA BE Guidance Documents.
+    lower, upper, n, design = ci
+    try:
+        cv = cv_from_ci(lower, upper, n, design)
+    except (ValueError, ZeroDivisionError) as e:
+        print(f"   ⚠️  CVintra из CI: ошибка расчёта: {e}")
+        return None
 
-    FIX #3: Если CVintra = 30.0% — пропускаем (это порог HVD, не реальный CV).
-    """
-    queries = [
-        f'Notes on the Design of Bioequivalence Study {term}',
-        f'bioequivalence study {term} within-subject variability Cmax coefficient of variation',
-        f'{term} generic bioequivalence Cmax intra-individual variability percent',
-    ]
+    return CVintraResult(
+        cv_intra=cv, source="pubmed_ci",
+        source_detail=f"Calculated from 90% CI [{lower:.2f}-{upper:.2f}], n={n}",
+        confidence="high", method="calculated_from_ci",
+        ci_data={"lower": lower, "upper": upper, "n": n, "design": design},
+    )
 
-    for query in queries:
-        answer = _call_yandex_world(query, folder_id, api_key)
-        if not answer or "not found" in answer.lower():
-            continue
 
-        cv = _extract_cv_from_text(answer)
-        if cv is not None:
-            source_name = _extract_source_name(answer) or f"FDA BE Guidance for {term}"
+def _pubmed_direct_queries(term: str) -> List[str]:
+    return [
+        f'{term} bioequivalence intra-subject variability Cmax coefficient of variation',
+        f'{term} pharmacokinetic variability within-subject Cmax bioequivalence study',
+    ]
 
-            # FIX #3: 30.0% из Guidance — скорее всего порог HVD
-            if cv == 30.0:
-                print(
-                    f"   ⚠️  BE Guidance ({term}): CVintra=30.0% — "
-                    f"вероятно порог HVD, а не реальный CVintra. Пропускаем."
-                )
-                continue
 
-            print(f"   ✅ BE Guidance ({term}): CVintra={cv}% [{source_name}]")
-            return CVintraResult(
-                cv_intra=cv, source="guidance",
-                source_detail=source_name,
-                confidence="high", method="lookup",
-            )
+def _eval_pubmed_direct(answer: str, term: str) -> Optional[CVintraResult]:
+    """Прямое значение CVintra из PubMed."""
+    ex = extract(answer)
+    cv = ex.cv_intra
+    if cv is None:
+        return None
 
-    print(f"   ⚠️  BE Guidance: не найден для '{term}'")
-    return None
+    source_name = ex.source_name or f"PubMed: {term} bioequivalence"
+    return CVintraResult(
+        cv_intra=cv, source="pubmed_direct",
+        source_detail=source_name,
+        confidence="medium", method="lookup",
+    )
 
 
-def _search_pubmed_ci(
-    term: str, folder_id: str, api_key: str,
-) -> Optional[CVintraResult]:
-    """Ищет 90% CI из PubMed BE-статей → расчёт CVintra."""
-    queries = [
-        f'{term} bioequivalence study 90% confidence interval Cmax results',
-        f'{term} bioequivalence Cmax AUC 90 CI healthy volunteers crossover',
+def _fda_guidance_queries(term: str) -> List[str]:
+    return [
+        f'Notes on the Design of Bioequivalence Study {term}',
+        f'bioequivalence study {term} within-subject variability Cmax coefficient of variation',
+        f'{term} generic bioequivalence Cmax intra-individual variability percent',
     ]
 
-    for query in queries:
-        answer = _call_yandex_world(query, folder_id, api_key)
-        if not answer:
-            continue
 
-        ci = _extract_ci_from_text(answer)
-        if ci is None:
-            continue
+def _eval_fda_guidance(answer: str, term: str) -> Optional[CVintraResult]:
+    """
+    CVintra из FDA/EMA BE Guidance Documents.
 
-        lower, upper, n, design = ci
-        try:
-            cv = cv_from_ci(lower, upper, n, design)
-        except (ValueError, ZeroDivisionError) as e:
-            print(f"   ⚠️  CVintra из CI: ошибка расчёта: {e}")
-            continue
+    FIX #3: Если CVintra = 30.0% — пропускаем (это порог HVD, не реальный CV).
+    """
+    if "not found" in answer.lower():
+        return None
 
+    ex = extract(answer)
+    cv = ex.cv_intra
+    if cv is None:
+        return None
+
+    # FIX #3: 30.0% из Guidance — скорее всего порог HVD
+    if cv == 30.0:
         print(
-            f"   ✅ PubMed CI ({term}): 90% CI=[{lower:.2f}, {upper:.2f}], "
-            f"n={n}, design={design} → CVintra={cv}%"
+            f"   ⚠️  BE Guidance ({term}): CVintra=30.0% — "
+            f"вероятно порог HVD, а не реальный CVintra. Пропускаем."
         )
-        return CVintraResult(
-            cv_intra=cv, source="pubmed_ci",
-            source_detail=f"Calculated from 90% CI [{lower:.2f}-{upper:.2f}], n={n}",
-            confidence="high", method="calculated_from_ci",
-            ci_data={"lower": lower, "upper": upper, "n": n, "design": design},
-        )
-
-    return None
-
-
-def _search_pubmed_direct(
-    term: str, folder_id: str, api_key: str,
-) -> Optional[CVintraResult]:
-    """Ищет прямое значение CVintra из PubMed."""
-    queries = [
-        f'{term} bioequivalence intra-subject variability Cmax coefficient of variation',
-        f'{term} pharmacokinetic variability within-subject Cmax bioequivalence study',
-    ]
-
-    for query in queries:
-        answer = _call_yandex_world(query, folder_id, api_key)
-        if not answer:
-            continue
-
-        cv = _extract_cv_from_text(answer)
-        if cv is not None:
-            source_name = _extract_source_name(answer) or f"PubMed: {term} bioequivalence"
-            print(f"   ✅ PubMed direct ({term}): CVintra={cv}% [{source_name}]")
-            return CVintraResult(
-                cv_intra=cv, source="pubmed_direct",
-                source_detail=source_name,
-                confidence="medium", method="lookup",
-            )
+        return None
 
-    return None
+    source_name = ex.source_name or f"FDA BE Guidance for {term}"
+    return CVintraResult(
+        cv_intra=cv, source="guidance",
+        source_detail=source_name,
+        confidence="high", method="lookup",
+    )
 
 
-def _search_broad_internet(
-    term: str, folder_id: str, api_key: str,
-) -> Optional[CVintraResult]:
-    """Широкий поиск по интернету — последняя попытка."""
-    queries = [
+def _broad_internet_queries(term: str) -> List[str]:
+    return [
         f'{term} bioequivalence Cmax intra-subject variability coefficient of variation',
         f'{term} generic bioequivalence study sample size within-subject variability',
         f'{term} bioequivalence 90 confidence interval Cmax healthy volunteers',
         f'{term} pharmacokinetics Cmax high variability bioequivalence',
     ]
 
-    for query in queries:
-        answer = _call_yandex_world(query, folder_id, api_key)
-        if not answer:
-            continue
 
-        cv = _extract_cv_from_text(answer)
-        if cv is not None:
-            source_name = _extract_source_name(answer) or f"Internet search: {term}"
-            print(f"   ✅ Broad search ({term}): CVintra={cv}% [{source_name}]")
-            return CVintraResult(
-                cv_intra=cv, source="internet",
-                source_detail=source_name,
-                confidence="low", method="lookup",
-            )
+def _eval_broad_internet(answer: str, term: str) -> Optional[CVintraResult]:
+    """Широкий поиск по интернету — прямой CVintra, затем 90% CI."""
+    ex = extract(answer)
+    cv = ex.cv_intra
+    if cv is not None:
+        source_name = ex.source_name or f"Internet search: {term}"
+        return CVintraResult(
+            cv_intra=cv, source="internet",
+            source_detail=source_name,
+            confidence="low", method="lookup",
+        )
 
-        ci = _extract_ci_from_text(answer)
-        if ci is not None:
-            lower, upper, n, design = ci
-            try:
-                cv = cv_from_ci(lower, upper, n, design)
-                print(
-                    f"   ✅ Broad search CI ({term}): "
-                    f"90% CI=[{lower:.2f}, {upper:.2f}], n={n} → CVintra={cv}%"
-                )
-                return CVintraResult(
-                    cv_intra=cv, source="internet_ci",
-                    source_detail=f"Internet: 90% CI [{lower:.2f}-{upper:.2f}], n={n}",
-                    confidence="low", method="calculated_from_ci",
-                    ci_data={"lower": lower, "upper": upper, "n": n, "design": design},
-                )
-            except (ValueError, ZeroDivisionError):
-                continue
+    ci = ex.ci
+    if ci is None:
+        return None
 
-    print(f"   ⚠️  Broad search: ничего не найдено для '{term}'")
-    return None
+    lower, upper, n, design = ci
+    try:
+        cv = cv_from_ci(lower, upper, n, design)
+    except (ValueError, ZeroDivisionError):
+        return None
 
+    return CVintraResult(
+        cv_intra=cv, source="internet_ci",
+        source_detail=f"Internet: 90% CI [{lower:.2f}-{upper:.2f}], n={n}",
+        confidence="low", method="calculated_from_ci",
+        ci_data={"lower": lower, "upper": upper, "n": n, "design": design},
+    )
 
-# ════════════════════════════════════════════════════════
-# ПАРСИНГ ОТВЕТОВ (ИСПРАВЛЕНО v2 — sentence-boundary)
-# ════════════════════════════════════════════════════════
 
-def _extract_cv_from_text(text: str) -> Optional[float]:
-    """
-    Извлекает CVintra из текста с контекстной фильтрацией.
-
-    ИСПРАВЛЕНИЕ v2: Sentence-boundary контекст.
-    Контекст определяется ВНУТРИ ПРЕДЛОЖЕНИЯ (от точки до точки),
-    что предотвращает «утечку» контекста из соседних предложений.
-
-    Приоритет бакетов:
-      1. intra-subject + Cmax  → ЛУЧШЕЕ
-      2. intra-subject         → ХОРОШЕЕ
-      3. Cmax (без intra)      → OK
-      4. Прочие                → FALLBACK
-
-    Фильтрует:
-      - inter-subject / between-subject → SKIP
-      - AUC-контекст → не путать с Cmax
-      - 30.0% → порог HVD, а не реальный CVintra
-    """
+_SOURCE_TIERS: List[_SourceTier] = [
+    _SourceTier("pubmed_ci", "PubMed CI", _pubmed_ci_queries, _eval_pubmed_ci),
+    _SourceTier("pubmed_direct", "PubMed direct", _pubmed_direct_queries, _eval_pubmed_direct),
+    _SourceTier("guidance", "BE Guidance", _fda_guidance_queries, _eval_fda_guidance),
+    _SourceTier("internet", "Broad search", _broad_internet_queries, _eval_broad_internet),
+]
 
-    BAD_CONTEXT = re.compile(
-        r'between.?subject|inter.?subject|inter.?individual|'
-        r'межиндивидуальн|между\s*субъект|between.?group',
-        re.IGNORECASE
-    )
-    INTRA_CONTEXT = re.compile(
-        r'within.?subject|intra.?subject|intra.?individual|'
-        r'внутрииндивидуальн|CVintra|CVw[RrTt]?[\s=]|intra-subject',
-        re.IGNORECASE
-    )
-    CMAX_CONTEXT = re.compile(
-        r'Cmax|C_?max|peak\s+concentr|максимальн\w+\s+концентр',
-        re.IGNORECASE
-    )
-    AUC_CONTEXT = re.compile(
-        r'\bAUC\b|area\s+under|площад\w+\s+под\s+кривой',
-        re.IGNORECASE
-    )
 
-    intra_cmax = []
-    intra_other = []
-    general_cmax = []
-    general_other = []
+# ════════════════════════════════════════════════════════
+# ПАРАЛЛЕЛЬНЫЙ ПОИСК ПО ВСЕМ УРОВНЯМ
+# ════════════════════════════════════════════════════════
 
-    for m in re.finditer(r'(\d+(?:\.\d+)?)\s*%', text):
-        val = float(m.group(1))
+_PENDING = object()
 
-        # Базовая фильтрация
-        if not (5 <= val <= 120):
-            continue
-        if val == 30.0:
-            continue  # 30% — скорее всего порог HVD
 
-        # ── Контекст в пределах ТЕКУЩЕГО предложения ──
-        # Начало предложения: предыдущая точка
-        before_text = text[:m.start()]
-        sent_start = before_text.rfind('.')
-        sent_start = sent_start + 1 if sent_start != -1 else 0
+async def _search_all_sources(
+    term: str, folder_id: str, api_key: str,
+    concurrency: int = CV_SEARCH_CONCURRENCY,
+    budget: Optional[SearchBudget] = None,
+    deadline: Optional[Deadline] = None,
+    pool: Optional[EvidencePool] = None,
+) -> Optional[CVintraResult]:
+    """
+    Поиск CVintra по одному термину во всех источниках.
 
-        # Конец предложения: следующая точка
-        after_text = text[m.end():]
-        sent_end_rel = after_text.find('.')
-        sent_end = m.end() + sent_end_rel if sent_end_rel != -1 else len(text)
+    Все запросы всех уровней запускаются сразу (не более concurrency
+    одновременно, в порядке приоритета).
 
-        ctx_before = text[sent_start:m.end()]    # От начала предложения до числа
-        ctx_after = text[m.end():sent_end]        # От числа до конца предложения
+    Победитель определяется так же, как при последовательном переборе:
+    первый по порядку (уровень → запрос) ответ с валидным значением.
+    Как только все более приоритетные запросы завершились без значения,
+    результат возвращается, а ожидающие запросы отменяются.
 
-        # Фильтруем inter-subject / between-subject
-        if BAD_CONTEXT.search(ctx_before):
-            continue
+    Если deadline истёк раньше — побеждает самый приоритетный из уже
+    полученных ответов (лучшее из найденного), остальные отменяются.
 
-        # Определяем тип
-        is_intra = bool(INTRA_CONTEXT.search(ctx_before))
-        is_cmax = bool(CMAX_CONTEXT.search(ctx_before + ctx_after))
-
-        # AUC-контекст ПОСЛЕ числа → это не Cmax
-        if AUC_CONTEXT.search(ctx_after):
-            is_cmax = False
-        # AUC-контекст ДО числа без Cmax → тоже не Cmax
-        if AUC_CONTEXT.search(ctx_before) and not CMAX_CONTEXT.search(ctx_before):
-            is_cmax = False
-
-        # Классифицируем по бакетам
-        if is_intra and is_cmax:
-            intra_cmax.append(val)
-        elif is_intra:
-            intra_other.append(val)
-        elif is_cmax:
-            general_cmax.append(val)
-        else:
-            general_other.append(val)
-
-    # Приоритет: intra+Cmax > intra > Cmax > other
-    # Берём ПЕРВОЕ найденное значение из бакета (порядок в тексте = порядок
-    # упоминания в источнике). НЕ max() — max может взять значение из 
-    # соседнего контекста (другой препарат в таблице, inter-subject и т.п.)
-    for bucket in [intra_cmax, intra_other, general_cmax, general_other]:
-        if bucket:
-            return round(bucket[0], 1)
-
-    # Fallback: "CV = 0.XX" формат (без %)
-    decimal_match = re.search(r'CV\s*=\s*0\.(\d{2,})', text)
-    if decimal_match:
-        val = float(f"0.{decimal_match.group(1)}") * 100
-        if 5 <= val <= 120 and val != 30.0:
-            return round(val, 1)
+    С пулом запросы, совпадающие с уже заданными (с точностью до порядка
+    слов), в GenSearch не уходят — ответ берётся из пула.
 
-    return None
+    Шаблоны внутри уровня упорядочиваются и отсеиваются по истории
+    (source_stats.py); итог каждого выполненного запроса пополняет историю.
+    """
+    deadline = ensure_deadline(deadline)
+    stats = _source_stats()
+    plan, pruned = _plan_queries(term, stats)
+    if not plan:
+        return None
 
+    semaphore = asyncio.Semaphore(concurrency)
+
+    executed: list = []  # QueryOutcome выполненных запросов — для истории
+
+    async def _run(tier: _SourceTier, query: str) -> Optional[CVintraResult]:
+        # "latency" появляется, только если запрос действительно ушёл в GenSearch
+        timing: Dict[str, float] = {}
+
+        async def _upstream() -> str:
+            # Разомкнутый breaker — не попытка шаблона, в историю не идёт
+            if circuit_is_open(GENSEARCH):
+                return ""
+            started = time.monotonic()
+            answer = await _call_yandex_world_async(query, folder_id, api_key)
+            # Тайм-аут, 429, ошибка или отказ предохранителя (None) — сбой
+            # транспорта, а не промах шаблона: в историю не идёт
+            if answer is not None:
+                timing["latency"] = time.monotonic() - started
+            return answer or ""
+
+        async with semaphore:
+            if circuit_is_open(GENSEARCH) or deadline.expired():
+                return None
+            # С бюджетом: сверх лимита — без вызова. Запрос идёт в loop
+            # HTTP-клиента — отмена задачи (победитель уже есть) отменяет
+            # и ожидание токена, и сам HTTP-запрос
+            fetch = partial(budget.run, _upstream) if budget is not None else _upstream
+            if pool is not None:
+                answer = await pool.answer_async(query, fetch, "cv_intra")
+            else:
+                answer = await fetch()
+        result = tier.evaluate(answer, term) if answer else None
+        # Пустой ответ HTTP 200 — тоже промах шаблона (иначе его доля попаданий
+        # завышена); не считаются запросы, не получившие ответа GenSearch
+        if stats is not None and (answer or "latency" in timing):
+            executed.append(QueryOutcome(
+                tier=tier.name, template=query_template(query, term),
+                hit=result is not None, latency_s=timing.get("latency"),
+            ))
+        return result
 
-def _extract_ci_from_text(text: str) -> Optional[Tuple[float, float, int, str]]:
-    """Извлекает 90% CI, N и дизайн из текста."""
-    ci_patterns = [
-        r'90\s*%\s*CI[:\s]*\[?(\d+\.?\d*)\s*[-–,]\s*(\d+\.?\d*)\]?',
-        r'confidence\s+interval[:\s]*(\d+\.?\d*)\s*(?:to|[-–])\s*(\d+\.?\d*)',
-        r'lower[:\s]*(\d+\.?\d*)[^.]*upper[:\s]*(\d+\.?\d*)',
-        r'\[(\d+\.?\d*)\s*%?\s*[-–,]\s*(\d+\.?\d*)\s*%?\]',
-    ]
+    tasks = [asyncio.ensure_future(_run(tier, query)) for tier, query in plan]
+    index = {task: i for i, task in enumerate(tasks)}
+    outcomes: list = [_PENDING] * len(tasks)
+    winner: Optional[int] = None
 
-    lower, upper = None, None
-    for pattern in ci_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            lower = float(match.group(1))
-            upper = float(match.group(2))
-            break
+    try:
+        pending = set(tasks)
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, timeout=deadline.timeout(), return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                # Время вышло: лучший из завершённых, не дожидаясь более приоритетных
+                deadline.record_shortfall("cv_intra")
+                winner = next(
+                    (i for i, o in enumerate(outcomes) if o is not _PENDING and o is not None),
+                    None,
+                )
+                break
+            for task in done:
+                try:
+                    outcomes[index[task]] = task.result()
+                except Exception as e:
+                    print(f"   ⚠️  CVintra ({term}): {type(e).__name__}: {e}")
+                    outcomes[index[task]] = None
+
+            # Решено, если все запросы до первого найденного значения завершены
+            for i, outcome in enumerate(outcomes):
+                if outcome is _PENDING:
+                    break
+                if outcome is not None:
+                    winner = i
+                    break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    if stats is not None:
+        stats.record(term, executed, found=winner is not None, pruned=pruned)
+
+    # Отчёт по уровням — в порядке приоритета
+    for tier in _SOURCE_TIERS:
+        tier_idx = [i for i, (t, _) in enumerate(plan) if t is tier]
+        if winner is not None and winner in tier_idx:
+            result = outcomes[winner]
+            print(
+                f"   ✅ {tier.label} ({term}): CVintra={result.cv_intra}% "
+                f"[{result.source_detail}]"
+            )
+            cancelled = sum(1 for o in outcomes if o is _PENDING)
+            if cancelled:
+                print(f"      ↳ отменено запросов с меньшим приоритетом: {cancelled}")
+            return result
+        print(f"   ⚠️  {tier.label}: не найден для '{term}'")
 
-    if lower is None or upper is None:
-        return None
+    return None
 
-    if lower > 2:
-        lower = lower / 100
-    if upper > 2:
-        upper = upper / 100
 
-    if not (0.5 < lower < 1.5 and 0.5 < upper < 1.5 and lower < upper):
+def _source_stats():
+    """Общая история источников или None (модуль недоступен / ошибка БД)."""
+    if not _HAS_SOURCE_STATS:
+        return None
+    try:
+        return get_source_stats()
+    except Exception as e:
+        print(f"   ⚠️  Статистика источников: {type(e).__name__}: {e}")
         return None
 
-    n = None
-    n_patterns = [
-        r'(?:n\s*=|subjects?|participants?|volunteers?)[:\s]*(\d+)',
-        r'(\d+)\s*(?:subjects?|participants?|volunteers?|healthy)',
-    ]
-    for pattern in n_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            val = int(match.group(1))
-            if 6 <= val <= 200:
-                n = val
-                break
 
-    if n is None:
-        return None
+def _plan_queries(term: str, stats) -> tuple:
+    """
+    План поиска: (уровень, запрос) в порядке приоритета уровней.
 
-    design = "2x2x2"
-    text_lower = text.lower()
-    if any(k in text_lower for k in ["4-period", "4 period", "full replicate", "2x2x4"]):
-        design = "2x2x4"
-    elif any(k in text_lower for k in ["3-period", "3 period", "partial replicate", "2x2x3"]):
-        design = "2x2x3"
-    elif any(k in text_lower for k in ["parallel"]):
-        design = "parallel"
-
-    return (lower, upper, n, design)
-
-
-def _extract_source_name(text: str) -> Optional[str]:
-    """Извлекает название документа/статьи."""
-    patterns = [
-        r'Notes on the Design[^.\n]+',
-        r'Product[- ]Specific Guidance[^.\n]+',
-        r'Guidance Document[^.\n]+',
-        r'PMID[:\s]*\d+',
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(0).strip()
-    return None
+    Внутри уровня запросы упорядочены по истории, бесперспективные
+    отброшены. Если отброшено всё — выполняется полный план.
+
+    Returns:
+        (план, число отброшенных запросов)
+    """
+    plan, pruned = [], 0
+    for tier in _SOURCE_TIERS:
+        queries = _unique(tier.queries(term))
+        if stats is not None:
+            queries, dropped = stats.order(term, tier.name, queries)
+            pruned += len(dropped)
+        plan.extend((tier, query) for query in queries)
+
+    if not plan and pruned:
+        print(f"   ⚠️  Все шаблоны для '{term}' малорезультативны — полный план")
+        return [(tier, q) for tier in _SOURCE_TIERS for q in _unique(tier.queries(term))], 0
+    if pruned:
+        print(f"   📉 '{term}': отсеяно малорезультативных запросов: {pruned}")
+    return plan, pruned
 
 
 # ════════════════════════════════════════════════════════
 # УТИЛИТЫ
 # ════════════════════════════════════════════════════════
 
-def _call_yandex_world(query: str, folder_id: str, api_key: str) -> str:
-    """Вызов Yandex GenSearch."""
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folder_id": folder_id,
-    }
-    headers = {
-        "Authorization": f"Api-Key {api_key}",
-        "Content-Type": "application/json",
-    }
-    try:
-        resp = requests.post(YANDEX_GEN_SEARCH_URL, json=body, headers=headers, timeout=25)
-        if resp.status_code != 200:
-            print(f"   ⚠️  Yandex HTTP {resp.status_code}: {resp.text[:200]}")
-            return ""
-        data = resp.json()
-
-        if isinstance(data, list):
-            data = data[0] if data else {}
-
-        message = data.get("message", {})
-        if isinstance(message, list):
-            message = message[0] if message else {}
-        if isinstance(message, dict):
-            content = message.get("content", "")
-            if isinstance(content, list):
-                parts = []
-                for item in content:
-                    if isinstance(item, dict):
-                        parts.append(str(item.get("content", item.get("text", ""))))
-                    elif isinstance(item, str):
-                        parts.append(item)
-                content = " ".join(parts)
-        else:
-            content = ""
-
-        sources = data.get("sources", [])
-        if sources:
-            source_urls = []
-            for s in sources:
-                if isinstance(s, dict):
-                    url = s.get("url", "")
-                    title = s.get("title", "")
-                    if url:
-                        source_urls.append(f"[SOURCE: {title} | {url}]")
-            if source_urls:
-                content += "\n" + "\n".join(source_urls)
-
-        return content if isinstance(content, str) else ""
-    except Exception as e:
-        print(f"   ⚠️  Yandex Search: {e}")
+def _call_yandex_world(query: str, folder_id: str, api_key: str) -> Optional[str]:
+    """
+    Вызов Yandex GenSearch (через общий клиент с лимитом RPS).
+
+    Returns:
+        текст ответа; "" — GenSearch ответил, но без текста;
+        None — ответа нет (тайм-аут, ошибка, 429, предохранитель, нет ключей).
+    """
+    data = get_gensearch_client().search(
+        query, folder_id, api_key, timeout=25, label="Yandex Search",
+    )
+    return _answer_content(data)
+
+
+async def _call_yandex_world_async(query: str, folder_id: str, api_key: str) -> Optional[str]:
+    """_call_yandex_world без потоков: запрос в loop HTTP-клиента, отменяемый."""
+    data = await get_gensearch_client().search_async(
+        query, folder_id, api_key, timeout=25, lane=LANE_BACKGROUND, label="Yandex Search",
+    )
+    return _answer_content(data)
+
+
+def _answer_content(data: Optional[Dict]) -> Optional[str]:
+    """Текст ответа GenSearch со списком источников (None — ответа нет)."""
+    if data is None:
+        return None
+    content = answer_text(data)
+    if not content:
         return ""
 
+    source_urls = [
+        f"[SOURCE: {src['title']} | {src['url']}]"
+        for src in answer_sources(data)
+    ]
+    if source_urls:
+        content += "\n" + "\n".join(source_urls)
+    return content
+
 
 def _unique(items: list) -> list:
     """Уникальные непустые элементы."""
@@ -684,19 +916,43 @@ class PKParamsResult:
     source_detail: str = ""
 
 
+@single_flight(_inn_flight_key, name="search_pk_params", **_FLIGHT_OPTIONS)
 def search_pk_params(
     inn_en: str,
     inn_ru: str = "",
     folder_id: Optional[str] = None,
     api_key: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+    pool: Optional[EvidencePool] = None,
 ) -> PKParamsResult:
     """
     Поиск T½, Tmax, Cmax по PubMed/FDA/интернету.
     Использует тот же Yandex Search API что и CVintra.
+
+    deadline — по истечении запросы прекращаются, возвращается найденное
+    на этот момент. Неполный результат (дедлайн, предохранитель GenSearch,
+    запросы без ответа) не кэшируется.
+
+    pool — пул ответов прогона: сначала T½ / Tmax / Cmax берутся из ответов,
+    уже полученных поисками протоколов и CVintra (без обращения к GenSearch);
+    собственные запросы — только если T½ там нет.
     """
     folder_id = folder_id or os.getenv("YANDEX_FOLDER_ID", "")
     api_key = api_key or os.getenv("YANDEX_API_KEY", "")
 
+    cache_key = pk_cache_key(inn_ru, inn_en) if _HAS_PK_CACHE else ""
+    if cache_key:
+        cached = load_cached("pk_params", cache_key)
+        if cached:
+            print(f"  💾 ФК-параметры из кэша ({cache_key}): T½={cached.get('t_half_hours')} ч")
+            return PKParamsResult(**cached)
+
+    if _HAS_MEDLINE and cache_key:
+        offline = lookup_pk(cache_key)
+        if offline:
+            print(f"  📚 ФК-параметры из корпуса MEDLINE ({cache_key}): T½={offline['t_half_hours']} ч")
+            return PKParamsResult(**offline)
+
     if not folder_id or not api_key:
         return PKParamsResult()
 
@@ -720,30 +976,56 @@ def search_pk_params(
         ])
 
     result = PKParamsResult()
+    deadline = ensure_deadline(deadline)
+    truncated = False
+    trips = _gensearch_trips()
 
-    for query in queries:
+    if pool is not None and pool.first("t_half_hours")[0] is not None:
+        _fill_pk_from_pool(result, pool, term)
+        queries = []
+
+    def _fetch(query: str) -> Optional[str]:
+        nonlocal truncated
         answer = _call_yandex_world(query, folder_id, api_key)
+        # Нет ответа (тайм-аут, 429, ошибка) — запрос не выполнен, результат неполный
+        if answer is None:
+            truncated = True
+        return answer
+
+    for query in queries:
+        if circuit_is_open(GENSEARCH):
+            print("  🔌 GenSearch недоступен — поиск ФК-параметров прерван")
+            truncated = True
+            break
+        if deadline.exhausted("pk_params"):
+            truncated = True
+            break
+        if pool is not None:
+            answer = pool.answer(query, partial(_fetch, query), "pk_params")
+        else:
+            answer = _fetch(query)
         if not answer:
             continue
+        ex = extract(answer)
 
         # Извлекаем T½
         if result.t_half_hours is None:
-            t_half = _extract_t_half_from_text(answer)
+            t_half = ex.t_half_hours
             if t_half is not None:
                 result.t_half_hours = t_half
                 result.source = "pubmed_pk"
-                result.source_detail = _extract_source_name(answer) or f"PubMed PK: {term}"
+                result.source_detail = ex.source_name or f"PubMed PK: {term}"
                 print(f"   ✅ PubMed PK ({term}): T½={t_half} ч [{result.source_detail}]")
 
         # Извлекаем Tmax
         if result.tmax_hours is None:
-            tmax = _extract_tmax_from_text(answer)
+            tmax = ex.tmax_hours
             if tmax is not None:
                 result.tmax_hours = tmax
 
         # Извлекаем Cmax
         if result.cmax_value is None:
-            cmax, unit = _extract_cmax_from_text(answer)
+            cmax, unit = ex.cmax
             if cmax is not None:
                 result.cmax_value = cmax
                 result.cmax_unit = unit
@@ -752,151 +1034,55 @@ def search_pk_params(
         if result.t_half_hours is not None:
             break
 
-    return result
+    # Tmax / Cmax, не найденные в ФК-ответах, — из остальных ответов пула
+    if pool is not None and (result.tmax_hours is None or result.cmax_value is None):
+        _fill_pk_from_pool(result, pool, term)
 
+    # Как в search_cv_intra: результат, урезанный дедлайном, предохранителем
+    # или запросами без ответа, не кэшируется на PK_CACHE_TTL_DAYS
+    if cache_key and not truncated and _gensearch_trips() == trips and (
+        result.t_half_hours is not None
+        or result.tmax_hours is not None
+        or result.cmax_value is not None
+    ):
+        store_cached("pk_params", cache_key, asdict(result))
 
-def _extract_t_half_from_text(text: str) -> Optional[float]:
-    """
-    Извлекает T½ из текста PubMed/FDA ответа.
-
-    ВАЖНО: Возвращает значение в ЧАСАХ.
-    Если в тексте "12 days" → возвращает 288.0
-    Если в тексте "12 hours" → возвращает 12.0
-    """
-    t = text.lower()
-
-    patterns = [
-        # "t1/2 = 12 h" / "t½ = 12 days" — самый надёжный формат
-        r'(?:t\s*1\s*/\s*2|t½|t1/2)\s*(?:[=:\-–—]\s*|(?:of|is|was)\s+)'
-        r'(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|minutes?|min|weeks?|wk)',
-
-        # "terminal half-life of 12 days" / "elimination half-life was approximately 12 h"
-        r'(?:terminal\s+)?(?:elimination\s+)?half[- ]?life'
-        r'(?:\s+(?:of\s+)?(?:the\s+)?(?:drug\s+)?(?:is\s+|was\s+|of\s+)?(?:approximately\s+|about\s+|~\s*)?)?'
-        r'(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|minutes?|min|weeks?|wk)',
-
-        # "half-life of approximately 12 days" — с промежутком до 80 символов
-        r'half[- ]?life'
-        r'(?:[^.]{0,80}?)'
-        r'(?:of|is|was|approximately|about|~|=|:)\s*'
-        r'(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|minutes?|min|weeks?|wk)',
-
-        # "half-life 12 days" — прямо рядом
-        r'half[- ]?life\s+(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|min|weeks?|wk)',
-
-        # Русский: "период полувыведения составляет 12 суток"
-        r'период\s+полу[- ]?(?:выведения|элиминации)'
-        r'(?:[^.]{0,120}?)'
-        r'(?:составля\w+|равен|равна|приблизительно|примерно|около|~|≈|=|:)\s*'
-        r'(\d+[.,]?\d*)\s*(час(?:ов|а|ы)?|ч\b|мин\w*|сут(?:ок|ки)?|дн(?:ей|я)?|день|нед\w*)',
-
-        # Русский: "T½ составляет 12 суток"
-        r'(?:t\s*1\s*/\s*2|t½)\s*(?:составля\w+|равен|равна|=|:|-)\s*'
-        r'(\d+[.,]?\d*)\s*(час(?:ов|а|ы)?|ч\b|мин\w*|сут(?:ок|ки)?|дн(?:ей|я)?|день|нед\w*)',
-    ]
-
-    for pat in patterns:
-        m = re.search(pat, t)
-        if m:
-            val_str = m.group(1).replace(',', '.')
-            try:
-                val = float(val_str)
-            except ValueError:
-                continue
-
-            unit = m.group(2).lower().strip()
-            hours = _pk_unit_to_hours(val, unit)
-
-            if hours is None:
-                continue
-
-            # Санитарная проверка
-            if hours < 0.01 or hours > 10000:
-                continue
-
-            # Логируем для отладки
-            if hours != val:
-                print(f"   📐 T½ конвертация: {val} {unit} → {hours} ч")
-
-            return hours
-
-    return None
-
-
-def _extract_tmax_from_text(text: str) -> Optional[float]:
-    """Извлекает Tmax из текста PubMed."""
-    t = text.lower()
-    patterns = [
-        r'(?:tmax|t\s*max)\s*(?:[=:\-–—]\s*|(?:of|is|was)\s+)'
-        r'(\d+[.,]?\d*)\s*(hours?|h|days?|d|min)',
-        r'(?:time\s+to\s+(?:peak|maximum)\s+(?:concentration|cmax))'
-        r'(?:[^.]{0,60}?)'
-        r'(?:of|is|was|approximately)\s*'
-        r'(\d+[.,]?\d*)\s*(hours?|h|days?|d|min)',
-    ]
-    for pat in patterns:
-        m = re.search(pat, t)
-        if m:
-            val_str = m.group(1).replace(',', '.')
-            try:
-                val = float(val_str)
-            except ValueError:
-                continue
-            hours = _pk_unit_to_hours(val, m.group(2).lower())
-            if hours and 0.01 < hours < 500:
-                return hours
-    return None
+    return result
 
 
-def _extract_cmax_from_text(text: str) -> tuple:
-    """Извлекает Cmax из текста PubMed. Returns (value, unit) or (None, '')."""
-    t = text.lower()
-    patterns = [
-        r'(?:cmax|c\s*max|peak\s+(?:plasma\s+)?concentration)'
-        r'(?:[^.]{0,60}?)'
-        r'(?:of|is|was|=)\s*'
-        r'(\d+[.,]?\d*)\s*(ng/ml|µg/ml|mg/ml|μg/ml|нг/мл|мкг/мл)',
-    ]
-    for pat in patterns:
-        m = re.search(pat, t)
-        if m:
-            val_str = m.group(1).replace(',', '.')
-            try:
-                return float(val_str), m.group(2)
-            except ValueError:
-                continue
-    return None, ""
-
-
-def _pk_unit_to_hours(val: float, unit: str) -> Optional[float]:
+def _fill_pk_from_pool(result: PKParamsResult, pool: EvidencePool, term: str) -> None:
+    """Дополняет пустые поля PKParamsResult фактами из пула ответов."""
+    if result.t_half_hours is None:
+        t_half, pooled = pool.first("t_half_hours")
+        if t_half is not None:
+            result.t_half_hours = t_half
+            result.source = "pubmed_pk"
+            result.source_detail = pooled.ex.source_name or f"PubMed PK: {term}"
+            print(f"   ♻️  T½={t_half} ч из ответа поиска {pooled.origin} [{result.source_detail}]")
+    if result.tmax_hours is None:
+        result.tmax_hours = pool.first("tmax_hours")[0]
+    if result.cmax_value is None:
+        cmax, _ = pool.first("cmax")
+        if cmax is not None:
+            result.cmax_value, result.cmax_unit = cmax
+
+
+def cv_from_pool(pool: EvidencePool) -> Optional[CVintraResult]:
     """
-    Конвертирует PK-единицы в часы.
-
-    ВАЖНО: Если единица не распознана — возвращает None (не val!).
-    Это предотвращает баг "12 days → 12 hours".
+    CVintra из 90% CI, попавшего в пул ответами других поисков
+    (например, ФК-запросов), — если поиск CVintra ничего не нашёл.
     """
-    u = unit.lower().strip()
-
-    # Часы
-    if u in ('h', 'hr', 'hrs', 'hour', 'hours') or u.startswith('час'):
-        return val
-
-    # Минуты
-    if u in ('min', 'minute', 'minutes') or u.startswith('мин'):
-        return val / 60
-
-    # Дни / сутки
-    if u in ('d', 'day', 'days') or u.startswith('сут') or u.startswith('дн') or u == 'день':
-        return val * 24
-
-    # Недели
-    if u in ('wk', 'week', 'weeks') or u.startswith('нед'):
-        return val * 24 * 7
-
-    # Русское "ч" — только если ровно "ч" (не начало другого слова)
-    if u == 'ч':
-        return val
-
-    # Неизвестная единица — НЕ возвращаем val, т.к. можем перепутать дни с часами
-    print(f"   ⚠️ T½: неизвестная единица '{unit}' для значения {val}")
-    return None
\ No newline at end of file
+    ci, pooled = pool.first("ci", exclude_origin="cv_intra")
+    if ci is None:
+        return None
+    lower, upper, n, design = ci
+    try:
+        cv = cv_from_ci(lower, upper, n, design)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return CVintraResult(
+        cv_intra=cv, source="pooled_ci",
+        source_detail=f"Calculated from 90% CI [{lower:.2f}-{upper:.2f}], n={n} ({pooled.origin})",
+        confidence="low", method="calculated_from_ci",
+        ci_data={"lower": lower, "upper": upper, "n": n, "design": design},
+    )
@@ -0,0 +1,211 @@
+"""
+services/pk/evidence_pool.py — Общий пул ответов GenSearch на один прогон PK Agent.
+
+search_existing_protocols, search_cv_intra и search_pk_params для одного
+МНН задают пересекающиеся запросы, и каждый берёт из ответа только своё:
+T½, найденный поиском CVintra, и 90% CI из ответа на ФК-запрос раньше
+выбрасывались. Пул:
+
+  - планирует запросы: запрос канонизируется (регистр, пунктуация,
+    порядок слов) — формулировки, отличающиеся только порядком слов,
+    уходят в GenSearch один раз, одинаковые одновременные запросы
+    ждут первый вместо повторного вызова;
+  - каждый ответ разбирается всеми извлекателями (services/pk/extraction.py):
+    CVintra, 90% CI, T½, Tmax, Cmax, дизайн, число добровольцев, режим приёма;
+  - факты доступны всем этапам: first("t_half_hours") — первое значение
+    в порядке поступления ответов (протоколы → CVintra → ФК-параметры).
+
+Запросы выполняются по мере надобности (а не все сразу): поиск CVintra
+по-прежнему отменяет менее приоритетные запросы, как только значение найдено,
+а поиск ФК-параметров не обращается к GenSearch, если T½ уже есть в пуле.
+
+Пул живёт один прогон; между прогонами данные хранит PK-кэш (pk_cache.py).
+
+Использование:
+    pool = EvidencePool()
+    protocols = search_existing_protocols(inn_ru, inn_en, pool=pool)
+    cv = search_cv_intra(inn_en, inn_ru, pool=pool)
+    pk = search_pk_params(inn_en, inn_ru, pool=pool)   # T½ — из уже полученных ответов
+    print(pool.summary())
+"""
+
+import asyncio
+import re
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    from app.services.pk.extraction import AnswerExtraction, extract
+except ImportError:
+    from extraction import AnswerExtraction, extract
+
+
+# Факты, которые извлекаются из каждого ответа пула
+POOL_FACTS = (
+    "cv_intra", "ci", "t_half_hours", "tmax_hours", "cmax",
+    "design", "subjects", "enrollment", "intake_mode",
+)
+
+_TOKEN = re.compile(r"[\w%½]+(?:[./-][\w%½]+)*")
+
+
+def canonical_query(query: str) -> str:
+    """Ключ запроса: множество слов без учёта регистра, пунктуации и порядка."""
+    return " ".join(sorted(set(_TOKEN.findall(query.lower()))))
+
+
+@dataclass
+class PooledAnswer:
+    """Ответ GenSearch в пуле."""
+    query: str
+    origin: str  # этап, впервые задавший запрос: protocols / cv_intra / pk_params
+    text: str
+
+    @property
+    def ex(self) -> AnswerExtraction:
+        return extract(self.text)
+
+
+def _has_value(fact: str, value: Any) -> bool:
+    if fact == "cmax":
+        return value[0] is not None
+    return value is not None
+
+
+class EvidencePool:
+    """
+    Потокобезопасный пул: этапы идут в разных потоках (answer) и корутинах
+    (answer_async) — ожидание одинакового запроса общее для тех и других.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._answers: Dict[str, PooledAnswer] = {}  # порядок вставки = порядок поступления
+        self._inflight: Dict[str, Future] = {}  # общий для потоков и event loop'ов
+        self.stats = {"requests": 0, "upstream": 0, "reused": 0}
+
+    def _claim(self, key: str) -> Tuple[Optional[str], Optional[Future], bool]:
+        """
+        (текст из пула, None, _) — ответ уже есть;
+        (None, future, True) — запрос выполняет вызывающий;
+        (None, future, False) — запрос уже выполняется, ждём future.
+        """
+        with self._lock:
+            pooled = self._answers.get(key)
+            if pooled is not None:
+                self.stats["reused"] += 1
+                return pooled.text, None, False
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return None, inflight, False
+            inflight = self._inflight[key] = Future()
+            return None, inflight, True
+
+    def _release(self, key: str, query: str, origin: str, text: str, inflight: Future) -> None:
+        with self._lock:
+            self.stats["upstream"] += 1
+            self._inflight.pop(key, None)
+            if text:
+                self._answers[key] = PooledAnswer(query=query, origin=origin, text=text)
+        inflight.set_result(None)
+
+    def answer(self, query: str, fetch: Callable[[], str], origin: str = "") -> str:
+        """
+        Ответ на запрос: из пула или через fetch() (вызов GenSearch).
+
+        Пустые ответы (ошибка, тайм-аут, исчерпан бюджет) в пул не попадают —
+        следующий этап может повторить запрос.
+        """
+        key = canonical_query(query)
+        with self._lock:
+            self.stats["requests"] += 1
+        while True:
+            text, inflight, owner = self._claim(key)
+            if inflight is None:
+                return text
+            if owner:
+                break
+            inflight.result()  # тот же запрос уже выполняется — ждём его ответ
+
+        text = ""
+        try:
+            text = fetch() or ""
+        finally:
+            self._release(key, query, origin, text, inflight)
+        return text
+
+    async def answer_async(
+        self, query: str, fetch: Callable[[], Awaitable[Optional[str]]], origin: str = "",
+    ) -> str:
+        """
+        То же, что answer(), для корутин: fetch — async-функция, ожидание
+        чужого запроса не блокирует event loop. Отменённый fetch ответа
+        не оставляет — следующий ожидающий выполнит запрос сам.
+        """
+        key = canonical_query(query)
+        with self._lock:
+            self.stats["requests"] += 1
+        while True:
+            text, inflight, owner = self._claim(key)
+            if inflight is None:
+                return text
+            if owner:
+                break
+            # shield: отмена ожидающего не должна отменять future владельца
+            await asyncio.shield(asyncio.wrap_future(inflight))
+
+        text = ""
+        try:
+            text = await fetch() or ""
+        finally:
+            self._release(key, query, origin, text, inflight)
+        return text
+
+    def merge(self, other: "EvidencePool") -> int:
+        """
+        Добавляет ответы другого пула, которых здесь ещё нет (поиск, объединённый
+        с чужим прогоном, отдаёт его ответы нашим следующим этапам).
+        Returns: число добавленных ответов.
+        """
+        added = 0
+        for pooled in other.answers():
+            key = canonical_query(pooled.query)
+            with self._lock:
+                if key not in self._answers:
+                    self._answers[key] = pooled
+                    added += 1
+        return added
+
+    def answers(self) -> List[PooledAnswer]:
+        with self._lock:
+            return list(self._answers.values())
+
+    def first(self, fact: str, exclude_origin: str = "") -> Tuple[Any, Optional[PooledAnswer]]:
+        """
+        Первое найденное значение факта (в порядке поступления ответов).
+
+        exclude_origin — не смотреть ответы этого этапа (их он уже разобрал сам).
+        Returns: (значение, ответ-источник) или (None, None).
+        """
+        for pooled in self.answers():
+            if exclude_origin and pooled.origin == exclude_origin:
+                continue
+            value = getattr(pooled.ex, fact)
+            if _has_value(fact, value):
+                return value, pooled
+        return None, None
+
+    def facts(self) -> Dict[str, Any]:
+        """Сводка: первое значение каждого факта из POOL_FACTS."""
+        return {fact: self.first(fact)[0] for fact in POOL_FACTS}
+
+    def summary(self) -> str:
+        with self._lock:
+            stats = dict(self.stats)
+            answers = len(self._answers)
+        return (
+            f"запросов {stats['requests']}, к GenSearch {stats['upstream']}, "
+            f"из пула {stats['reused']}, ответов в пуле {answers}"
+        )
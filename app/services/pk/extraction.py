@@ -0,0 +1,508 @@
+"""
+services/pk/extraction.py — Извлечение ФК-величин из ответов GenSearch.
+
+Раньше каждый параметр (CVintra, 90% CI, T½, Tmax, Cmax, источник,
+протокол БЭ) искался отдельной функцией: каждая заново приводила текст
+к нижнему регистру, заново искала границы предложений (text[:pos].rfind
+для каждого числа — квадратично) и компилировала свои регулярные
+выражения. Один ответ разбирался 6–8 раз.
+
+Теперь ответ разбирается один раз:
+  - регистр, границы предложений (позиции точек) считаются однократно;
+  - все шаблоны скомпилированы при импорте;
+  - каждая величина вычисляется при первом обращении и запоминается;
+  - разбор последних ответов кэшируется (один ответ читают несколько
+    уровней источников и поиск ФК-параметров).
+
+Правила извлечения не изменились (sentence-boundary контекст CVintra,
+приоритет шаблонов T½, фильтр 30% и т.д.) — результаты совпадают
+с прежними функциями _extract_*_from_text.
+
+Использование:
+    from app.services.pk.extraction import extract
+
+    ex = extract(answer)
+    ex.cv_intra          # 25.4
+    ex.ci                # (0.89, 1.12, 24, "2x2x2") или None
+    ex.t_half_hours      # 12.0
+    ex.quantities        # все найденные величины с контекстом
+
+Замер скорости разбора — benchmarks/bench_extraction.py.
+"""
+
+import bisect
+import re
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+# ════════════════════════════════════════════════════════
+# ШАБЛОНЫ (компилируются один раз)
+# ════════════════════════════════════════════════════════
+
+# ── CVintra: контекст внутри предложения ──
+_PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+_BAD_CONTEXT = re.compile(
+    r'between.?subject|inter.?subject|inter.?individual|'
+    r'межиндивидуальн|между\s*субъект|between.?group',
+    re.IGNORECASE,
+)
+_INTRA_CONTEXT = re.compile(
+    r'within.?subject|intra.?subject|intra.?individual|'
+    r'внутрииндивидуальн|CVintra|CVw[RrTt]?[\s=]|intra-subject',
+    re.IGNORECASE,
+)
+_CMAX_CONTEXT = re.compile(
+    r'Cmax|C_?max|peak\s+concentr|максимальн\w+\s+концентр',
+    re.IGNORECASE,
+)
+_AUC_CONTEXT = re.compile(
+    r'\bAUC\b|area\s+under|площад\w+\s+под\s+кривой',
+    re.IGNORECASE,
+)
+_CV_DECIMAL = re.compile(r'CV\s*=\s*0\.(\d{2,})')
+
+# ── 90% CI и выборка ──
+_CI_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'90\s*%\s*CI[:\s]*\[?(\d+\.?\d*)\s*[-–,]\s*(\d+\.?\d*)\]?',
+    r'confidence\s+interval[:\s]*(\d+\.?\d*)\s*(?:to|[-–])\s*(\d+\.?\d*)',
+    r'lower[:\s]*(\d+\.?\d*)[^.]*upper[:\s]*(\d+\.?\d*)',
+    r'\[(\d+\.?\d*)\s*%?\s*[-–,]\s*(\d+\.?\d*)\s*%?\]',
+)]
+_N_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:n\s*=|subjects?|participants?|volunteers?)[:\s]*(\d+)',
+    r'(\d+)\s*(?:subjects?|participants?|volunteers?|healthy)',
+)]
+
+# ── Название источника ──
+_SOURCE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'Notes on the Design[^.\n]+',
+    r'Product[- ]Specific Guidance[^.\n]+',
+    r'Guidance Document[^.\n]+',
+    r'PMID[:\s]*\d+',
+)]
+
+# ── T½ / Tmax / Cmax (по тексту в нижнем регистре) ──
+_T_HALF_PATTERNS = [re.compile(p) for p in (
+    # "t1/2 = 12 h" / "t½ = 12 days" — самый надёжный формат
+    r'(?:t\s*1\s*/\s*2|t½|t1/2)\s*(?:[=:\-–—]\s*|(?:of|is|was)\s+)'
+    r'(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|minutes?|min|weeks?|wk)',
+
+    # "terminal half-life of 12 days" / "elimination half-life was approximately 12 h"
+    r'(?:terminal\s+)?(?:elimination\s+)?half[- ]?life'
+    r'(?:\s+(?:of\s+)?(?:the\s+)?(?:drug\s+)?(?:is\s+|was\s+|of\s+)?(?:approximately\s+|about\s+|~\s*)?)?'
+    r'(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|minutes?|min|weeks?|wk)',
+
+    # "half-life of approximately 12 days" — с промежутком до 80 символов
+    r'half[- ]?life'
+    r'(?:[^.]{0,80}?)'
+    r'(?:of|is|was|approximately|about|~|=|:)\s*'
+    r'(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|minutes?|min|weeks?|wk)',
+
+    # "half-life 12 days" — прямо рядом
+    r'half[- ]?life\s+(\d+[.,]?\d*)\s*(hours?|hrs?|h\b|days?|d\b|min|weeks?|wk)',
+
+    # Русский: "период полувыведения составляет 12 суток"
+    r'период\s+полу[- ]?(?:выведения|элиминации)'
+    r'(?:[^.]{0,120}?)'
+    r'(?:составля\w+|равен|равна|приблизительно|примерно|около|~|≈|=|:)\s*'
+    r'(\d+[.,]?\d*)\s*(час(?:ов|а|ы)?|ч\b|мин\w*|сут(?:ок|ки)?|дн(?:ей|я)?|день|нед\w*)',
+
+    # Русский: "T½ составляет 12 суток"
+    r'(?:t\s*1\s*/\s*2|t½)\s*(?:составля\w+|равен|равна|=|:|-)\s*'
+    r'(\d+[.,]?\d*)\s*(час(?:ов|а|ы)?|ч\b|мин\w*|сут(?:ок|ки)?|дн(?:ей|я)?|день|нед\w*)',
+)]
+_TMAX_PATTERNS = [re.compile(p) for p in (
+    r'(?:tmax|t\s*max)\s*(?:[=:\-–—]\s*|(?:of|is|was)\s+)'
+    r'(\d+[.,]?\d*)\s*(hours?|h|days?|d|min)',
+    r'(?:time\s+to\s+(?:peak|maximum)\s+(?:concentration|cmax))'
+    r'(?:[^.]{0,60}?)'
+    r'(?:of|is|was|approximately)\s*'
+    r'(\d+[.,]?\d*)\s*(hours?|h|days?|d|min)',
+)]
+_CMAX_PATTERNS = [re.compile(p) for p in (
+    r'(?:cmax|c\s*max|peak\s+(?:plasma\s+)?concentration)'
+    r'(?:[^.]{0,60}?)'
+    r'(?:of|is|was|=)\s*'
+    r'(\d+[.,]?\d*)\s*(ng/ml|µg/ml|mg/ml|μg/ml|нг/мл|мкг/мл)',
+)]
+
+# ── Протоколы БЭ (ClinicalTrials.gov / PubMed) ──
+_NCT = re.compile(r'NCT\d{6,10}', re.IGNORECASE)
+_PMID = re.compile(r'PMID[:\s]*(\d+)', re.IGNORECASE)
+_REPORTED_CV = re.compile(
+    r'(?:CVintra|CV|coefficient\s+of\s+variation)[:\s]*(\d+(?:\.\d+)?)\s*%?',
+    re.IGNORECASE,
+)
+_ENROLLMENT = re.compile(
+    r'(?:количество\s+добровольцев|subjects?|participants?|enrollment)[:\s]*(\d+)',
+    re.IGNORECASE,
+)
+_SUBJECTS = re.compile(
+    r'(?:subjects?|participants?|volunteers?|добровольц)[:\s]*(\d+)',
+    re.IGNORECASE,
+)
+
+_BE_KEYWORDS = (
+    "bioequivalence", "биоэквивалент", "generic",
+    "crossover", "перекрестн", "replicate", "репликат",
+    "reference product", "test product",
+)
+# Дизайн протокола: (тип, периоды, ключевые слова) — в порядке приоритета
+_DESIGN_RULES = (
+    ("replicate_4_period", 4, (
+        "4-period", "4 period", "full replicate", "trtr", "2x2x4",
+        "4 периода", "полный репликативный", "четырехпериодн",
+    )),
+    ("replicate_3_period", 3, (
+        "3-period", "3 period", "partial replicate", "trt/rtr", "2x2x3",
+        "3 периода", "частичный репликативный", "трехпериодн",
+    )),
+    ("parallel", 1, ("parallel", "параллельн")),
+    ("2x2_crossover", 2, (
+        "crossover", "cross-over", "2x2", "2-period", "2 period",
+        "перекрестн", "двухпериодн",
+    )),
+)
+
+# Бакеты контекста CVintra в порядке приоритета
+BUCKET_INTRA_CMAX = "intra_cmax"
+BUCKET_INTRA = "intra"
+BUCKET_CMAX = "cmax"
+BUCKET_OTHER = "other"
+BUCKET_INTER = "inter"      # between/inter-subject — не используется как CVintra
+_CV_BUCKET_ORDER = (BUCKET_INTRA_CMAX, BUCKET_INTRA, BUCKET_CMAX, BUCKET_OTHER)
+
+
+def pk_unit_to_hours(val: float, unit: str) -> Optional[float]:
+    """
+    Конвертирует PK-единицы в часы.
+
+    ВАЖНО: Если единица не распознана — возвращает None (не val!).
+    Это предотвращает баг "12 days → 12 hours".
+    """
+    u = unit.lower().strip()
+
+    # Часы
+    if u in ('h', 'hr', 'hrs', 'hour', 'hours') or u.startswith('час'):
+        return val
+
+    # Минуты
+    if u in ('min', 'minute', 'minutes') or u.startswith('мин'):
+        return val / 60
+
+    # Дни / сутки
+    if u in ('d', 'day', 'days') or u.startswith('сут') or u.startswith('дн') or u == 'день':
+        return val * 24
+
+    # Недели
+    if u in ('wk', 'week', 'weeks') or u.startswith('нед'):
+        return val * 24 * 7
+
+    # Русское "ч" — только если ровно "ч" (не начало другого слова)
+    if u == 'ч':
+        return val
+
+    # Неизвестная единица — НЕ возвращаем val, т.к. можем перепутать дни с часами
+    print(f"   ⚠️ T½: неизвестная единица '{unit}' для значения {val}")
+    return None
+
+
+@dataclass
+class PKQuantity:
+    """Одна найденная величина с контекстом."""
+    name: str            # "cv" | "ci" | "t_half" | "tmax" | "cmax"
+    value: float
+    unit: str
+    bucket: str = ""     # для "cv": intra_cmax / intra / cmax / other / inter
+    sentence: int = 0    # номер предложения (по точкам)
+    start: int = 0       # позиция в тексте
+
+
+class AnswerExtraction:
+    """Разбор одного ответа GenSearch; величины считаются лениво и один раз."""
+
+    def __init__(self, text: str):
+        self.text = text or ""
+
+    # ── Общая подготовка ──
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def _dots(self) -> List[int]:
+        """Позиции точек — границы предложений для контекста CVintra."""
+        return [i for i, ch in enumerate(self.text) if ch == '.']
+
+    def _sentence_bounds(self, start: int, end: int) -> Tuple[int, int, int]:
+        """(начало, конец, номер) предложения, содержащего text[start:end]."""
+        i = bisect.bisect_left(self._dots, start)
+        sent_start = self._dots[i - 1] + 1 if i > 0 else 0
+        j = bisect.bisect_left(self._dots, end)
+        sent_end = self._dots[j] if j < len(self._dots) else len(self.text)
+        return sent_start, sent_end, i
+
+    # ── CVintra ──
+
+    @cached_property
+    def cv_candidates(self) -> List[PKQuantity]:
+        """
+        Все проценты 5–120 (кроме 30% — порог HVD) с бакетом контекста
+        внутри своего предложения:
+          intra + Cmax → intra_cmax; intra → intra; Cmax → cmax;
+          прочие → other; between/inter-subject → inter.
+        AUC после числа (или до него без Cmax) снимает признак Cmax.
+        """
+        text = self.text
+        found: List[PKQuantity] = []
+        for m in _PERCENT.finditer(text):
+            val = float(m.group(1))
+            if not (5 <= val <= 120) or val == 30.0:
+                continue
+
+            sent_start, sent_end, sentence = self._sentence_bounds(m.start(), m.end())
+            ctx_before = text[sent_start:m.end()]    # от начала предложения до числа
+            ctx_after = text[m.end():sent_end]        # от числа до конца предложения
+
+            if _BAD_CONTEXT.search(ctx_before):
+                bucket = BUCKET_INTER
+            else:
+                is_intra = bool(_INTRA_CONTEXT.search(ctx_before))
+                cmax_before = bool(_CMAX_CONTEXT.search(ctx_before))
+                is_cmax = cmax_before or bool(_CMAX_CONTEXT.search(text[sent_start:sent_end]))
+                if _AUC_CONTEXT.search(ctx_after):
+                    is_cmax = False
+                if not cmax_before and _AUC_CONTEXT.search(ctx_before):
+                    is_cmax = False
+
+                if is_intra and is_cmax:
+                    bucket = BUCKET_INTRA_CMAX
+                elif is_intra:
+                    bucket = BUCKET_INTRA
+                elif is_cmax:
+                    bucket = BUCKET_CMAX
+                else:
+                    bucket = BUCKET_OTHER
+            found.append(PKQuantity("cv", val, "%", bucket, sentence, m.start()))
+        return found
+
+    @cached_property
+    def cv_intra(self) -> Optional[float]:
+        """
+        CVintra: ПЕРВОЕ значение из самого приоритетного бакета
+        (intra+Cmax > intra > Cmax > прочие). НЕ max() — max может взять
+        значение из соседнего контекста. Fallback — "CV = 0.XX".
+        """
+        for bucket in _CV_BUCKET_ORDER:
+            for q in self.cv_candidates:
+                if q.bucket == bucket:
+                    return round(q.value, 1)
+
+        decimal_match = _CV_DECIMAL.search(self.text)
+        if decimal_match:
+            val = float(f"0.{decimal_match.group(1)}") * 100
+            if 5 <= val <= 120 and val != 30.0:
+                return round(val, 1)
+        return None
+
+    # ── 90% CI ──
+
+    @cached_property
+    def ci(self) -> Optional[Tuple[float, float, int, str]]:
+        """(lower, upper, n, design) из 90% CI или None."""
+        lower, upper = None, None
+        for pattern in _CI_PATTERNS:
+            match = pattern.search(self.text)
+            if match:
+                lower = float(match.group(1))
+                upper = float(match.group(2))
+                break
+
+        if lower is None or upper is None:
+            return None
+
+        if lower > 2:
+            lower = lower / 100
+        if upper > 2:
+            upper = upper / 100
+
+        if not (0.5 < lower < 1.5 and 0.5 < upper < 1.5 and lower < upper):
+            return None
+
+        n = None
+        for pattern in _N_PATTERNS:
+            match = pattern.search(self.text)
+            if match:
+                val = int(match.group(1))
+                if 6 <= val <= 200:
+                    n = val
+                    break
+
+        if n is None:
+            return None
+
+        design = "2x2x2"
+        t = self.lower
+        if any(k in t for k in ["4-period", "4 period", "full replicate", "2x2x4"]):
+            design = "2x2x4"
+        elif any(k in t for k in ["3-period", "3 period", "partial replicate", "2x2x3"]):
+            design = "2x2x3"
+        elif "parallel" in t:
+            design = "parallel"
+
+        return (lower, upper, n, design)
+
+    # ── Источник ──
+
+    @cached_property
+    def source_name(self) -> Optional[str]:
+        """Название документа/статьи (FDA Guidance, PMID)."""
+        for pattern in _SOURCE_PATTERNS:
+            match = pattern.search(self.text)
+            if match:
+                return match.group(0).strip()
+        return None
+
+    # ── T½ / Tmax / Cmax ──
+
+    @cached_property
+    def t_half_hours(self) -> Optional[float]:
+        """T½ в ЧАСАХ ("12 days" → 288.0). Шаблоны — в порядке надёжности."""
+        for pattern in _T_HALF_PATTERNS:
+            m = pattern.search(self.lower)
+            if not m:
+                continue
+            try:
+                val = float(m.group(1).replace(',', '.'))
+            except ValueError:
+                continue
+
+            unit = m.group(2).lower().strip()
+            hours = pk_unit_to_hours(val, unit)
+            if hours is None:
+                continue
+            # Санитарная проверка
+            if hours < 0.01 or hours > 10000:
+                continue
+            if hours != val:
+                print(f"   📐 T½ конвертация: {val} {unit} → {hours} ч")
+            return hours
+        return None
+
+    @cached_property
+    def tmax_hours(self) -> Optional[float]:
+        for pattern in _TMAX_PATTERNS:
+            m = pattern.search(self.lower)
+            if not m:
+                continue
+            try:
+                val = float(m.group(1).replace(',', '.'))
+            except ValueError:
+                continue
+            hours = pk_unit_to_hours(val, m.group(2).lower())
+            if hours and 0.01 < hours < 500:
+                return hours
+        return None
+
+    @cached_property
+    def cmax(self) -> Tuple[Optional[float], str]:
+        """(значение, единица) или (None, '')."""
+        for pattern in _CMAX_PATTERNS:
+            m = pattern.search(self.lower)
+            if not m:
+                continue
+            try:
+                return float(m.group(1).replace(',', '.')), m.group(2)
+            except ValueError:
+                continue
+        return None, ""
+
+    # ── Протоколы БЭ ──
+
+    @cached_property
+    def not_found(self) -> bool:
+        """Ответ прямо говорит, что ничего не найдено."""
+        return "не найдено" in self.lower or "no results" in self.lower
+
+    @cached_property
+    def is_be_study(self) -> bool:
+        return any(kw in self.lower for kw in _BE_KEYWORDS)
+
+    @cached_property
+    def nct_id(self) -> Optional[str]:
+        m = _NCT.search(self.text)
+        return m.group(0).upper() if m else None
+
+    @cached_property
+    def pmid(self) -> Optional[str]:
+        m = _PMID.search(self.text)
+        return m.group(1) if m else None
+
+    @cached_property
+    def reported_cv(self) -> Optional[float]:
+        """CV из описания статьи ("CVintra: 24%") — без контекстного фильтра."""
+        m = _REPORTED_CV.search(self.text)
+        return float(m.group(1)) if m else None
+
+    @cached_property
+    def enrollment(self) -> Optional[int]:
+        """Число добровольцев в формате карточки ClinicalTrials.gov."""
+        m = _ENROLLMENT.search(self.text)
+        return int(m.group(1)) if m else None
+
+    @cached_property
+    def subjects(self) -> Optional[int]:
+        """Число добровольцев в формате описания статьи PubMed."""
+        m = _SUBJECTS.search(self.text)
+        return int(m.group(1)) if m else None
+
+    @cached_property
+    def design(self) -> Optional[Dict]:
+        """{"type", "periods"} дизайна протокола или None."""
+        for design_type, periods, keywords in _DESIGN_RULES:
+            if any(k in self.lower for k in keywords):
+                return {"type": design_type, "periods": periods}
+        return None
+
+    @cached_property
+    def intake_mode(self) -> Optional[str]:
+        """Режим приёма: both / fed / fasting."""
+        t = self.lower
+        if any(k in t for k in ["fasting and fed", "fed and fasting", "натощак и после еды"]):
+            return "both"
+        if any(k in t for k in ["fed", "after meal", "with food",
+                                "после еды", "с пищей", "во время еды"]):
+            return "fed"
+        if any(k in t for k in ["fasting", "натощак"]):
+            return "fasting"
+        return None
+
+    # ── Сводка ──
+
+    @cached_property
+    def quantities(self) -> List[PKQuantity]:
+        """Все ФК-величины ответа: кандидаты CVintra (с бакетом), CI, T½, Tmax, Cmax."""
+        result = list(self.cv_candidates)
+        if self.ci:
+            lower, upper, n, design = self.ci
+            result.append(PKQuantity("ci", lower, "ratio", f"{lower}-{upper}|n={n}|{design}"))
+        if self.t_half_hours is not None:
+            result.append(PKQuantity("t_half", self.t_half_hours, "h"))
+        if self.tmax_hours is not None:
+            result.append(PKQuantity("tmax", self.tmax_hours, "h"))
+        cmax, unit = self.cmax
+        if cmax is not None:
+            result.append(PKQuantity("cmax", cmax, unit))
+        return result
+
+
+@lru_cache(maxsize=256)
+def extract(text: str) -> AnswerExtraction:
+    """
+    Разбор ответа (кэшируется по тексту: один ответ читают несколько
+    уровней источников CVintra и поиск ФК-параметров).
+    """
+    return AnswerExtraction(text)
@@ -0,0 +1,358 @@
+"""
+services/pk/inhouse_table.py — Собственная таблица ФК-параметров.
+
+Валидированные CVintra, T½, Tmax и Cmax из наших прошлых исследований
+раньше можно было использовать только через --cv-intra / t_half_hours
+в каждом запросе. Таблица (CSV или Parquet, settings.INHOUSE_PK_PATH,
+по умолчанию data/inhouse_pk.csv) читается PK Agent до любого внешнего поиска:
+
+    inn,inn_en,form,release,cv_intra,t_half_hours,tmax_hours,cmax,cmax_unit,study,source,validated_by,validated_at
+    амлодипин,amlodipine,таблетки,immediate,14.2,41,7.5,5.8,нг/мл,IF-BE-2023-014,Отчёт КИ,Иванова,2024-03-01
+
+  - ключ — нормализованное МНН (ru / en, соль и падеж не важны:
+    "амлодипина безилат" = "Amlodipine");
+  - form и release уточняют строку; пусто — подходит для любой формы /
+    типа высвобождения. Каждый параметр берётся из самой точной строки,
+    где он заполнен (при равенстве — из нижней строки файла);
+  - study / source / validated_by / validated_at — происхождение значения,
+    попадает в источник параметра и в файл обоснований.
+
+Файл перечитывается при изменении (проверка mtime не чаще
+INHOUSE_PK_CHECK_S) — сервер перезапускать не нужно. Ошибка в новой
+версии файла — остаётся прежняя таблица.
+"""
+
+import csv
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    from app.utils.inn_utils import strip_salt_en, strip_salt_ru
+except ImportError:
+    from inn_utils import strip_salt_en, strip_salt_ru
+
+try:
+    from app.utils.inn_dictionary import get_inn_dictionary
+except ImportError:
+    get_inn_dictionary = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from app.config.settings import settings
+
+
+DEFAULT_TABLE_PATH = settings.INHOUSE_PK_PATH
+CHECK_INTERVAL_S = settings.INHOUSE_PK_CHECK_S
+
+# Без этих параметров внешний поиск нужен (как в PKLiteratureAgent.validate)
+REQUIRED = ("cv_intra", "t_half_hours")
+PARAMETERS = ("cv_intra", "t_half_hours", "tmax_hours", "cmax_value")
+
+# Синонимы колонок
+_COLUMNS = {
+    "inn": ("inn", "inn_ru", "мнн"),
+    "inn_en": ("inn_en",),
+    "form": ("form", "dosage_form", "форма", "лекарственная форма"),
+    "release": ("release", "release_type", "высвобождение"),
+    "cv_intra": ("cv_intra", "cvintra", "cv_intra_cmax", "cv"),
+    "t_half_hours": ("t_half_hours", "t_half", "t½", "thalf"),
+    "tmax_hours": ("tmax_hours", "tmax"),
+    "cmax_value": ("cmax", "cmax_value"),
+    "cmax_unit": ("cmax_unit",),
+    "study": ("study", "study_id", "protocol", "исследование"),
+    "source": ("source", "report", "источник"),
+    "validated_by": ("validated_by", "проверил"),
+    "validated_at": ("validated_at", "date", "дата"),
+}
+
+# Семейства лекарственных форм: "таблетки, покрытые плёночной оболочкой" → tablet
+_FORM_FAMILIES = (
+    ("tablet", ("таблет", "tablet")),
+    ("capsule", ("капсул", "capsule")),
+    ("solution", ("раствор", "solution")),
+    ("suspension", ("суспенз", "suspension")),
+    ("syrup", ("сироп", "syrup")),
+    ("drops", ("капли", "drops")),
+    ("powder", ("порош", "powder")),
+    ("granules", ("гранул", "granule")),
+    ("suppository", ("суппозит", "suppositor")),
+    ("patch", ("пластыр", "patch")),
+)
+
+# Тип высвобождения (ReleaseType): immediate / modified / delayed
+_RELEASE_TYPES = (
+    ("delayed", ("delayed", "кишечнораствор", "отсроч", "замедл")),
+    ("modified", ("modified", "модифиц", "пролонг", "extended", "sustained",
+                  "prolonged", "controlled", "ретард", "retard")),
+    ("immediate", ("immediate", "немедлен", "обычн")),
+)
+
+
+def normalize_form(text: str) -> str:
+    """Семейство формы или нормализованный текст; пусто — любая форма."""
+    text = re.sub(r"\s+", " ", (text or "").lower().replace("ё", "е")).strip()
+    for family, stems in _FORM_FAMILIES:
+        if any(stem in text for stem in stems):
+            return family
+    return text
+
+
+def normalize_release(value: Any) -> str:
+    """'Пролонгированного действия' / ReleaseType.MODIFIED → 'modified'; пусто — любой."""
+    text = str(getattr(value, "value", value) or "").lower().replace("ё", "е")
+    for release, stems in _RELEASE_TYPES:
+        if any(stem in text for stem in stems):
+            return release
+    return ""
+
+
+def inn_keys(*names: str) -> Set[str]:
+    """
+    Все ключи МНН: как написано, без соли и через словарь МНН
+    ("амлодипина безилат" → {"амлодипина безилат", "амлодипина", "амлодипин", "amlodipine"}).
+    """
+    keys: Set[str] = set()
+    for name in names:
+        name = re.sub(r"\s+", " ", (name or "").lower().replace("ё", "е")).strip()
+        if not name:
+            continue
+        keys.update({name, strip_salt_ru(name).lower(), strip_salt_en(name).lower()})
+        entry = get_inn_dictionary().lookup(name) if get_inn_dictionary is not None else None
+        if entry:
+            keys.update({entry.ru.lower(), entry.en.lower()})
+    keys.discard("")
+    return keys
+
+
+def _number(value: Any) -> Optional[float]:
+    """'12,5' / '12.5' / 12.5 → 12.5; пусто и мусор → None."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if value != value else float(value)  # NaN из Parquet
+    m = re.search(r"-?\d+(?:[.,]\d+)?", str(value))
+    return float(m.group(0).replace(",", ".")) if m else None
+
+
+@dataclass
+class InhouseRecord:
+    """Одна строка таблицы."""
+    row: int                              # номер строки файла (для отчёта и порядка)
+    inn: str
+    inn_en: str = ""
+    form: str = ""                        # семейство формы, "" — любая
+    release: str = ""                     # immediate / modified / delayed, "" — любой
+    cv_intra: Optional[float] = None
+    t_half_hours: Optional[float] = None
+    tmax_hours: Optional[float] = None
+    cmax_value: Optional[float] = None
+    cmax_unit: str = ""
+    study: str = ""
+    source: str = ""
+    validated_by: str = ""
+    validated_at: str = ""
+
+    @property
+    def provenance(self) -> str:
+        """'Своя таблица ФК: IF-BE-2023-014 (Отчёт КИ; проверил Иванова, 2024-03-01)'."""
+        checked = ", ".join(x for x in (
+            f"проверил {self.validated_by}" if self.validated_by else "", self.validated_at,
+        ) if x)
+        details = "; ".join(x for x in (self.source, checked) if x)
+        label = self.study or f"строка {self.row}"
+        return f"Своя таблица ФК: {label}" + (f" ({details})" if details else "")
+
+
+@dataclass
+class InhousePK:
+    """Параметры для МНН / формы / типа высвобождения с происхождением каждого."""
+    inn: str
+    cv_intra: Optional[float] = None
+    t_half_hours: Optional[float] = None
+    tmax_hours: Optional[float] = None
+    cmax_value: Optional[float] = None
+    cmax_unit: str = ""
+    provenance: Dict[str, str] = field(default_factory=dict)   # параметр → происхождение
+
+    def covers(self, **given: Optional[float]) -> bool:
+        """Покрыты ли обязательные параметры (given — уже заданные пользователем)."""
+        return all(getattr(self, name) is not None or given.get(name) is not None for name in REQUIRED)
+
+    def summary(self) -> str:
+        parts = [
+            f"CVintra {self.cv_intra}%" if self.cv_intra is not None else "",
+            f"T½ {self.t_half_hours} ч" if self.t_half_hours is not None else "",
+            f"Tmax {self.tmax_hours} ч" if self.tmax_hours is not None else "",
+            f"Cmax {self.cmax_value} {self.cmax_unit}".rstrip() if self.cmax_value is not None else "",
+        ]
+        return ", ".join(p for p in parts if p) or "—"
+
+
+# ════════════════════════════════════════════════════════
+# ЧТЕНИЕ ФАЙЛА
+# ════════════════════════════════════════════════════════
+
+def _read_rows(path: str) -> List[Dict[str, Any]]:
+    if path.lower().endswith(".parquet"):
+        if pq is None:
+            raise ImportError("для .parquet нужен pyarrow (pip install pyarrow)")
+        return pq.read_table(path).to_pylist()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        text = f.read()
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.DictReader(text.splitlines(), dialect=dialect))
+
+
+def parse_table(rows: Sequence[Dict[str, Any]]) -> List[InhouseRecord]:
+    """Строки файла → записи; строки без МНН или без единого параметра пропускаются."""
+    records: List[InhouseRecord] = []
+    for i, raw in enumerate(rows, start=2):   # строка 1 — заголовок
+        lowered = {str(k).strip().lower(): v for k, v in raw.items() if k is not None}
+
+        def _pick(name: str) -> Any:
+            for alias in _COLUMNS[name]:
+                value = lowered.get(alias)
+                if value not in (None, ""):
+                    return value
+            return None
+
+        def _text(name: str) -> str:
+            value = _pick(name)
+            return str(value).strip() if value is not None else ""
+
+        record = InhouseRecord(
+            row=i,
+            inn=_text("inn"),
+            inn_en=_text("inn_en"),
+            form=normalize_form(_text("form")),
+            release=normalize_release(_text("release")),
+            cv_intra=_number(_pick("cv_intra")),
+            t_half_hours=_number(_pick("t_half_hours")),
+            tmax_hours=_number(_pick("tmax_hours")),
+            cmax_value=_number(_pick("cmax_value")),
+            cmax_unit=_text("cmax_unit"),
+            study=_text("study"),
+            source=_text("source"),
+            validated_by=_text("validated_by"),
+            validated_at=_text("validated_at"),
+        )
+        if (record.inn or record.inn_en) and any(getattr(record, p) is not None for p in PARAMETERS):
+            records.append(record)
+    return records
+
+
+# ════════════════════════════════════════════════════════
+# ТАБЛИЦА С ПЕРЕЧИТЫВАНИЕМ
+# ════════════════════════════════════════════════════════
+
+class InhousePKTable:
+    """Индекс МНН → записи; перечитывает файл, когда меняются его mtime / размер."""
+
+    def __init__(self, path: str = DEFAULT_TABLE_PATH, check_interval_s: float = CHECK_INTERVAL_S):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[InhouseRecord]] = {}
+        self._signature: Optional[Tuple[float, int]] = None
+        self._checked_at = 0.0
+        self.stats = {"loads": 0, "errors": 0, "records": 0}
+
+    def _reload_if_changed(self) -> None:
+        """Под self._lock."""
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.check_interval_s:
+            return
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            if self._signature is not None:
+                print(f"  ⚠️ Своя таблица ФК {self.path} удалена — таблица пуста")
+            self._index, self._signature = {}, None
+            return
+        signature = (stat.st_mtime, stat.st_size)
+        if signature == self._signature:
+            return
+        try:
+            records = parse_table(_read_rows(self.path))
+        except Exception as e:
+            # Файл мог быть прочитан посреди записи — повторим при следующей проверке
+            self.stats["errors"] += 1
+            print(f"  ⚠️ Своя таблица ФК {self.path} не прочитана ({type(e).__name__}: {e}) — "
+                  f"используется прежняя версия")
+            return
+        index: Dict[str, List[InhouseRecord]] = {}
+        for record in records:
+            for key in inn_keys(record.inn, record.inn_en):
+                index.setdefault(key, []).append(record)
+        self._index, self._signature = index, signature
+        self.stats["loads"] += 1
+        self.stats["records"] = len(records)
+        print(f"  📒 Своя таблица ФК: {len(records)} записей ({self.path})")
+
+    def records_for(self, *inns: str) -> List[InhouseRecord]:
+        keys = inn_keys(*inns)
+        with self._lock:
+            self._reload_if_changed()
+            found = {id(r): r for key in keys for r in self._index.get(key, [])}
+        return sorted(found.values(), key=lambda r: r.row)
+
+    def lookup(self, inn_ru: str, inn_en: str = "", form: str = "", release: Any = "") -> Optional[InhousePK]:
+        """
+        Параметры для МНН. Строки с другой формой / типом высвобождения
+        не подходят; из подходящих каждый параметр — из самой точной.
+        """
+        form, release = normalize_form(form), normalize_release(release)
+        matching = [
+            r for r in self.records_for(inn_ru, inn_en)
+            if (not r.form or not form or r.form == form)
+            and (not r.release or not release or r.release == release)
+        ]
+        if not matching:
+            return None
+        # Точнее — позже: форма + тип высвобождения > одно из них > только МНН; затем порядок файла
+        matching.sort(key=lambda r: (bool(r.form) + bool(r.release), r.row))
+        result = InhousePK(inn=matching[-1].inn or matching[-1].inn_en)
+        for record in matching:
+            for name in PARAMETERS:
+                value = getattr(record, name)
+                if value is not None:
+                    setattr(result, name, value)
+                    result.provenance[name] = record.provenance
+                    if name == "cmax_value":
+                        result.cmax_unit = record.cmax_unit
+        return result
+
+
+# ── Общий экземпляр ──
+
+_table: Optional[InhousePKTable] = None
+_table_lock = threading.Lock()
+
+
+def get_inhouse_table() -> InhousePKTable:
+    """Общая таблица процесса (settings.INHOUSE_PK_PATH)."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = InhousePKTable(DEFAULT_TABLE_PATH)
+        return _table
+
+
+def lookup_inhouse_pk(inn_ru: str, inn_en: str = "", form: str = "", release: Any = "") -> Optional[InhousePK]:
+    """Параметры из своей таблицы или None (нет файла / МНН). Ошибки не ломают поиск."""
+    try:
+        return get_inhouse_table().lookup(inn_ru, inn_en, form, release)
+    except Exception as e:
+        print(f"  ⚠️ Своя таблица ФК: {type(e).__name__}: {e}")
+        return None
@@ -0,0 +1,387 @@
+"""
+services/pk/medline_index.py — Офлайн-корпус PubMed: кандидаты CVintra / T½ по МНН.
+
+Поиски PubMed CI / PubMed direct в cv_intra.py ищут одно и то же —
+90% CI или intra-subject CV из опубликованных БЭ-исследований. Те же
+факты можно заранее извлечь из локальной выгрузки MEDLINE (baseline и
+updatefiles, pubmed*.xml.gz) и не спрашивать GenSearch вовсе.
+
+Импорт (import_medline.py):
+  - потоковый разбор XML (iterparse, разобранные статьи сразу удаляются
+    из дерева) — память не зависит от размера файла;
+  - отбираются рефераты с ФК/БЭ-контекстом, МНН — из ChemicalList
+    (вещества с регистрационным номером, без фармакологических классов);
+  - извлекатели services/pk/extraction.py (CVintra, 90% CI → CVintra,
+    T½, Tmax, Cmax) работают в пуле процессов пакетами; в работе
+    не больше 2 пакетов на процесс — память ограничена и на миллионах
+    рефератов;
+  - <DeleteCitation> из updatefiles удаляет кандидатов отозванных PMID,
+    повторно пришедший PMID заменяет свои прежние строки.
+
+Результат — таблица candidates (МНН, PMID, год, вид, значение, CI, n,
+дизайн) в SQLite-файле settings.MEDLINE_INDEX_PATH (по умолчанию
+data/medline_pk.db).
+
+search_cv_intra и search_pk_params обращаются к нему до сетевого поиска.
+Из нескольких исследований берётся медиана (верхняя — консервативнее
+для расчёта выборки); рефераты об одном МНН приоритетнее комбинаций.
+"""
+
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from app.services.pk.extraction import BUCKET_INTRA, BUCKET_INTRA_CMAX, extract
+except ImportError:
+    from extraction import BUCKET_INTRA, BUCKET_INTRA_CMAX, extract
+
+try:
+    from app.utils.inn_utils import strip_salt_en
+except ImportError:
+    from inn_utils import strip_salt_en
+
+from app.config.settings import settings
+
+
+DEFAULT_INDEX_PATH = settings.MEDLINE_INDEX_PATH
+
+# Реферат отправляется извлекателям, только если в нём есть ФК/БЭ-контекст
+_PK_MARKERS = re.compile(
+    r"bioequivalen|pharmacokinetic|bioavailab|half-life|half life|cmax|t1/2|t½",
+    re.IGNORECASE,
+)
+
+KINDS = ("ci", "cv_intra", "t_half", "tmax", "cmax")
+
+# Статья: (pmid, год, заголовок, текст реферата, МНН)
+Article = Tuple[str, int, str, str, Tuple[str, ...]]
+
+# Прямое значение CVintra берётся только с явным within/intra-subject
+# контекстом: в реферате без него процент — эффект пищи, доля
+# добровольцев и т.п. (ex.cv_intra в ответах GenSearch берёт и их).
+_CV_BUCKETS = (BUCKET_INTRA_CMAX, BUCKET_INTRA)
+
+
+def _inn_key(name: str) -> str:
+    """'Amlodipine Besylate' → 'amlodipine' (как ключ PK-кэша)."""
+    return re.sub(r"\s+", " ", strip_salt_en(name or "")).strip().lower()
+
+
+# ════════════════════════════════════════════════════════
+# ПОТОКОВЫЙ РАЗБОР MEDLINE XML
+# ════════════════════════════════════════════════════════
+
+def _open(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _article(elem: ET.Element) -> Optional[Article]:
+    """Статья из <PubmedArticle> или None (нет реферата / МНН / ФК-контекста)."""
+    citation = elem.find("MedlineCitation")
+    if citation is None:
+        return None
+    pmid = (citation.findtext("PMID") or "").strip()
+    article = citation.find("Article")
+    if not pmid or article is None:
+        return None
+
+    title_node = article.find("ArticleTitle")
+    title = "".join(title_node.itertext()) if title_node is not None else ""
+    abstract = " ".join(
+        "".join(node.itertext()) for node in article.findall("Abstract/AbstractText")
+    )
+    if not abstract or not _PK_MARKERS.search(title + " " + abstract):
+        return None
+
+    inns = []
+    for chemical in citation.findall("ChemicalList/Chemical"):
+        # Регистрационный номер "0" — фармакологический класс, а не вещество
+        if (chemical.findtext("RegistryNumber") or "0").strip() == "0":
+            continue
+        key = _inn_key(chemical.findtext("NameOfSubstance") or "")
+        if key and key not in inns:
+            inns.append(key)
+    if not inns:
+        return None
+
+    year_text = (
+        article.findtext("Journal/JournalIssue/PubDate/Year")
+        or (article.findtext("Journal/JournalIssue/PubDate/MedlineDate") or "")[:4]
+    )
+    year = int(year_text) if year_text.isdigit() else 0
+    return pmid, year, title, abstract, tuple(inns)
+
+
+def iter_medline(path: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Поток событий файла MEDLINE: ("article", Article) и ("delete", pmid).
+
+    Разобранные элементы удаляются из дерева — в памяти одна статья.
+    """
+    with _open(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end":
+                continue
+            if elem.tag == "PubmedArticle":
+                article = _article(elem)
+                if article is not None:
+                    yield "article", article
+                root.clear()
+            elif elem.tag == "DeleteCitation":
+                for node in elem.findall("PMID"):
+                    if node.text:
+                        yield "delete", node.text.strip()
+                root.clear()
+            elif elem.tag == "PubmedBookArticle":
+                root.clear()
+
+
+# ════════════════════════════════════════════════════════
+# ИЗВЛЕЧЕНИЕ (в процессах пула)
+# ════════════════════════════════════════════════════════
+
+def _explicit_cv_intra(ex) -> Optional[float]:
+    """Первый процент из бакетов intra+Cmax / intra или None."""
+    for bucket in _CV_BUCKETS:
+        for q in ex.cv_candidates:
+            if q.bucket == bucket:
+                return round(q.value, 1)
+    return None
+
+
+def extract_batch(batch: List[Article]) -> Tuple[List[str], List[tuple]]:
+    """
+    Кандидаты значений для пакета статей (выполняется в процессе пула).
+
+    Returns:
+        (PMID пакета, строки candidates)
+    """
+    try:
+        from app.services.pk.cv_intra import cv_from_ci
+    except ImportError:
+        from cv_intra import cv_from_ci
+
+    rows: List[tuple] = []
+    for pmid, year, title, abstract, inns in batch:
+        ex = extract(f"{title}. {abstract}")
+        found: List[tuple] = []
+
+        if ex.ci is not None:
+            lower, upper, n, design = ex.ci
+            try:
+                found.append(("ci", cv_from_ci(lower, upper, n, design), "", lower, upper, n, design))
+            except (ValueError, ZeroDivisionError):
+                pass
+        cv_intra = _explicit_cv_intra(ex)
+        if cv_intra is not None:
+            found.append(("cv_intra", cv_intra, "", None, None, None, ""))
+        if ex.t_half_hours is not None:
+            found.append(("t_half", ex.t_half_hours, "h", None, None, None, ""))
+        if ex.tmax_hours is not None:
+            found.append(("tmax", ex.tmax_hours, "h", None, None, None, ""))
+        cmax, unit = ex.cmax
+        if cmax is not None:
+            found.append(("cmax", cmax, unit, None, None, None, ""))
+
+        for inn in inns:
+            for kind, value, unit, lower, upper, n, design in found:
+                rows.append((
+                    inn, pmid, year, kind, float(value), unit, lower, upper, n, design,
+                    len(inns), title[:300],
+                ))
+    return [a[0] for a in batch], rows
+
+
+# ════════════════════════════════════════════════════════
+# ИНДЕКС
+# ════════════════════════════════════════════════════════
+
+class MedlineIndex:
+    """SQLite-таблица кандидатов по МНН + журнал импортированных файлов."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(
+                "PRAGMA journal_mode=WAL;"
+                "CREATE TABLE IF NOT EXISTS candidates ("
+                "  inn TEXT NOT NULL, pmid TEXT NOT NULL, year INTEGER,"
+                "  kind TEXT NOT NULL, value REAL NOT NULL, unit TEXT,"
+                "  ci_lower REAL, ci_upper REAL, n INTEGER, design TEXT,"
+                "  n_inns INTEGER, title TEXT);"
+                "CREATE INDEX IF NOT EXISTS candidates_inn ON candidates (inn, kind);"
+                "CREATE INDEX IF NOT EXISTS candidates_pmid ON candidates (pmid);"
+                "CREATE TABLE IF NOT EXISTS files ("
+                "  name TEXT PRIMARY KEY, size INTEGER, articles INTEGER,"
+                "  candidates INTEGER, imported_at REAL);"
+            )
+            self._conn.commit()
+
+    # ── Запись (import_medline.py) ──
+
+    def replace(self, pmids: List[str], rows: List[tuple]) -> None:
+        """Строки пакета; прежние строки этих PMID удаляются."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM candidates WHERE pmid = ?", [(p,) for p in pmids])
+            self._conn.executemany(
+                "INSERT INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows,
+            )
+            self._conn.commit()
+
+    def delete_pmids(self, pmids: List[str]) -> None:
+        self.replace(pmids, [])
+
+    def is_imported(self, name: str, size: int) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM files WHERE name = ?", (name,),
+            ).fetchone()
+        return row is not None and row[0] == size
+
+    def mark_imported(self, name: str, size: int, articles: int, candidates: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (name, size, articles, candidates, time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript("DELETE FROM candidates; DELETE FROM files;")
+            self._conn.commit()
+
+    # ── Чтение ──
+
+    def candidates(self, inn_key: str, kinds: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """Кандидаты по МНН: сначала рефераты об одном веществе, затем свежие."""
+        placeholders = ",".join("?" * len(kinds))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT pmid, year, kind, value, unit, ci_lower, ci_upper, n, design, n_inns, title"
+                f"  FROM candidates WHERE inn = ? AND kind IN ({placeholders})"
+                f" ORDER BY n_inns = 1 DESC, year DESC",
+                (inn_key, *kinds),
+            ).fetchall()
+        keys = ("pmid", "year", "kind", "value", "unit", "ci_lower", "ci_upper",
+                "n", "design", "n_inns", "title")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_kind = dict(self._conn.execute(
+                "SELECT kind, COUNT(*) FROM candidates GROUP BY kind"
+            ).fetchall())
+            inns = self._conn.execute("SELECT COUNT(DISTINCT inn) FROM candidates").fetchone()[0]
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return {"path": self.path, "files": files, "inns": inns, "candidates": by_kind}
+
+
+def _median_row(rows: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """
+    Строка с медианным значением среди рефератов об одном веществе
+    (если такие есть). Чётное число — верхняя медиана.
+    """
+    single = [r for r in rows if r["n_inns"] == 1] or rows
+    ordered = sorted(single, key=lambda r: r["value"])
+    return ordered[len(ordered) // 2], len(single)
+
+
+_index: Optional[MedlineIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_medline_index() -> Optional[MedlineIndex]:
+    """Общий индекс процесса или None, если он ещё не построен."""
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(DEFAULT_INDEX_PATH):
+            _index = MedlineIndex(DEFAULT_INDEX_PATH)
+        return _index
+
+
+def _candidates(inn_key: str, kinds: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """Безопасное чтение: ошибки индекса не должны ломать поиск."""
+    if not inn_key or "+" in inn_key:
+        return []
+    try:
+        index = get_medline_index()
+        return index.candidates(inn_key, kinds) if index is not None else []
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Корпус MEDLINE: {type(e).__name__}: {e}")
+        return []
+
+
+def lookup_cv(inn_key: str) -> Optional[Dict[str, Any]]:
+    """
+    CVintra из корпуса в полях CVintraResult или None.
+
+    Приоритет — как у сетевого поиска: расчёт из 90% CI (pubmed_ci),
+    затем прямое значение CVintra (pubmed_direct).
+    """
+    rows = _candidates(inn_key, ("ci", "cv_intra"))
+    ci_rows = [r for r in rows if r["kind"] == "ci"]
+    if ci_rows:
+        row, count = _median_row(ci_rows)
+        return {
+            "cv_intra": round(row["value"], 2),
+            "source": "pubmed_ci",
+            "source_detail": (
+                f"MEDLINE PMID {row['pmid']}: 90% CI [{row['ci_lower']:.2f}-{row['ci_upper']:.2f}], "
+                f"n={row['n']} (медиана {count} исследований)"
+            ),
+            "confidence": "high",
+            "method": "calculated_from_ci",
+            "ci_data": {
+                "lower": row["ci_lower"], "upper": row["ci_upper"],
+                "n": row["n"], "design": row["design"], "pmid": row["pmid"],
+            },
+        }
+    cv_rows = [r for r in rows if r["kind"] == "cv_intra"]
+    if cv_rows:
+        row, count = _median_row(cv_rows)
+        return {
+            "cv_intra": row["value"],
+            "source": "pubmed_direct",
+            "source_detail": f"MEDLINE PMID {row['pmid']}: {row['title'][:120]} (медиана {count} исследований)",
+            "confidence": "medium",
+            "method": "lookup",
+        }
+    return None
+
+
+def lookup_pk(inn_key: str) -> Optional[Dict[str, Any]]:
+    """T½ / Tmax / Cmax из корпуса в полях PKParamsResult или None (нет T½)."""
+    rows = _candidates(inn_key, ("t_half", "tmax", "cmax"))
+    t_half = [r for r in rows if r["kind"] == "t_half"]
+    if not t_half:
+        return None
+    row, count = _median_row(t_half)
+    result = {
+        "t_half_hours": row["value"],
+        "source": "medline",
+        "source_detail": f"MEDLINE PMID {row['pmid']} (медиана {count} исследований)",
+    }
+    tmax = [r for r in rows if r["kind"] == "tmax"]
+    if tmax:
+        result["tmax_hours"] = _median_row(tmax)[0]["value"]
+    cmax = [r for r in rows if r["kind"] == "cmax"]
+    if cmax:
+        # Cmax сравним только в одних единицах — самая частая единица
+        units = [r["unit"] for r in cmax]
+        unit = max(set(units), key=units.count)
+        best = _median_row([r for r in cmax if r["unit"] == unit])[0]
+        result["cmax_value"], result["cmax_unit"] = best["value"], unit
+    return result
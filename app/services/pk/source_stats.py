@@ -0,0 +1,364 @@
+"""
+services/pk/source_stats.py — Статистика источников CVintra по истории поисков.
+
+Поиск CVintra (_search_all_sources) перебирает уровни PubMed CI → PubMed
+direct → BE Guidance → интернет, по 2–4 шаблона запросов на уровень.
+Для некоторых групп препаратов отдельные шаблоны почти никогда не дают
+значения, но каждый раз тратят запрос GenSearch.
+
+Модуль запоминает по каждому шаблону (в разрезе группы препарата):
+  - сколько раз он выполнялся и сколько раз ответ дал значение (hit rate);
+  - среднюю задержку ответа.
+
+По этой истории план поиска:
+  - упорядочивает шаблоны внутри уровня — сначала самые результативные
+    (при равенстве — более быстрые);
+  - отбрасывает шаблоны, которые после settings.SOURCE_STATS_MIN_ATTEMPTS
+    попыток дают значение реже SOURCE_STATS_PRUNE_RATE. С вероятностью
+    SOURCE_STATS_EXPLORE отброшенный шаблон всё же выполняется, чтобы
+    статистика не застывала.
+
+Порядок уровней не меняется: значение по-прежнему выбирается
+по регуляторному приоритету (PubMed CI важнее интернета).
+
+Группа препарата — по основе МНН (stem ВОЗ: -sartan, -statin, -pril, ...).
+Пока по группе мало попыток, используется статистика по всем группам.
+
+Хранение — таблица source_stats в той же SQLite-БД, что PK-кэш
+(DATABASE_URL); счётчики увеличиваются атомарно, так что сервер и CLI
+могут писать одновременно.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+# Как часто перечитывать таблицу (её пополняют и другие процессы)
+_REFRESH_S = 300
+
+OTHER_CLASS = "other"
+
+# Основы МНН (stem ВОЗ) → группа. Проверяются по убыванию длины.
+_STEMS: Dict[str, str] = {
+    "sartan": "sartan", "артан": "sartan",
+    "statin": "statin", "статин": "statin",
+    "pril": "ace_inhibitor", "прил": "ace_inhibitor",
+    "olol": "beta_blocker", "alol": "beta_blocker", "олол": "beta_blocker",
+    "dipine": "dihydropyridine", "дипин": "dihydropyridine",
+    "prazole": "ppi", "празол": "ppi",
+    "tidine": "h2_blocker", "тидин": "h2_blocker",
+    "gliptin": "gliptin", "глиптин": "gliptin",
+    "gliflozin": "gliflozin", "глифлозин": "gliflozin",
+    "formin": "biguanide", "формин": "biguanide",
+    "floxacin": "fluoroquinolone", "флоксацин": "fluoroquinolone",
+    "cillin": "penicillin", "циллин": "penicillin",
+    "mycin": "macrolide_aminoglycoside", "micin": "macrolide_aminoglycoside",
+    "мицин": "macrolide_aminoglycoside",
+    "conazole": "azole_antifungal", "коназол": "azole_antifungal",
+    "navir": "protease_inhibitor", "навир": "protease_inhibitor",
+    "vir": "antiviral", "вир": "antiviral",
+    "tinib": "kinase_inhibitor", "тиниб": "kinase_inhibitor",
+    "mab": "monoclonal_antibody", "маб": "monoclonal_antibody",
+    "xaban": "xaban", "ксабан": "xaban",
+    "gatran": "gatran", "гатран": "gatran",
+    "parin": "heparin", "парин": "heparin",
+    "grel": "antiplatelet", "грел": "antiplatelet",
+    "setron": "setron", "сетрон": "setron",
+    "triptan": "triptan", "триптан": "triptan",
+    "oxetine": "antidepressant", "оксетин": "antidepressant",
+    "triptyline": "antidepressant", "триптилин": "antidepressant",
+    "azepam": "benzodiazepine", "азепам": "benzodiazepine",
+    "azolam": "benzodiazepine", "азолам": "benzodiazepine",
+    "profen": "nsaid", "профен": "nsaid",
+    "fenac": "nsaid", "фенак": "nsaid",
+    "coxib": "coxib", "коксиб": "coxib",
+    "lukast": "leukotriene", "лукаст": "leukotriene",
+    "dronate": "bisphosphonate", "дронат": "bisphosphonate",
+    "caine": "local_anesthetic", "каин": "local_anesthetic",
+    "olone": "corticosteroid", "олон": "corticosteroid",
+    "sone": "corticosteroid", "glitazone": "glitazone", "глитазон": "glitazone",
+}
+_STEMS_BY_LENGTH = sorted(_STEMS, key=len, reverse=True)
+
+
+def drug_class_for(term: str) -> str:
+    """
+    Группа препарата по основе МНН (последнее слово термина).
+
+        "losartan" → "sartan", "аторвастатин" → "statin", "xyz" → "other"
+    """
+    words = (term or "").lower().split()
+    if not words:
+        return OTHER_CLASS
+    word = words[-1]
+    for stem in _STEMS_BY_LENGTH:
+        if word.endswith(stem):
+            return _STEMS[stem]
+    if word.startswith(("cef", "цеф")):
+        return "cephalosporin"
+    return OTHER_CLASS
+
+
+def query_template(query: str, term: str) -> str:
+    """Шаблон запроса: термин заменяется на {term}."""
+    return query.replace(term, "{term}") if term else query
+
+
+@dataclass
+class TemplateStats:
+    """Счётчики одного шаблона запроса."""
+    attempts: int = 0
+    hits: int = 0
+    latency_sum: float = 0.0
+    latency_n: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Сглаженная доля попаданий (априори 1/2 при отсутствии данных)."""
+        return (self.hits + 1) / (self.attempts + 2)
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        return self.latency_sum / self.latency_n if self.latency_n else None
+
+    def add(self, other: "TemplateStats") -> None:
+        self.attempts += other.attempts
+        self.hits += other.hits
+        self.latency_sum += other.latency_sum
+        self.latency_n += other.latency_n
+
+
+@dataclass
+class QueryOutcome:
+    """Итог одного выполненного запроса поиска."""
+    tier: str
+    template: str
+    hit: bool
+    latency_s: Optional[float] = None  # None — ответ взят из пула прогона
+
+
+class SourceStats:
+    """История результативности шаблонов запросов (SQLite + копия в памяти)."""
+
+    def __init__(
+        self, path: str, enabled: bool = True,
+        min_attempts: int = 8,
+        prune_rate: float = 0.05,
+        explore: float = 0.1,
+        rng: Optional[random.Random] = None,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.min_attempts = max(1, min_attempts)
+        self.prune_rate = prune_rate
+        self.explore = explore
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[str, str, str], TemplateStats] = {}
+        self._loaded_at = 0.0
+        # Счётчики процесса: сколько запросов уходит на один поиск
+        self.searches = {"searches": 0, "found": 0, "calls": 0, "calls_to_hit": 0, "pruned": 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS source_stats ("
+                "  drug_class TEXT NOT NULL,"
+                "  tier TEXT NOT NULL,"
+                "  template TEXT NOT NULL,"
+                "  attempts INTEGER NOT NULL DEFAULT 0,"
+                "  hits INTEGER NOT NULL DEFAULT 0,"
+                "  latency_sum REAL NOT NULL DEFAULT 0,"
+                "  latency_n INTEGER NOT NULL DEFAULT 0,"
+                "  updated_at REAL NOT NULL,"
+                "  PRIMARY KEY (drug_class, tier, template))"
+            )
+            self._conn.commit()
+
+    # ── Чтение ──
+
+    def _refresh_locked(self) -> None:
+        if time.time() - self._loaded_at < _REFRESH_S:
+            return
+        rows = self._conn.execute(
+            "SELECT drug_class, tier, template, attempts, hits, latency_sum, latency_n "
+            "FROM source_stats"
+        ).fetchall()
+        self._rows = {
+            (cls, tier, tpl): TemplateStats(attempts, hits, latency_sum, latency_n)
+            for cls, tier, tpl, attempts, hits, latency_sum, latency_n in rows
+        }
+        self._loaded_at = time.time()
+
+    def _stats_locked(self, drug_class: str, tier: str, template: str) -> TemplateStats:
+        """Статистика группы; пока по группе мало попыток — по всем группам."""
+        own = self._rows.get((drug_class, tier, template))
+        if own is not None and own.attempts >= self.min_attempts:
+            return own
+        total = TemplateStats()
+        for (_, t, tpl), stats in self._rows.items():
+            if t == tier and tpl == template:
+                total.add(stats)
+        return total
+
+    def order(self, term: str, tier: str, queries: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Запросы уровня в порядке результативности и отброшенные.
+
+        Returns:
+            (запросы к выполнению, отброшенные запросы)
+        """
+        if not self.enabled or not queries:
+            return list(queries), []
+        drug_class = drug_class_for(term)
+        with self._lock:
+            try:
+                self._refresh_locked()
+            except sqlite3.Error as e:
+                print(f"   ⚠️  Статистика источников: {type(e).__name__}: {e}")
+                return list(queries), []
+            scored = [
+                (self._stats_locked(drug_class, tier, query_template(q, term)), i, q)
+                for i, q in enumerate(queries)
+            ]
+
+        def _rank(item):
+            stats, i, _ = item
+            latency = stats.mean_latency
+            return (-stats.hit_rate, latency if latency is not None else float("inf"), i)
+
+        kept, pruned = [], []
+        for stats, _, query in sorted(scored, key=_rank):
+            dead = (
+                stats.attempts >= self.min_attempts
+                and stats.hits / stats.attempts < self.prune_rate
+            )
+            if dead and self._rng.random() >= self.explore:
+                pruned.append(query)
+            else:
+                kept.append(query)
+        return kept, pruned
+
+    # ── Запись ──
+
+    def record(self, term: str, outcomes: List[QueryOutcome],
+               found: bool, pruned: int = 0) -> None:
+        """
+        Записывает итоги одного поиска по термину.
+
+        outcomes — выполненные запросы (отменённые не учитываются),
+        found — найдено ли значение, pruned — сколько запросов отброшено.
+        """
+        calls = sum(1 for o in outcomes if o.latency_s is not None)
+        with self._lock:
+            self.searches["searches"] += 1
+            self.searches["calls"] += calls
+            self.searches["pruned"] += pruned
+            if found:
+                self.searches["found"] += 1
+                self.searches["calls_to_hit"] += calls
+        if not self.enabled or not outcomes:
+            return
+
+        drug_class = drug_class_for(term)
+        now = time.time()
+        rows = [
+            (
+                drug_class, o.tier, o.template, int(o.hit),
+                o.latency_s or 0.0, int(o.latency_s is not None), now,
+            )
+            for o in outcomes
+        ]
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO source_stats "
+                    "(drug_class, tier, template, attempts, hits, latency_sum, latency_n, updated_at) "
+                    "VALUES (?, ?, ?, 1, ?, ?, ?, ?) "
+                    "ON CONFLICT (drug_class, tier, template) DO UPDATE SET "
+                    "  attempts = attempts + 1,"
+                    "  hits = hits + excluded.hits,"
+                    "  latency_sum = latency_sum + excluded.latency_sum,"
+                    "  latency_n = latency_n + excluded.latency_n,"
+                    "  updated_at = excluded.updated_at",
+                    rows,
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"   ⚠️  Статистика источников: {type(e).__name__}: {e}")
+                return
+            for cls, tier, tpl, hit, latency, latency_n, _ in rows:
+                stats = self._rows.setdefault((cls, tier, tpl), TemplateStats())
+                stats.add(TemplateStats(1, hit, latency, latency_n))
+
+    def reset(self) -> int:
+        """Очищает историю. Возвращает число удалённых строк."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM source_stats")
+            self._conn.commit()
+            self._rows = {}
+            self._loaded_at = 0.0
+            return cur.rowcount
+
+    def snapshot(self) -> Dict:
+        """Сводка: запросов на поиск и результативность шаблонов по группам."""
+        with self._lock:
+            try:
+                self._refresh_locked()
+            except sqlite3.Error:
+                pass
+            searches = dict(self.searches)
+            rows = dict(self._rows)
+
+        classes: Dict[str, list] = {}
+        for (cls, tier, tpl), stats in sorted(rows.items()):
+            latency = stats.mean_latency
+            classes.setdefault(cls, []).append({
+                "tier": tier,
+                "template": tpl,
+                "attempts": stats.attempts,
+                "hits": stats.hits,
+                "hit_rate": round(stats.hits / stats.attempts, 3) if stats.attempts else None,
+                "mean_latency_s": round(latency, 2) if latency is not None else None,
+            })
+        found = searches["found"]
+        return {
+            "enabled": self.enabled,
+            "searches": searches["searches"],
+            "found": found,
+            "calls_per_search": (
+                round(searches["calls"] / searches["searches"], 2) if searches["searches"] else None
+            ),
+            "calls_to_hit": round(searches["calls_to_hit"] / found, 2) if found else None,
+            "pruned": searches["pruned"],
+            "classes": classes,
+        }
+
+
+_source_stats: Optional[SourceStats] = None
+_source_stats_lock = threading.Lock()
+
+
+def get_source_stats() -> SourceStats:
+    """Общий экземпляр (ленивая инициализация из settings, БД — из DATABASE_URL)."""
+    global _source_stats
+    with _source_stats_lock:
+        if _source_stats is None:
+            from app.config.settings import settings
+            from app.services.cache.sqlite_store import sqlite_path_from_url
+            _source_stats = SourceStats(
+                path=sqlite_path_from_url(settings.DATABASE_URL),
+                enabled=settings.SOURCE_STATS_ENABLED,
+                min_attempts=settings.SOURCE_STATS_MIN_ATTEMPTS,
+                prune_rate=settings.SOURCE_STATS_PRUNE_RATE,
+                explore=settings.SOURCE_STATS_EXPLORE,
+            )
+        return _source_stats
@@ -0,0 +1,178 @@
+"""
+services/search/counterparties.py — Справочник частых контрагентов.
+
+Спонсоры, исследовательские центры, лаборатории и страховые компании
+в наших синопсисах повторяются постоянно. Их реквизиты хранятся
+локально (data/counterparties.json, settings.COUNTERPARTIES_PATH):
+
+    {"organizations": [
+        {"name": "ООО «ИФАРМА»", "kinds": ["research_center", "biolab"],
+         "aliases": ["ИФАРМА"], "inn": "", "country": "Россия",
+         "address": "", "postal_code": "", "phone": ""},
+        ...
+    ]}
+
+и используются:
+  - в автодополнении компаний (/api/dictionaries/company) — до DaData;
+  - в search_organization_info — если адрес заполнен, GenSearch не нужен.
+
+Имена сравниваются после normalize_org_name: без кавычек,
+организационно-правовой формы и регистра.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_COUNTERPARTIES_PATH = os.path.join("data", "counterparties.json")
+
+# Организационно-правовые формы (полные — раньше сокращений)
+_LEGAL_FORMS = [
+    "общество с ограниченной ответственностью",
+    "публичное акционерное общество",
+    "непубличное акционерное общество",
+    "закрытое акционерное общество",
+    "открытое акционерное общество",
+    "акционерное общество",
+    "федеральное государственное бюджетное учреждение",
+    "государственное бюджетное учреждение здравоохранения",
+    "ооо", "пао", "нао", "зао", "оао", "ао", "ип", "фгбу", "гбуз",
+    "llc", "ltd", "limited", "gmbh", "inc", "corp", "plc", "s.a.", "ag",
+]
+_LEGAL_FORMS_RE = re.compile(
+    r'(?<![\w])(' + "|".join(re.escape(f) for f in _LEGAL_FORMS) + r')(?![\w])'
+)
+
+
+def normalize_org_name(name: str) -> str:
+    """
+    Ключ организации: 'ООО «Фармстандарт-Лексредства»' → 'фармстандарт-лексредства'.
+    """
+    text = (name or "").lower().replace("ё", "е")
+    text = re.sub(r'[«»"„“”\'®™©]', ' ', text)
+    text = _LEGAL_FORMS_RE.sub(' ', text)
+    text = re.sub(r'[,.;:()]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@dataclass
+class Counterparty:
+    """Организация из локального справочника."""
+    name: str
+    kinds: List[str] = field(default_factory=list)
+    aliases: List[str] = field(default_factory=list)
+    inn: str = ""
+    country: str = "Россия"
+    address: str = ""
+    postal_code: str = ""
+    phone: str = ""
+
+    def to_suggestion(self) -> Dict[str, str]:
+        """Формат подсказки компании (как у DaData)."""
+        return {"name": self.name, "inn": self.inn, "address": self.address, "source": "local"}
+
+    def to_org_info(self, country: str = "") -> Dict[str, Any]:
+        """Формат search_organization_info."""
+        return {
+            "name": self.name,
+            "country": country or self.country,
+            "address": self.address,
+            "postal_code": self.postal_code,
+            "phone": self.phone,
+            "raw_answer": "",
+            "sources": ["local:counterparties"],
+        }
+
+
+class CounterpartyDirectory:
+    """Справочник контрагентов с поиском по нормализованному имени."""
+
+    def __init__(self, organizations: List[Counterparty]):
+        self.organizations = list(organizations)
+        self._by_key: Dict[str, Counterparty] = {}
+        self._by_inn: Dict[str, Counterparty] = {}
+        for org in self.organizations:
+            for name in [org.name] + org.aliases:
+                key = normalize_org_name(name)
+                if key:
+                    self._by_key.setdefault(key, org)
+            if org.inn:
+                self._by_inn.setdefault(org.inn, org)
+
+    def __len__(self) -> int:
+        return len(self.organizations)
+
+    def match(self, name: str) -> Optional[Counterparty]:
+        """Точное совпадение по имени, синониму или ИНН."""
+        name = (name or "").strip()
+        if name.isdigit():
+            return self._by_inn.get(name)
+        return self._by_key.get(normalize_org_name(name))
+
+    def suggest(self, query: str, kind: str = "", limit: int = 10) -> List[Dict[str, str]]:
+        """
+        Подсказки: сначала совпадение с начала имени, затем вхождение.
+        kind ограничивает тип (sponsor, research_center, biolab, insurance,
+        general); организации без kinds подходят к любому.
+        """
+        q = normalize_org_name(query)
+        if not q:
+            return []
+        starts, contains = [], []
+        seen = set()
+        for key, org in self._by_key.items():
+            if id(org) in seen or (kind and org.kinds and kind not in org.kinds):
+                continue
+            if key.startswith(q) or (org.inn and org.inn.startswith(q)):
+                starts.append(org)
+                seen.add(id(org))
+            elif q in key:
+                contains.append(org)
+                seen.add(id(org))
+        return [org.to_suggestion() for org in (starts + contains)[:limit]]
+
+    def organization_info(self, name: str, country: str = "") -> Optional[Dict[str, Any]]:
+        """Реквизиты для синопсиса, если в справочнике заполнен адрес."""
+        org = self.match(name)
+        if org is None or not org.address:
+            return None
+        return org.to_org_info(country)
+
+
+def load_counterparties(path: str = DEFAULT_COUNTERPARTIES_PATH) -> CounterpartyDirectory:
+    """Загружает справочник. Нет файла — пустой справочник."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return CounterpartyDirectory([])
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  ⚠️ Справочник контрагентов не загружен ({path}): {e}")
+        return CounterpartyDirectory([])
+
+    known = set(Counterparty.__dataclass_fields__)
+    organizations = []
+    for raw in data.get("organizations", []) if isinstance(data, dict) else data:
+        if isinstance(raw, dict) and raw.get("name"):
+            organizations.append(Counterparty(**{k: v for k, v in raw.items() if k in known}))
+    return CounterpartyDirectory(organizations)
+
+
+# ── Общий экземпляр ──
+
+_directory: Optional[CounterpartyDirectory] = None
+_directory_lock = threading.Lock()
+
+
+def get_counterparties() -> CounterpartyDirectory:
+    """Общий справочник процесса (ленивая загрузка из settings.COUNTERPARTIES_PATH)."""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            from app.config.settings import settings
+            _directory = load_counterparties(settings.COUNTERPARTIES_PATH)
+        return _directory
@@ -0,0 +1,470 @@
+"""
+services/search/ctgov_index.py — Локальный индекс БЭ-исследований ClinicalTrials.gov.
+
+search_existing_protocols раньше всегда спрашивал GenSearch «найди на
+ClinicalTrials.gov...» и разбирал свободный текст ответа: секунды на запрос,
+а дизайн и выборка терялись, если модель сформулировала их по-своему.
+
+Индекс строится офлайн из выгрузки ClinicalTrials.gov (import_ctgov.py):
+  - JSON API v2 (ctg-studies.json.zip / NCT*.json / страницы {"studies": [...]});
+  - устаревший XML (AllPublicXML.zip / NCT*.xml);
+в индекс попадают только исследования биоэквивалентности, и только нужные
+поля — дизайн, число периодов, выборка, режим приёма (fed / fasting),
+статус. Ключ — нормализованное МНН вмешательства (как у PK-кэша):
+    "Amlodipine Besylate 10 mg Tablet (Test)" → "amlodipine"
+Монопрепарат и комбинации не смешиваются: по "amlodipine" не находится
+FDC амлодипин/валсартан, по "amlodipine + valsartan" — монопрепарат.
+
+Поиск по индексу — один запрос к SQLite (миллисекунды); GenSearch
+вызывается, только если МНН в индексе нет.
+
+Путь к индексу — settings.CTGOV_INDEX_PATH (по умолчанию data/ctgov_be.db).
+Нет файла — поиск просто идёт через GenSearch.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    from app.utils.inn_utils import strip_salt_en
+except ImportError:
+    from inn_utils import strip_salt_en
+
+try:
+    from app.services.pk.extraction import extract
+except ImportError:
+    from extraction import extract
+
+from app.config.settings import settings
+
+
+DEFAULT_INDEX_PATH = settings.CTGOV_INDEX_PATH
+
+_BE_MARKERS = ("bioequivalen", "биоэквивалент")
+
+# Слова из названий вмешательств, не относящиеся к МНН
+_NOISE_WORDS = {
+    "tablet", "tablets", "capsule", "capsules", "film", "coated",
+    "oral", "suspension", "solution", "injection", "injectable", "powder",
+    "extended", "delayed", "immediate", "modified", "prolonged", "release",
+    "er", "xr", "sr", "ir", "mr", "xl", "cr", "dr", "odt", "orally", "disintegrating",
+    "chewable", "dispersible", "effervescent", "granules", "syrup", "cream",
+    "test", "reference", "product", "formulation", "drug", "generic", "brand",
+    "fixed", "dose", "combination", "fdc", "mg", "mcg", "ml", "g", "usp", "of",
+    "the", "a", "an", "single", "multiple", "treatment", "period", "arm",
+    "hcl", "hbr",
+}
+_SKIP_INTERVENTIONS = {"placebo", "water", "food", "standard meal", "high-fat meal", "meal"}
+
+_FED = re.compile(r"\b(fed|food|meals?|high[- ]fat|postprandial)\b")
+_FASTING = re.compile(r"\b(fasting|fasted)\b")
+
+_SPLIT_COMBO = re.compile(r"\s*(?:\+|/|,|;|&|\band\b|\bplus\b|\bwith\b)\s*")
+
+
+def intervention_keys(name: str) -> List[str]:
+    """
+    Ключи МНН из названия вмешательства.
+
+        "Amlodipine Besylate 10 mg Tablet (Test)" → ["amlodipine"]
+        "Amlodipine/Valsartan 5/160 mg"           → ["amlodipine", "valsartan"]
+    """
+    name = re.sub(r"\(.*?\)|\[.*?\]|®|™", " ", (name or "").lower())
+    keys = []
+    for part in _SPLIT_COMBO.split(name):
+        part = re.split(r"\d", part, maxsplit=1)[0]
+        words = [w for w in re.findall(r"[a-z][a-z']*", part) if w not in _NOISE_WORDS]
+        if not words:
+            continue
+        key = strip_salt_en(" ".join(words)).strip()
+        if key and key not in _SKIP_INTERVENTIONS and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def component_count(names: Iterable[str], meshes: Iterable[str]) -> int:
+    """
+    Число действующих веществ исследования. Термины MeSH сводят бренды и
+    соли к веществу ("Norvasc" → Amlodipine), поэтому считаются по ним;
+    без MeSH — по основным названиям вмешательств (без otherNames).
+    """
+    for source in (meshes, names):
+        keys = {key for name in source for key in intervention_keys(name)}
+        if keys:
+            return len(keys)
+    return 0
+
+
+def _intake_mode(text: str) -> Optional[str]:
+    """fed / fasting / both по названию и описанию (по целым словам)."""
+    t = text.lower()
+    fed, fasting = bool(_FED.search(t)), bool(_FASTING.search(t))
+    if fed and fasting:
+        return "both"
+    return "fed" if fed else "fasting" if fasting else None
+
+
+def _design(model: str, text: str) -> Optional[Dict]:
+    """Дизайн: репликативный — по тексту, иначе по модели вмешательства карточки."""
+    from_text = extract(text).design
+    if from_text and from_text["type"].startswith("replicate"):
+        return from_text
+    model = (model or "").upper()
+    if "CROSSOVER" in model:
+        return {"type": "2x2_crossover", "periods": 2}
+    if "PARALLEL" in model:
+        return {"type": "parallel", "periods": 1}
+    return from_text
+
+
+@dataclass
+class CTStudy:
+    """БЭ-исследование в индексе (только предизвлечённые поля)."""
+    nct_id: str
+    title: str
+    status: str
+    design_type: Optional[str]
+    n_periods: Optional[int]
+    enrollment: Optional[int]
+    intake_mode: Optional[str]
+    start_date: str
+    inns: List[str]
+    components: int = 0               # число действующих веществ (моно — 1, FDC из двух — 2)
+
+    def to_protocol(self) -> Dict[str, Any]:
+        """Результат в формате search_existing_protocols."""
+        return {
+            "found": True,
+            "source": "clinicaltrials",
+            "design_type": self.design_type,
+            "n_periods": self.n_periods,
+            "n_subjects": self.enrollment,
+            "cv_intra": None,
+            "intake_mode": self.intake_mode,
+            "nct_id": self.nct_id,
+            "study_title": self.title,
+            "raw_text": (
+                f"{self.nct_id}: {self.title} | {self.status} | "
+                f"{self.design_type or '?'} | n={self.enrollment or '?'} | "
+                f"{self.intake_mode or '?'} [локальный индекс ClinicalTrials.gov]"
+            ),
+        }
+
+
+def _make_study(
+    nct_id: str, titles: List[str], status: str, study_type: str, model: str,
+    enrollment: Any, start_date: str, interventions: Iterable[str],
+    texts: List[str], components: int = 0,
+) -> Optional[CTStudy]:
+    """Общая часть разбора JSON и XML: фильтр БЭ и извлечение полей."""
+    if not nct_id:
+        return None
+    if study_type and "INTERVENTIONAL" not in study_type.upper():
+        return None
+    headline = " ".join(t for t in titles if t)
+    blob = " ".join([headline] + [t for t in texts if t])
+    if not any(m in blob.lower() for m in _BE_MARKERS):
+        return None
+
+    inns: List[str] = []
+    for name in interventions:
+        for key in intervention_keys(name):
+            if key not in inns:
+                inns.append(key)
+    if not inns:
+        return None
+
+    design = _design(model, blob)
+    try:
+        enrollment = int(enrollment) if enrollment not in (None, "") else None
+    except (TypeError, ValueError):
+        enrollment = None
+    return CTStudy(
+        nct_id=nct_id.upper(),
+        title=titles[0] if titles and titles[0] else headline,
+        status=(status or "").strip().lower().replace(" ", "_"),
+        design_type=design["type"] if design else None,
+        n_periods=design["periods"] if design else None,
+        enrollment=enrollment,
+        intake_mode=_intake_mode(headline) or _intake_mode(blob),
+        start_date=start_date or "",
+        inns=inns,
+        components=components or len(inns),
+    )
+
+
+def parse_study_json(record: Dict[str, Any]) -> Optional[CTStudy]:
+    """Запись JSON API v2 (protocolSection / derivedSection)."""
+    proto = record.get("protocolSection") or {}
+    ident = proto.get("identificationModule") or {}
+    status = proto.get("statusModule") or {}
+    design = proto.get("designModule") or {}
+    arms = proto.get("armsInterventionsModule") or {}
+    desc = proto.get("descriptionModule") or {}
+    cond = proto.get("conditionsModule") or {}
+    browse = (record.get("derivedSection") or {}).get("interventionBrowseModule") or {}
+
+    names: List[str] = []
+    interventions: List[str] = []
+    for item in arms.get("interventions") or []:
+        if (item.get("type") or "DRUG").upper() not in ("DRUG", "BIOLOGICAL", "COMBINATION_PRODUCT"):
+            continue
+        names.append(item.get("name") or "")
+        interventions.extend(item.get("otherNames") or [])
+    meshes = [m.get("term", "") for m in browse.get("meshes") or []]
+    interventions = names + interventions + meshes
+
+    design_info = design.get("designInfo") or {}
+    texts = [
+        " ".join(cond.get("keywords") or []),
+        " ".join(cond.get("conditions") or []),
+        design_info.get("interventionModelDescription") or "",
+        desc.get("briefSummary") or "",
+    ] + [g.get("description") or "" for g in arms.get("armGroups") or []]
+
+    return _make_study(
+        nct_id=ident.get("nctId") or "",
+        titles=[ident.get("briefTitle") or "", ident.get("officialTitle") or ""],
+        status=status.get("overallStatus") or "",
+        study_type=design.get("studyType") or "",
+        model=design_info.get("interventionModel") or "",
+        enrollment=(design.get("enrollmentInfo") or {}).get("count"),
+        start_date=(status.get("startDateStruct") or {}).get("date") or "",
+        interventions=interventions,
+        texts=texts,
+        components=component_count(names, meshes),
+    )
+
+
+def parse_study_xml(data: bytes) -> Optional[CTStudy]:
+    """Карточка устаревшего XML-формата (<clinical_study>)."""
+    root = ET.fromstring(data)
+
+    def _text(path: str) -> str:
+        node = root.find(path)
+        return (node.text or "").strip() if node is not None else ""
+
+    names: List[str] = []
+    interventions: List[str] = []
+    for item in root.findall("intervention"):
+        kind = (item.findtext("intervention_type") or "Drug").strip().lower()
+        if kind not in ("drug", "biological", "combination product"):
+            continue
+        names.append(item.findtext("intervention_name") or "")
+        interventions.extend(o.text or "" for o in item.findall("other_name"))
+    meshes = [m.text or "" for m in root.findall("intervention_browse/mesh_term")]
+    interventions = names + interventions + meshes
+
+    texts = [
+        " ".join(k.text or "" for k in root.findall("keyword")),
+        " ".join(c.text or "" for c in root.findall("condition")),
+        _text("study_design_info/intervention_model_description"),
+        _text("brief_summary/textblock"),
+    ] + [g.findtext("description") or "" for g in root.findall("arm_group")]
+
+    return _make_study(
+        nct_id=_text("id_info/nct_id"),
+        titles=[_text("brief_title"), _text("official_title")],
+        status=_text("overall_status"),
+        study_type=_text("study_type"),
+        model=_text("study_design_info/intervention_model"),
+        enrollment=_text("enrollment"),
+        start_date=_text("start_date"),
+        interventions=interventions,
+        texts=texts,
+        components=component_count(names, meshes),
+    )
+
+
+def iter_records(name: str, data: bytes) -> Iterator[Optional[CTStudy]]:
+    """Исследования одного файла выгрузки (None — не БЭ / не разобрано)."""
+    lower = name.lower()
+    if lower.endswith(".xml"):
+        yield parse_study_xml(data)
+        return
+    if not lower.endswith(".json"):
+        return
+    payload = json.loads(data)
+    if isinstance(payload, dict) and "studies" in payload:
+        payload = payload["studies"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    for record in payload or []:
+        if isinstance(record, dict):
+            yield parse_study_json(record)
+
+
+# ════════════════════════════════════════════════════════
+# ИНДЕКС
+# ════════════════════════════════════════════════════════
+
+class CTGovIndex:
+    """
+    SQLite-индекс: studies (поля исследования) + study_inns (МНН → NCT).
+
+    Одно соединение на процесс, операции сериализуются через lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(
+                # WAL: импорт пишет, пока сервер читает тот же файл
+                "PRAGMA journal_mode=WAL;"
+                "CREATE TABLE IF NOT EXISTS studies ("
+                "  nct_id TEXT PRIMARY KEY, title TEXT, status TEXT,"
+                "  design_type TEXT, n_periods INTEGER, enrollment INTEGER,"
+                "  intake_mode TEXT, start_date TEXT, components INTEGER) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS study_inns ("
+                "  inn TEXT NOT NULL, nct_id TEXT NOT NULL,"
+                "  PRIMARY KEY (inn, nct_id)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            )
+            # Индекс, построенный до появления components: число веществ
+            # до переимпорта берётся по study_inns
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(studies)")}
+            if "components" not in columns:
+                self._conn.execute("ALTER TABLE studies ADD COLUMN components INTEGER")
+            self._conn.commit()
+
+    # ── Запись (import_ctgov.py) ──
+
+    def add_many(self, studies: List[CTStudy]) -> None:
+        """Добавляет/обновляет исследования одной транзакцией."""
+        if not studies:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO studies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (s.nct_id, s.title, s.status, s.design_type, s.n_periods,
+                     s.enrollment, s.intake_mode, s.start_date, s.components or len(s.inns))
+                    for s in studies
+                ],
+            )
+            self._conn.executemany(
+                "DELETE FROM study_inns WHERE nct_id = ?", [(s.nct_id,) for s in studies],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO study_inns VALUES (?, ?)",
+                [(inn, s.nct_id) for s in studies for inn in s.inns],
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript("DELETE FROM study_inns; DELETE FROM studies;")
+            self._conn.commit()
+
+    def finish_import(self, source: str) -> None:
+        """Отметка о выгрузке + сжатие файла."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('imported_at', ?)", (str(time.time()),),
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (source,))
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    # ── Чтение ──
+
+    def studies_for(self, inn_key: str) -> List[CTStudy]:
+        """
+        Исследования ровно с этим набором компонентов: для "amlodipine" —
+        только монопрепарат (не "amlodipine + valsartan"), для комбинации —
+        все её компоненты и никаких других. Все компоненты ищутся среди
+        ключей study_inns (с брендами из otherNames), а лишние отсекаются
+        по числу веществ исследования (components).
+        """
+        parts = sorted({p.strip() for p in (inn_key or "").lower().split("+") if p.strip()})
+        if not parts:
+            return []
+        placeholders = ",".join("?" * len(parts))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT s.nct_id, s.title, s.status, s.design_type, s.n_periods,"
+                f"       s.enrollment, s.intake_mode, s.start_date, s.components"
+                f"  FROM studies s JOIN study_inns i ON i.nct_id = s.nct_id"
+                f" WHERE i.inn IN ({placeholders})"
+                f"   AND COALESCE(s.components, (SELECT COUNT(*) FROM study_inns o"
+                f"                               WHERE o.nct_id = s.nct_id)) = ?"
+                f" GROUP BY s.nct_id HAVING COUNT(DISTINCT i.inn) = ?",
+                (*parts, len(parts), len(parts)),
+            ).fetchall()
+        return [CTStudy(*row[:8], inns=parts, components=row[8] or len(parts)) for row in rows]
+
+    def best_for(self, inn_key: str) -> Optional[CTStudy]:
+        """
+        Наиболее показательное исследование: завершённое, с известным
+        дизайном и выборкой, самое свежее.
+        """
+        studies = self.studies_for(inn_key)
+        if not studies:
+            return None
+        return max(studies, key=lambda s: (
+            s.status == "completed",
+            s.design_type is not None,
+            s.enrollment is not None,
+            _sortable_date(s.start_date),
+        ))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            studies = self._conn.execute("SELECT COUNT(*) FROM studies").fetchone()[0]
+            inns = self._conn.execute("SELECT COUNT(DISTINCT inn) FROM study_inns").fetchone()[0]
+            meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        return {"path": self.path, "studies": studies, "inns": inns, **meta}
+
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"), 1)}
+
+
+def _sortable_date(value: str) -> str:
+    """'2019-03' / '2019-03-15' / 'March 2019' / 'March 15, 2019' → '2019-03'."""
+    value = (value or "").strip()
+    if re.match(r"\d{4}", value):
+        return value[:7]
+    m = re.match(r"([A-Za-z]+)\s+(?:\d{1,2},\s*)?(\d{4})", value)
+    if m and m.group(1).lower() in _MONTHS:
+        return f"{m.group(2)}-{_MONTHS[m.group(1).lower()]:02d}"
+    return ""
+
+
+_index: Optional[CTGovIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_ctgov_index() -> Optional[CTGovIndex]:
+    """Общий индекс процесса или None, если он ещё не построен."""
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(DEFAULT_INDEX_PATH):
+            _index = CTGovIndex(DEFAULT_INDEX_PATH)
+        return _index
+
+
+def lookup_protocol(inn_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Протокол БЭ из локального индекса (формат search_existing_protocols)
+    или None. Ошибки индекса не должны ломать поиск.
+    """
+    try:
+        index = get_ctgov_index()
+        study = index.best_for(inn_key) if index is not None and inn_key else None
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Индекс ClinicalTrials.gov: {type(e).__name__}: {e}")
+        return None
+    return study.to_protocol() if study is not None else None
@@ -0,0 +1,655 @@
+"""
+services/search/gensearch_client.py — Общий клиент Yandex GenSearch.
+
+Все обращения к GenSearch (CVintra, протоколы БЭ, организации,
+референтные препараты) идут через один клиент процесса:
+
+  - token bucket под RPS-квоту аккаунта (GENSEARCH_RPS / GENSEARCH_BURST),
+    общий для всех потоков и event loop'ов процесса;
+  - приоритетные очереди: "interactive" (подсказки, справочники в UI)
+    получают токен раньше "background" (поиски пайплайна);
+  - повтор при 429 / 5xx с экспоненциальной паузой и jitter;
+  - предохранитель "gensearch": при серии тайм-аутов / 5xx вызовы сразу
+    возвращают None, не дожидаясь тайм-аута (services/circuit_breaker);
+  - keep-alive соединения общего HTTP-клиента (services/http_client.py);
+  - дублирующие запросы (hedging, GENSEARCH_HEDGE=1): если ответа нет
+    дольше GENSEARCH_HEDGE_PERCENTILE-го перцентиля наблюдаемых задержек,
+    отправляется копия запроса, берётся первый ответ, второй отменяется.
+    Доля дублей ограничена GENSEARCH_HEDGE_MAX_RATE от всех вызовов,
+    дубль расходует токен общего bucket — квота не превышается.
+
+Синхронный API — search(); асинхронный — search_async() (для FastAPI).
+
+Использование:
+    from app.services.search.gensearch_client import get_gensearch_client, answer_text
+
+    data = get_gensearch_client().search(query, search_type="SEARCH_TYPE_RU")
+    text = answer_text(data)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from app.services.circuit_breaker import get_breaker, GENSEARCH
+except ImportError:
+    from circuit_breaker import get_breaker, GENSEARCH
+
+try:
+    from app.services.http_client import get_http_client, HttpError, HttpTimeout, HttpResponse
+except ImportError:
+    from http_client import get_http_client, HttpError, HttpTimeout, HttpResponse
+
+
+YANDEX_GEN_SEARCH_URL = "https://searchapi.api.cloud.yandex.net/v2/gen/search"
+
+LANE_INTERACTIVE = "interactive"
+LANE_BACKGROUND = "background"
+
+# HTTP-статусы, при которых имеет смысл повторить запрос
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket с двумя приоритетами.
+
+    Пока есть ожидающие запросы interactive — background токен не получает.
+    Работает и из потоков (acquire), и из корутин (acquire_async) —
+    состояние общее, поэтому лимит соблюдается для всего процесса.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.01)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Condition()
+        self._waiting = {LANE_INTERACTIVE: 0, LANE_BACKGROUND: 0}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, lane: str) -> float:
+        """Берёт токен (→ 0.0) или возвращает рекомендуемую паузу в секундах."""
+        self._refill()
+        if lane != LANE_INTERACTIVE and self._waiting[LANE_INTERACTIVE] > 0:
+            return 1.0 / self.rate
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def acquire(self, lane: str = LANE_BACKGROUND) -> float:
+        """Блокирующее получение токена. Возвращает время ожидания."""
+        started = time.monotonic()
+        with self._lock:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    wait = self._try_take(lane)
+                    if wait <= 0:
+                        break
+                    self._lock.wait(timeout=wait)
+            finally:
+                self._waiting[lane] -= 1
+                self._lock.notify_all()
+        return time.monotonic() - started
+
+    def try_acquire(self, lane: str = LANE_BACKGROUND) -> bool:
+        """Токен без ожидания: False, если сейчас его нет."""
+        with self._lock:
+            return self._try_take(lane) <= 0
+
+    async def acquire_async(self, lane: str = LANE_INTERACTIVE) -> float:
+        """Неблокирующее для event loop получение токена."""
+        started = time.monotonic()
+        with self._lock:
+            self._waiting[lane] += 1
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(lane)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            with self._lock:
+                self._waiting[lane] -= 1
+                self._lock.notify_all()
+        return time.monotonic() - started
+
+
+def _percentile(values, p: float) -> Optional[float]:
+    """Перцентиль по рангу (p — 0..100); None для пустой выборки."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class HedgePolicy:
+    """
+    Когда отправлять дублирующий запрос и метрики задержек.
+
+    Задержка дубля — percentile-й перцентиль задержек последних завершившихся
+    HTTP-запросов (не меньше min_delay_s); пока выборка меньше min_samples —
+    дублей нет. Доля дублей не превышает max_rate от числа вызовов.
+
+    Прерванные попытки (тайм-аут, отмена проигравшего) в эту выборку не
+    попадают: их задержка неизвестна, известно лишь, что она больше прошедшего
+    времени, а у дубля и тайм-аут свой (timeout - delay). Они хранятся
+    отдельно и учитываются только в оценке задержки без дублей.
+
+    Метрики: задержка вызова, которую видит вызывающий (p50/p95/p99), и оценка
+    той же задержки без дублей (p99_unhedged_s). Если основной запрос отменён
+    после победы дубля, берётся медиана по запросам, которые шли дольше него:
+    завершившимся — с их задержкой, оборвавшимся по тайм-ауту — с тайм-аутом
+    вызова; если таких нет — тайм-аут.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 95,
+                 max_rate: float = 0.05, min_delay_s: float = 1.0,
+                 window: int = 500, min_samples: int = 20):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=window)    # завершившиеся HTTP-запросы
+        self._censored: deque = deque(maxlen=window)   # прерванные: (прошло, тайм-аут?)
+        self._observed: deque = deque(maxlen=window)   # вызовы с учётом дубля
+        self._unhedged: deque = deque(maxlen=window)   # те же вызовы без дубля (оценка)
+        self.stats = {
+            "calls": 0, "hedged": 0, "hedge_wins": 0, "capped": 0, "no_token": 0,
+            "timeouts": 0, "cancelled": 0,
+        }
+
+    def delay(self) -> Optional[float]:
+        """Через сколько секунд отправлять дубль (None — не отправлять)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            return max(self.min_delay_s, _percentile(self._samples, self.percentile))
+
+    def allow(self) -> bool:
+        """Можно ли отправить ещё один дубль, не превысив max_rate."""
+        with self._lock:
+            if self.stats["hedged"] + 1 > self.max_rate * (self.stats["calls"] + 1):
+                self.stats["capped"] += 1
+                return False
+            return True
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def record_sample(self, latency_s: float) -> None:
+        """Задержка завершившегося (не отменённого) HTTP-запроса."""
+        with self._lock:
+            self._samples.append(latency_s)
+
+    def record_censored(self, elapsed_s: float, timed_out: bool) -> None:
+        """Прерванный HTTP-запрос: тайм-аут или отменённый проигравший."""
+        with self._lock:
+            self._censored.append((elapsed_s, timed_out))
+            self.stats["timeouts" if timed_out else "cancelled"] += 1
+
+    def record_call(self, observed_s: float, hedge_won: bool = False,
+                    timeout: Optional[float] = None) -> None:
+        """Итог вызова. hedge_won — основной запрос отменён, его задержка оценивается."""
+        with self._lock:
+            self.stats["calls"] += 1
+            unhedged_s = observed_s
+            if hedge_won:
+                self.stats["hedge_wins"] += 1
+                slower = [x for x in self._samples if x > observed_s]
+                if timeout is not None:
+                    slower += [
+                        timeout for elapsed, timed_out in self._censored
+                        if timed_out and elapsed > observed_s
+                    ]
+                if slower:
+                    unhedged_s = _percentile(slower, 50)
+                elif timeout is not None:
+                    unhedged_s = timeout
+            self._observed.append(observed_s)
+            self._unhedged.append(unhedged_s)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            observed, unhedged = list(self._observed), list(self._unhedged)
+        p99 = _percentile(observed, 99)
+        p99_unhedged = _percentile(unhedged, 99)
+
+        def _round(v):
+            return round(v, 2) if v is not None else None
+
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "delay_s": _round(self.delay()),
+            **stats,
+            "hedge_rate": round(stats["hedged"] / stats["calls"], 3) if stats["calls"] else 0.0,
+            "p50_s": _round(_percentile(observed, 50)),
+            "p95_s": _round(_percentile(observed, 95)),
+            "p99_s": _round(p99),
+            "p99_unhedged_s": _round(p99_unhedged),
+            "p99_saved_s": _round(p99_unhedged - p99) if p99 is not None else None,
+        }
+
+
+class GenSearchClient:
+    """Клиент Yandex GenSearch с общим лимитом запросов процесса."""
+
+    def __init__(
+        self,
+        rps: float,
+        burst: int,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        hedge: Optional[HedgePolicy] = None,
+    ):
+        self.bucket = TokenBucket(rps, burst)
+        self.hedge = hedge or HedgePolicy(enabled=False)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.http = get_http_client()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "retries": 0, "rate_limited": 0, "errors": 0,
+            "short_circuited": 0, "hedged": 0, "wait_s": 0.0,
+        }
+        self.breaker = get_breaker(GENSEARCH)
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная пауза с полным jitter."""
+        return random.uniform(0.5, 1.0) * self.backoff_base * (2 ** (attempt - 1))
+
+    @staticmethod
+    def build_body(
+        query: str, folder_id: str,
+        search_type: Optional[str] = None, fix_misspell: bool = False,
+    ) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "messages": [{"content": query, "role": "ROLE_USER"}],
+            "folderId": folder_id,
+        }
+        if search_type:
+            body["searchType"] = search_type
+        if fix_misspell:
+            body["fixMisspell"] = True
+        return body
+
+    # ── Синхронный API ──
+
+    def search(
+        self,
+        query: str,
+        folder_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        search_type: Optional[str] = None,
+        fix_misspell: bool = False,
+        timeout: float = 25,
+        lane: str = LANE_BACKGROUND,
+        timeout_retries: int = 0,
+        label: str = "GenSearch",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Запрос к GenSearch. Возвращает JSON-ответ (dict) или None при ошибке.
+
+        timeout_retries — сколько раз повторять при тайм-ауте (по умолчанию
+        не повторяем: тайм-аут обычно означает перегрузку upstream).
+        """
+        return self._request(
+            query, folder_id, api_key, search_type, fix_misspell,
+            timeout, lane, timeout_retries, label, prepaid=False,
+        )
+
+    def _prepare(
+        self, query: str, folder_id: Optional[str], api_key: Optional[str],
+        search_type: Optional[str], fix_misspell: bool,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+        """(body, headers) запроса или None, если нет ключей."""
+        folder_id = folder_id or os.getenv("YANDEX_FOLDER_ID", "")
+        api_key = api_key or os.getenv("YANDEX_API_KEY", "")
+        if not folder_id or not api_key:
+            return None
+
+        body = self.build_body(query, folder_id, search_type, fix_misspell)
+        headers = {
+            "Authorization": f"Api-Key {api_key}",
+            "Content-Type": "application/json",
+        }
+        return body, headers
+
+    def _on_timeout(self, label: str, timeout: float, retry: bool) -> None:
+        self.breaker.record_failure()
+        if retry:
+            self._count("retries")
+            print(f"  ⚠️ {label}: тайм-аут, повтор...")
+        else:
+            print(f"  ⚠️ {label}: тайм-аут ({timeout}с)")
+            self._count("errors")
+
+    def _on_error(self, label: str, e: HttpError) -> None:
+        self.breaker.record_failure()
+        print(f"  ⚠️ {label}: {e}")
+        self._count("errors")
+
+    def _on_response(
+        self, resp: HttpResponse, attempt: int, label: str,
+    ) -> Tuple[Optional[float], Optional[Dict[str, Any]]]:
+        """
+        Разбор ответа: (пауза перед повтором, None) — повторить;
+        (None, данные или None) — попытки закончены.
+        """
+        # 5xx — сбой upstream; 429 и прочие 4xx — upstream жив
+        if resp.status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        if resp.status == 200:
+            try:
+                return None, _unwrap(resp.json())
+            except ValueError:
+                print(f"  ⚠️ {label}: невалидный JSON")
+                self._count("errors")
+                return None, None
+
+        if resp.status in _RETRY_STATUSES and attempt <= self.max_retries:
+            if resp.status == 429:
+                self._count("rate_limited")
+            pause = self._backoff(attempt)
+            self._count("retries")
+            print(f"  ⚠️ {label}: HTTP {resp.status}, пауза {pause:.1f}с ({attempt}/{self.max_retries})")
+            return pause, None
+
+        print(f"  ⚠️ {label}: HTTP {resp.status}: {resp.text[:200]}")
+        self._count("errors")
+        return None, None
+
+    def _request(
+        self, query: str, folder_id: Optional[str], api_key: Optional[str],
+        search_type: Optional[str], fix_misspell: bool, timeout: float,
+        lane: str, timeout_retries: int, label: str, prepaid: bool,
+    ) -> Optional[Dict[str, Any]]:
+        """Цикл запрос/повтор. prepaid=True — токен на первую попытку уже взят."""
+        prepared = self._prepare(query, folder_id, api_key, search_type, fix_misspell)
+        if prepared is None:
+            return None
+        body, headers = prepared
+
+        timeouts_left = timeout_retries
+        for attempt in range(1, self.max_retries + 2):
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                return None
+            if not (prepaid and attempt == 1):
+                self._count("wait_s", self.bucket.acquire(lane))
+            self._count("requests")
+            try:
+                resp = self.http.run_sync(
+                    self._post(body, headers, timeout, lane),
+                    timeout=self.http.sync_timeout_for("gensearch", timeout),
+                )
+            except HttpTimeout:
+                self._on_timeout(label, timeout, retry=timeouts_left > 0)
+                if timeouts_left > 0:
+                    timeouts_left -= 1
+                    continue
+                return None
+            except HttpError as e:
+                self._on_error(label, e)
+                return None
+
+            pause, data = self._on_response(resp, attempt, label)
+            if pause is None:
+                return data
+            time.sleep(pause)
+
+        return None
+
+    async def _request_async(
+        self, query: str, folder_id: Optional[str], api_key: Optional[str],
+        search_type: Optional[str], fix_misspell: bool, timeout: float,
+        lane: str, timeout_retries: int, label: str, prepaid: bool,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        То же, что _request, без потоков: токен и паузы ждём асинхронно,
+        попытка выполняется в loop HTTP-клиента. Отмена вызывающего
+        отменяет и HTTP-запрос (вместе с дублем).
+        """
+        prepared = self._prepare(query, folder_id, api_key, search_type, fix_misspell)
+        if prepared is None:
+            return None
+        body, headers = prepared
+
+        timeouts_left = timeout_retries
+        for attempt in range(1, self.max_retries + 2):
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                return None
+            if not (prepaid and attempt == 1):
+                self._count("wait_s", await self.bucket.acquire_async(lane))
+            self._count("requests")
+            try:
+                resp = await self.http.run(
+                    self._post(body, headers, timeout, lane),
+                    timeout=self.http.sync_timeout_for("gensearch", timeout),
+                )
+            except HttpTimeout:
+                self._on_timeout(label, timeout, retry=timeouts_left > 0)
+                if timeouts_left > 0:
+                    timeouts_left -= 1
+                    continue
+                return None
+            except HttpError as e:
+                self._on_error(label, e)
+                return None
+
+            pause, data = self._on_response(resp, attempt, label)
+            if pause is None:
+                return data
+            await asyncio.sleep(pause)
+
+        return None
+
+    async def _post(self, body: Dict[str, Any], headers: Dict[str, str],
+                    timeout: float, lane: str) -> HttpResponse:
+        """
+        Одна попытка запроса (в loop HTTP-клиента), при необходимости с дублем.
+
+        Дубль отправляется, если основной запрос не ответил за hedge.delay(),
+        доля дублей не исчерпана и в bucket есть свободный токен. Побеждает
+        первый ответ без сетевой ошибки, второй запрос отменяется.
+        """
+        started = time.monotonic()
+
+        async def _send(limit: float) -> HttpResponse:
+            sent = time.monotonic()
+            try:
+                resp = await self.http.post(
+                    YANDEX_GEN_SEARCH_URL, json=body, headers=headers,
+                    service="gensearch", timeout=limit,
+                )
+            except HttpTimeout:
+                self.hedge.record_censored(time.monotonic() - sent, timed_out=True)
+                raise
+            except asyncio.CancelledError:
+                self.hedge.record_censored(time.monotonic() - sent, timed_out=False)
+                raise
+            self.hedge.record_sample(time.monotonic() - sent)
+            return resp
+
+        primary = asyncio.ensure_future(_send(timeout))
+        hedge = None
+        try:
+            delay = self.hedge.delay()
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and self.hedge.allow():
+                    if self.bucket.try_acquire(lane):
+                        self.hedge.count("hedged")
+                        self._count("requests")
+                        self._count("hedged")
+                        hedge = asyncio.ensure_future(_send(timeout - delay))
+                    else:
+                        self.hedge.count("no_token")
+
+            if hedge is None:
+                try:
+                    return await primary
+                finally:
+                    self.hedge.record_call(time.monotonic() - started)
+
+            winner, pending = None, {primary, hedge}
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next(
+                    (t for t in (primary, hedge) if t in done and t.exception() is None),
+                    None,
+                )
+            self.hedge.record_call(
+                time.monotonic() - started, hedge_won=winner is hedge, timeout=timeout,
+            )
+            if winner is None:
+                raise primary.exception()  # обе попытки неудачны — ошибка основной
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # ошибка проигравшего обработана
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Счётчики клиента и метрики дублирующих запросов."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["wait_s"] = round(stats["wait_s"], 2)
+        return {**stats, "hedge": self.hedge.snapshot()}
+
+    # ── Асинхронный API ──
+
+    async def search_async(
+        self,
+        query: str,
+        folder_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        search_type: Optional[str] = None,
+        fix_misspell: bool = False,
+        timeout: float = 15,
+        lane: str = LANE_INTERACTIVE,
+        label: str = "GenSearch",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        То же, что search(), но не блокирует event loop.
+
+        Токен ждём асинхронно (interactive-запросы проходят вне очереди
+        background), HTTP-вызов — в loop HTTP-клиента, без потоков:
+        отмена корутины отменяет ожидание токена, паузу или сам запрос.
+        Разомкнутый предохранитель — сразу None, без ожидания токена.
+        """
+        if self.breaker.is_open():
+            self._count("short_circuited")
+            return None
+        self._count("wait_s", await self.bucket.acquire_async(lane))
+        return await self._request_async(
+            query, folder_id, api_key, search_type,
+            fix_misspell, timeout, lane, 0, label, True,
+        )
+
+
+# ════════════════════════════════════════════════════════
+# РАЗБОР ОТВЕТА
+# ════════════════════════════════════════════════════════
+
+def _unwrap(data: Any) -> Dict[str, Any]:
+    """GenSearch может вернуть массив — берём первый элемент."""
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    return data if isinstance(data, dict) else {}
+
+
+def answer_text(data: Optional[Dict[str, Any]]) -> str:
+    """Текст ответа: message.content (строка или список частей)."""
+    if not data:
+        return ""
+    message = data.get("message", {})
+    if isinstance(message, list):
+        message = message[0] if message else {}
+    if not isinstance(message, dict):
+        return ""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, dict):
+                parts.append(str(item.get("content", item.get("text", ""))))
+            elif isinstance(item, str):
+                parts.append(item)
+        content = " ".join(parts)
+    return content if isinstance(content, str) else ""
+
+
+def answer_sources(data: Optional[Dict[str, Any]], used_only: bool = False) -> List[Dict[str, str]]:
+    """Источники ответа: [{"url": ..., "title": ...}]."""
+    if not data:
+        return []
+    result = []
+    for src in data.get("sources", []) or []:
+        if not isinstance(src, dict):
+            continue
+        if used_only and not src.get("used"):
+            continue
+        if src.get("url"):
+            result.append({"url": src.get("url", ""), "title": src.get("title", "")})
+    return result
+
+
+# ════════════════════════════════════════════════════════
+# ОБЩИЙ ЭКЗЕМПЛЯР
+# ════════════════════════════════════════════════════════
+
+_client: Optional[GenSearchClient] = None
+_client_lock = threading.Lock()
+
+
+def get_gensearch_client() -> GenSearchClient:
+    """Общий клиент процесса (ленивая инициализация из settings)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from app.config.settings import settings
+            _client = GenSearchClient(
+                rps=settings.GENSEARCH_RPS,
+                burst=settings.GENSEARCH_BURST,
+                max_retries=settings.GENSEARCH_MAX_RETRIES,
+                hedge=HedgePolicy(
+                    enabled=settings.GENSEARCH_HEDGE,
+                    percentile=settings.GENSEARCH_HEDGE_PERCENTILE,
+                    max_rate=settings.GENSEARCH_HEDGE_MAX_RATE,
+                    min_delay_s=settings.GENSEARCH_HEDGE_MIN_DELAY_S,
+                ),
+            )
+        return _client
@@ -0,0 +1,641 @@
+"""
+services/search/grls_registry.py — Локальная копия ГРЛС с нечётким поиском.
+
+Торговые названия по МНН (/api/dictionaries/reference), держатели РУ
+(/api/dictionaries/manufacturers) и референтный препарат в пайплайне
+раньше брались из GenSearch, Yandex Suggest и страниц grls.rosminzdrav.ru —
+секунды на запрос и зависимость от квоты.
+
+Реестр импортируется из выгрузки ГРЛС (import_grls.py: .xlsx / .xls /
+.csv или zip с ними) в SQLite:
+  - products — регистрационные удостоверения (номер, торговое название,
+    МНН, держатель, страна, формы выпуска, дата регистрации, статус);
+  - names + grams — триграммный индекс (как pg_trgm) по торговым
+    названиям, МНН и держателям: неполный ввод и опечатки
+    ("норва", "амлодипен") находятся за миллисекунды.
+
+Выгрузка — полный снимок реестра. Повторный импорт нового файла
+записывает только изменившиеся РУ, удаляет исчезнувшие и строит
+триграммы лишь для новых названий.
+
+Путь — settings.GRLS_REGISTRY_PATH (по умолчанию data/grls.db).
+Нет файла — справочники и пайплайн идут в сеть, как раньше.
+"""
+
+import csv
+import io
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from dataclasses import astuple, dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    from app.services.search.counterparties import normalize_org_name
+except ImportError:
+    from counterparties import normalize_org_name
+
+try:
+    from app.utils.inn_dictionary import get_inn_dictionary
+except ImportError:
+    get_inn_dictionary = None
+
+# Чтение выгрузки Excel — только в import_grls.py
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import xlrd
+except ImportError:
+    xlrd = None
+
+from app.config.settings import settings
+
+
+DEFAULT_REGISTRY_PATH = settings.GRLS_REGISTRY_PATH
+
+REGISTRY_EXTENSIONS = (".zip", ".xlsx", ".xls", ".csv")
+
+KINDS = ("trade", "inn", "holder")
+
+# Минимальная доля триграмм запроса, найденных в названии
+_MIN_COVERAGE = 0.5
+# Нечёткое совпадение, которому верим без подтверждения (торговое название, МНН)
+_MATCH_SCORE = 0.7
+# Кандидатов из индекса на пересчёт сходства
+_CANDIDATES = 200
+
+# Колонки выгрузки: поле → начало заголовка.
+# Порядок важен: «Страна держателя…» проверяется раньше «…держателя».
+_COLUMNS = (
+    ("reg_number", ("регистрационный номер", "номер ру", "reg_number")),
+    ("reg_date", ("дата регистрации", "reg_date")),
+    ("cancel_date", ("дата аннулирования", "дата исключения", "cancel_date")),
+    ("country", ("страна", "country")),
+    ("holder", ("наименование держателя", "держатель", "владелец", "holder")),
+    ("trade_name", ("торговое наименование", "trade_name")),
+    ("inn", ("международное непатентованное", "мнн", "inn")),
+    ("forms", ("формы выпуска", "лекарственная форма", "forms")),
+    ("atc", ("атх", "atc")),
+)
+
+# Заголовок в выгрузке ГРЛС — под несколькими строками шапки
+_HEADER_SEARCH_ROWS = 50
+
+
+def normalize_text(text: str) -> str:
+    """'Норваск®' → 'норваск'; 'Амлодипин+Валсартан' → 'амлодипин + валсартан'."""
+    text = (text or "").lower().replace("ё", "е")
+    text = re.sub(r'[«»"„“”\'®™©*]', ' ', text)
+    text = re.sub(r'\s*\+\s*', ' + ', text)
+    return re.sub(r'\s+', ' ', text).strip(" ,.;")
+
+
+def _normalize(kind: str, text: str) -> str:
+    return normalize_org_name(text) if kind == "holder" else normalize_text(text)
+
+
+def trigrams(norm: str, prefix: bool = False) -> Set[str]:
+    """
+    Триграммы слов как в pg_trgm: "  слово " → {"  с", " сл", "сло", ...}.
+    prefix=True — последнее слово ещё набирается, хвостовой пробел не ставится.
+    """
+    words = re.findall(r"\w+", norm)
+    grams: Set[str] = set()
+    for i, word in enumerate(words):
+        padded = f"  {word}" if prefix and i == len(words) - 1 else f"  {word} "
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(query_grams: Set[str], norm: str) -> float:
+    """Доля триграмм запроса в названии, с поправкой на лишнюю длину названия."""
+    if not query_grams:
+        return 0.0
+    grams = trigrams(norm)
+    shared = len(query_grams & grams)
+    coverage = shared / len(query_grams)
+    jaccard = shared / len(query_grams | grams)
+    return coverage if coverage < _MIN_COVERAGE else 0.8 * coverage + 0.2 * jaccard
+
+
+@dataclass
+class GRLSProduct:
+    """Регистрационное удостоверение из ГРЛС."""
+    reg_number: str                   # "П N011451/01" / "ЛП-004357"
+    trade_name: str                   # "Норваск®"
+    inn: str = ""                     # "Амлодипин"
+    holder: str = ""                  # "Виатрис Спешиалти ЛЛК"
+    country: str = ""                 # "США"
+    forms: str = ""                   # "таблетки, 5 мг, 10 мг, ..."
+    reg_date: str = ""                # ISO: "2008-04-21"
+    atc: str = ""                     # "C08CA01"
+    status: str = "active"            # active / cancelled
+
+    @property
+    def active(self) -> bool:
+        return self.status == "active"
+
+    @property
+    def manufacturer(self) -> str:
+        """Держатель РУ в формате DrugInfo.manufacturer: 'Название, Страна'."""
+        return ", ".join(x for x in (self.holder, self.country) if x)
+
+    def to_reference(self) -> Dict[str, str]:
+        """Формат подсказки /api/dictionaries/reference."""
+        return {
+            "name": self.trade_name, "inn": self.inn, "mfg": self.holder,
+            "country": self.country, "reg_number": self.reg_number, "source": "grls",
+        }
+
+
+_PRODUCT_COLUMNS = "reg_number, trade_name, inn, holder, country, forms, reg_date, atc, status"
+
+
+# ════════════════════════════════════════════════════════
+# РАЗБОР ВЫГРУЗКИ
+# ════════════════════════════════════════════════════════
+
+def _header_map(row: Sequence[Any]) -> Dict[str, int]:
+    mapping: Dict[str, int] = {}
+    for idx, cell in enumerate(row):
+        header = re.sub(r"\s+", " ", str(cell or "")).strip().lower()
+        for name, aliases in _COLUMNS:
+            if name not in mapping and header.startswith(aliases):
+                mapping[name] = idx
+                break
+    return mapping
+
+
+def _iso_date(value: Any) -> str:
+    """datetime / '21.04.2008' / '2008-04-21' → '2008-04-21'."""
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    text = str(value or "").strip()
+    m = re.match(r"(\d{1,2})\.(\d{1,2})\.(\d{4})", text)
+    if m:
+        return f"{m.group(3)}-{int(m.group(2)):02d}-{int(m.group(1)):02d}"
+    m = re.match(r"\d{4}-\d{2}-\d{2}", text)
+    return m.group(0) if m else ""
+
+
+def parse_rows(rows: Iterable[Sequence[Any]], sheet: str = "") -> Iterator[GRLSProduct]:
+    """
+    РУ из строк таблицы выгрузки. Заголовок ищется среди первых строк;
+    лист «Исключённые» (или заполненная дата аннулирования) — статус cancelled.
+    """
+    cancelled_sheet = bool(re.search(r"исключ|аннулир|cancel", sheet.lower()))
+    mapping: Optional[Dict[str, int]] = None
+    for i, row in enumerate(rows):
+        if mapping is None:
+            found = _header_map(row)
+            if {"reg_number", "trade_name"} <= found.keys():
+                mapping = found
+            elif i >= _HEADER_SEARCH_ROWS:
+                return
+            continue
+
+        def _cell(name: str) -> Any:
+            idx = mapping.get(name)
+            return row[idx] if idx is not None and idx < len(row) else None
+
+        def _text(name: str) -> str:
+            value = _cell(name)
+            return re.sub(r"\s+", " ", str(value)).strip() if value is not None else ""
+
+        reg_number, trade_name = _text("reg_number"), _text("trade_name")
+        if not reg_number or not trade_name:
+            continue
+        inn = _text("inn")
+        yield GRLSProduct(
+            reg_number=reg_number,
+            trade_name=trade_name,
+            inn="" if inn in ("~", "-", "—") else inn,
+            holder=_text("holder"),
+            country=_text("country"),
+            forms=_text("forms"),
+            reg_date=_iso_date(_cell("reg_date")),
+            atc=_text("atc"),
+            status="cancelled" if cancelled_sheet or _iso_date(_cell("cancel_date")) else "active",
+        )
+
+
+def _csv_rows(data: bytes) -> Iterator[List[str]]:
+    for encoding in ("utf-8-sig", "cp1251"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    try:
+        dialect = csv.Sniffer().sniff(text[:8192], delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(io.StringIO(text), dialect)
+
+
+def _xls_rows(sheet) -> Iterator[List[Any]]:
+    for r in range(sheet.nrows):
+        row = []
+        for cell in sheet.row(r):
+            if cell.ctype == xlrd.XL_CELL_DATE:
+                row.append(xlrd.xldate_as_datetime(cell.value, sheet.book.datemode))
+            else:
+                row.append(cell.value)
+        yield row
+
+
+def iter_sheets(name: str, data: bytes) -> Iterator[Tuple[str, Iterable[Sequence[Any]]]]:
+    """(имя листа, строки) из .csv / .xlsx / .xls или zip с ними."""
+    lower = name.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(REGISTRY_EXTENSIONS[1:]):
+                    yield from iter_sheets(info.filename, archive.read(info))
+    elif lower.endswith(".csv"):
+        yield os.path.basename(name), _csv_rows(data)
+    elif lower.endswith(".xlsx"):
+        if openpyxl is None:
+            raise ImportError("для .xlsx нужен openpyxl (pip install openpyxl)")
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    elif lower.endswith(".xls"):
+        if xlrd is None:
+            raise ImportError("для .xls нужен xlrd (pip install xlrd)")
+        workbook = xlrd.open_workbook(file_contents=data)
+        for sheet in workbook.sheets():
+            yield sheet.name, _xls_rows(sheet)
+
+
+def iter_products(path: str) -> Iterator[GRLSProduct]:
+    """Все РУ из файла выгрузки."""
+    with open(path, "rb") as f:
+        data = f.read()
+    for sheet, rows in iter_sheets(path, data):
+        yield from parse_rows(rows, sheet)
+
+
+# ════════════════════════════════════════════════════════
+# ИНДЕКС
+# ════════════════════════════════════════════════════════
+
+# kind → (нормализованная колонка products, отображаемая колонка)
+_NAME_COLUMNS = {
+    "trade": ("trade_norm", "trade_name"),
+    "inn": ("inn_norm", "inn"),
+    "holder": ("holder_norm", "holder"),
+}
+
+
+class GRLSRegistry:
+    """
+    SQLite: products (РУ) + names / grams (триграммы названий) + files
+    (импортированные выгрузки).
+
+    Одно соединение на процесс, операции сериализуются через lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(
+                # WAL: импорт пишет, пока сервер читает тот же файл
+                "PRAGMA journal_mode=WAL;"
+                "CREATE TABLE IF NOT EXISTS products ("
+                "  reg_number TEXT PRIMARY KEY, trade_name TEXT, inn TEXT, holder TEXT,"
+                "  country TEXT, forms TEXT, reg_date TEXT, atc TEXT, status TEXT,"
+                "  trade_norm TEXT, inn_norm TEXT, holder_norm TEXT) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS products_trade ON products (trade_norm);"
+                "CREATE INDEX IF NOT EXISTS products_inn ON products (inn_norm);"
+                "CREATE INDEX IF NOT EXISTS products_holder ON products (holder_norm);"
+                "CREATE TABLE IF NOT EXISTS names ("
+                "  id INTEGER PRIMARY KEY, kind TEXT NOT NULL, norm TEXT NOT NULL,"
+                "  display TEXT, UNIQUE (kind, norm));"
+                "CREATE TABLE IF NOT EXISTS grams ("
+                "  kind TEXT NOT NULL, gram TEXT NOT NULL, name_id INTEGER NOT NULL,"
+                "  PRIMARY KEY (kind, gram, name_id)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS files ("
+                "  name TEXT PRIMARY KEY, size INTEGER, mtime REAL,"
+                "  imported_at REAL, products INTEGER);"
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            )
+            self._conn.commit()
+
+    # ── Запись (import_grls.py) ──
+
+    def apply_snapshot(self, products: Iterable[GRLSProduct], prune: bool = True) -> Dict[str, int]:
+        """
+        Применяет выгрузку: новые и изменившиеся РУ записываются, РУ,
+        которых нет в выгрузке, удаляются (prune=False — не удаляются).
+        {"added", "updated", "removed", "unchanged"}
+        """
+        incoming: Dict[str, GRLSProduct] = {}
+        for product in products:
+            previous = incoming.get(product.reg_number)
+            # Номер и среди действующих, и среди исключённых — действующее важнее
+            if previous is None or previous.active <= product.active:
+                incoming[product.reg_number] = product
+
+        with self._lock:
+            existing = {
+                row[0]: row
+                for row in self._conn.execute(f"SELECT {_PRODUCT_COLUMNS} FROM products")
+            }
+            changed = [p for key, p in incoming.items() if existing.get(key) != astuple(p)]
+            removed = [key for key in existing if key not in incoming] if prune else []
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (*astuple(p), normalize_text(p.trade_name), normalize_text(p.inn),
+                     normalize_org_name(p.holder))
+                    for p in changed
+                ],
+            )
+            self._conn.executemany(
+                "DELETE FROM products WHERE reg_number = ?", [(key,) for key in removed],
+            )
+            self._sync_names()
+            self._conn.commit()
+
+        added = sum(1 for p in changed if p.reg_number not in existing)
+        return {
+            "added": added, "updated": len(changed) - added,
+            "removed": len(removed), "unchanged": len(incoming) - len(changed),
+        }
+
+    def _sync_names(self) -> None:
+        """Триграммы: удаляет названия без РУ, добавляет новые (под self._lock)."""
+        for kind, (norm_column, display_column) in _NAME_COLUMNS.items():
+            stale = self._conn.execute(
+                f"SELECT id, norm FROM names WHERE kind = ?"
+                f"   AND norm NOT IN (SELECT {norm_column} FROM products)",
+                (kind,),
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM grams WHERE kind = ? AND gram = ? AND name_id = ?",
+                [(kind, gram, name_id) for name_id, norm in stale for gram in trigrams(norm)],
+            )
+            self._conn.executemany("DELETE FROM names WHERE id = ?", [(name_id,) for name_id, _ in stale])
+
+            # MAX: "Норваск" раньше "НОРВАСК" (строчные буквы больше прописных)
+            fresh = self._conn.execute(
+                f"SELECT {norm_column}, MAX({display_column}) FROM products"
+                f" WHERE {norm_column} != ''"
+                f"   AND {norm_column} NOT IN (SELECT norm FROM names WHERE kind = ?)"
+                f" GROUP BY {norm_column}",
+                (kind,),
+            ).fetchall()
+            grams = []
+            for norm, display in fresh:
+                cursor = self._conn.execute(
+                    "INSERT INTO names (kind, norm, display) VALUES (?, ?, ?)", (kind, norm, display),
+                )
+                grams.extend((kind, gram, cursor.lastrowid) for gram in trigrams(norm))
+            self._conn.executemany("INSERT OR IGNORE INTO grams VALUES (?, ?, ?)", grams)
+
+    def is_imported(self, name: str, size: int, mtime: float) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM files WHERE name = ? AND size = ? AND mtime = ?", (name, size, mtime),
+            ).fetchone()
+        return row is not None
+
+    def mark_imported(self, name: str, size: int, mtime: float, products: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (name, size, mtime, time.time(), products),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('imported_at', ?)", (str(time.time()),),
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (name,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript(
+                "DELETE FROM grams; DELETE FROM names; DELETE FROM products; DELETE FROM files;"
+            )
+            self._conn.commit()
+
+    # ── Чтение ──
+
+    def _products(self, where: str, params: Sequence[Any]) -> List[GRLSProduct]:
+        """РУ по условию: действующие раньше исключённых, затем по дате регистрации."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE {where}"
+                f" ORDER BY status != 'active', reg_date = '', reg_date",
+                tuple(params),
+            ).fetchall()
+        return [GRLSProduct(*row) for row in rows]
+
+    def search(self, query: str, kind: str = "trade", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Нечёткий поиск названий: сначала начинающиеся с запроса, затем
+        по доле совпавших триграмм (опечатки, пропущенные буквы).
+        [{"name", "norm", "score"}], score 1.0 — совпадение по префиксу.
+        """
+        norm = _normalize(kind, query)
+        if not norm:
+            return []
+        query_grams = trigrams(norm, prefix=True)
+        with self._lock:
+            prefix_rows = self._conn.execute(
+                "SELECT id, norm, display FROM names"
+                " WHERE kind = ? AND norm >= ? AND norm < ? ORDER BY length(norm) LIMIT ?",
+                (kind, norm, norm + "\uffff", limit),
+            ).fetchall()
+            fuzzy_rows = []
+            if query_grams and len(prefix_rows) < limit:
+                placeholders = ",".join("?" * len(query_grams))
+                fuzzy_rows = self._conn.execute(
+                    f"SELECT n.id, n.norm, n.display FROM ("
+                    f"   SELECT name_id, COUNT(*) AS hits FROM grams"
+                    f"    WHERE kind = ? AND gram IN ({placeholders})"
+                    f"    GROUP BY name_id HAVING hits >= ? ORDER BY hits DESC LIMIT ?"
+                    f" ) g JOIN names n ON n.id = g.name_id",
+                    (kind, *query_grams, math.ceil(len(query_grams) * _MIN_COVERAGE), _CANDIDATES),
+                ).fetchall()
+
+        found: Dict[int, Dict[str, Any]] = {
+            name_id: {"name": display, "norm": name_norm, "score": 1.0}
+            for name_id, name_norm, display in prefix_rows
+        }
+        for name_id, name_norm, display in fuzzy_rows:
+            if name_id not in found:
+                score = _similarity(query_grams, name_norm)
+                if score >= _MIN_COVERAGE:
+                    found[name_id] = {"name": display, "norm": name_norm, "score": round(score, 3)}
+        return sorted(found.values(), key=lambda r: (-r["score"], len(r["norm"])))[:limit]
+
+    def products_for_inn(self, inn: str) -> List[GRLSProduct]:
+        """
+        РУ по МНН: точное совпадение (с формой из словаря МНН:
+        "амлодипина безилат" → "амлодипин"), иначе лучшее нечёткое.
+        """
+        keys = _inn_keys(inn)
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        products = self._products(f"inn_norm IN ({placeholders})", keys)
+        if not products:
+            best = self.search(inn, "inn", limit=1)
+            if best and best[0]["score"] >= _MATCH_SCORE:
+                products = self._products("inn_norm = ?", (best[0]["norm"],))
+        return products
+
+    def product(self, trade_name: str, inn: str = "") -> Optional[GRLSProduct]:
+        """РУ по торговому названию (точно, иначе лучшее нечёткое); МНН уточняет выбор."""
+        norm = normalize_text(trade_name)
+        if not norm:
+            return None
+        products = self._products("trade_norm = ?", (norm,))
+        if not products:
+            best = self.search(trade_name, "trade", limit=1)
+            if best and best[0]["score"] >= _MATCH_SCORE:
+                products = self._products("trade_norm = ?", (best[0]["norm"],))
+        keys = set(_inn_keys(inn))
+        same_inn = [p for p in products if normalize_text(p.inn) in keys]
+        return (same_inn or products or [None])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            products = self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            active = self._conn.execute(
+                "SELECT COUNT(*) FROM products WHERE status = 'active'"
+            ).fetchone()[0]
+            names = dict(self._conn.execute("SELECT kind, COUNT(*) FROM names GROUP BY kind").fetchall())
+            meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        return {"path": self.path, "products": products, "active": active, "names": names, **meta}
+
+
+def _inn_keys(inn: str) -> List[str]:
+    key = normalize_text(inn)
+    keys = [key] if key else []
+    if key and get_inn_dictionary is not None:
+        entry = get_inn_dictionary().lookup(key)
+        if entry and normalize_text(entry.ru) not in keys:
+            keys.append(normalize_text(entry.ru))
+    return keys
+
+
+def _matches(query: str, name: str) -> int:
+    """Ранг совпадения ввода с названием: 0 — префикс, 1 — подстрока, 2 — нечётко, -1 — нет."""
+    if name.startswith(query):
+        return 0
+    if query in name:
+        return 1
+    return 2 if _similarity(trigrams(query, prefix=True), name) >= _MIN_COVERAGE else -1
+
+
+# ════════════════════════════════════════════════════════
+# ОБЩИЙ ЭКЗЕМПЛЯР И ЗАПРОСЫ СЕРВИСОВ
+# ════════════════════════════════════════════════════════
+
+_registry: Optional[GRLSRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_grls_registry() -> Optional[GRLSRegistry]:
+    """Общий реестр процесса или None, если выгрузка ещё не импортирована."""
+    global _registry
+    with _registry_lock:
+        if _registry is None and os.path.exists(DEFAULT_REGISTRY_PATH):
+            _registry = GRLSRegistry(DEFAULT_REGISTRY_PATH)
+        return _registry
+
+
+def reference_products(inn: str = "", q: str = "", limit: int = 10) -> List[Dict[str, str]]:
+    """
+    Торговые названия для /api/dictionaries/reference: по МНН (самые
+    ранние действующие РУ — первыми, обычно это оригинальный препарат),
+    ввод q фильтрует список; без МНН — нечёткий поиск по названиям.
+    Пустой список — реестра нет или ничего не найдено.
+    """
+    try:
+        registry = get_grls_registry()
+        if registry is None:
+            return []
+        if inn:
+            products = registry.products_for_inn(inn)
+        else:
+            products = []
+            for match in registry.search(q, "trade", limit=limit):
+                product = registry.product(match["name"])
+                if product is not None:
+                    products.append(product)
+    except sqlite3.Error as e:
+        print(f"  ⚠️ Реестр ГРЛС: {type(e).__name__}: {e}")
+        return []
+
+    unique: Dict[str, GRLSProduct] = {}
+    for product in products:
+        unique.setdefault(normalize_text(product.trade_name), product)
+    items = list(unique.items())
+    if inn and q:
+        query = normalize_text(q)
+        ranked = [(_matches(query, norm), i, p) for i, (norm, p) in enumerate(items)]
+        return [p.to_reference() for rank, _, p in sorted(ranked) if rank >= 0][:limit]
+    return [p.to_reference() for _, p in items[:limit]]
+
+
+def manufacturer_names(q: str, limit: int = 10) -> List[str]:
+    """Держатели РУ для /api/dictionaries/manufacturers (нечётко)."""
+    try:
+        registry = get_grls_registry()
+        return [m["name"] for m in registry.search(q, "holder", limit=limit)] if registry else []
+    except sqlite3.Error as e:
+        print(f"  ⚠️ Реестр ГРЛС: {type(e).__name__}: {e}")
+        return []
+
+
+def lookup_product(trade_name: str, inn: str = "") -> Optional[GRLSProduct]:
+    """РУ препарата по торговому названию или None."""
+    try:
+        registry = get_grls_registry()
+        return registry.product(trade_name, inn) if registry else None
+    except sqlite3.Error as e:
+        print(f"  ⚠️ Реестр ГРЛС: {type(e).__name__}: {e}")
+        return None
+
+
+def registered_reference(trade_name: str, inn: str) -> Optional[GRLSProduct]:
+    """
+    РУ найденного референта (названия от пользователя или LLM) — только
+    с тем же МНН; None — в реестре такого препарата этого МНН нет.
+    """
+    product = lookup_product(trade_name, inn)
+    if product is None or not inn:
+        return product
+    return product if normalize_text(product.inn) in set(_inn_keys(inn)) else None
+
+
+def reference_product(inn: str) -> Optional[GRLSProduct]:
+    """
+    Догадка о референте, когда он не найден иначе: действующее РУ с самой
+    ранней датой регистрации (оригинальный препарат обычно зарегистрирован
+    первым, но перерегистрированный оригинал или старый дженерик это ломают).
+    """
+    try:
+        registry = get_grls_registry()
+        products = registry.products_for_inn(inn) if registry and inn else []
+    except sqlite3.Error as e:
+        print(f"  ⚠️ Реестр ГРЛС: {type(e).__name__}: {e}")
+        return None
+    active = [p for p in products if p.active]
+    return active[0] if active else None
@@ -7,6 +7,8 @@ services/search/protocol_search.py — Поиск существующих пр
 размер выборки, режим приёма.
 
 Приоритет:
+0. Локальный индекс выгрузки ClinicalTrials.gov (ctgov_index.py) —
+   миллисекунды, без GenSearch
 1. ClinicalTrials.gov — структурированные данные о дизайне
 2. PubMed — статьи с результатами, CVintra
 
@@ -15,11 +17,80 @@ services/search/protocol_search.py — Поиск существующих пр
 
 import os
 import re
-import requests
 from typing import Dict, Optional, List
 
+# Общий клиент GenSearch (лимит RPS, повторы при 429)
+try:
+    from app.services.search.gensearch_client import get_gensearch_client, answer_text
+except ImportError:
+    from gensearch_client import get_gensearch_client, answer_text
+
+# Предохранитель GenSearch: при деградации Yandex Cloud — сразу пустой результат
+try:
+    from app.services.circuit_breaker import circuit_is_open, GENSEARCH
+except ImportError:
+    GENSEARCH = "gensearch"
+    def circuit_is_open(name):
+        return False
+
+# Разбор ответов GenSearch (общий с cv_intra, один проход по тексту)
+try:
+    from app.services.pk.extraction import extract
+except ImportError:
+    from extraction import extract
+
+# Пул ответов прогона (общий с поисками CVintra и ФК-параметров)
+try:
+    from app.services.pk.evidence_pool import EvidencePool
+except ImportError:
+    from evidence_pool import EvidencePool
+
+# Бюджет времени прогона
+try:
+    from app.utils.deadline import Deadline, ensure_deadline
+except ImportError:
+    from deadline import Deadline, ensure_deadline
+
+# Персистентный кэш PK-данных (SQLite, TTL = PK_CACHE_TTL_DAYS)
+try:
+    from app.services.cache.pk_cache import pk_cache_key, load_cached, store_cached
+    _HAS_PK_CACHE = True
+except ImportError:
+    _HAS_PK_CACHE = False
+
+# Локальный индекс БЭ-исследований ClinicalTrials.gov (строится import_ctgov.py)
+try:
+    from app.services.search.ctgov_index import lookup_protocol
+    _HAS_CT_INDEX = True
+except ImportError:
+    _HAS_CT_INDEX = False
+
+# Объединение одинаковых одновременных запросов (несколько пайплайнов на один МНН)
+try:
+    from app.services.cache.single_flight import (
+        single_flight, normalize_key, deadline_wait, pool_adopt,
+    )
+except ImportError:
+    def single_flight(key_fn, name=None, **options):
+        return lambda fn: fn
+    def normalize_key(*parts):
+        return "|".join((p or "").lower().strip() for p in parts)
+    deadline_wait = pool_adopt = None
+
+
+def _protocol_flight_key(inn_ru: str = "", inn_en: str = "", ref_drug_name: str = "", *args, **kwargs) -> str:
+    """Ключ объединения: нормализованный МНН + референтный препарат."""
+    inn_key = pk_cache_key(inn_ru, inn_en) if _HAS_PK_CACHE else normalize_key(inn_en or inn_ru)
+    return normalize_key(inn_key, ref_drug_name) if inn_key else ""
 
-YANDEX_GEN_SEARCH_URL = "https://searchapi.api.cloud.yandex.net/v2/gen/search"
+
+def _protocol_shareable(result, *args, deadline: Optional[Deadline] = None, **kwargs) -> bool:
+    """Пустой результат лидера, урезанный его дедлайном или предохранителем, — не для других."""
+    if result.get("found"):
+        return True
+    if deadline is not None and deadline.expired():
+        return False
+    return not circuit_is_open(GENSEARCH)
 
 
 def lookup_inn_english(
@@ -63,42 +134,30 @@ def lookup_inn_english(
 
 def _call_yandex_ru(query: str, folder_id: str, api_key: str) -> str:
     """Вызов Yandex GenSearch API (русскоязычный поиск)."""
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folder_id": folder_id,
-        "fixMisspell": True,
-    }
-    headers = {
-        "Authorization": f"Api-Key {api_key}",
-        "Content-Type": "application/json",
-    }
-    try:
-        resp = requests.post(YANDEX_GEN_SEARCH_URL, json=body, headers=headers, timeout=15)
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, list):
-                data = data[0] if data else {}
-            message = data.get("message", {})
-            if isinstance(message, list):
-                message = message[0] if message else {}
-            if isinstance(message, dict):
-                content = message.get("content", "")
-                return content if isinstance(content, str) else ""
-        return ""
-    except Exception:
-        return ""
+    data = get_gensearch_client().search(
+        query, folder_id, api_key, fix_misspell=True, timeout=15,
+        label="Yandex Search (INN)",
+    )
+    return answer_text(data)
 
 
+@single_flight(
+    _protocol_flight_key, name="search_existing_protocols",
+    wait_timeout=deadline_wait, shareable=_protocol_shareable, adopt=pool_adopt,
+)
 def search_existing_protocols(
     inn_ru: str,
     inn_en: str = "",
     ref_drug_name: str = "",
     folder_id: Optional[str] = None,
     api_key: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+    pool: Optional[EvidencePool] = None,
 ) -> Dict:
     """
     Ищет существующие протоколы БЭ через Yandex GenSearch.
 
+    Шаг 0: Локальный индекс ClinicalTrials.gov (если построен)
     Шаг 1: Ищем на ClinicalTrials.gov
     Шаг 2: Ищем на PubMed
     Шаг 3: Парсим результаты → дизайн, CVintra, выборка
@@ -107,6 +166,9 @@ def search_existing_protocols(
         inn_ru: МНН на русском ("тенофовира алафенамид")
         inn_en: МНН на английском ("tenofovir alafenamide") — для PubMed
         ref_drug_name: торговое название референта ("Вемлиди®")
+        deadline: бюджет времени — по истечении следующий шаг не начинается
+        pool: пул ответов прогона — ответы (T½, CI, Cmax в тексте протоколов)
+            доступны поискам CVintra и ФК-параметров
 
     Returns:
         dict с ключами:
@@ -120,21 +182,51 @@ def search_existing_protocols(
             nct_id: str | None  (номер NCT)
             study_title: str | None
             raw_text: str
+
+    Найденный протокол кэшируется по нормализованному МНН (PK_CACHE_TTL_DAYS).
     """
     folder_id = folder_id or os.getenv("YANDEX_FOLDER_ID", "")
     api_key = api_key or os.getenv("YANDEX_API_KEY", "")
 
+    cache_key = pk_cache_key(inn_ru, inn_en) if _HAS_PK_CACHE else ""
+
+    # Шаг 0: локальный индекс — структурированные поля, без GenSearch
+    if _HAS_CT_INDEX:
+        index_key = cache_key or normalize_key(inn_en or inn_ru)
+        local = lookup_protocol(index_key)
+        if local:
+            print(f"  🗂️  Протокол БЭ из индекса ClinicalTrials.gov ({index_key}): {local['nct_id']}")
+            return local
+
+    if cache_key:
+        cached = load_cached("protocols", cache_key)
+        if cached:
+            print(f"  💾 Протокол БЭ из кэша ({cache_key}): {cached.get('nct_id')}")
+            return cached
+
     if not folder_id or not api_key:
         return _empty_result()
+    if circuit_is_open(GENSEARCH):
+        print("  🔌 GenSearch недоступен — поиск протоколов БЭ пропущен")
+        return _empty_result()
+    deadline = ensure_deadline(deadline)
+    if deadline.exhausted("protocols"):
+        return _empty_result()
 
     # Шаг 1: Ищем на ClinicalTrials.gov
-    ct_result = _search_clinicaltrials(inn_ru, inn_en, ref_drug_name, folder_id, api_key)
+    ct_result = _search_clinicaltrials(inn_ru, inn_en, ref_drug_name, folder_id, api_key, pool)
     if ct_result.get("found"):
+        if cache_key:
+            store_cached("protocols", cache_key, ct_result)
         return ct_result
 
     # Шаг 2: Ищем на PubMed
-    pubmed_result = _search_pubmed(inn_ru, inn_en, folder_id, api_key)
+    if circuit_is_open(GENSEARCH) or deadline.exhausted("protocols"):
+        return _empty_result()
+    pubmed_result = _search_pubmed(inn_ru, inn_en, folder_id, api_key, pool)
     if pubmed_result.get("found"):
+        if cache_key:
+            store_cached("protocols", cache_key, pubmed_result)
         return pubmed_result
 
     return _empty_result()
@@ -146,6 +238,7 @@ def _search_clinicaltrials(
     ref_drug_name: str,
     folder_id: str,
     api_key: str,
+    pool: Optional[EvidencePool] = None,
 ) -> Dict:
     """Ищет протоколы БЭ на ClinicalTrials.gov."""
     # Используем английское название если есть, иначе русское
@@ -165,7 +258,7 @@ def _search_clinicaltrials(
         f"Если исследований не найдено, напиши 'Не найдено'."
     )
 
-    answer = _call_yandex(query, folder_id, api_key)
+    answer = _call_yandex(query, folder_id, api_key, pool)
     if not answer:
         return _empty_result()
 
@@ -177,6 +270,7 @@ def _search_pubmed(
     inn_en: str,
     folder_id: str,
     api_key: str,
+    pool: Optional[EvidencePool] = None,
 ) -> Dict:
     """Ищет статьи о БЭ-исследованиях на PubMed."""
     search_term = inn_en if inn_en else inn_ru
@@ -194,83 +288,43 @@ def _search_pubmed(
         f"Если статей не найдено, напиши 'Не найдено'."
     )
 
-    answer = _call_yandex(query, folder_id, api_key)
+    answer = _call_yandex(query, folder_id, api_key, pool)
     if not answer:
         return _empty_result()
 
     return _parse_pubmed_response(answer)
 
 
-def _call_yandex(query: str, folder_id: str, api_key: str) -> str:
-    """Вызов Yandex GenSearch API."""
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folder_id": folder_id,
-        
-        "fixMisspell": True,
-    }
-
-    headers = {
-        "Authorization": f"Api-Key {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        resp = requests.post(
-            YANDEX_GEN_SEARCH_URL,
-            json=body,
-            headers=headers,
-            timeout=20,
+def _call_yandex(query: str, folder_id: str, api_key: str, pool: Optional[EvidencePool] = None) -> str:
+    """Вызов Yandex GenSearch API (через пул ответов прогона, если он есть)."""
+    def _fetch() -> str:
+        data = get_gensearch_client().search(
+            query, folder_id, api_key, fix_misspell=True, timeout=20,
+            label="Yandex Search (protocol)",
         )
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, list):
-                data = data[0] if data else {}
-            message = data.get("message", {})
-            if isinstance(message, list):
-                message = message[0] if message else {}
-            if isinstance(message, dict):
-                content = message.get("content", "")
-                if isinstance(content, str):
-                    return content
-                elif isinstance(content, list):
-                    parts = []
-                    for item in content:
-                        if isinstance(item, dict):
-                            parts.append(str(item.get("content", item.get("text", ""))))
-                        elif isinstance(item, str):
-                            parts.append(item)
-                    return " ".join(parts)
-            return ""
-        else:
-            return ""
-    except Exception as e:
-        print(f"⚠️  Yandex Search (protocol): {e}")
-        return ""
+        return answer_text(data)
+
+    if pool is not None:
+        return pool.answer(query, _fetch, "protocols")
+    return _fetch()
 
 
 def _parse_ct_response(text: str) -> Dict:
     """Парсит ответ поиска ClinicalTrials.gov."""
     result = _empty_result()
-    text_lower = text.lower()
+    ex = extract(text)
 
     # Проверяем наличие результатов
-    if "не найдено" in text_lower or "no results" in text_lower:
+    if ex.not_found:
         return result
 
     # Проверяем что это действительно исследование БЭ
     # (не оригинальное Phase 1-3 исследование)
-    be_keywords = [
-        "bioequivalence", "биоэквивалент", "generic",
-        "crossover", "перекрестн", "replicate", "репликат",
-        "reference product", "test product",
-    ]
-    is_be_study = any(kw in text_lower for kw in be_keywords)
+    is_be_study = ex.is_be_study
 
     # NCT номер
-    nct_match = re.search(r'NCT\d{6,10}', text, re.IGNORECASE)
-    if nct_match:
-        result["nct_id"] = nct_match.group(0).upper()
+    if ex.nct_id:
+        result["nct_id"] = ex.nct_id
         # Помечаем как найденный ТОЛЬКО если это БЭ-исследование
         result["found"] = is_be_study
         result["source"] = "clinicaltrials"
@@ -279,23 +333,17 @@ def _parse_ct_response(text: str) -> Dict:
         return result
 
     # Дизайн
-    design = _extract_design(text)
-    if design:
-        result["design_type"] = design["type"]
-        result["n_periods"] = design["periods"]
+    if ex.design:
+        result["design_type"] = ex.design["type"]
+        result["n_periods"] = ex.design["periods"]
 
     # Количество добровольцев
-    n_match = re.search(
-        r'(?:количество\s+добровольцев|subjects?|participants?|enrollment)[:\s]*(\d+)',
-        text, re.IGNORECASE
-    )
-    if n_match:
-        result["n_subjects"] = int(n_match.group(1))
+    if ex.enrollment is not None:
+        result["n_subjects"] = ex.enrollment
 
     # Режим приёма
-    intake = _extract_intake(text)
-    if intake:
-        result["intake_mode"] = intake
+    if ex.intake_mode:
+        result["intake_mode"] = ex.intake_mode
 
     result["raw_text"] = text[:1000]
     return result
@@ -304,102 +352,41 @@ def _parse_ct_response(text: str) -> Dict:
 def _parse_pubmed_response(text: str) -> Dict:
     """Парсит ответ поиска PubMed."""
     result = _empty_result()
-    text_lower = text.lower()
+    ex = extract(text)
 
-    if "не найдено" in text_lower or "no results" in text_lower:
+    if ex.not_found:
         return result
 
     # PMID
-    pmid_match = re.search(r'PMID[:\s]*(\d+)', text, re.IGNORECASE)
-    if pmid_match:
+    if ex.pmid:
         result["found"] = True
         result["source"] = "pubmed"
-        result["nct_id"] = f"PMID:{pmid_match.group(1)}"
+        result["nct_id"] = f"PMID:{ex.pmid}"
 
     # CVintra
-    cv_match = re.search(
-        r'(?:CVintra|CV|coefficient\s+of\s+variation)[:\s]*(\d+(?:\.\d+)?)\s*%?',
-        text, re.IGNORECASE
-    )
-    if cv_match:
-        result["cv_intra"] = float(cv_match.group(1))
+    if ex.reported_cv is not None:
+        result["cv_intra"] = ex.reported_cv
         if not result["found"]:
             result["found"] = True
             result["source"] = "pubmed"
 
     # Дизайн
-    design = _extract_design(text)
-    if design:
-        result["design_type"] = design["type"]
-        result["n_periods"] = design["periods"]
+    if ex.design:
+        result["design_type"] = ex.design["type"]
+        result["n_periods"] = ex.design["periods"]
 
     # Количество добровольцев
-    n_match = re.search(
-        r'(?:subjects?|participants?|volunteers?|добровольц)[:\s]*(\d+)',
-        text, re.IGNORECASE
-    )
-    if n_match:
-        result["n_subjects"] = int(n_match.group(1))
+    if ex.subjects is not None:
+        result["n_subjects"] = ex.subjects
 
     # Режим приёма
-    intake = _extract_intake(text)
-    if intake:
-        result["intake_mode"] = intake
+    if ex.intake_mode:
+        result["intake_mode"] = ex.intake_mode
 
     result["raw_text"] = text[:1000]
     return result
 
 
-def _extract_design(text: str) -> Optional[Dict]:
-    """Извлекает тип дизайна из текста."""
-    text_lower = text.lower()
-
-    # Полный репликативный 4 периода
-    if any(k in text_lower for k in [
-        "4-period", "4 period", "full replicate", "trtr", "2x2x4",
-        "4 периода", "полный репликативный", "четырехпериодн",
-    ]):
-        return {"type": "replicate_4_period", "periods": 4}
-
-    # Частичный репликативный 3 периода
-    if any(k in text_lower for k in [
-        "3-period", "3 period", "partial replicate", "trt/rtr", "2x2x3",
-        "3 периода", "частичный репликативный", "трехпериодн",
-    ]):
-        return {"type": "replicate_3_period", "periods": 3}
-
-    # Параллельный
-    if any(k in text_lower for k in [
-        "parallel", "параллельн",
-    ]):
-        return {"type": "parallel", "periods": 1}
-
-    # Стандартный перекрёстный 2×2
-    if any(k in text_lower for k in [
-        "crossover", "cross-over", "2x2", "2-period", "2 period",
-        "перекрестн", "двухпериодн",
-    ]):
-        return {"type": "2x2_crossover", "periods": 2}
-
-    return None
-
-
-def _extract_intake(text: str) -> Optional[str]:
-    """Извлекает режим приёма из текста."""
-    text_lower = text.lower()
-
-    if any(k in text_lower for k in ["fasting and fed", "fed and fasting",
-                                       "натощак и после еды"]):
-        return "both"
-    if any(k in text_lower for k in ["fed", "after meal", "with food",
-                                       "после еды", "с пищей", "во время еды"]):
-        return "fed"
-    if any(k in text_lower for k in ["fasting", "натощак"]):
-        return "fasting"
-
-    return None
-
-
 def _empty_result() -> Dict:
     """Пустой результат."""
     return {
@@ -0,0 +1,282 @@
+"""
+services/search/reference_drugs.py — Торговые названия по МНН для /api/dictionaries/reference.
+
+Список препаратов для МНН почти не меняется, поэтому результат разбора
+ответа GenSearch хранится в SQLite (namespace "reference_drugs", ключ —
+нормализованное МНН):
+
+  - свежая запись (моложе REFERENCE_CACHE_TTL_DAYS) → сразу из кэша;
+  - устаревшая → отдаём её и обновляем в фоне (stale-while-revalidate);
+  - нет записи → GenSearch, разбор, сохранение.
+
+Одновременные запросы по одному МНН (быстрый набор в UI) объединяются
+(single_flight). Пустые ответы и сбои GenSearch не кэшируются.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from app.config.settings import settings
+from app.services.cache.sqlite_store import SQLiteStore, get_store
+from app.services.cache.single_flight import single_flight
+from app.services.search.gensearch_client import (
+    get_gensearch_client, answer_text as _answer_text, LANE_INTERACTIVE,
+)
+
+try:
+    from app.utils.inn_dictionary import get_inn_dictionary
+except ImportError:
+    get_inn_dictionary = None
+
+
+_NAMESPACE = "reference_drugs"
+
+# Мусорные слова
+_GARBAGE = {
+    "препарат", "лекарство", "таблетки", "капсулы", "оригинальный", "аналоги",
+    "торговое название", "инструкция", "цена", "купить", "отзывы", "состав",
+    "это", "это химия", "химия", "формула", "действие", "механизм",
+    "побочные", "показания", "противопоказания", "дозировка", "применение",
+    "и другие", "другие", "также", "например", "включая", "некоторые",
+}
+
+
+def reference_cache_key(inn: str) -> str:
+    """
+    Ключ кэша: МНН из словаря (если известно) или нормализованная строка.
+    "Амлодипина безилат" / "амлодипин" → "амлодипин".
+    """
+    key = re.sub(r'\s+', ' ', (inn or "").lower().replace("ё", "е")).strip()
+    if key and get_inn_dictionary is not None:
+        entry = get_inn_dictionary().lookup(key)
+        if entry:
+            return entry.ru.lower()
+    return key
+
+
+# ════════════════════════════════════════════════════════
+# РАЗБОР ОТВЕТА GENSEARCH
+# ════════════════════════════════════════════════════════
+
+def _extract_name(text: str) -> Optional[str]:
+    """Извлекает торговое название из строки GenSearch."""
+    # Убираем markdown и сноски
+    text = re.sub(r'\[\d+\]', '', text)
+    text = text.replace("**", "").strip()
+    # Извлекаем текст в кавычках — самый надёжный способ
+    m = re.search(r'[«"„]([^»""]+)[»""]', text)
+    if m:
+        return m.group(1).strip()
+    # Убираем скобки с содержимым
+    text = re.sub(r'\([^)]*\)', '', text)
+    text = re.sub(r'[®™«»„"""\*]', '', text)
+    # Убираем всё после тире (— производитель, описание)
+    text = re.split(r'\s*[—–-]\s', text)[0].strip()
+    # Убираем вводные "Оригинальный:", "Референтный:" и т.д.
+    text = re.sub(r'^(оригинальн\w*|референтн\w*|генерик\w*)\s*:\s*', '', text, flags=re.IGNORECASE)
+    text = text.strip().strip('.,;:')
+    return text if text and len(text) >= 2 else None
+
+
+def _is_valid(name: str, inn_lower: str) -> bool:
+    nl = name.lower().strip()
+    if not nl or len(nl) < 2 or len(nl) > 40:
+        return False
+    if nl == inn_lower or nl in _GARBAGE:
+        return False
+    if len(nl.split()) > 3:
+        return False
+    if re.match(r'^[\d\s,.\+/]+\s*(мг|мкг|г|мл|%|ме|ед)?$', nl):
+        return False
+    if any(w in nl for w in ['является', 'зарегистрирован', 'выпускается', 'содержит', 'применяется', 'торговые названия']):
+        return False
+    return True
+
+
+def parse_reference_names(answer_text: str, inn_lower: str) -> List[str]:
+    """Торговые названия из ответа GenSearch (без повторов, в порядке ответа)."""
+    # pre_clean: убираем только markdown bold и сноски, сохраняем кавычки для парсинга
+    pre_clean = answer_text.replace("**", "").strip()
+    pre_clean = re.sub(r'\[\d+\]', '', pre_clean)
+
+    # clean: полная очистка для fallback-парсинга
+    clean = re.sub(r'\([^)]*\)', '', pre_clean)
+    clean = re.sub(r'[®™«»„"""\*]', '', clean)
+
+    names = []
+
+    # Стратегия 1: разбиваем по строкам (markdown списки * или 1. 2. 3.)
+    for line in pre_clean.split('\n'):
+        line = line.strip().lstrip('*•-– ').strip()
+        if not line:
+            continue
+        extracted = _extract_name(line)
+        if extracted and _is_valid(extracted, inn_lower):
+            names.append(extracted)
+
+    # Стратегия 2: если строки не дали результат — разбиваем по запятой из clean
+    if not names:
+        text_for_parse = re.sub(
+            r'^.*?(торговые названия|зарегистрированы|препараты)\s*[:—–-]\s*',
+            '', clean, count=1, flags=re.IGNORECASE
+        )
+        for c in re.split(r'[,;]\s*|\d+[.)]\s*', text_for_parse):
+            extracted = _extract_name(c)
+            if extracted and _is_valid(extracted, inn_lower):
+                names.append(extracted)
+
+    # Дедупликация
+    seen = set()
+    result = []
+    for name in names:
+        nl = name.lower()
+        if nl not in seen:
+            seen.add(nl)
+            result.append(name)
+    return result
+
+
+# ════════════════════════════════════════════════════════
+# ЗАПРОС + КЭШ
+# ════════════════════════════════════════════════════════
+
+def _reference_flight_key(search_term: str, *args, **kwargs) -> str:
+    return reference_cache_key(search_term)
+
+
+@single_flight(_reference_flight_key, name="reference_drugs")
+async def fetch_reference_names(
+    search_term: str, folder_id: str = "", api_key: str = "",
+) -> Optional[List[str]]:
+    """GenSearch + разбор. None — сбой или пустой ответ (не кэшируется)."""
+    query = (
+        f"Перечисли все торговые названия лекарственных препаратов с МНН «{search_term}», "
+        f"зарегистрированные в России (ГРЛС). "
+        f"Укажи только торговые названия через запятую, без дозировок и лекарственных форм. "
+        f"Начни с оригинального (референтного) препарата."
+    )
+    # Общий GenSearch-клиент: interactive-приоритет над фоновыми поисками пайплайна
+    data = await get_gensearch_client().search_async(
+        query, folder_id, api_key,
+        search_type="SEARCH_TYPE_RU", fix_misspell=True, timeout=15,
+        lane=LANE_INTERACTIVE, label="Yandex GenSearch reference",
+    )
+    answer_text = _answer_text(data)
+    if not answer_text:
+        return None
+
+    print(f"📋 GenSearch reference ({search_term}): {answer_text[:200]}")
+    names = parse_reference_names(answer_text, search_term.lower())
+    if not names:
+        return None
+
+    get_reference_cache().put(search_term, names)
+    return names
+
+
+class ReferenceDrugCache:
+    """Персистентный кэш списков торговых названий (SQLiteStore)."""
+
+    def __init__(self, store: SQLiteStore, ttl_s: float):
+        self.store = store
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"fresh": 0, "stale": 0, "misses": 0, "refreshes": 0}
+
+    def get(self, search_term: str) -> Optional[Dict[str, Any]]:
+        """{"names": [...], "stale": bool} или None."""
+        key = reference_cache_key(search_term)
+        try:
+            entry = self.store.get_entry(_NAMESPACE, key) if key else None
+        except Exception as e:
+            print(f"  ⚠️ Кэш референтных препаратов: {type(e).__name__}: {e}")
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, stored_at = entry
+            stale = time.time() - stored_at > self.ttl_s
+            self.stats["stale" if stale else "fresh"] += 1
+        return {"names": list(value.get("names", [])), "stale": stale}
+
+    def put(self, search_term: str, names: List[str]) -> None:
+        key = reference_cache_key(search_term)
+        if not key or not names:
+            return
+        try:
+            self.store.set(_NAMESPACE, key, {"term": search_term, "names": names})
+        except Exception as e:
+            print(f"  ⚠️ Кэш референтных препаратов: {type(e).__name__}: {e}")
+
+    def refresh_in_background(self, search_term: str, folder_id: str, api_key: str) -> None:
+        """Обновляет устаревшую запись, не задерживая ответ (нужен запущенный loop)."""
+        key = reference_cache_key(search_term)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.stats["refreshes"] += 1
+
+        async def _refresh():
+            try:
+                await fetch_reference_names(search_term, folder_id, api_key)
+            except Exception as e:
+                print(f"  ⚠️ Фоновое обновление «{search_term}»: {type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # Держим ссылку на задачу, иначе её может собрать GC
+        task = asyncio.get_running_loop().create_task(_refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+async def get_reference_names(
+    search_term: str, folder_id: str = "", api_key: str = "",
+) -> Optional[List[str]]:
+    """
+    Торговые названия для МНН: кэш (в т.ч. устаревший + фоновое
+    обновление) → GenSearch. None — данных нет.
+    """
+    cache = get_reference_cache()
+    cached = cache.get(search_term)
+    if cached is not None:
+        if cached["stale"]:
+            cache.refresh_in_background(search_term, folder_id, api_key)
+        return cached["names"]
+    return await fetch_reference_names(search_term, folder_id, api_key)
+
+
+def filter_reference_names(names: List[str], q: str) -> List[str]:
+    """Инкрементальный фильтр списка по вводу пользователя."""
+    ql = (q or "").strip().lower().replace("ё", "е")
+    if not ql:
+        return list(names)
+    starts = [n for n in names if n.lower().replace("ё", "е").startswith(ql)]
+    contains = [n for n in names if n not in starts and ql in n.lower().replace("ё", "е")]
+    return starts + contains
+
+
+# ── Общий экземпляр ──
+
+_reference_cache: Optional[ReferenceDrugCache] = None
+_reference_cache_lock = threading.Lock()
+
+
+def get_reference_cache() -> ReferenceDrugCache:
+    """Общий кэш процесса (REFERENCE_CACHE_TTL_DAYS из settings)."""
+    global _reference_cache
+    with _reference_cache_lock:
+        if _reference_cache is None:
+            _reference_cache = ReferenceDrugCache(
+                store=get_store(),
+                ttl_s=settings.REFERENCE_CACHE_TTL_DAYS * 86400,
+            )
+        return _reference_cache
@@ -0,0 +1,163 @@
+"""
+services/search/suggest_cache.py — Кэш подсказок для справочников (typeahead).
+
+Справочники /api/dictionaries/* запрашивают Yandex Suggest / DaData на
+каждое нажатие клавиши. Кэш хранит ответы в памяти (LRU + TTL) и умеет
+отвечать на удлинённый запрос по уже загруженному короткому:
+
+    "амло"  → сеть, 17 подсказок (список полный: меньше лимита запроса)
+    "амлод" → локальная фильтрация подсказок "амло", без сети
+
+Лимит запроса к upstream выбирается больше числа показываемых подсказок
+(server.py: _SUGGEST_FETCH = 30 против 10) — иначе ответ на короткий
+префикс почти всегда усечён и фильтровать его нельзя. Доля попаданий —
+GET /api/health/suggest.
+
+Фильтрация по префиксу используется, только если короткий ответ был
+полным (upstream вернул меньше лимита) и после неё что-то осталось.
+Усечённый ответ (первая страница top-N) для удлинённого запроса не
+годится: DaData и Yandex Suggest переранжируют по более точному вводу,
+и лучшие совпадения могут быть за пределами первой страницы.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def normalize_query(text: str) -> str:
+    """Ключ запроса: нижний регистр, ё → е, без лишних пробелов."""
+    text = (text or "").lower().replace("ё", "е")
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def default_match(item: Any, query: str) -> bool:
+    """Подсказка подходит к запросу: запрос входит в её текст."""
+    if isinstance(item, dict):
+        text = " ".join(str(item.get(k) or "") for k in ("name", "ru", "en", "inn"))
+    else:
+        text = str(item)
+    return query in normalize_query(text)
+
+
+class PrefixSuggestCache:
+    """Потокобезопасный LRU+TTL кэш подсказок с фильтрацией по префиксу."""
+
+    def __init__(
+        self,
+        maxsize: int = 2000,
+        ttl_s: float = 3600,
+        min_prefix: int = 2,
+    ):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.min_prefix = min_prefix
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, List[Any], bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _entry(self, key: Tuple[str, str], now: float) -> Optional[Tuple[float, List[Any], bool]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.ttl_s:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(
+        self,
+        namespace: str,
+        query: str,
+        match: Callable[[Any, str], bool] = default_match,
+        prefix: bool = True,
+    ) -> Optional[List[Any]]:
+        """
+        Подсказки из кэша (точное совпадение или отфильтрованный префикс) или None.
+
+        prefix=False — только точное совпадение (когда подсказки после
+        очистки уже не содержат текст запроса и фильтровать их нельзя).
+        """
+        q = normalize_query(query)
+        if not q:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entry((namespace, q), now)
+            if entry is not None:
+                self.hits += 1
+                return list(entry[1])
+
+            # Самый длинный закэшированный префикс запроса
+            min_length = self.min_prefix if prefix else len(q)
+            for length in range(len(q) - 1, min_length - 1, -1):
+                entry = self._entry((namespace, q[:length]), now)
+                if entry is None:
+                    continue
+                _, items, complete = entry
+                if not complete:
+                    break
+                filtered = [item for item in items if match(item, q)]
+                if filtered:
+                    self.prefix_hits += 1
+                    # Запоминаем под точным ключом — следующий символ найдёт сразу
+                    self._put_locked((namespace, q), filtered, True, entry[0])
+                    return list(filtered)
+                break
+
+            self.misses += 1
+            return None
+
+    def put(self, namespace: str, query: str, items: List[Any], complete: bool) -> None:
+        """
+        Сохраняет ответ upstream.
+
+        complete=True — ответ содержит все варианты для запроса
+        (upstream вернул меньше своего лимита).
+        """
+        q = normalize_query(query)
+        if not q:
+            return
+        with self._lock:
+            self._put_locked((namespace, q), list(items), complete, time.time())
+
+    def _put_locked(self, key: Tuple[str, str], items: List[Any], complete: bool, stored_at: float) -> None:
+        self._data[key] = (stored_at, items, complete)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.prefix_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "prefix_hits": self.prefix_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.prefix_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# ── Общий экземпляр ──
+
+_suggest_cache: Optional[PrefixSuggestCache] = None
+_suggest_cache_lock = threading.Lock()
+
+
+def get_suggest_cache() -> PrefixSuggestCache:
+    """Общий кэш подсказок (settings.SUGGEST_CACHE_SIZE записей, SUGGEST_CACHE_TTL_S секунд)."""
+    global _suggest_cache
+    with _suggest_cache_lock:
+        if _suggest_cache is None:
+            from app.config.settings import settings
+            _suggest_cache = PrefixSuggestCache(
+                maxsize=settings.SUGGEST_CACHE_SIZE,
+                ttl_s=settings.SUGGEST_CACHE_TTL_S,
+            )
+        return _suggest_cache
@@ -10,13 +10,51 @@ services/search/yandex_search.py — Клиент Yandex Search API.
 """
 
 import os
-import requests
 from typing import Dict, Optional
 
+# Общий клиент GenSearch (лимит RPS, приоритеты, повторы при 429)
+try:
+    from app.services.search.gensearch_client import (
+        get_gensearch_client, answer_text as _answer_text, answer_sources,
+    )
+except ImportError:
+    from gensearch_client import get_gensearch_client, answer_text as _answer_text, answer_sources
+
+# Объединение одинаковых одновременных запросов (несколько пайплайнов на один МНН)
+try:
+    from app.services.cache.single_flight import single_flight, normalize_key
+except ImportError:
+    def single_flight(key_fn, name=None):
+        return lambda fn: fn
+    def normalize_key(*parts):
+        return "|".join((p or "").lower().strip() for p in parts)
+
+
+# Локальный справочник частых контрагентов (data/counterparties.json)
+try:
+    from app.services.search.counterparties import get_counterparties
+except ImportError:
+    try:
+        from counterparties import get_counterparties
+    except ImportError:
+        get_counterparties = None
+
+
+# Персистентный кэш реквизитов организаций (SQLite)
+try:
+    from app.services.cache.org_info_cache import get_org_info_cache
+except ImportError:
+    try:
+        from org_info_cache import get_org_info_cache
+    except ImportError:
+        get_org_info_cache = None
+
 
-YANDEX_GEN_SEARCH_URL = "https://searchapi.api.cloud.yandex.net/v2/gen/search"
+def _org_flight_key(org_name: str = "", country: str = "Россия", *args, **kwargs) -> str:
+    return normalize_key(org_name, country)
 
 
+@single_flight(_org_flight_key, name="search_organization_info")
 def search_organization_info(
     org_name: str,
     country: str = "Россия",
@@ -27,15 +65,49 @@ def search_organization_info(
     Ищет юридический адрес, индекс и телефон организации
     через Yandex Generative Search API.
 
-    Включает retry с паузой при тоймауте (Yandex GenSearch
-    может тоймаутить при нескольких запросах подряд).
+    Порядок: справочник контрагентов (ручные записи) → кэш организаций
+    (services/cache/org_info_cache) → GenSearch. Устаревшая запись кэша
+    возвращается сразу и обновляется в фоне (GenSearch не задерживает ответ).
+
+    Лимит RPS и повторы (429, тайм-аут) — в общем GenSearch-клиенте,
+    ручные паузы между запросами не нужны.
 
     Returns:
         dict с ключами: name, country, address, postal_code, phone,
                         raw_answer, sources
     """
-    import time
+    if get_counterparties is not None:
+        local = get_counterparties().organization_info(org_name, country)
+        if local:
+            print(f"  📖 «{org_name}»: реквизиты из справочника контрагентов")
+            return local
+
+    cache = get_org_info_cache() if get_org_info_cache is not None else None
+    cached = cache.get(org_name, country) if cache else None
+    if cached:
+        if cached["stale"]:
+            print(f"  💾 «{org_name}»: устаревшая запись кэша, обновляем в фоне")
+            cache.refresh_in_background(
+                org_name, country,
+                lambda: _search_organization_info_yandex(org_name, country, folder_id, api_key),
+            )
+        else:
+            print(f"  💾 «{org_name}»: реквизиты из кэша")
+        return {**cached["info"], "name": org_name, "country": country}
+
+    result = _search_organization_info_yandex(org_name, country, folder_id, api_key)
+    if cache:
+        cache.put(org_name, country, result)
+    return result
 
+
+def _search_organization_info_yandex(
+    org_name: str,
+    country: str,
+    folder_id: Optional[str],
+    api_key: Optional[str],
+) -> Dict[str, str]:
+    """Запрос к GenSearch и разбор ответа (без кэшей)."""
     folder_id = folder_id or os.getenv("YANDEX_FOLDER_ID", "")
     api_key = api_key or os.getenv("YANDEX_API_KEY", "")
 
@@ -52,66 +124,19 @@ def search_organization_info(
         f"Если данные не найдены, напиши 'не найдено'."
     )
 
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folderId": folder_id,
-        "searchType": "SEARCH_TYPE_RU",
-        "fixMisspell": True,
-    }
-
-    headers = {
-        "Authorization": f"Api-Key {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    # Retry до 3 раз с паузой (Yandex GenSearch тоймаутит при частых запросах)
-    max_retries = 3
-    for attempt in range(1, max_retries + 1):
-        try:
-            resp = requests.post(
-                YANDEX_GEN_SEARCH_URL,
-                headers=headers,
-                json=body,
-                timeout=30,
-            )
-
-            if resp.status_code == 200:
-                data = resp.json()
-                if isinstance(data, list):
-                    data = data[0] if data else {}
-                break  # Успех — выходим из цикла
-            elif resp.status_code == 429:
-                # Rate limit — ждём подольше
-                print(f"  ⚠️ Yandex Search: rate limit (429), пауза {attempt * 3}с...")
-                time.sleep(attempt * 3)
-                continue
-            else:
-                print(f"❌ Yandex Search API: HTTP {resp.status_code}")
-                print(f"   {resp.text[:300]}")
-                return _empty_result(org_name, country)
-
-        except requests.exceptions.ReadTimeout:
-            if attempt < max_retries:
-                print(f"  ⚠️ Yandex Search: тоймаут для «{org_name}», повтор {attempt}/{max_retries} через {attempt * 2}с...")
-                time.sleep(attempt * 2)
-                continue
-            else:
-                print(f"  ❌ Yandex Search: тоймаут для «{org_name}» после {max_retries} попыток")
-                return _empty_result(org_name, country)
-
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Yandex Search API ошибка: {e}")
-            return _empty_result(org_name, country)
-    else:
-        # Все retry исчерпаны
+    # Yandex GenSearch тоймаутит при частых запросах — до 2 повторов
+    data = get_gensearch_client().search(
+        query, folder_id, api_key,
+        search_type="SEARCH_TYPE_RU", fix_misspell=True,
+        timeout=30, timeout_retries=2,
+        label=f"Yandex Search «{org_name}»",
+    )
+    if data is None:
         return _empty_result(org_name, country)
 
     # Парсим ответ
-    answer_text = data.get("message", {}).get("content", "")
-    sources = []
-    for src in data.get("sources", []):
-        if src.get("used"):
-            sources.append(src.get("url", ""))
+    answer_text = _answer_text(data)
+    sources = [src["url"] for src in answer_sources(data, used_only=True)]
 
     result = {
         "name": org_name,
@@ -271,40 +296,16 @@ def search_reference_drug_info(
         f"Если информация недоступна, напиши 'не найдено'."
     )
 
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folderId": folder_id,
-        "searchType": "SEARCH_TYPE_RU",
-        "fixMisspell": True,
-    }
-
-    headers = {
-        "Authorization": f"Api-Key {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        resp = requests.post(
-            YANDEX_GEN_SEARCH_URL,
-            headers=headers,
-            json=body,
-            timeout=30,
-        )
-
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, list):
-                data = data[0] if data else {}
-        else:
-            print(f"❌ Yandex Search API: HTTP {resp.status_code}")
-            return _empty_ref_result(ref_drug_name)
-
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Yandex Search API ошибка: {e}")
+    data = get_gensearch_client().search(
+        query, folder_id, api_key,
+        search_type="SEARCH_TYPE_RU", fix_misspell=True, timeout=30,
+        label="Yandex Search (reference drug)",
+    )
+    if data is None:
         return _empty_ref_result(ref_drug_name)
 
-    answer_text = data.get("message", {}).get("content", "")
-    sources = [s.get("url") for s in data.get("sources", []) if s.get("used")]
+    answer_text = _answer_text(data)
+    sources = [src["url"] for src in answer_sources(data, used_only=True)]
 
     result = {
         "name": ref_drug_name,
@@ -441,57 +442,16 @@ def search_intake_mode(
         f"Процитируй точную фразу из раздела «Способ применения и дозы» инструкции."
     )
 
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folderId": folder_id,
-        "searchType": "SEARCH_TYPE_RU",
-        "fixMisspell": True,
-    }
-
-    headers = {
-        "Authorization": f"Api-Key {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        resp = requests.post(
-            YANDEX_GEN_SEARCH_URL,
-            json=body,
-            headers=headers,
-            timeout=15,
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            # GenSearch может вернуть массив — берём первый элемент
-            if isinstance(data, list):
-                data = data[0] if data else {}
-        else:
-            print(f"⚠️  Yandex Search (intake mode): HTTP {resp.status_code}")
-            return {"mode": "fasting", "raw_text": "", "source": "default"}
-    except Exception as e:
-        print(f"⚠️  Yandex Search ошибка (intake mode): {e}")
+    data = get_gensearch_client().search(
+        query, folder_id, api_key,
+        search_type="SEARCH_TYPE_RU", fix_misspell=True, timeout=15,
+        label="Yandex Search (intake mode)",
+    )
+    if data is None:
         return {"mode": "fasting", "raw_text": "", "source": "default"}
 
     # Извлекаем текст ответа (тот же формат что в search_organization_info)
-    answer_text = ""
-    try:
-        message = data.get("message", {})
-        if isinstance(message, list):
-            message = message[0] if message else {}
-        if isinstance(message, dict):
-            answer_text = message.get("content", "")
-        if isinstance(answer_text, list):
-            # content может быть списком объектов
-            parts = []
-            for item in answer_text:
-                if isinstance(item, dict):
-                    parts.append(str(item.get("content", item.get("text", ""))))
-                elif isinstance(item, str):
-                    parts.append(item)
-            answer_text = " ".join(parts)
-    except Exception as e:
-        print(f"⚠️  Парсинг ответа (intake mode): {e}")
-        answer_text = str(data)[:1000]
+    answer_text = _answer_text(data)
 
     if not answer_text:
         return {"mode": "fasting", "raw_text": "", "source": "default"}
@@ -0,0 +1,191 @@
+"""
+services/translate/yandex_translate.py — Пакетный перевод через Yandex Translate.
+
+Yandex Translate принимает список texts в одном запросе, поэтому все
+строки, которые нужно перевести за прогон (компоненты комбинированного
+МНН, страны производителей), уходят одним вызовом.
+
+Переводы кэшируются:
+  - в памяти процесса (потокобезопасно);
+  - в общем SQLite-хранилище (services/cache/sqlite_store.py) —
+    переживают перезапуск и общие для сервера и CLI.
+
+При недоступности Yandex Translate срабатывает предохранитель "translate":
+запросы сразу возвращают пустой результат (вызывающий код переводит сам).
+
+Использование:
+    from app.services.translate.yandex_translate import translate_texts
+
+    translate_texts(["биктегравир", "эмтрицитабин"], "ru", "en")
+    → {"биктегравир": "bictegravir", "эмтрицитабин": "emtricitabine"}
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from app.services.circuit_breaker import get_breaker, TRANSLATE
+except ImportError:
+    from circuit_breaker import get_breaker, TRANSLATE
+
+try:
+    from app.services.http_client import get_http_client, HttpError
+except ImportError:
+    from http_client import get_http_client, HttpError
+
+
+YANDEX_TRANSLATE_URL = "https://translate.api.cloud.yandex.net/translate/v2/translate"
+
+# Лимит Yandex Translate: не более 10 000 символов в одном запросе
+_MAX_CHARS_PER_REQUEST = 10000
+
+
+class TranslationService:
+    """Перевод с пакетной отправкой и двухуровневым кэшем (память + SQLite)."""
+
+    def __init__(self, store=None, timeout: Optional[float] = None):
+        self.store = store
+        self.timeout = timeout  # None — тайм-аут сервиса "translate" из http_client
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Dict[str, str]] = {}
+        self.requests = 0
+
+    def translate_many(
+        self, texts: Iterable[str], source: str, target: str,
+    ) -> Dict[str, str]:
+        """
+        Переводит набор строк. Returns: {исходная строка: перевод}.
+
+        Непереведённые (нет ключей / ошибка API) в результат не попадают.
+        """
+        namespace = f"translate:{source}-{target}"
+        wanted = []
+        for text in texts:
+            text = (text or "").strip()
+            if text and text not in wanted:
+                wanted.append(text)
+        if not wanted:
+            return {}
+
+        # 1. Память процесса
+        with self._lock:
+            memory = self._memory.setdefault(namespace, {})
+            result = {t: memory[t] for t in wanted if t in memory}
+        missing = [t for t in wanted if t not in result]
+
+        # 2. Персистентное хранилище
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many(namespace, missing)
+            except Exception as e:
+                print(f"  ⚠️ Кэш переводов: {type(e).__name__}: {e}")
+                stored = {}
+            if stored:
+                result.update(stored)
+                with self._lock:
+                    memory.update(stored)
+                missing = [t for t in missing if t not in stored]
+
+        # 3. Yandex Translate — одним запросом (или несколькими при > 10 000 символов)
+        if missing:
+            fresh = self._request_batches(missing, source, target)
+            if fresh:
+                result.update(fresh)
+                with self._lock:
+                    memory.update(fresh)
+                if self.store is not None:
+                    try:
+                        self.store.set_many(namespace, fresh)
+                    except Exception as e:
+                        print(f"  ⚠️ Кэш переводов: {type(e).__name__}: {e}")
+
+        return result
+
+    def _request_batches(self, texts: List[str], source: str, target: str) -> Dict[str, str]:
+        batches: List[List[str]] = [[]]
+        size = 0
+        for text in texts:
+            if batches[-1] and size + len(text) > _MAX_CHARS_PER_REQUEST:
+                batches.append([])
+                size = 0
+            batches[-1].append(text)
+            size += len(text)
+
+        result: Dict[str, str] = {}
+        for batch in batches:
+            result.update(self._request(batch, source, target))
+        return result
+
+    def _request(self, texts: List[str], source: str, target: str) -> Dict[str, str]:
+        folder_id = os.getenv("YANDEX_FOLDER_ID", "")
+        api_key = os.getenv("YANDEX_API_KEY", "")
+        if not folder_id or not api_key:
+            return {}
+        breaker = get_breaker(TRANSLATE)
+        if not breaker.allow():
+            return {}
+
+        with self._lock:
+            self.requests += 1
+        try:
+            resp = get_http_client().post_sync(
+                YANDEX_TRANSLATE_URL,
+                json={
+                    "folderId": folder_id,
+                    "texts": texts,
+                    "sourceLanguageCode": source,
+                    "targetLanguageCode": target,
+                },
+                headers={"Authorization": f"Api-Key {api_key}"},
+                service="translate",
+                timeout=self.timeout,
+            )
+            if resp.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if resp.status != 200:
+                print(f"  ⚠️ Yandex Translate: HTTP {resp.status}")
+                return {}
+            translations = resp.json().get("translations", [])
+        except HttpError as e:
+            breaker.record_failure()
+            print(f"  ⚠️ Yandex Translate: {e}")
+            return {}
+        except Exception as e:
+            print(f"  ⚠️ Yandex Translate: {type(e).__name__}: {e}")
+            return {}
+
+        result = {}
+        for text, item in zip(texts, translations):
+            translated = (item or {}).get("text", "").strip()
+            if translated:
+                result[text] = translated
+        return result
+
+
+# ── Общий экземпляр ──
+
+_service: Optional[TranslationService] = None
+_service_lock = threading.Lock()
+
+
+def get_translation_service() -> TranslationService:
+    """Общий сервис перевода (персистентный кэш — если доступна БД)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            store = None
+            try:
+                from app.services.cache.sqlite_store import get_store
+                store = get_store()
+            except Exception as e:
+                print(f"  ⚠️ Кэш переводов только в памяти: {type(e).__name__}: {e}")
+            _service = TranslationService(store=store)
+        return _service
+
+
+def translate_texts(texts: Iterable[str], source: str, target: str) -> Dict[str, str]:
+    """Пакетный перевод через общий сервис."""
+    return get_translation_service().translate_many(texts, source, target)
@@ -0,0 +1,107 @@
+"""
+utils/deadline.py — Бюджет времени прогона пайплайна.
+
+Поиск ФК-параметров, инструкций и реквизитов организаций вместе может
+занимать больше 10 минут. Deadline задаёт общий бюджет (time_budget_s
+в PipelineInput / GenerateRequest) и передаётся агентам и поисковым
+функциям:
+
+  - этап получает свою долю оставшегося времени (slice);
+  - когда доля исчерпана, этап не начинает новых обращений к upstream
+    и возвращает лучшее из уже найденного;
+  - пропущенные этапы записываются (record_shortfall) и попадают
+    в sources результата как "budget_exhausted:<этап>".
+
+Deadline(None) — без ограничений: все проверки всегда проходят.
+
+Использование:
+    from app.utils.deadline import Deadline
+
+    deadline = Deadline(120)
+    pk_deadline = deadline.slice(0.6)
+    for query in queries:
+        if pk_deadline.exhausted("pk_params"):
+            break
+        ...
+"""
+
+import math
+import threading
+import time
+from typing import List, Optional
+
+
+SHORTFALL_PREFIX = "budget_exhausted"
+
+
+class Deadline:
+    """Потокобезопасный дедлайн; доли (slice) делят общий список недоборов."""
+
+    def __init__(self, budget_s: Optional[float] = None, _parent: Optional["Deadline"] = None):
+        self.budget_s = budget_s if budget_s and budget_s > 0 else None
+        self._started = time.monotonic()
+        self._expires_at = self._started + self.budget_s if self.budget_s else None
+        if _parent is not None:
+            self._lock = _parent._lock
+            self._shortfalls = _parent._shortfalls
+            # Доля не может пережить родителя
+            if _parent._expires_at is not None:
+                self._expires_at = min(self._expires_at or math.inf, _parent._expires_at)
+        else:
+            self._lock = threading.Lock()
+            self._shortfalls: List[str] = []
+
+    @property
+    def unlimited(self) -> bool:
+        return self._expires_at is None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def remaining(self) -> float:
+        """Секунд до дедлайна (inf — без ограничений, 0 — истёк)."""
+        if self._expires_at is None:
+            return math.inf
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """Тайм-аут для asyncio.wait / wait_for: None — ждать без ограничений."""
+        remaining = self.remaining()
+        if cap is not None:
+            remaining = min(remaining, cap)
+        return None if remaining == math.inf else remaining
+
+    def slice(self, fraction: float) -> "Deadline":
+        """Доля оставшегося времени для этапа (без ограничений → тоже без)."""
+        if self.unlimited:
+            return Deadline(None, _parent=self)
+        return Deadline(max(self.remaining() * fraction, 0.001), _parent=self)
+
+    # ── Недоборы ──
+
+    def record_shortfall(self, stage: str) -> None:
+        label = f"{SHORTFALL_PREFIX}:{stage}"
+        with self._lock:
+            if label not in self._shortfalls:
+                self._shortfalls.append(label)
+                print(f"  ⏱️ Бюджет времени исчерпан: {stage} — используем найденное")
+
+    def exhausted(self, stage: str) -> bool:
+        """True (и запись недобора), если время этапа вышло."""
+        if not self.expired():
+            return False
+        self.record_shortfall(stage)
+        return True
+
+    @property
+    def shortfalls(self) -> List[str]:
+        with self._lock:
+            return list(self._shortfalls)
+
+
+def ensure_deadline(deadline: Optional[Deadline]) -> Deadline:
+    """None → Deadline без ограничений (чтобы не проверять на None везде)."""
+    return deadline if deadline is not None else Deadline(None)
@@ -9,10 +9,68 @@ utils/drug_info_parser.py — Парсер инструкции к препар
 Без LLM — регулярные выражения на структурированном HTML.
 """
 
+import asyncio
 import re
 import logging
-from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Dict, Any, List, Tuple
+
+# Дисковый кэш страниц инструкций (ETag/Last-Modified, LRU, 404-кэш)
+try:
+    from app.utils.page_cache import get_page_cache
+except ImportError:
+    try:
+        from page_cache import get_page_cache
+    except ImportError:
+        def get_page_cache():
+            return None
+
+# Объединение одинаковых одновременных запросов (один препарат в нескольких пайплайнах)
+try:
+    from app.services.cache.single_flight import (
+        single_flight, normalize_key, deadline_wait, deadline_shareable,
+    )
+except ImportError:
+    def single_flight(key_fn, name=None, **options):
+        return lambda fn: fn
+    def normalize_key(*parts):
+        return "|".join((p or "").lower().strip() for p in parts)
+    deadline_wait = deadline_shareable = None
+
+
+# Предохранители по хостам: лежащий vidal.ru / rlsnet.ru не тормозит поиск тайм-аутами
+try:
+    from app.services.circuit_breaker import get_breaker, host_breaker_name
+except ImportError:
+    try:
+        from circuit_breaker import get_breaker, host_breaker_name
+    except ImportError:
+        get_breaker = None
+
+
+# Общий HTTP-клиент процесса (keep-alive пул, тайм-аут сервиса "instructions")
+try:
+    from app.services.http_client import get_http_client, HttpError
+except ImportError:
+    from http_client import get_http_client, HttpError
+
+
+# Бюджет времени прогона
+try:
+    from app.utils.deadline import Deadline, ensure_deadline
+except ImportError:
+    from deadline import Deadline, ensure_deadline
+
+
+# Локальный реестр ГРЛС: держатель и номер РУ без запросов к grls.rosminzdrav.ru
+try:
+    from app.services.search.grls_registry import lookup_product as grls_lookup_product
+except ImportError:
+    grls_lookup_product = None
+
+
+def _drug_flight_key(drug_name: str = "", inn: str = "", dosage: str = "", *args, **kwargs) -> str:
+    return normalize_key(drug_name, inn, dosage)
 
 logger = logging.getLogger(__name__)
 
@@ -443,10 +501,29 @@ def drug_info_to_dict(info: DrugInfo) -> Dict[str, str]:
 
 # ── Поиск и fetch (async-обёртка) ──
 
+# Сколько страниц инструкций загружаются одновременно
+try:
+    from app.config.settings import settings
+    DRUG_INFO_CONCURRENCY = max(1, settings.DRUG_INFO_CONCURRENCY)
+except ImportError:
+    DRUG_INFO_CONCURRENCY = 4
+
+_BROWSER_UA = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+@single_flight(
+    _drug_flight_key, name="fetch_drug_info",
+    wait_timeout=deadline_wait, shareable=deadline_shareable,
+)
 async def fetch_drug_info(
     drug_name: str,
     inn: str = "",
     dosage: str = "",
+    concurrency: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
 ) -> DrugInfo:
     """
     Ищет и парсит инструкцию к препарату из интернета.
@@ -457,15 +534,97 @@ async def fetch_drug_info(
     3. vidal.ru по МНН
     4. vidal.ru поиск по сайту
     5. rlsnet.ru поиск
+
+    Препарат есть в локальном реестре ГРЛС — страницы grls.rosminzdrav.ru
+    не запрашиваются, держатель и номер РУ берутся из реестра (если
+    инструкция их не дала).
+
+    Страницы загружаются параллельно (не более concurrency одновременно,
+    по умолчанию DRUG_INFO_CONCURRENCY), но сливаются в порядке приоритета —
+    результат тот же, что при последовательном переборе. Как только
+    собраны вспомогательные вещества и условия хранения, оставшиеся
+    запросы отменяются. То же — когда истёк deadline: возвращается
+    собранное из уже загруженных страниц.
     """
-    import aiohttp
+    deadline = ensure_deadline(deadline)
+    registry = _registry_product(drug_name, inn)
+    urls_to_try = _build_candidate_urls(drug_name, inn, skip_grls=registry is not None)
+    semaphore = asyncio.Semaphore(concurrency or DRUG_INFO_CONCURRENCY)
+    best_info = DrugInfo(drug_name=drug_name)
+
+    async def _probe(url: str) -> List[Tuple[DrugInfo, str, bool]]:
+        async with semaphore:
+            return await _probe_url(url, drug_name)
+
+    tasks = [asyncio.ensure_future(_probe(url)) for url in urls_to_try]
+    try:
+        # Сливаем строго по порядку приоритета URL
+        for url, task in zip(urls_to_try, tasks):
+            if not task.done():
+                await asyncio.wait({task}, timeout=deadline.timeout())
+                if not task.done():
+                    deadline.record_shortfall("instruction")
+                    break
+            try:
+                found = task.result()
+            except Exception as e:
+                print(f"    → {url} → {type(e).__name__}: {e}")
+                continue
 
+            for info, page_url, from_search in found:
+                if from_search:
+                    _merge_drug_info(best_info, info)
+                    if info.excipients or info.storage_conditions:
+                        best_info.source_url = page_url
+                        _print_drug_info(best_info)
+                elif _merge_drug_info(best_info, info):
+                    if not best_info.source_url:
+                        best_info.source_url = page_url
+                    print(f"      ✅ excip={bool(info.excipients)}, storage={bool(info.storage_conditions)} ({page_url})")
+
+            # Если собрали excipients и storage — хватит
+            if best_info.excipients and best_info.storage_conditions:
+                break
+    finally:
+        pending = [t for t in tasks if not t.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if registry is not None:
+        _merge_drug_info(best_info, DrugInfo(
+            inn=registry.inn, manufacturer=registry.manufacturer, ru_number=registry.reg_number,
+        ))
+
+    has_any = bool(
+        best_info.excipients or best_info.storage_conditions
+        or best_info.manufacturer or best_info.suggested_sex != "males_only"
+    )
+    if has_any:
+        _print_drug_info(best_info)
+        return best_info
+
+    logger.warning(f"⚠️ Could not fetch drug info for '{drug_name}'")
+    return DrugInfo(drug_name=drug_name)
+
+
+def _registry_product(drug_name: str, inn: str = ""):
+    """РУ из локального реестра ГРЛС (по МНН вместо названия — не ищем)."""
+    if grls_lookup_product is None or not drug_name:
+        return None
+    if inn and drug_name.strip().lower() == inn.strip().lower():
+        return None
+    return grls_lookup_product(drug_name, inn)
+
+
+def _build_candidate_urls(drug_name: str, inn: str = "", skip_grls: bool = False) -> List[str]:
+    """Список URL инструкций в порядке приоритета (без повторов)."""
     clean_name = re.sub(r'[®™©]', '', drug_name).strip()
     clean_name_lower = clean_name.lower()
 
     # Формируем список URL для поиска
     urls_to_try = []
-
     # 1. Vidal по транслитерации торгового названия
     vidal_slug = _transliterate(clean_name_lower)
     urls_to_try.append(f"https://www.vidal.ru/drugs/{vidal_slug}")
@@ -536,15 +695,16 @@ async def fetch_drug_info(
                 f"https://www.rlsnet.ru/active-substance/{inn_en_slug}"
             )
 
-    # 8. ГРЛС (Государственный реестр лекарственных средств)
-    if inn:
+    # 8. ГРЛС (Государственный реестр лекарственных средств) — если нет в локальном реестре
+    if inn and not skip_grls:
         inn_encoded = inn.replace(' ', '+')
         urls_to_try.append(
             f"https://grls.rosminzdrav.ru/Grls_View_v2.aspx?routingGuid=&t=&q={inn_encoded}"
         )
-    urls_to_try.append(
-        f"https://grls.rosminzdrav.ru/Grls_View_v2.aspx?routingGuid=&t=&q={clean_name.replace(' ', '+')}"
-    )
+    if not skip_grls:
+        urls_to_try.append(
+            f"https://grls.rosminzdrav.ru/Grls_View_v2.aspx?routingGuid=&t=&q={clean_name.replace(' ', '+')}"
+        )
 
     # 6. RLS
     urls_to_try.append(
@@ -563,84 +723,140 @@ async def fetch_drug_info(
             f"https://etabl.ru/search/?query={inn_clean.replace(' ', '+')}"
         )
 
-    best_info = DrugInfo(drug_name=drug_name)
+    # Дубликаты (например, одинаковые slug МНН) не запрашиваем дважды
+    unique_urls = []
+    for url in urls_to_try:
+        if url not in unique_urls:
+            unique_urls.append(url)
+    return unique_urls
 
-    async with aiohttp.ClientSession() as session:
-        for url in urls_to_try:
-            try:
-                async with session.get(
-                    url,
-                    timeout=aiohttp.ClientTimeout(total=15),
-                    headers={"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"},
-                    allow_redirects=True,
-                ) as resp:
-                    print(f"    → {url} → HTTP {resp.status}")
-                    if resp.status != 200:
-                        continue
-
-                    text = await resp.text()
-
-                    # Если это страница поиска — извлекаем ссылку
-                    if '/search' in url:
-                        if 'vidal.ru' in url:
-                            drug_links = re.findall(
-                                r'href="(/drugs/[a-z0-9_-]+)"', text, re.IGNORECASE
-                            )
-                            seen = set()
-                            for link in drug_links:
-                                if link not in seen and '/drugs/' in link:
-                                    seen.add(link)
-                                    drug_url = f"https://www.vidal.ru{link}"
-                                    print(f"      → Найдена ссылка: {drug_url}")
-                                    try:
-                                        async with session.get(
-                                            drug_url,
-                                            timeout=aiohttp.ClientTimeout(total=15),
-                                            headers={"User-Agent": "Mozilla/5.0 (Macintosh)"},
-                                            allow_redirects=True,
-                                        ) as dr:
-                                            if dr.status == 200:
-                                                plain = _strip_html(await dr.text())
-                                                if len(plain) > 500:
-                                                    info = parse_drug_info_from_text(plain, drug_name)
-                                                    _merge_drug_info(best_info, info)
-                                                    if info.excipients or info.storage_conditions:
-                                                        best_info.source_url = str(dr.url)
-                                                        _print_drug_info(best_info)
-                                    except Exception:
-                                        pass
-                                    if len(seen) >= 2:
-                                        break
-                        continue
-
-                    plain = _strip_html(text)
-                    if len(plain) < 300:
-                        continue
-                    info = parse_drug_info_from_text(plain, drug_name)
-                    has_new = _merge_drug_info(best_info, info)
-                    if has_new:
-                        if not best_info.source_url:
-                            best_info.source_url = str(resp.url)
-                        print(f"      ✅ excip={bool(info.excipients)}, storage={bool(info.storage_conditions)} ({resp.url})")
-            except Exception as e:
-                print(f"    → {url} → {type(e).__name__}: {e}")
-                continue
 
-            # Если собрали excipients и storage — хватит
-            if best_info.excipients and best_info.storage_conditions:
-                break
+async def _fetch_page(url: str, headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Загружает страницу через дисковый кэш (utils/page_cache.py).
 
-    has_any = bool(
-        best_info.excipients or best_info.storage_conditions
-        or best_info.manufacturer or best_info.suggested_sex != "males_only"
-    )
-    if has_any:
-        _print_drug_info(best_info)
-        return best_info
+    Returns:
+        {"status", "text" (без HTML), "final_url", "links" (для поиска vidal)}
+        или None при сетевой ошибке / разомкнутом предохранителе хоста.
+    """
+    cache = get_page_cache()
+    entry = cache.get(url) if cache else None
+    if entry and entry["fresh"]:
+        print(f"    → {url} → HTTP {entry['status']} 💾")
+        return entry
+
+    breaker = get_breaker(host_breaker_name(url)) if get_breaker else None
+    if breaker and not breaker.allow():
+        print(f"    → {url} → 🔌 хост недоступен, пропуск")
+        return entry  # устаревшая копия лучше, чем ничего
+
+    request_headers = {"User-Agent": _BROWSER_UA}
+    request_headers.update(headers or {})
+    request_headers.update(cache.conditional_headers(entry) if cache else {})
+    try:
+        resp = await get_http_client().get(
+            url, service="instructions", headers=request_headers, allow_redirects=True,
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        if breaker and isinstance(e, HttpError):
+            breaker.record_failure()
+        print(f"    → {url} → {type(e).__name__}: {e}")
+        return None
+
+    print(f"    → {url} → HTTP {resp.status}")
+    if breaker:
+        if resp.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    if resp.status == 304 and entry:
+        cache.touch(url)
+        return entry
+    if resp.status != 200:
+        if cache:
+            cache.put_not_found(url, resp.status)
+        return {"status": resp.status, "text": "", "final_url": url, "links": []}
+    html = resp.text
+    page = {
+        "status": 200,
+        "text": "" if '/search' in url else _strip_html(html),
+        "final_url": resp.url,
+        "links": _extract_vidal_links(html) if _is_vidal_search(url) else [],
+    }
+    if cache:
+        cache.put(
+            url, text=page["text"], final_url=page["final_url"],
+            etag=resp.headers.get("ETag", ""),
+            last_modified=resp.headers.get("Last-Modified", ""),
+            links=page["links"],
+        )
+    return page
 
-    logger.warning(f"⚠️ Could not fetch drug info for '{drug_name}'")
-    return DrugInfo(drug_name=drug_name)
+
+def _is_vidal_search(url: str) -> bool:
+    return '/search' in url and 'vidal.ru' in url
+
+
+def _extract_vidal_links(html: str) -> List[str]:
+    """Ссылки на карточки препаратов со страницы поиска vidal.ru (до 2)."""
+    links: List[str] = []
+    for link in re.findall(r'href="(/drugs/[a-z0-9_-]+)"', html, re.IGNORECASE):
+        drug_url = f"https://www.vidal.ru{link}"
+        if drug_url not in links:
+            links.append(drug_url)
+        if len(links) >= 2:
+            break
+    return links
+
+
+def _parse_page(url: str, plain: str, drug_name: str) -> DrugInfo:
+    """parse_drug_info_from_text с кэшированием результата разбора."""
+    cache = get_page_cache()
+    cached = cache.get_parsed(url, drug_name) if cache else None
+    if cached:
+        try:
+            return DrugInfo(**cached)
+        except TypeError:
+            pass  # формат DrugInfo изменился — разбираем заново
+    info = parse_drug_info_from_text(plain, drug_name)
+    if cache:
+        cache.put_parsed(url, drug_name, asdict(info))
+    return info
+
+
+async def _probe_url(url: str, drug_name: str) -> List[Tuple[DrugInfo, str, bool]]:
+    """
+    Загружает одну страницу-кандидат.
+
+    Returns:
+        [(DrugInfo, url страницы, из поиска vidal?)] — пусто, если страница
+        не найдена или слишком короткая. Для страницы поиска vidal.ru
+        загружаются до 2 найденных карточек препарата.
+    """
+    found: List[Tuple[DrugInfo, str, bool]] = []
+    page = await _fetch_page(url)
+    if not page or page["status"] != 200:
+        return found
+
+    # Если это страница поиска — извлекаем ссылку
+    if '/search' in url:
+        for drug_url in page.get("links") or []:
+            print(f"      → Найдена ссылка: {drug_url}")
+            drug_page = await _fetch_page(
+                drug_url, headers={"User-Agent": "Mozilla/5.0 (Macintosh)"},
+            )
+            if drug_page and drug_page["status"] == 200 and len(drug_page["text"]) > 500:
+                info = _parse_page(drug_url, drug_page["text"], drug_name)
+                found.append((info, drug_page["final_url"], True))
+        return found
+
+    plain = page["text"]
+    if len(plain) < 300:
+        return found
+    found.append((_parse_page(url, plain, drug_name), page["final_url"], False))
+    return found
 
 
 def _merge_drug_info(target: DrugInfo, source: DrugInfo) -> bool:
@@ -681,24 +897,48 @@ def fetch_drug_info_sync(
 ) -> DrugInfo:
     """
     Синхронная версия — парсит из уже загруженного текста
-    или пытается загрузить через requests.
+    или пытается загрузить через общий HTTP-клиент.
     """
     if page_text:
         plain = _strip_html(page_text)
         return parse_drug_info_from_text(plain, drug_name)
 
     try:
-        import requests
         clean_name = re.sub(r'[®™©]', '', drug_name).strip()
         vidal_slug = _transliterate(clean_name.lower())
         url = f"https://www.vidal.ru/drugs/{vidal_slug}"
 
-        resp = requests.get(url, timeout=15)
-        if resp.status_code == 200:
+        cache = get_page_cache()
+        entry = cache.get(url) if cache else None
+        if entry and entry["fresh"]:
+            if entry["status"] != 200:
+                return DrugInfo(drug_name=drug_name)
+            info = _parse_page(url, entry["text"], drug_name)
+            info.source_url = url
+            return info
+
+        resp = get_http_client().get_sync(
+            url, service="instructions",
+            headers=cache.conditional_headers(entry) if cache else None,
+        )
+        if resp.status == 304 and entry:
+            cache.touch(url)
+            info = _parse_page(url, entry["text"], drug_name)
+            info.source_url = url
+            return info
+        if resp.status == 200:
             plain = _strip_html(resp.text)
-            info = parse_drug_info_from_text(plain, drug_name)
+            if cache:
+                cache.put(
+                    url, text=plain, final_url=resp.url,
+                    etag=resp.headers.get("ETag", ""),
+                    last_modified=resp.headers.get("Last-Modified", ""),
+                )
+            info = _parse_page(url, plain, drug_name)
             info.source_url = url
             return info
+        if cache:
+            cache.put_not_found(url, resp.status)
     except Exception as e:
         logger.debug(f"Sync fetch failed: {e}")
 
@@ -0,0 +1,249 @@
+"""
+utils/inn_dictionary.py — Локальный словарь МНН для автодополнения и ru→en.
+
+Словарь загружается из data/inn_dictionary.json (settings.INN_DICTIONARY_PATH):
+
+    {"entries": [
+        {"ru": "Амлодипин", "en": "Amlodipine",
+         "salt_forms": ["амлодипина безилат"], "trade_names": ["Норваск"],
+         "aliases": [...]},
+        ...
+    ]}
+
+и компилируется в отсортированный массив ключей (ru, en, родительный
+падеж, соли, торговые названия, отдельные слова составных МНН).
+Поиск по префиксу — bisect, без сети; при опечатке — ограниченное
+расстояние Левенштейна до префикса ключа.
+
+Использование:
+    from app.utils.inn_dictionary import get_inn_dictionary
+
+    get_inn_dictionary().complete("амлод")   # [{"ru": "Амлодипин", "en": "Amlodipine"}]
+    get_inn_dictionary().lookup("амлодипина безилат").en  # "Amlodipine"
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_DICTIONARY_PATH = os.path.join("data", "inn_dictionary.json")
+
+# Вид ключа → приоритет в выдаче (меньше — выше)
+KIND_NAME = 0      # ru / en
+KIND_ALIAS = 1     # родительный падеж, соли, синонимы
+KIND_TRADE = 2     # торговое название
+KIND_WORD = 3      # отдельное слово составного МНН ("алафенамид")
+
+
+def normalize_name(text: str) -> str:
+    """Ключ словаря: нижний регистр, ё → е, без ®™ и лишних пробелов."""
+    text = (text or "").lower().replace("ё", "е")
+    text = re.sub(r'[®™©«»"]', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _genitive(name: str) -> str:
+    """Родительный падеж последнего слова: амлодипин → амлодипина."""
+    words = name.split()
+    if not words:
+        return name
+    last = words[-1]
+    if last.endswith(("й", "ь")):
+        last = last[:-1] + "я"
+    elif last.endswith("а"):
+        last = last[:-1] + "ы"
+    elif re.search(r'[бвгджзклмнпрстфхцчшщ]$', last):
+        last += "а"
+    return " ".join(words[:-1] + [last])
+
+
+def _prefix_distance(query: str, key: str, max_d: int) -> int:
+    """
+    Расстояние Левенштейна от query до ближайшего префикса key.
+    Считается с отсечением: больше max_d → max_d + 1.
+    """
+    key = key[:len(query) + max_d]
+    prev = list(range(len(key) + 1))
+    for i, qc in enumerate(query, 1):
+        cur = [i] + [0] * len(key)
+        row_min = i
+        for j, kc in enumerate(key, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (qc != kc))
+            if cur[j] < row_min:
+                row_min = cur[j]
+        if row_min > max_d:
+            return max_d + 1
+        prev = cur
+    return min(prev)
+
+
+@dataclass
+class InnEntry:
+    """Одна запись словаря."""
+    ru: str
+    en: str
+    salt_forms: List[str] = field(default_factory=list)
+    trade_names: List[str] = field(default_factory=list)
+    aliases: List[str] = field(default_factory=list)
+
+    def to_suggestion(self, trade_name: str = "") -> Dict[str, str]:
+        """Формат ответа /api/dictionaries/inn."""
+        item = {"ru": self.ru, "en": self.en}
+        if trade_name:
+            item["trade"] = trade_name
+        return item
+
+
+class InnDictionary:
+    """Неизменяемый индекс МНН: отсортированные ключи + bisect."""
+
+    def __init__(self, entries: List[InnEntry]):
+        self.entries = list(entries)
+        refs: Dict[str, Tuple[int, int, str]] = {}  # ключ → (kind, idx, отображаемое имя)
+
+        def add(key: str, kind: int, idx: int, display: str = "") -> None:
+            key = normalize_name(key)
+            if key and (key not in refs or refs[key][:2] > (kind, idx)):
+                refs[key] = (kind, idx, display)
+
+        for idx, entry in enumerate(self.entries):
+            names = [entry.ru, entry.en]
+            for name in names:
+                add(name, KIND_NAME, idx)
+            add(_genitive(normalize_name(entry.ru)), KIND_ALIAS, idx)
+            for alias in entry.aliases + entry.salt_forms:
+                add(alias, KIND_ALIAS, idx)
+            for trade in entry.trade_names:
+                add(trade, KIND_TRADE, idx, trade)
+            # Слова составных МНН: "алафенамид" → тенофовира алафенамид
+            for name in names + entry.salt_forms:
+                words = normalize_name(name).replace("+", " ").split()
+                for word in words[1:]:
+                    if len(word) >= 4:
+                        add(word, KIND_WORD, idx)
+
+        self._keys = sorted(refs)
+        self._refs = [refs[k] for k in self._keys]
+        # Для нечёткого поиска — только полноценные имена, без слов-хвостов,
+        # сгруппированные по первому и второму символу
+        self._fuzzy_first: Dict[str, List[Tuple[str, Tuple[int, int, str]]]] = {}
+        self._fuzzy_second: Dict[str, List[Tuple[str, Tuple[int, int, str]]]] = {}
+        for key, ref in zip(self._keys, self._refs):
+            if ref[0] == KIND_WORD or len(key) < 2:
+                continue
+            self._fuzzy_first.setdefault(key[0], []).append((key, ref))
+            if key[1] != key[0]:
+                self._fuzzy_second.setdefault(key[1], []).append((key, ref))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def top(self, limit: int = 10) -> List[Dict[str, str]]:
+        """Первые записи файла (самые популярные МНН)."""
+        return [e.to_suggestion() for e in self.entries[:limit]]
+
+    def lookup(self, name: str) -> Optional[InnEntry]:
+        """Точное совпадение по ru / en / родительному падежу / соли."""
+        key = normalize_name(name)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            kind, idx, _ = self._refs[i]
+            if kind in (KIND_NAME, KIND_ALIAS):
+                return self.entries[idx]
+        return None
+
+    def lookup_trade(self, name: str) -> Optional[InnEntry]:
+        """МНН по торговому названию."""
+        key = normalize_name(name)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key and self._refs[i][0] == KIND_TRADE:
+            return self.entries[self._refs[i][1]]
+        return None
+
+    def complete(self, query: str, limit: int = 10, typos: bool = True) -> List[Dict[str, str]]:
+        """
+        Подсказки по префиксу; если совпадений нет — нечёткий поиск
+        (1 опечатка до 8 символов, 2 — длиннее).
+        """
+        q = normalize_name(query)
+        if not q:
+            return self.top(limit)
+
+        found: Dict[int, Tuple[int, int, str]] = {}  # idx → (kind, rank, trade)
+        i = bisect.bisect_left(self._keys, q)
+        while i < len(self._keys) and self._keys[i].startswith(q):
+            kind, idx, display = self._refs[i]
+            if idx not in found or found[idx][0] > kind:
+                found[idx] = (kind, 0, display)
+            i += 1
+
+        if typos and not found and len(q) >= 4:
+            max_d = 1 if len(q) < 8 else 2
+            # Опечатка сразу в обоих первых символах маловероятна:
+            # кандидаты — ключи с тем же первым или тем же вторым символом
+            candidates = self._fuzzy_first.get(q[0], []) + [
+                item for item in self._fuzzy_second.get(q[1], []) if item[0][0] != q[0]
+            ]
+            for key, (kind, idx, display) in candidates:
+                dist = _prefix_distance(q, key, max_d)
+                if dist <= max_d and (idx not in found or found[idx][1:2] > (dist,)):
+                    found[idx] = (kind, dist, display)
+
+        ranked = sorted(found.items(), key=lambda item: (item[1][1], item[1][0], item[0]))
+        return [
+            self.entries[idx].to_suggestion(display if kind == KIND_TRADE else "")
+            for idx, (kind, _, display) in ranked[:limit]
+        ]
+
+
+def load_inn_dictionary(path: str = DEFAULT_DICTIONARY_PATH) -> InnDictionary:
+    """Загружает словарь из JSON. Нет файла / битый файл — пустой словарь."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  ⚠️ Словарь МНН не загружен ({path}): {e}")
+        return InnDictionary([])
+
+    entries = []
+    for raw in data.get("entries", []) if isinstance(data, dict) else data:
+        if not isinstance(raw, dict) or not raw.get("ru") or not raw.get("en"):
+            continue
+        entries.append(InnEntry(
+            ru=raw["ru"],
+            en=raw["en"],
+            salt_forms=list(raw.get("salt_forms", [])),
+            trade_names=list(raw.get("trade_names", [])),
+            aliases=list(raw.get("aliases", [])),
+        ))
+    return InnDictionary(entries)
+
+
+# ── Общий экземпляр ──
+
+_dictionary: Optional[InnDictionary] = None
+_dictionary_lock = threading.Lock()
+
+
+def get_inn_dictionary() -> InnDictionary:
+    """Общий словарь процесса (ленивая загрузка из settings.INN_DICTIONARY_PATH)."""
+    global _dictionary
+    with _dictionary_lock:
+        if _dictionary is None:
+            try:
+                from app.config.settings import settings
+                path = settings.INN_DICTIONARY_PATH
+            except ImportError:
+                path = DEFAULT_DICTIONARY_PATH
+            if not os.path.isabs(path) and not os.path.exists(path):
+                # Запуск не из корня проекта — ищем рядом с пакетом
+                root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+                path = os.path.join(root, path)
+            _dictionary = load_inn_dictionary(path)
+            print(f"  📖 Словарь МНН: {len(_dictionary)} записей")
+        return _dictionary
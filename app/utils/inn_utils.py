@@ -13,7 +13,24 @@ inn_utils.py — Нормализация МНН (INN) для поиска ФК-
 """
 
 import re
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Пакетный перевод с персистентным кэшем (services/translate)
+try:
+    from app.services.translate.yandex_translate import translate_texts
+except ImportError:
+    def translate_texts(texts, source, target):
+        return {}  # без сервиса перевода — только словарь и транслитерация
+
+
+# Локальный словарь МНН (data/inn_dictionary.json)
+try:
+    from app.utils.inn_dictionary import get_inn_dictionary
+except ImportError:
+    try:
+        from inn_dictionary import get_inn_dictionary
+    except ImportError:
+        get_inn_dictionary = None
 
 
 # ─── Маппинг популярных МНН ru→en ───
@@ -277,13 +294,69 @@ def resolve_inn_en(inn_ru: str) -> str:
     Резолвит русский МНН в английский INN.
 
     Стратегия:
-    1. Маппинг (мгновенно, без сети)
-    2. Yandex Translate API (точный перевод)
+    1. Словарь data/inn_dictionary.json и маппинг (мгновенно, без сети)
+    2. Yandex Translate API (точный перевод, кэшируется на диске)
     3. INN-транслитерация (offline fallback)
+
+    Комбинация "А + Б + В" резолвится покомпонентно — все компоненты,
+    которых нет в маппинге, переводятся одним запросом.
     """
     key = inn_ru.strip().lower()
+    if not key:
+        return ""
+
+    if "+" in key:
+        parts = [p.strip() for p in key.split("+") if p.strip()]
+        resolved = resolve_inn_en_many(parts)
+        if parts and all(resolved.get(p) for p in parts):
+            return " + ".join(resolved[p] for p in parts)
+
+    return resolve_inn_en_many([key]).get(key, "")
+
+
+def resolve_inn_en_many(inns_ru: Iterable[str]) -> Dict[str, str]:
+    """
+    Пакетный resolve_inn_en: {русский МНН: английский INN}.
+
+    Всё, чего нет в маппинге, уходит в Yandex Translate одним запросом.
+    """
+    result: Dict[str, str] = {}
+    to_translate: Dict[str, List[str]] = {}  # базовое МНН → исходные строки
+
+    for inn_ru in inns_ru:
+        key = (inn_ru or "").strip().lower()
+        if not key:
+            continue
+        mapped = _lookup_inn_map(key)
+        if mapped:
+            result[inn_ru] = mapped
+        else:
+            to_translate.setdefault(strip_salt_ru(key), []).append(inn_ru)
+
+    if to_translate:
+        translated = _translate_yandex_many(list(to_translate))
+        for key_base, originals in to_translate.items():
+            # INN-транслитерация (offline fallback)
+            inn_en = translated.get(key_base) or _inn_transliterate(key_base)
+            for original in originals:
+                if inn_en:
+                    result[original] = inn_en
+
+    return result
+
+
+def _lookup_inn_map(key: str) -> str:
+    """
+    Поиск без сети: словарь МНН (ru, соли, родительный падеж, торговые
+    названия) → маппинг как есть → без соли → без окончания «-а».
+    """
+    if get_inn_dictionary is not None:
+        dictionary = get_inn_dictionary()
+        entry = (dictionary.lookup(key) or dictionary.lookup(strip_salt_ru(key))
+                 or dictionary.lookup_trade(key))
+        if entry:
+            return entry.en.lower()
 
-    # 1. Прямой маппинг
     if key in _INN_RU_TO_EN:
         return _INN_RU_TO_EN[key]
 
@@ -297,18 +370,6 @@ def resolve_inn_en(inn_ru: str) -> str:
         if key_no_a in _INN_RU_TO_EN:
             return _INN_RU_TO_EN[key_no_a]
 
-    # 2. Yandex Translate API
-    translated = _translate_yandex(key_base)
-    if translated:
-        # Кэшируем в маппинг для будущих вызовов
-        _INN_RU_TO_EN[key_base] = translated
-        return translated
-
-    # 3. INN-транслитерация (offline fallback)
-    transliterated = _inn_transliterate(key_base)
-    if transliterated:
-        return transliterated
-
     return ""
 
 
@@ -319,40 +380,19 @@ def _translate_yandex(text: str) -> str:
     Использует тот же YANDEX_FOLDER_ID / YANDEX_API_KEY
     что и Yandex Search.
     """
-    import os
-    folder_id = os.getenv("YANDEX_FOLDER_ID", "")
-    api_key = os.getenv("YANDEX_API_KEY", "")
-
-    if not folder_id or not api_key:
-        return ""
+    return _translate_yandex_many([text]).get(text, "")
 
-    try:
-        import requests
-        resp = requests.post(
-            "https://translate.api.cloud.yandex.net/translate/v2/translate",
-            json={
-                "folderId": folder_id,
-                "texts": [text],
-                "sourceLanguageCode": "ru",
-                "targetLanguageCode": "en",
-            },
-            headers={"Authorization": f"Api-Key {api_key}"},
-            timeout=10,
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            translations = data.get("translations", [])
-            if translations:
-                result = translations[0].get("text", "").strip().lower()
-                # Убираем артикли и лишнее
-                result = re.sub(r'^(the|a|an)\s+', '', result)
-                if result and result != text:
-                    return result
-    except Exception as e:
-        # Тихо падаем — перейдём к транслитерации
-        pass
 
-    return ""
+def _translate_yandex_many(texts: List[str]) -> Dict[str, str]:
+    """Пакетный перевод МНН ru→en (нижний регистр, без артиклей)."""
+    result = {}
+    for text, translated in translate_texts(texts, "ru", "en").items():
+        translated = translated.strip().lower()
+        # Убираем артикли и лишнее
+        translated = re.sub(r'^(the|a|an)\s+', '', translated)
+        if translated and translated != text:
+            result[text] = translated
+    return result
 
 
 def _inn_transliterate(inn_ru: str) -> str:
@@ -616,33 +656,30 @@ def _translit_en_to_ru(text: str) -> str:
 
 def _translate_word(text: str) -> str:
     """Переводит слово/фразу EN→RU через Yandex Translate (для стран)."""
-    import os
-    folder_id = os.getenv("YANDEX_FOLDER_ID", "")
-    api_key = os.getenv("YANDEX_API_KEY", "")
-    if not folder_id or not api_key:
-        return _translit_en_to_ru(text)
-    try:
-        import requests as _req
-        resp = _req.post(
-            "https://translate.api.cloud.yandex.net/translate/v2/translate",
-            json={
-                "folderId": folder_id,
-                "texts": [text.strip()],
-                "sourceLanguageCode": "en",
-                "targetLanguageCode": "ru",
-            },
-            headers={"Authorization": f"Api-Key {api_key}"},
-            timeout=10,
-        )
-        if resp.status_code == 200:
-            tr = resp.json().get("translations", [])
-            if tr:
-                result = tr[0].get("text", "").strip()
-                if result:
-                    return result
-    except Exception:
-        pass
-    return _translit_en_to_ru(text)
+    text = text.strip()
+    translated = translate_texts([text], "en", "ru").get(text, "")
+    return translated or _translit_en_to_ru(text)
+
+
+def _has_latin(text: str) -> bool:
+    return any('a' <= c.lower() <= 'z' for c in text)
+
+
+def ensure_russian_texts(texts: List[str]) -> List[str]:
+    """
+    Пакетный ensure_russian_text: страны из всех строк переводятся
+    одним запросом к Yandex Translate, затем каждая строка обрабатывается
+    как обычно (переводы уже в кэше).
+    """
+    countries = []
+    for text in texts:
+        if text and "," in text:
+            country_part = text[text.rfind(",") + 1:].strip()
+            if _has_latin(country_part):
+                countries.append(country_part)
+    if countries:
+        translate_texts(countries, "en", "ru")
+    return [ensure_russian_text(text) for text in texts]
 
 
 def ensure_russian_text(text: str) -> str:
@@ -0,0 +1,342 @@
+"""
+utils/page_cache.py — Дисковый кэш страниц инструкций (vidal, rlsnet, medi, ГРЛС).
+
+Инструкции меняются редко, поэтому fetch_drug_info не скачивает их заново:
+
+  data/page_cache/
+  ├── meta/<sha256(url)>.json     # статус, ETag, Last-Modified, ссылки, DrugInfo
+  └── blobs/<sha256(text)>.txt    # очищенный текст страницы (_strip_html)
+
+Текст хранится по хэшу содержимого: одинаковые страницы (редиректы,
+зеркала) занимают место один раз.
+
+Правила:
+  - свежая запись (моложе PAGE_CACHE_TTL_DAYS) → сеть не нужна;
+  - устаревшая → условный запрос (If-None-Match / If-Modified-Since),
+    304 продлевает запись;
+  - 404/410 кэшируются отдельно (PAGE_CACHE_NEGATIVE_TTL_DAYS) — slug'и
+    из _transliterate, которых нет на сайте, не запрашиваются повторно;
+  - общий размер ограничен PAGE_CACHE_MAX_MB, вытесняются давно
+    не читанные страницы (LRU по времени доступа); записи вытесненных
+    страниц и истёкшие 404/410 удаляются в том же проходе.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+
+DEFAULT_CACHE_DIR = os.path.join("data", "page_cache")
+
+# Статусы, которые кэшируем как «страницы нет»
+NEGATIVE_STATUSES = (404, 410)
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """Потокобезопасный дисковый кэш HTTP-страниц."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = 200 * 1024 * 1024,
+        ttl_s: float = 14 * 86400,
+        negative_ttl_s: float = 7 * 86400,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self._meta_dir = os.path.join(root, "meta")
+        self._blob_dir = os.path.join(root, "blobs")
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        os.makedirs(self._meta_dir, exist_ok=True)
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+    # ── Пути ──
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self._meta_dir, f"{_sha256(url)}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blob_dir, f"{digest}.txt")
+
+    def _read_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        path = self._meta_path(url)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # ── Чтение ──
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Запись для URL или None.
+
+        Поля: status, final_url, etag, last_modified, fetched_at, links,
+              text (для 200), fresh (можно ли не ходить в сеть).
+        """
+        with self._lock:
+            meta = self._read_meta(url)
+            if meta is None:
+                return None
+
+            age = time.time() - meta.get("fetched_at", 0)
+            status = meta.get("status", 0)
+
+            if status in NEGATIVE_STATUSES:
+                if age > self.negative_ttl_s:
+                    self._remove_meta(url)
+                    return None
+                meta["fresh"] = True
+                meta["text"] = ""
+                return meta
+
+            digest = meta.get("blob")
+            text = ""
+            if digest:
+                blob = self._blob_path(digest)
+                try:
+                    with open(blob, encoding="utf-8") as f:
+                        text = f.read()
+                    os.utime(blob)  # время доступа для LRU
+                except OSError:
+                    # Текст вытеснен — запись бесполезна
+                    self._remove_meta(url)
+                    return None
+
+            meta["text"] = text
+            meta["fresh"] = age <= self.ttl_s
+            return meta
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Заголовки для revalidation устаревшей записи."""
+        headers: Dict[str, str] = {}
+        if not entry or entry.get("status") != 200:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def get_parsed(self, url: str, drug_name: str) -> Optional[Dict[str, Any]]:
+        """Ранее разобранный DrugInfo (asdict) для страницы и названия."""
+        with self._lock:
+            meta = self._read_meta(url)
+        if not meta:
+            return None
+        return (meta.get("parsed") or {}).get(drug_name)
+
+    # ── Запись ──
+
+    def put(
+        self,
+        url: str,
+        text: str = "",
+        final_url: str = "",
+        etag: str = "",
+        last_modified: str = "",
+        links: Optional[List[str]] = None,
+    ) -> None:
+        """Сохраняет успешный ответ (200): очищенный текст + заголовки."""
+        digest = _sha256(text) if text else ""
+        with self._lock:
+            if digest:
+                blob = self._blob_path(digest)
+                if not os.path.exists(blob):
+                    tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        f.write(text)
+                    os.replace(tmp, blob)
+                else:
+                    os.utime(blob)
+
+            old = self._read_meta(url) or {}
+            # Разобранный DrugInfo валиден, только пока текст не изменился
+            parsed = old.get("parsed", {}) if old.get("blob") == digest else {}
+            self._write_meta(url, {
+                "url": url,
+                "status": 200,
+                "final_url": final_url or url,
+                "etag": etag or "",
+                "last_modified": last_modified or "",
+                "fetched_at": time.time(),
+                "blob": digest,
+                "links": links or [],
+                "parsed": parsed,
+            })
+            self._maybe_evict_locked()
+
+    def put_not_found(self, url: str, status: int = 404) -> None:
+        """Негативный кэш: страницы нет (404/410)."""
+        if status not in NEGATIVE_STATUSES:
+            return
+        with self._lock:
+            self._write_meta(url, {
+                "url": url,
+                "status": status,
+                "fetched_at": time.time(),
+            })
+            self._maybe_evict_locked()
+
+    def touch(self, url: str) -> None:
+        """Ответ 304 — запись снова свежая."""
+        with self._lock:
+            meta = self._read_meta(url)
+            if meta is None:
+                return
+            meta["fetched_at"] = time.time()
+            self._write_meta(url, meta)
+
+    def put_parsed(self, url: str, drug_name: str, info: Dict[str, Any]) -> None:
+        """Сохраняет разобранный DrugInfo рядом со страницей."""
+        with self._lock:
+            meta = self._read_meta(url)
+            if meta is None or meta.get("status") != 200:
+                return
+            meta.setdefault("parsed", {})[drug_name] = info
+            self._write_meta(url, meta)
+
+    # ── Обслуживание ──
+
+    def _remove_meta(self, url: str) -> None:
+        try:
+            os.remove(self._meta_path(url))
+        except OSError:
+            pass
+
+    def _maybe_evict_locked(self) -> None:
+        """Обслуживание раз в 20 записей (страниц и 404/410)."""
+        self._puts_since_evict += 1
+        if self._puts_since_evict >= 20:
+            self._puts_since_evict = 0
+            self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        """
+        LRU-вытеснение текстов сверх max_bytes (до 90% лимита), затем
+        удаление записей, чей текст вытеснен, и истёкших 404/410.
+        """
+        blobs = []
+        total = 0
+        for entry in os.scandir(self._blob_dir):
+            if not entry.name.endswith(".txt"):
+                continue
+            st = entry.stat()
+            blobs.append((st.st_mtime, st.st_size, entry.path, entry.name[:-4]))
+            total += st.st_size
+
+        removed = 0
+        alive = {digest for _, _, _, digest in blobs}
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            for _, size, path, digest in sorted(blobs):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                    alive.discard(digest)
+                except OSError:
+                    pass
+
+        self._sweep_meta_locked(alive)
+        return removed
+
+    def _sweep_meta_locked(self, alive: Set[str]) -> int:
+        """Удаляет записи без текста (вытеснен) и истёкшие 404/410."""
+        now = time.time()
+        swept = 0
+        for entry in os.scandir(self._meta_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                meta = None
+            if meta is not None:
+                if meta.get("status") in NEGATIVE_STATUSES:
+                    stale = now - meta.get("fetched_at", 0) > self.negative_ttl_s
+                else:
+                    digest = meta.get("blob")
+                    # Текст мог записать другой процесс уже после обхода blobs
+                    stale = (
+                        bool(digest) and digest not in alive
+                        and not os.path.exists(self._blob_path(digest))
+                    )
+                if not stale:
+                    continue
+            try:
+                os.remove(entry.path)
+                swept += 1
+            except OSError:
+                pass
+        return swept
+
+    def evict(self) -> int:
+        """Принудительное вытеснение. Возвращает число удалённых текстов."""
+        with self._lock:
+            return self._evict_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер кэша: число страниц, текстов, байт."""
+        with self._lock:
+            metas = sum(1 for e in os.scandir(self._meta_dir) if e.name.endswith(".json"))
+            blob_sizes = [
+                e.stat().st_size for e in os.scandir(self._blob_dir)
+                if e.name.endswith(".txt")
+            ]
+        return {
+            "pages": metas,
+            "blobs": len(blob_sizes),
+            "bytes": sum(blob_sizes),
+            "max_bytes": self.max_bytes,
+        }
+
+
+# ── Общий экземпляр ──
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Общий кэш страниц (ленивая инициализация из settings).
+    PAGE_CACHE_ENABLED=0 отключает кэш — тогда None.
+    """
+    global _page_cache
+    from app.config.settings import settings
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            try:
+                _page_cache = PageCache(
+                    root=settings.PAGE_CACHE_DIR or DEFAULT_CACHE_DIR,
+                    max_bytes=int(settings.PAGE_CACHE_MAX_MB * 1024 * 1024),
+                    ttl_s=settings.PAGE_CACHE_TTL_DAYS * 86400,
+                    negative_ttl_s=settings.PAGE_CACHE_NEGATIVE_TTL_DAYS * 86400,
+                )
+            except OSError as e:
+                print(f"  ⚠️ Кэш страниц недоступен: {e}")
+                return None
+        return _page_cache
@@ -0,0 +1,106 @@
+"""
+benchmarks/bench_extraction.py — Время разбора ответов GenSearch.
+
+Прогоняет services/pk/extraction.py по сохранённому корпусу ответов
+(benchmarks/corpus/gensearch_answers.jsonl: {"id", "kind", "text"})
+и печатает время полного разбора каждого ответа (все величины:
+CVintra, CI, T½, Tmax, Cmax, источник, поля протокола БЭ).
+
+Запуск (из корня проекта):
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --repeat 200 --corpus my_answers.jsonl
+
+Новые ответы для корпуса удобно сохранять из логов GenSearch
+(answer_text(data)) — по одному JSON-объекту на строку.
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pk.extraction import AnswerExtraction  # noqa: E402
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "gensearch_answers.jsonl")
+
+# Всё, что читают cv_intra и protocol_search
+_FIELDS = (
+    "cv_intra", "ci", "source_name", "t_half_hours", "tmax_hours", "cmax",
+    "not_found", "is_be_study", "nct_id", "pmid", "reported_cv",
+    "enrollment", "subjects", "design", "intake_mode", "quantities",
+)
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_all(text: str) -> AnswerExtraction:
+    """Полный разбор без кэша extract() — честное время одного ответа."""
+    ex = AnswerExtraction(text)
+    for name in _FIELDS:
+        getattr(ex, name)
+    return ex
+
+
+def time_answer(text: str, repeat: int) -> float:
+    """Медианное время разбора, мс."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse_all(text)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора ответов GenSearch")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL с ответами")
+    parser.add_argument("--repeat", type=int, default=50, help="Повторов на ответ")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"Корпус: {args.corpus} ({len(corpus)} ответов), повторов: {args.repeat}\n")
+    print(f"{'id':<28} {'kind':<16} {'симв.':>6} {'мс':>8}  {'вел.':>4}  CVintra  T½, ч")
+    print("-" * 84)
+
+    timings = []
+    # Печать конвертаций единиц внутри разбора не нужна в отчёте
+    rows = []
+    with redirect_stdout(io.StringIO()):
+        for item in corpus:
+            text = item.get("text", "")
+            ms = time_answer(text, args.repeat)
+            rows.append((item, text, ms, parse_all(text)))
+
+    for item, text, ms, ex in rows:
+        timings.append(ms)
+        cv = f"{ex.cv_intra}" if ex.cv_intra is not None else "—"
+        t_half = f"{ex.t_half_hours:g}" if ex.t_half_hours is not None else "—"
+        print(
+            f"{item.get('id', '?')[:28]:<28} {item.get('kind', '')[:16]:<16} "
+            f"{len(text):>6} {ms:>8.3f}  {len(ex.quantities):>4}  {cv:>7}  {t_half}"
+        )
+
+    if timings:
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        total_chars = sum(len(item.get("text", "")) for item in corpus)
+        print("-" * 84)
+        print(
+            f"среднее {statistics.mean(timings):.3f} мс · медиана {statistics.median(timings):.3f} мс · "
+            f"p95 {p95:.3f} мс · макс {max(timings):.3f} мс · "
+            f"{total_chars / max(sum(timings), 1e-9):.0f} симв./мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+import_ctgov.py — Построение локального индекса БЭ-исследований ClinicalTrials.gov.
+
+Читает выгрузку ClinicalTrials.gov с диска, оставляет только исследования
+биоэквивалентности и пишет их в компактный SQLite-индекс
+(services/search/ctgov_index.py), по которому search_existing_protocols
+ищет протоколы без обращения к GenSearch.
+
+Поддерживаемые входы (можно несколько, вперемешку):
+  - ctg-studies.json.zip — выгрузка JSON API v2 (один NCT*.json на исследование);
+  - AllPublicXML.zip — устаревший XML-формат;
+  - каталоги с NCT*.json / NCT*.xml (рекурсивно);
+  - отдельные .json (запись или страница {"studies": [...]}) и .xml.
+
+Повторный импорт обновляет записи (по NCT); --rebuild — индекс с нуля.
+
+Запуск:
+    python import_ctgov.py ~/Downloads/ctg-studies.json.zip
+    python import_ctgov.py AllPublicXML.zip --index data/ctgov_be.db --rebuild
+    python import_ctgov.py exports/ --quiet
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from typing import Iterator, List, Tuple
+
+from app.services.search.ctgov_index import DEFAULT_INDEX_PATH, CTGovIndex, CTStudy, iter_records
+
+
+BATCH_SIZE = 500
+
+
+def iter_files(paths: List[str]) -> Iterator[Tuple[str, bytes]]:
+    """(имя, содержимое) всех .json / .xml из файлов, каталогов и zip-архивов."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    full = os.path.join(root, name)
+                    if name.lower().endswith(".zip"):
+                        yield from iter_files([full])
+                    elif name.lower().endswith((".json", ".xml")):
+                        with open(full, "rb") as f:
+                            yield full, f.read()
+        elif path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith((".json", ".xml")):
+                        yield info.filename, archive.read(info)
+        else:
+            with open(path, "rb") as f:
+                yield path, f.read()
+
+
+def run_import(args) -> int:
+    missing = [p for p in args.paths if not os.path.exists(p)]
+    if missing:
+        print(f"❌ Не найдено: {', '.join(missing)}")
+        return 1
+
+    index = CTGovIndex(args.index)
+    if args.rebuild:
+        index.clear()
+
+    started = time.time()
+    files = errors = 0
+    batch: List[CTStudy] = []
+    found = 0
+    for name, data in iter_files(args.paths):
+        files += 1
+        try:
+            for study in iter_records(name, data):
+                if study is not None:
+                    batch.append(study)
+        except Exception as e:
+            errors += 1
+            if not args.quiet:
+                print(f"  ⚠️  {name}: {type(e).__name__}: {e}")
+        if len(batch) >= BATCH_SIZE:
+            index.add_many(batch)
+            found += len(batch)
+            batch = []
+        if not args.quiet and files % 10000 == 0:
+            print(f"  … файлов {files}, БЭ-исследований {found + len(batch)}")
+    index.add_many(batch)
+    found += len(batch)
+
+    index.finish_import(", ".join(os.path.basename(p.rstrip("/")) for p in args.paths))
+    stats = index.stats()
+    size_mb = os.path.getsize(args.index) / 1e6
+    print(
+        f"✅ Файлов {files}, БЭ-исследований {found} (ошибок {errors}) "
+        f"за {time.time() - started:.0f}с\n"
+        f"   Индекс {args.index}: исследований {stats['studies']}, "
+        f"МНН {stats['inns']}, {size_mb:.1f} МБ"
+    )
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Индекс БЭ-исследований из выгрузки ClinicalTrials.gov",
+    )
+    parser.add_argument("paths", nargs="+", help="zip / каталог / .json / .xml")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help=f"файл индекса (по умолчанию {DEFAULT_INDEX_PATH}, env CTGOV_INDEX_PATH)")
+    parser.add_argument("--rebuild", action="store_true", help="очистить индекс перед импортом")
+    parser.add_argument("--quiet", action="store_true", help="без прогресса и ошибок по файлам")
+    sys.exit(run_import(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
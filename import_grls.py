@@ -0,0 +1,156 @@
+"""
+import_grls.py — Импорт выгрузки ГРЛС в локальный реестр.
+
+Читает выгрузку Государственного реестра лекарственных средств
+(grls.rosminzdrav.ru → «Выгрузка реестра»: zip с .xls, а также .xlsx / .csv)
+и пишет её в SQLite с триграммным индексом (services/search/grls_registry.py).
+Из реестра отвечают /api/dictionaries/reference, /api/dictionaries/manufacturers
+и выбор референтного препарата в пайплайне.
+
+  - выгрузка — полный снимок: записываются только изменившиеся РУ,
+    исчезнувшие удаляются (--append — не удалять, для частичных файлов);
+  - каталог: импортируется самый свежий ещё не импортированный файл;
+    более старые новые файлы отмечаются как пройденные только после того,
+    как он применился. Не разобрался — применяется предыдущий по свежести,
+    а сбойный файл пробуется снова на следующем проходе (--watch);
+  - --watch N — проверять каталог каждые N секунд: положили новую
+    выгрузку — она применится без перезапуска сервера.
+
+.xlsx читается через openpyxl, .xls — через xlrd (pip install openpyxl xlrd).
+
+Запуск:
+    python import_grls.py ~/Downloads/grls2026-10-01.zip
+    python import_grls.py data/grls/                  # новый файл в каталоге
+    python import_grls.py data/grls/ --watch 600      # следить за каталогом
+    python import_grls.py export.csv --append --registry data/grls.db
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+from app.services.search.grls_registry import (
+    DEFAULT_REGISTRY_PATH, REGISTRY_EXTENSIONS, GRLSRegistry, iter_products,
+)
+
+
+def list_files(paths: List[str]) -> List[str]:
+    """Файлы выгрузки из путей (каталоги — без вложенных), от старых к новым."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, n) for n in os.listdir(path)
+                if n.lower().endswith(REGISTRY_EXTENSIONS) and not n.startswith((".", "~$"))
+            )
+        elif os.path.exists(path):
+            files.append(path)
+    return sorted(files, key=os.path.getmtime)
+
+
+def _read(path: str, name: str) -> List:
+    """РУ из файла выгрузки; [] — файл не разобран (причина напечатана)."""
+    try:
+        products = list(iter_products(path))
+    except Exception as e:
+        print(f"  ⚠️  {name}: {type(e).__name__}: {e}")
+        return []
+    if not products:
+        print(f"  ⚠️  {name}: РУ не найдены (нет заголовка «Регистрационный номер»?)")
+    return products
+
+
+def import_new(args, registry: GRLSRegistry) -> int:
+    """Один проход: применяет новые файлы. Returns: число импортированных."""
+    new = []
+    for path in list_files(args.paths):
+        stat = os.stat(path)
+        key = (os.path.basename(path), stat.st_size, stat.st_mtime)
+        if not registry.is_imported(*key):
+            new.append((path, key))
+    if not new:
+        return 0
+
+    # Частичные выгрузки применяются все, от старых к новым;
+    # полные снимки — только самый свежий из разобравшихся
+    order = new if args.append else list(reversed(new))
+
+    imported = 0
+    for i, (path, key) in enumerate(order):
+        started = time.time()
+        products = _read(path, key[0])
+        if not products:
+            continue  # не отмечаем — повторим на следующем проходе
+        changes = registry.apply_snapshot(products, prune=not args.append)
+        registry.mark_imported(*key, products=len(products))
+        imported += 1
+        print(
+            f"  📄 {key[0]}: РУ {len(products)} — новых {changes['added']}, "
+            f"изменено {changes['updated']}, удалено {changes['removed']}, "
+            f"без изменений {changes['unchanged']} ({time.time() - started:.0f}с)"
+        )
+        if not args.append:
+            # Более старые снимки перекрыты применённым — отмечаем только теперь
+            for _, old_key in order[i + 1:]:
+                registry.mark_imported(*old_key, products=0)
+                if not args.quiet:
+                    print(f"  ⏭️  {old_key[0]}: перекрыт более свежей выгрузкой")
+            break
+    return imported
+
+
+def _print_stats(registry: GRLSRegistry) -> None:
+    stats = registry.stats()
+    names = stats["names"]
+    print(
+        f"   Реестр {stats['path']}: РУ {stats['products']} (действующих {stats['active']}), "
+        f"торговых названий {names.get('trade', 0)}, МНН {names.get('inn', 0)}, "
+        f"держателей {names.get('holder', 0)}"
+    )
+
+
+def run_import(args) -> int:
+    if not list_files(args.paths) and not args.watch:
+        print(f"❌ Файлы выгрузки ({', '.join(REGISTRY_EXTENSIONS)}) не найдены")
+        return 1
+
+    registry = GRLSRegistry(args.registry)
+    if args.rebuild:
+        registry.clear()
+
+    if not args.watch:
+        import_new(args, registry)
+        _print_stats(registry)
+        return 0
+
+    print(f"👀 Слежу за {', '.join(args.paths)} (каждые {args.watch:.0f}с, Ctrl+C — выход)")
+    try:
+        while True:
+            if import_new(args, registry):
+                _print_stats(registry)
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        print("\n⏹️  Остановлено")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Локальный реестр ГРЛС из файла выгрузки",
+    )
+    parser.add_argument("paths", nargs="+", help="файл выгрузки (.zip / .xlsx / .xls / .csv) или каталог")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH,
+                        help=f"файл реестра (по умолчанию {DEFAULT_REGISTRY_PATH}, env GRLS_REGISTRY_PATH)")
+    parser.add_argument("--append", action="store_true",
+                        help="частичная выгрузка: не удалять РУ, которых нет в файле")
+    parser.add_argument("--rebuild", action="store_true", help="очистить реестр перед импортом")
+    parser.add_argument("--watch", type=float, default=0,
+                        help="проверять пути каждые N секунд и импортировать новые файлы")
+    parser.add_argument("--quiet", action="store_true", help="без строк о пропущенных файлах")
+    sys.exit(run_import(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+import_medline.py — Офлайн-корпус PubMed: кандидаты CVintra / T½ из выгрузки MEDLINE.
+
+Разбирает локальные файлы MEDLINE (baseline / updatefiles, pubmed*.xml.gz),
+извлекает из рефератов с ФК/БЭ-контекстом 90% CI (→ CVintra), CVintra,
+T½, Tmax, Cmax и пишет их в таблицу кандидатов по МНН
+(services/pk/medline_index.py). search_cv_intra и search_pk_params берут
+значения оттуда, не обращаясь к GenSearch.
+
+  - файл читается потоком, извлечение — в пуле процессов (--workers)
+    пакетами по --batch-size статей; в работе не больше 2 пакетов
+    на процесс — память ограничена при любом объёме выгрузки;
+  - уже импортированные файлы (то же имя и размер) пропускаются —
+    после выхода новых updatefiles достаточно запустить импорт снова;
+  - файлы обрабатываются в порядке имён: для updatefiles это порядок
+    выхода, более поздняя версия статьи заменяет прежнюю.
+
+Запуск:
+    python import_medline.py /data/pubmed/baseline /data/pubmed/updatefiles
+    python import_medline.py pubmed25n0001.xml.gz --workers 4
+    python import_medline.py /data/pubmed --rebuild --index data/medline_pk.db
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List
+
+from app.services.pk.medline_index import (
+    DEFAULT_INDEX_PATH, MedlineIndex, extract_batch, iter_medline,
+)
+
+
+def list_files(paths: List[str]) -> List[str]:
+    """Файлы .xml / .xml.gz из путей (каталоги — рекурсивно), по имени."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, n) for n in names if n.endswith((".xml", ".xml.gz"))
+                )
+        else:
+            files.append(path)
+    return sorted(files, key=os.path.basename)
+
+
+def import_file(path: str, index: MedlineIndex, executor: ProcessPoolExecutor,
+                workers: int, batch_size: int) -> tuple:
+    """Один файл MEDLINE. Returns: (статей с ФК-контекстом, кандидатов, удалено PMID)."""
+    articles = candidates = deleted = 0
+    pending = set()
+    batch: list = []
+
+    def _collect(done) -> None:
+        nonlocal candidates
+        for future in done:
+            pmids, rows = future.result()
+            index.replace(pmids, rows)
+            candidates += len(rows)
+
+    def _submit() -> None:
+        nonlocal pending, batch
+        pending.add(executor.submit(extract_batch, batch))
+        batch = []
+        # Не больше 2 пакетов на процесс — остальное ждёт на диске
+        if len(pending) >= workers * 2:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done)
+
+    for event, payload in iter_medline(path):
+        if event == "delete":
+            # Удаление относится к более ранним файлам — пакеты этого файла дописываем до него
+            _collect(wait(pending).done)
+            pending = set()
+            index.delete_pmids([payload])
+            deleted += 1
+            continue
+        articles += 1
+        batch.append(payload)
+        if len(batch) >= batch_size:
+            _submit()
+    if batch:
+        _submit()
+    _collect(wait(pending).done)
+    return articles, candidates, deleted
+
+
+def run_import(args) -> int:
+    files = list_files(args.paths)
+    if not files:
+        print("❌ Файлы MEDLINE (.xml / .xml.gz) не найдены")
+        return 1
+
+    index = MedlineIndex(args.index)
+    if args.rebuild:
+        index.clear()
+
+    started = time.time()
+    imported = skipped = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for path in files:
+            name, size = os.path.basename(path), os.path.getsize(path)
+            if index.is_imported(name, size):
+                skipped += 1
+                continue
+            file_started = time.time()
+            try:
+                articles, candidates, deleted = import_file(
+                    path, index, executor, args.workers, args.batch_size,
+                )
+            except Exception as e:
+                print(f"  ⚠️  {name}: {type(e).__name__}: {e}")
+                continue
+            index.mark_imported(name, size, articles, candidates)
+            imported += 1
+            if not args.quiet:
+                print(
+                    f"  📄 {name}: статей с ФК-контекстом {articles}, кандидатов {candidates}"
+                    + (f", удалено PMID {deleted}" if deleted else "")
+                    + f" ({time.time() - file_started:.0f}с)"
+                )
+
+    stats = index.stats()
+    by_kind = ", ".join(f"{k} {n}" for k, n in sorted(stats["candidates"].items()))
+    print(
+        f"✅ Импортировано файлов {imported}, пропущено (уже в индексе) {skipped} "
+        f"за {time.time() - started:.0f}с\n"
+        f"   Индекс {args.index}: МНН {stats['inns']}, кандидатов: {by_kind or '—'}"
+    )
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Кандидаты CVintra / T½ по МНН из локальной выгрузки MEDLINE",
+    )
+    parser.add_argument("paths", nargs="+", help="файлы .xml / .xml.gz или каталоги")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help=f"файл индекса (по умолчанию {DEFAULT_INDEX_PATH}, env MEDLINE_INDEX_PATH)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="процессов извлечения (по умолчанию — число CPU)")
+    parser.add_argument("--batch-size", type=int, default=500, help="статей в пакете")
+    parser.add_argument("--rebuild", action="store_true", help="очистить индекс перед импортом")
+    parser.add_argument("--quiet", action="store_true", help="без строки по каждому файлу")
+    sys.exit(run_import(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -368,6 +368,11 @@ def main():
     parser.add_argument("--washout-days", type=int, default=None,
                         help="Отмывочный период (дни). По умолчанию ≥5×T½")
 
+    # ── 9. Бюджет времени ──
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Бюджет времени прогона (сек). По истечении поиски "
+                             "прекращаются, синопсис строится из найденного")
+
     # ── Пути ──
     parser.add_argument("--template",
                         default="data/шаблон_для_заполнения.docx")
@@ -451,6 +456,7 @@ def main():
             override_screenfail_rate=args.screenfail_rate,
             override_min_subjects=args.min_subjects,
             override_washout_min_days=args.washout_days,
+            time_budget_s=args.time_budget,
         )
 
     asyncio.run(run_pipeline(payload, args))
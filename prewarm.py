@@ -0,0 +1,482 @@
+"""
+prewarm.py — Ночной прогрев кэшей по списку МНН.
+
+Для каждого МНН из списка выполняет те же поиски, что PK Agent
+(search_existing_protocols, search_cv_intra, search_pk_params,
+fetch_drug_info) — результаты попадают в персистентный PK-кэш
+(services/cache/pk_cache.py) и дисковый кэш инструкций
+(utils/page_cache.py). Дневные прогоны для этих МНН берут данные
+из кэша и не ждут Yandex.
+
+  - несколько МНН одновременно (--concurrency), запросы GenSearch —
+    в фоновой очереди общего клиента (интерактивные их опережают);
+  - при 429 / разомкнутом предохранителе GenSearch новые МНН
+    не начинаются, пока квота не восстановится (пауза растёт до --max-cooldown);
+  - прогресс пишется после каждого МНН (<список>.prewarm.json) —
+    после прерывания запуск продолжается с того же места; МНН, где
+    какой-то поиск упал с ошибкой или ничего не нашёл, пока GenSearch
+    отвечал 429 / ошибками / был разомкнут предохранитель, повторяются
+    (найденное уже в кэше);
+  - в конце — время по МНН и доля найденного по каждому источнику.
+
+Формат списка:
+  CSV (заголовок обязателен): inn_ru,inn_en,form,dose,ref_drug
+      — обязательна только колонка inn_ru (или inn)
+  JSON: ["амлодипин", {"inn_ru": "тенофовира алафенамид", "ref_drug": "Вемлиди®"}, ...]
+        или {"inns": [...]}; ключи — как в PipelineInput
+        (inn_ru, inn_en, dosage_form, dosage, reference_drug_name)
+
+Запуск:
+    python prewarm.py data/next_quarter.csv
+    python prewarm.py inns.json --concurrency 3 --rps 2 --quiet
+    python prewarm.py inns.json --restart     # игнорировать сохранённый прогресс
+    python prewarm.py inns.json --refresh     # перезаписать уже закэшированное
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+from app.services.cache.pk_cache import get_pk_cache, load_cached, pk_cache_key
+from app.services.circuit_breaker import GENSEARCH, get_breaker
+from app.services.pk.cv_intra import search_cv_intra, search_pk_params
+from app.services.pk.evidence_pool import EvidencePool
+from app.services.search.gensearch_client import get_gensearch_client
+from app.services.search.protocol_search import search_existing_protocols
+from app.utils.drug_info_parser import fetch_drug_info
+from app.utils.inn_utils import normalize_inn, resolve_inn_en_many
+
+
+STEPS = ("protocols", "cv_intra", "pk_params", "instruction")
+
+# Синонимы колонок CSV / ключей JSON
+_FIELD_ALIASES = {
+    "inn_ru": ("inn_ru", "inn", "мнн"),
+    "inn_en": ("inn_en",),
+    "dosage_form": ("dosage_form", "form", "форма"),
+    "dosage": ("dosage", "dose", "дозировка"),
+    "ref_drug": ("reference_drug_name", "ref_drug", "референт"),
+}
+
+
+@dataclass
+class PrewarmTarget:
+    """Одна строка списка."""
+    inn_ru: str
+    inn_en: str = ""
+    dosage_form: str = ""
+    dosage: str = ""
+    ref_drug: str = ""
+
+    @property
+    def key(self) -> str:
+        """Ключ прогресса: МНН как в PK-кэше + референт (для инструкции)."""
+        base = pk_cache_key(self.inn_ru, self.inn_en) or self.inn_ru.lower()
+        return f"{base}|{self.ref_drug.lower()}" if self.ref_drug else base
+
+
+@dataclass
+class StepReport:
+    """Итог одного поиска для МНН."""
+    found: bool = False
+    cached: bool = False
+    source: str = ""
+    value: str = ""
+    seconds: float = 0.0
+    error: str = ""
+    interrupted: bool = False     # не найдено, но GenSearch в это время сбоил
+
+
+@dataclass
+class TargetReport:
+    inn_ru: str
+    inn_en: str
+    seconds: float = 0.0
+    finished_at: str = ""
+    complete: bool = False        # каждый поиск нашёл значение или честно промахнулся (иначе повторим)
+    steps: Dict[str, StepReport] = field(default_factory=dict)
+
+
+# ════════════════════════════════════════════════════════
+# СПИСОК МНН
+# ════════════════════════════════════════════════════════
+
+def _pick(row: Dict[str, Any], name: str) -> str:
+    lowered = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+    for alias in _FIELD_ALIASES[name]:
+        value = lowered.get(alias)
+        if value:
+            return str(value).strip()
+    return ""
+
+
+def load_targets(path: str) -> List[PrewarmTarget]:
+    """Читает CSV / JSON, убирает пустые строки и повторы."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            rows = data.get("inns", []) if isinstance(data, dict) else data
+        else:
+            rows = list(csv.DictReader(f))
+
+    targets: List[PrewarmTarget] = []
+    for row in rows:
+        if isinstance(row, str):
+            row = {"inn_ru": row}
+        target = PrewarmTarget(**{name: _pick(row, name) for name in _FIELD_ALIASES})
+        if target.inn_ru:
+            targets.append(target)
+
+    # Английские МНН — одним запросом Translate для всего списка
+    missing = [t.inn_ru for t in targets if not t.inn_en]
+    if missing:
+        resolved = resolve_inn_en_many(missing)
+        for target in targets:
+            target.inn_en = target.inn_en or resolved.get(target.inn_ru, "")
+
+    unique: Dict[str, PrewarmTarget] = {}
+    for target in targets:
+        unique.setdefault(target.key, target)
+    return list(unique.values())
+
+
+# ════════════════════════════════════════════════════════
+# ПРОГРЕСС (возобновление после прерывания)
+# ════════════════════════════════════════════════════════
+
+class ProgressFile:
+    """JSON {ключ МНН: отчёт}; перезаписывается атомарно после каждого МНН."""
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.done: Dict[str, Dict[str, Any]] = {}
+        if not restart and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.done = json.load(f).get("done", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Прогресс {path} не прочитан ({e}) — начинаем заново")
+
+    def save(self, key: str, report: TargetReport) -> None:
+        self.done[key] = asdict(report)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": datetime.now().isoformat(), "done": self.done},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+# ════════════════════════════════════════════════════════
+# ТЕМП ЗАПРОСОВ
+# ════════════════════════════════════════════════════════
+
+class QuotaPacer:
+    """
+    Не даёт начинать новые МНН, пока GenSearch отвечает 429
+    или его предохранитель разомкнут.
+
+    Пауза удваивается при каждом новом 429 (до max_cooldown)
+    и сбрасывается, когда МНН прошёл без ограничений.
+    """
+
+    def __init__(self, cooldown: float, max_cooldown: float):
+        self.client = get_gensearch_client()
+        self.breaker = get_breaker(GENSEARCH)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self._rate_limited = self.client.stats["rate_limited"]
+        self._lock = asyncio.Lock()
+
+    async def wait_turn(self) -> None:
+        async with self._lock:
+            rate_limited = self.client.stats["rate_limited"]
+            if rate_limited > self._rate_limited:
+                self._rate_limited = rate_limited
+                print(f"⏸️  GenSearch: 429 — пауза {self.cooldown:.0f}с")
+                await asyncio.sleep(self.cooldown)
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            else:
+                self.cooldown = self.base_cooldown
+
+            while self.breaker.is_open():
+                retry_in = max(self.breaker.snapshot()["retry_in_s"], 1.0)
+                print(f"⏸️  Предохранитель GenSearch разомкнут — ждём {retry_in:.0f}с")
+                await asyncio.sleep(retry_in)
+
+
+# ════════════════════════════════════════════════════════
+# ПРОГРЕВ ОДНОГО МНН
+# ════════════════════════════════════════════════════════
+
+async def _timed_step(report: StepReport, coro) -> Any:
+    started = time.monotonic()
+    try:
+        return await coro
+    except Exception as e:
+        report.error = f"{type(e).__name__}: {e}"
+        return None
+    finally:
+        report.seconds = round(time.monotonic() - started, 2)
+
+
+def _upstream_disruptions() -> tuple:
+    """
+    Счётчики сбоев GenSearch: 429, ошибки и тайм-ауты, отказы и размыкания
+    предохранителя. Изменились за время МНН — его «не найдено» могло быть
+    default'ом из-за сбоя, а не настоящим промахом.
+    """
+    stats = get_gensearch_client().snapshot()
+    return (
+        stats["rate_limited"], stats["errors"], stats["short_circuited"],
+        get_breaker(GENSEARCH).trips,
+    )
+
+
+def _was_cached(kind: str, inn_ru: str, inn_en: str) -> bool:
+    key = pk_cache_key(inn_ru, inn_en)
+    return bool(key and load_cached(kind, key))
+
+
+async def warm_target(target: PrewarmTarget, refresh: bool = False) -> TargetReport:
+    """Прогрев всех кэшей для одного МНН — те же вызовы, что в PK Agent."""
+    started = time.monotonic()
+    disruptions = _upstream_disruptions()
+    inn_ru_base, inn_en_base = normalize_inn(target.inn_ru, target.inn_en or None)
+    inn_en = inn_en_base or target.inn_en
+    report = TargetReport(inn_ru=target.inn_ru, inn_en=inn_en)
+    steps = {name: StepReport() for name in STEPS}
+    report.steps = steps
+
+    if refresh:
+        get_pk_cache().invalidate(pk_cache_key(inn_ru_base, inn_en))
+
+    # CVintra ищется по каждому компоненту комбинации (как в PK Agent)
+    components_ru = [c.strip() for c in inn_ru_base.split("+") if c.strip()]
+    components_en = [c.strip() for c in inn_en.split("+") if c.strip()]
+    components = [
+        normalize_inn(comp_ru, components_en[i] if i < len(components_en) else None)
+        for i, comp_ru in enumerate(components_ru)
+    ]
+    if refresh and len(components) > 1:
+        for comp_ru, comp_en in components:
+            get_pk_cache().invalidate(pk_cache_key(comp_ru, comp_en), "cv_intra")
+
+    steps["protocols"].cached = _was_cached("protocols", inn_ru_base, inn_en)
+    steps["cv_intra"].cached = all(_was_cached("cv_intra", ru, en) for ru, en in components)
+    steps["pk_params"].cached = _was_cached("pk_params", inn_ru_base, inn_en)
+
+    # Общий пул ответов: ФК-параметры ищутся после протоколов и CVintra,
+    # чтобы взять T½ / Tmax / Cmax из уже полученных ответов (как PK Agent)
+    pool = EvidencePool()
+
+    async def _cv_all():
+        return await asyncio.gather(*(
+            asyncio.to_thread(search_cv_intra, inn_en=en, inn_ru=ru, pool=pool) for ru, en in components
+        ))
+
+    async def _gensearch_steps():
+        found = await asyncio.gather(
+            _timed_step(steps["protocols"], asyncio.to_thread(
+                search_existing_protocols, inn_ru=inn_ru_base, inn_en=inn_en,
+                ref_drug_name=target.ref_drug, pool=pool,
+            )),
+            _timed_step(steps["cv_intra"], _cv_all()),
+        )
+        pk = await _timed_step(steps["pk_params"], asyncio.to_thread(
+            search_pk_params, inn_en=inn_en, inn_ru=inn_ru_base, pool=pool,
+        ))
+        return (*found, pk)
+
+    (protocol, cv_results, pk_params), drug_info = await asyncio.gather(
+        _gensearch_steps(),
+        _timed_step(steps["instruction"], fetch_drug_info(
+            drug_name=target.ref_drug or inn_ru_base, inn=inn_ru_base, dosage=target.dosage,
+        )),
+    )
+
+    if protocol and protocol.get("found"):
+        steps["protocols"].found = True
+        steps["protocols"].source = protocol.get("source") or ""
+        steps["protocols"].value = protocol.get("nct_id") or protocol.get("design_type") or ""
+
+    found_cv = [r for r in (cv_results or []) if r and r.source != "default"]
+    if found_cv:
+        best = max(found_cv, key=lambda r: r.cv_intra)
+        steps["cv_intra"].found = len(found_cv) == len(components)
+        steps["cv_intra"].source = best.source
+        steps["cv_intra"].value = f"{best.cv_intra}%"
+
+    if pk_params and pk_params.t_half_hours:
+        steps["pk_params"].found = True
+        steps["pk_params"].source = pk_params.source
+        steps["pk_params"].value = f"T½ {pk_params.t_half_hours} ч"
+
+    if drug_info and (drug_info.excipients or drug_info.storage_conditions):
+        steps["instruction"].found = True
+        steps["instruction"].source = urlparse(drug_info.source_url).netloc if drug_info.source_url else ""
+
+    # Пустой результат поиска GenSearch при сбоях upstream (МНН идут параллельно —
+    # учитываются и сбои соседних МНН, это лишь лишний повтор) — не промах
+    if _upstream_disruptions() != disruptions:
+        for name in ("protocols", "cv_intra", "pk_params"):
+            if not steps[name].found and not steps[name].cached:
+                steps[name].interrupted = True
+
+    report.complete = not any(step.error or step.interrupted for step in steps.values())
+    report.seconds = round(time.monotonic() - started, 2)
+    report.finished_at = datetime.now().isoformat(timespec="seconds")
+    return report
+
+
+# ════════════════════════════════════════════════════════
+# ОТЧЁТ
+# ════════════════════════════════════════════════════════
+
+def _format_line(report: TargetReport) -> str:
+    parts = []
+    for name in STEPS:
+        step = report.steps[name]
+        if step.error:
+            mark = "❌"
+        elif step.interrupted:
+            mark = "⏸️"
+        elif step.found:
+            mark = "💾" if step.cached else "✅"
+        else:
+            mark = "—"
+        detail = " ".join(x for x in (step.value, f"[{step.source}]" if step.source else "") if x)
+        parts.append(f"{name} {mark} {detail}".rstrip())
+    return f"{report.inn_ru:<32} {report.seconds:>7.1f}с  " + " · ".join(parts)
+
+
+def print_summary(reports: List[Dict[str, Any]], out) -> None:
+    if not reports:
+        return
+    times = [r["seconds"] for r in reports]
+    print(f"\n{'=' * 60}", file=out)
+    print(f"  Прогрето МНН: {len(reports)}", file=out)
+    print(f"  Время на МНН: среднее {statistics.mean(times):.1f}с · "
+          f"медиана {statistics.median(times):.1f}с · макс {max(times):.1f}с", file=out)
+    print(f"{'=' * 60}", file=out)
+
+    for name in STEPS:
+        steps = [r["steps"][name] for r in reports if name in r["steps"]]
+        found = sum(1 for s in steps if s["found"])
+        cached = sum(1 for s in steps if s["cached"])
+        errors = sum(1 for s in steps if s["error"])
+        interrupted = sum(1 for s in steps if s.get("interrupted"))
+        sources = Counter(s["source"] for s in steps if s["found"] and s["source"])
+        by_source = ", ".join(f"{src} {n}" for src, n in sources.most_common())
+        print(f"  {name:<12} найдено {found}/{len(steps)} ({found / len(steps) * 100:.0f}%)"
+              f" · уже в кэше {cached} · ошибок {errors} · прервано сбоем GenSearch {interrupted}",
+              file=out)
+        if by_source:
+            print(f"  {'':<12} источники: {by_source}", file=out)
+
+    stats = get_gensearch_client().snapshot()
+    print(f"\n  GenSearch: запросов {stats['requests']}, повторов {stats['retries']}, "
+          f"429: {stats['rate_limited']}, ожидание квоты {stats['wait_s']:.0f}с", file=out)
+    hedge = stats["hedge"]
+    if hedge["enabled"] and hedge["p99_s"] is not None:
+        print(f"  Дубли: {hedge['hedged']} ({hedge['hedge_rate'] * 100:.1f}% вызовов), "
+              f"выиграли {hedge['hedge_wins']} · p99 {hedge['p99_s']}с "
+              f"(без дублей ≈ {hedge['p99_unhedged_s']}с)", file=out)
+
+
+# ════════════════════════════════════════════════════════
+# ЗАПУСК
+# ════════════════════════════════════════════════════════
+
+async def run_prewarm(args) -> None:
+    out = sys.stdout
+    targets = load_targets(args.inns)
+    progress = ProgressFile(args.progress or f"{os.path.splitext(args.inns)[0]}.prewarm.json", args.restart)
+    pending = [t for t in targets if not progress.done.get(t.key, {}).get("complete")]
+
+    print(f"🔥 Прогрев кэша: {len(targets)} МНН, уже готово {len(targets) - len(pending)}, "
+          f"осталось {len(pending)} (параллельно {args.concurrency})", file=out)
+    print(f"   Прогресс: {progress.path}", file=out)
+
+    client = get_gensearch_client()
+    if args.rps:
+        client.bucket.rate = args.rps
+    pacer = QuotaPacer(args.cooldown, args.max_cooldown)
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    save_lock = asyncio.Lock()
+
+    async def _one(target: PrewarmTarget) -> None:
+        async with semaphore:
+            await pacer.wait_turn()
+            try:
+                report = await warm_target(target, refresh=args.refresh)
+            except Exception as e:
+                # Не записываем в прогресс — при следующем запуске повторим
+                print(f"❌ {target.inn_ru}: {type(e).__name__}: {e}", file=out)
+                return
+            async with save_lock:
+                progress.save(target.key, report)
+            print(_format_line(report), file=out)
+
+    quiet = open(os.devnull, "w", encoding="utf-8") if args.quiet else None
+    if quiet:
+        sys.stdout = quiet
+    try:
+        await asyncio.gather(*(_one(t) for t in pending))
+    finally:
+        if quiet:
+            sys.stdout = out
+            quiet.close()
+
+    keys = {t.key for t in targets}
+    print_summary([r for k, r in progress.done.items() if k in keys], out)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="iFarma — прогрев PK-кэша по списку МНН",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Примеры:
+  python prewarm.py data/next_quarter.csv
+  python prewarm.py inns.json --concurrency 3 --rps 2 --quiet
+        """,
+    )
+    parser.add_argument("inns", help="CSV / JSON со списком МНН")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Сколько МНН прогревать одновременно")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="Лимит запросов GenSearch в секунду для прогрева "
+                             "(по умолчанию GENSEARCH_RPS)")
+    parser.add_argument("--cooldown", type=float, default=30,
+                        help="Пауза после 429 от GenSearch (сек)")
+    parser.add_argument("--max-cooldown", type=float, default=600,
+                        help="Максимальная пауза при повторных 429 (сек)")
+    parser.add_argument("--progress", default=None,
+                        help="Файл прогресса (по умолчанию <список>.prewarm.json)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Начать заново, игнорируя сохранённый прогресс")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Сбросить PK-кэш МНН перед поиском (обновить данные)")
+    parser.add_argument("--quiet", "-q", action="store_true",
+                        help="Только строки отчёта, без логов поиска")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_prewarm(args))
+    except KeyboardInterrupt:
+        print("\n⏹️  Прервано — прогресс сохранён, повторный запуск продолжит с того же места")
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,8 @@ class GenerateRequest(BaseModel):
     override_min_subjects: Optional[int] = None
     override_blood_per_point_ml: Optional[float] = None
     override_max_blood_ml: Optional[float] = None
+    # Бюджет времени прогона (сек): по истечении — синопсис из найденного
+    time_budget_s: Optional[float] = None
 
     def to_pipeline_input(self) -> PipelineInput:
         sponsor = self.manufacturer if self.manufacturer_is_sponsor else self.sponsor
@@ -75,7 +77,7 @@ class GenerateRequest(BaseModel):
         for attr in ("override_power", "override_alpha", "override_gmr",
                       "override_dropout_rate", "override_screenfail_rate",
                       "override_min_subjects", "override_blood_per_point_ml",
-                      "override_max_blood_ml"):
+                      "override_max_blood_ml", "time_budget_s"):
             val = getattr(self, attr)
             if val is not None:
                 kwargs[attr] = val
@@ -271,67 +273,77 @@ async def chat(message: str = "", task_id: str = ""):
     return {"reply": "Понял, обрабатываю."}
 
 # ═══ Dictionaries (подсказки, БЕЗ валидации) ═══
-_INN = [
-    {"ru":"Амлодипин","en":"Amlodipine"},{"ru":"Аторвастатин","en":"Atorvastatin"},
-    {"ru":"Амоксициллин","en":"Amoxicillin"},{"ru":"Метформин","en":"Metformin"},
-    {"ru":"Левофлоксацин","en":"Levofloxacin"},{"ru":"Омепразол","en":"Omeprazole"},
-    {"ru":"Лизиноприл","en":"Lisinopril"},{"ru":"Розувастатин","en":"Rosuvastatin"},
-    {"ru":"Кларитромицин","en":"Clarithromycin"},{"ru":"Диклофенак","en":"Diclofenac"},
-    {"ru":"Ибупрофен","en":"Ibuprofen"},{"ru":"Силденафил","en":"Sildenafil"},
-    {"ru":"Варфарин","en":"Warfarin"},{"ru":"Парацетамол","en":"Paracetamol"},
-    {"ru":"Эналаприл","en":"Enalapril"},{"ru":"Лоратадин","en":"Loratadine"},
-    {"ru":"Валсартан","en":"Valsartan"},{"ru":"Тамсулозин","en":"Tamsulosin"},
-    {"ru":"Тенофовира алафенамид","en":"Tenofovir alafenamide"},
-    {"ru":"Эмтрицитабин","en":"Emtricitabine"},{"ru":"Биктегравир","en":"Bictegravir"},
-    {"ru":"биктегравир + тенофовира алафенамид + эмтрицитабин","en":"Bictegravir + Tenofovir alafenamide + Emtricitabine"},
-    {"ru":"Дапаглифлозин","en":"Dapagliflozin"},{"ru":"Эмпаглифлозин","en":"Empagliflozin"},
-    {"ru":"Апиксабан","en":"Apixaban"},{"ru":"Ривароксабан","en":"Rivaroxaban"},
-    {"ru":"Ципрофлоксацин","en":"Ciprofloxacin"},{"ru":"Цефтриаксон","en":"Ceftriaxone"},
-    {"ru":"Прегабалин","en":"Pregabalin"},{"ru":"Дулоксетин","en":"Duloxetine"},
-]
-
-
-# ═══ Глобальная HTTP-сессия (переиспользуется, не создаётся каждый раз) ═══
-
-import aiohttp, urllib.parse
-
-_http_session: aiohttp.ClientSession | None = None
-_TIMEOUT = aiohttp.ClientTimeout(total=2)
-_HEADERS = {"User-Agent": "Mozilla/5.0"}
+# МНН — локальный словарь data/inn_dictionary.json (app/utils/inn_dictionary.py)
+
+# ═══ HTTP: общий keep-alive клиент процесса (app/services/http_client.py) ═══
+# Тайм-ауты сервисов: suggest — 2с, dadata — 5с (HTTP_TIMEOUT_<СЕРВИС>)
+
+import urllib.parse
 
-async def _get_session() -> aiohttp.ClientSession:
-    global _http_session
-    if _http_session is None or _http_session.closed:
-        _http_session = aiohttp.ClientSession(timeout=_TIMEOUT, headers=_HEADERS)
-    return _http_session
+from app.services.http_client import get_http_client, HttpError
+from app.services.search.suggest_cache import get_suggest_cache
+from app.services.search.counterparties import get_counterparties, normalize_org_name
+from app.utils.inn_dictionary import get_inn_dictionary
+from app.services.circuit_breaker import get_breaker, circuits_snapshot, SUGGEST, DADATA
+from app.services.pk.source_stats import get_source_stats
+from app.services.search.gensearch_client import get_gensearch_client
+
+_SUGGEST_LIMIT = 10
+# Для кэша запрашивается больше подсказок, чем показывается: ответ короткого
+# префикса ("амло") обычно полон на _SUGGEST_FETCH, и следующие символы
+# обслуживаются его фильтрацией (на _SUGGEST_LIMIT он почти всегда усечён)
+_SUGGEST_FETCH = 30
+_DADATA_FETCH = 20   # максимум count в DaData Suggestions
+
+_HEADERS = {"User-Agent": "Mozilla/5.0"}
 
 @app.on_event("shutdown")
 async def _close_session():
-    global _http_session
-    if _http_session and not _http_session.closed:
-        await _http_session.close()
+    await get_http_client().aclose()
 
 
 # ═══ Yandex Suggest — универсальная функция ═══
 
-async def _yandex_suggest(query: str, suffix: str = "", clean_fn=None) -> list[str]:
-    """Подсказки через Yandex Suggest API (бесплатный, без ключа)."""
+async def _yandex_suggest(query: str, suffix: str = "", clean_fn=None, cache_key: str = "") -> list[str]:
+    """
+    Подсказки через Yandex Suggest API (бесплатный, без ключа).
+
+    Ответы кэшируются (suggest_cache): при наборе "амло" → "амлод" второй
+    запрос обычно обслуживается фильтрацией первого, без сети.
+    cache_key — для clean_fn-замыканий, чей результат зависит не только
+    от запроса (тогда кэш только по точному совпадению).
+    """
+    cache = get_suggest_cache()
+    namespace = f"yandex:{suffix}:{getattr(clean_fn, '__name__', '')}:{cache_key}"
+    cached = cache.get(namespace, query, prefix=not cache_key)
+    if cached is not None:
+        return cached[:_SUGGEST_LIMIT]
+    breaker = get_breaker(SUGGEST)
+    if not breaker.allow():
+        return []
+
     search_q = f"{query} {suffix}".strip() if suffix else query
-    url = f"https://suggest.yandex.ru/suggest-ff.cgi?part={urllib.parse.quote(search_q)}&uil=ru&n=10"
+    url = f"https://suggest.yandex.ru/suggest-ff.cgi?part={urllib.parse.quote(search_q)}&uil=ru&n={_SUGGEST_FETCH}"
     results = []
     try:
-        session = await _get_session()
-        async with session.get(url) as resp:
-            if resp.status == 200:
-                data = await resp.json(content_type=None)
-                if isinstance(data, list) and len(data) >= 2:
-                    for s in data[1]:
-                        clean = clean_fn(s) if clean_fn else s.strip()
-                        if clean and len(clean) >= 2:
-                            results.append(clean)
+        resp = await get_http_client().get(url, service="suggest", headers=_HEADERS)
+        if resp.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if resp.status == 200:
+            data = resp.json()
+            if isinstance(data, list) and len(data) >= 2:
+                for s in data[1]:
+                    clean = clean_fn(s) if clean_fn else s.strip()
+                    if clean and len(clean) >= 2:
+                        results.append(clean)
+                cache.put(namespace, query, results, complete=len(data[1]) < _SUGGEST_FETCH)
+    except HttpError:
+        breaker.record_failure()
     except Exception:
         pass
-    return results
+    return results[:_SUGGEST_LIMIT]
 
 
 def _clean_inn(text: str) -> str:
@@ -426,44 +438,82 @@ print(f"  ℹ️ YANDEX_FOLDER_ID: {'✅ ' + _YANDEX_FOLDER[:8] + '...' if _YAND
 print(f"  ℹ️ YANDEX_API_KEY: {'✅ загружен' if _YANDEX_KEY else '❌ не задан'}")
 
 async def _dadata_suggest_company(query: str, count: int = 10) -> list[dict]:
-    """Поиск компании через DaData Suggestions API."""
+    """Поиск компании через DaData Suggestions API (с кэшем подсказок)."""
     if not DADATA_TOKEN:
         print(f"  ⚠️ DaData: токен не задан (DADATA_TOKEN пустой)")
         return []
+    cache = get_suggest_cache()
+    namespace = "dadata:party"
+    cached = cache.get(namespace, query)
+    if cached is not None:
+        return cached[:count]
+    breaker = get_breaker(DADATA)
+    if not breaker.allow():
+        return []
     url = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/suggest/party"
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
         "Authorization": f"Token {DADATA_TOKEN}",
     }
-    payload = {"query": query, "count": count}
+    payload = {"query": query, "count": max(count, _DADATA_FETCH)}
     try:
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=5)
-        ) as dadata_session:
-            async with dadata_session.post(url, json=payload, headers=headers) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    results = []
-                    for s in data.get("suggestions", []):
-                        d = s.get("data", {})
-                        name_full = s.get("value", "")
-                        inn = d.get("inn", "")
-                        address = ""
-                        if d.get("address"):
-                            address = d["address"].get("value", "")
-                        results.append({"name": name_full, "inn": inn, "address": address})
-                    return results
-                else:
-                    body = await resp.text()
-                    print(f"  ⚠️ DaData HTTP {resp.status}: {body[:200]}")
+        resp = await get_http_client().post(url, json=payload, headers=headers, service="dadata")
+        if resp.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if resp.status == 200:
+            data = resp.json()
+            results = []
+            for s in data.get("suggestions", []):
+                d = s.get("data", {})
+                name_full = s.get("value", "")
+                inn = d.get("inn", "")
+                address = ""
+                if d.get("address"):
+                    address = d["address"].get("value", "")
+                results.append({"name": name_full, "inn": inn, "address": address})
+            cache.put(namespace, query, results, complete=len(results) < payload["count"])
+            return results[:count]
+        else:
+            print(f"  ⚠️ DaData HTTP {resp.status}: {resp.text[:200]}")
     except Exception as e:
+        if isinstance(e, HttpError):
+            breaker.record_failure()
         print(f"  ⚠️ DaData error: {type(e).__name__}: {e}")
     return []
 
 
+def _merge_companies(first: list[dict], second: list[dict]) -> list[dict]:
+    """Объединяет списки компаний без повторов (по нормализованному имени)."""
+    merged, seen = [], set()
+    for r in first + second:
+        key = normalize_org_name(r["name"]) or r["name"].lower()
+        if key not in seen:
+            merged.append(r)
+            seen.add(key)
+    return merged
+
+
 async def _search_company_combined(q: str, kind: str = "") -> list[dict]:
-    """Комбинированный поиск: DaData (приоритет) → Yandex Suggest (fallback)."""
+    """
+    Комбинированный поиск: справочник контрагентов (data/counterparties.json)
+    → кэш → DaData (приоритет) → Yandex Suggest (fallback).
+    """
+    directory = get_counterparties()
+    local = directory.suggest(q, kind=kind)
+    # Известная организация — отвечаем без сети
+    if local and (len(local) >= 3 or directory.match(q)):
+        return local[:10]
+
+    cache = get_suggest_cache()
+    namespace = f"company:{kind}"
+    cache_key = normalize_org_name(q) or q
+    cached = cache.get(namespace, cache_key, prefix=False)
+    if cached is not None:
+        return _merge_companies(local, cached)[:10] or [{"name": q, "inn": "", "address": ""}]
+
     results = []
     if DADATA_TOKEN:
         dadata_results = await _dadata_suggest_company(q)
@@ -489,6 +539,9 @@ async def _search_company_combined(q: str, kind: str = "") -> list[dict]:
                     existing.add(s.lower())
         except Exception:
             pass
+    if results:
+        cache.put(namespace, cache_key, results[:10], complete=True)
+    results = _merge_companies(local, results)
     if not results:
         results = [{"name": q, "inn": "", "address": ""}]
     return results[:10]
@@ -498,17 +551,24 @@ async def _search_company_combined(q: str, kind: str = "") -> list[dict]:
 
 @app.get("/api/dictionaries/inn")
 async def inn(q: str = ""):
-    if not q: return _INN[:10]
-    ql = q.lower()
-    local = [d for d in _INN if ql in d["ru"].lower() or ql in d["en"].lower()]
-    if len(q) >= 2:
+    """Сначала локальный словарь МНН (без сети), Yandex Suggest — только добор."""
+    dictionary = get_inn_dictionary()
+    if not q: return dictionary.top(10)
+    local = dictionary.complete(q, limit=10)
+    if len(local) < 5 and len(q) >= 2:
         try:
-            suggestions = await _yandex_suggest(q, suffix="МНН", clean_fn=_clean_inn)
+            # Если словарь уже что-то нашёл — медленный Suggest не задерживает ответ
+            suggestions = await asyncio.wait_for(
+                _yandex_suggest(q, suffix="МНН", clean_fn=_clean_inn),
+                timeout=0.5 if local else None,
+            )
             local_names = {d["ru"].lower() for d in local}
             for s in suggestions:
                 if s.lower() not in local_names:
                     local.append({"ru": s, "en": "", "source": "yandex"})
                     local_names.add(s.lower())
+        except asyncio.TimeoutError:
+            pass
         except Exception as e:
             print(f"  ⚠️ Yandex INN error: {e}")
     if not local: local = [{"ru": q, "en": "", "custom": True}]
@@ -548,9 +608,15 @@ async def forms(q: str = ""):
 
 @app.get("/api/dictionaries/manufacturers")
 async def mfg(q: str = ""):
+    """Держатели РУ из локального реестра ГРЛС, добор — справочник компаний / DaData."""
+    from app.services.search.grls_registry import manufacturer_names
     if not q: return []
+    holders = manufacturer_names(q)
+    if len(holders) >= 5:
+        return holders[:10]
     results = await _search_company_combined(q, kind="general")
-    return [r["name"] for r in results]
+    seen = {h.lower() for h in holders}
+    return (holders + [r["name"] for r in results if r["name"].lower() not in seen])[:10]
 
 
 @app.get("/api/dictionaries/company")
@@ -561,12 +627,28 @@ async def company_search(q: str = "", kind: str = ""):
 
 @app.get("/api/dictionaries/reference")
 async def refs(inn: str = "", q: str = ""):
-    """Референтные препараты по МНН — через Yandex GenSearch (ГРЛС)."""
-    import re
+    """
+    Референтные препараты по МНН: локальный реестр ГРЛС
+    (services/search/grls_registry, без сети), иначе — Yandex GenSearch.
+
+    Список GenSearch кэшируется по МНН (services/search/reference_drugs): после
+    первого запроса ответ мгновенный, ввод q фильтрует закэшированный список.
+    Без МНН GenSearch спрашивается по самому вводу q.
+    """
+    from app.services.search.grls_registry import reference_products
+    from app.services.search.reference_drugs import get_reference_names, filter_reference_names
     if not q and not inn:
         return []
 
-    search_term = (q or inn).strip()
+    local = reference_products(inn, q)
+    if local:
+        return local
+
+    def _as_items(names):
+        return [{"name": n, "inn": inn or "", "mfg": "", "source": "yandex_gensearch"} for n in names[:10]]
+
+    # Список запрашивается и кэшируется по МНН, а не по очередному символу ввода
+    search_term = (inn or q).strip()
     # Минимум 4 символа — не тратим GenSearch на "па", "пал"
     if len(search_term) < 4:
         return []
@@ -578,156 +660,18 @@ async def refs(inn: str = "", q: str = ""):
         print("⚠️  YANDEX_FOLDER_ID/YANDEX_API_KEY не заданы — fallback на Suggest")
         return await _refs_fallback_suggest(inn, q)
 
-    query = (
-        f"Перечисли все торговые названия лекарственных препаратов с МНН «{search_term}», "
-        f"зарегистрированные в России (ГРЛС). "
-        f"Укажи только торговые названия через запятую, без дозировок и лекарственных форм. "
-        f"Начни с оригинального (референтного) препарата."
-    )
-
-    body = {
-        "messages": [{"content": query, "role": "ROLE_USER"}],
-        "folderId": YANDEX_FOLDER_ID,
-        "searchType": "SEARCH_TYPE_RU",
-        "fixMisspell": True,
-    }
-    headers = {
-        "Authorization": f"Api-Key {YANDEX_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        session = await _get_session()
-        async with session.post(
-            "https://searchapi.api.cloud.yandex.net/v2/gen/search",
-            json=body, headers=headers, timeout=aiohttp.ClientTimeout(total=15)
-        ) as resp:
-            if resp.status != 200:
-                print(f"❌ Yandex GenSearch reference: HTTP {resp.status}")
-                return await _refs_fallback_suggest(inn, q)
-            data = await resp.json(content_type=None)
-    except Exception as e:
-        print(f"❌ Yandex GenSearch reference error: {e}")
-        return await _refs_fallback_suggest(inn, q)
-
-    # GenSearch может вернуть массив
-    if isinstance(data, list):
-        data = data[0] if data else {}
-
-    answer_text = ""
-    try:
-        message = data.get("message", {})
-        if isinstance(message, list):
-            message = message[0] if message else {}
-        if isinstance(message, dict):
-            answer_text = message.get("content", "")
-        if isinstance(answer_text, list):
-            parts = []
-            for item in answer_text:
-                if isinstance(item, dict):
-                    parts.append(str(item.get("content", item.get("text", ""))))
-                elif isinstance(item, str):
-                    parts.append(item)
-            answer_text = " ".join(parts)
-    except Exception:
-        answer_text = str(data)[:500]
-
-    if not answer_text:
-        return await _refs_fallback_suggest(inn, q)
-
-    print(f"📋 GenSearch reference ({search_term}): {answer_text[:200]}")
-
-    # Парсим торговые названия из ответа
-    # pre_clean: убираем только markdown bold и сноски, сохраняем кавычки для парсинга
-    pre_clean = answer_text.replace("**", "").strip()
-    pre_clean = re.sub(r'\[\d+\]', '', pre_clean)
-
-    # clean: полная очистка для fallback-парсинга
-    clean = re.sub(r'\([^)]*\)', '', pre_clean)
-    clean = re.sub(r'[®™«»„"""\*]', '', clean)
-
-    # Извлекаем названия из ответа GenSearch
-    names = []
-    inn_lower = (inn or q or "").lower()
-
-    # Мусорные слова
-    _GARBAGE = {
-        "препарат", "лекарство", "таблетки", "капсулы", "оригинальный", "аналоги",
-        "торговое название", "инструкция", "цена", "купить", "отзывы", "состав",
-        "это", "это химия", "химия", "формула", "действие", "механизм",
-        "побочные", "показания", "противопоказания", "дозировка", "применение",
-        "и другие", "другие", "также", "например", "включая", "некоторые",
-    }
-
-    def _extract_name(text: str) -> str | None:
-        """Извлекает торговое название из строки GenSearch."""
-        # Убираем markdown и сноски
-        text = re.sub(r'\[\d+\]', '', text)
-        text = text.replace("**", "").strip()
-        # Извлекаем текст в кавычках — самый надёжный способ
-        m = re.search(r'[«"„]([^»""]+)[»""]', text)
-        if m:
-            return m.group(1).strip()
-        # Убираем скобки с содержимым
-        text = re.sub(r'\([^)]*\)', '', text)
-        text = re.sub(r'[®™«»„"""\*]', '', text)
-        # Убираем всё после тире (— производитель, описание)
-        text = re.split(r'\s*[—–-]\s', text)[0].strip()
-        # Убираем вводные "Оригинальный:", "Референтный:" и т.д.
-        text = re.sub(r'^(оригинальн\w*|референтн\w*|генерик\w*)\s*:\s*', '', text, flags=re.IGNORECASE)
-        text = text.strip().strip('.,;:')
-        return text if text and len(text) >= 2 else None
-
-    def _is_valid(name: str) -> bool:
-        nl = name.lower().strip()
-        if not nl or len(nl) < 2 or len(nl) > 40:
-            return False
-        if nl == inn_lower or nl in _GARBAGE:
-            return False
-        if len(nl.split()) > 3:
-            return False
-        if re.match(r'^[\d\s,.\+/]+\s*(мг|мкг|г|мл|%|ме|ед)?$', nl):
-            return False
-        if any(w in nl for w in ['является', 'зарегистрирован', 'выпускается', 'содержит', 'применяется', 'торговые названия']):
-            return False
-        return True
-
-    # Стратегия 1: разбиваем по строкам (markdown списки * или 1. 2. 3.)
-    lines = pre_clean.split('\n')
-    for line in lines:
-        line = line.strip().lstrip('*•-– ').strip()
-        if not line:
-            continue
-        extracted = _extract_name(line)
-        if extracted and _is_valid(extracted):
-            names.append(extracted)
-
-    # Стратегия 2: если строки не дали результат — разбиваем по запятой из clean
+    names = await get_reference_names(search_term, YANDEX_FOLDER_ID, YANDEX_API_KEY)
     if not names:
-        text_for_parse = re.sub(
-            r'^.*?(торговые названия|зарегистрированы|препараты)\s*[:—–-]\s*',
-            '', clean, count=1, flags=re.IGNORECASE
-        )
-        candidates = re.split(r'[,;]\s*|\d+[.)]\s*', text_for_parse)
-        for c in candidates:
-            extracted = _extract_name(c)
-            if extracted and _is_valid(extracted):
-                names.append(extracted)
-
-    # Дедупликация
-    seen = set()
-    result = []
-    for name in names:
-        nl = name.lower()
-        if nl not in seen:
-            seen.add(nl)
-            result.append({"name": name, "inn": inn or "", "mfg": "", "source": "yandex_gensearch"})
-
-    if not result:
         # Если GenSearch не дал результатов — fallback
         return await _refs_fallback_suggest(inn, q)
 
-    return result[:10]
+    # Инкрементальный ввод: фильтруем список для МНН
+    if inn and q:
+        names = filter_reference_names(names, q)
+        if not names:
+            return await _refs_fallback_suggest(inn, q)
+
+    return _as_items(names)
 
 
 async def _refs_fallback_suggest(inn: str, q: str):
@@ -755,7 +699,7 @@ async def _refs_fallback_suggest(inn: str, q: str):
         if len(result) >= 5:
             break
         try:
-            suggestions = await _yandex_suggest(search_term, suffix=suffix, clean_fn=_extract)
+            suggestions = await _yandex_suggest(search_term, suffix=suffix, clean_fn=_extract, cache_key=inn_lower)
             for s in suggestions:
                 sl = s.lower()
                 if sl not in seen and len(s) >= 3 and sl != inn_lower and len(sl.split()) <= 3:
@@ -786,4 +730,31 @@ async def exc(q: str = ""):
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok", "llm": os.getenv("LLM_PROVIDER","mock"), "time": datetime.now().isoformat()}
\ No newline at end of file
+    return {"status": "ok", "llm": os.getenv("LLM_PROVIDER","mock"), "time": datetime.now().isoformat()}
+
+
+@app.get("/api/health/circuits")
+async def health_circuits():
+    """Состояние предохранителей внешних сервисов (closed / open / half_open)."""
+    return {"circuits": circuits_snapshot(), "time": datetime.now().isoformat()}
+
+@app.get("/api/health/http")
+async def health_http():
+    """Общий HTTP-клиент: запросы/ошибки по сервисам, открытые соединения, DNS-запросы."""
+    return {"http": get_http_client().snapshot(), "time": datetime.now().isoformat()}
+
+@app.get("/api/health/gensearch")
+async def health_gensearch():
+    """GenSearch: запросы, повторы, 429, дублирующие запросы и перцентили задержки."""
+    return {"gensearch": get_gensearch_client().snapshot(), "time": datetime.now().isoformat()}
+
+@app.get("/api/health/suggest")
+async def health_suggest():
+    """Кэш подсказок справочников: попадания (точные и по префиксу) и промахи."""
+    return {"suggest_cache": get_suggest_cache().stats(), "time": datetime.now().isoformat()}
+
+@app.get("/api/health/sources")
+async def health_sources():
+    """Поиск CVintra: запросов на поиск и результативность шаблонов по группам препаратов."""
+    snapshot = await asyncio.to_thread(get_source_stats().snapshot)
+    return {"sources": snapshot, "time": datetime.now().isoformat()}
@@ -0,0 +1,58 @@
+"""
+Локальный индекс ClinicalTrials.gov: монопрепарат и комбинация не смешиваются.
+
+Запуск: python -m pytest -q test_ctgov_index.py
+"""
+
+from app.services.search.ctgov_index import CTGovIndex, parse_study_json
+
+
+def _record(nct_id, title, interventions, meshes, enrollment):
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": title},
+            "statusModule": {"overallStatus": "COMPLETED"},
+            "designModule": {
+                "studyType": "INTERVENTIONAL",
+                "designInfo": {"interventionModel": "CROSSOVER"},
+                "enrollmentInfo": {"count": enrollment},
+            },
+            "armsInterventionsModule": {"interventions": [
+                {"type": "DRUG", "name": name, "otherNames": other}
+                for name, other in interventions
+            ]},
+        },
+        "derivedSection": {"interventionBrowseModule": {
+            "meshes": [{"term": term} for term in meshes],
+        }},
+    }
+
+
+def _index(tmp_path):
+    index = CTGovIndex(str(tmp_path / "ctgov.db"))
+    index.add_many([
+        parse_study_json(_record(
+            "NCT1", "Bioequivalence of Amlodipine/Valsartan FDC Under Fasting Conditions",
+            [("Amlodipine/Valsartan 10/160 mg", [])],
+            ["Amlodipine", "Valsartan"], 60,
+        )),
+        parse_study_json(_record(
+            "NCT2", "Bioequivalence Study of Amlodipine 10 mg Tablets in Healthy Volunteers",
+            [("Amlodipine 10 mg (Test)", []), ("Norvasc 10 mg (Reference)", ["Amlodipine Besylate"])],
+            ["Amlodipine"], 24,
+        )),
+    ])
+    return index
+
+
+def test_mono_lookup_skips_combination(tmp_path):
+    index = _index(tmp_path)
+    assert [s.nct_id for s in index.studies_for("amlodipine")] == ["NCT2"]
+    assert index.best_for("amlodipine").to_protocol()["n_subjects"] == 24
+
+
+def test_combination_lookup_skips_mono(tmp_path):
+    index = _index(tmp_path)
+    assert [s.nct_id for s in index.studies_for("amlodipine + valsartan")] == ["NCT1"]
+    assert [s.nct_id for s in index.studies_for("valsartan + amlodipine")] == ["NCT1"]
+    assert index.studies_for("valsartan") == []
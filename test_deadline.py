@@ -0,0 +1,71 @@
+"""
+Deadline.slice: доля оставшегося времени, не переживающая родителя,
+с общим списком недоборов.
+
+Запуск: python -m pytest -q test_deadline.py
+"""
+
+import math
+import time
+
+from app.utils.deadline import Deadline, ensure_deadline
+
+
+def _clock(monkeypatch, start=1000.0):
+    now = [start]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_slice_takes_fraction_of_remaining(monkeypatch):
+    now = _clock(monkeypatch)
+    deadline = Deadline(100)
+    now[0] += 20
+    pk = deadline.slice(0.5)
+    assert pk.budget_s == 40
+    assert pk.remaining() == 40
+
+    now[0] += 40
+    assert pk.expired()
+    assert not deadline.expired()
+    assert deadline.remaining() == 40
+
+
+def test_slice_never_outlives_parent(monkeypatch):
+    now = _clock(monkeypatch)
+    deadline = Deadline(10)
+    stage = deadline.slice(5)   # доля больше 1 — обрезается родителем
+    assert stage.remaining() == 10
+    now[0] += 10
+    assert stage.expired() and deadline.expired()
+
+
+def test_slice_of_expired_deadline_is_expired(monkeypatch):
+    now = _clock(monkeypatch)
+    deadline = Deadline(1)
+    now[0] += 2
+    stage = deadline.slice(0.5)
+    assert stage.budget_s == 0.001
+    assert stage.expired()
+
+
+def test_unlimited_slice_stays_unlimited():
+    deadline = ensure_deadline(None)
+    stage = deadline.slice(0.1)
+    assert stage.unlimited
+    assert stage.remaining() == math.inf
+    assert stage.timeout() is None
+    assert stage.timeout(cap=3) == 3
+    assert not stage.exhausted("pk_params")
+
+
+def test_slices_share_shortfalls(monkeypatch):
+    now = _clock(monkeypatch)
+    deadline = Deadline(100)
+    pk, org = deadline.slice(0.25), deadline.slice(0.5)
+    now[0] += 30
+
+    assert pk.exhausted("pk_params")
+    assert pk.exhausted("pk_params")        # повторно не дублируется
+    assert not org.exhausted("org_info")
+    assert deadline.shortfalls == org.shortfalls == ["budget_exhausted:pk_params"]
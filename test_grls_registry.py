@@ -0,0 +1,76 @@
+"""
+Локальный ГРЛС: повторный импорт записывает только изменения, удаляет
+исчезнувшие РУ и поддерживает триграммы названий в актуальном виде.
+
+Запуск: python -m pytest -q test_grls_registry.py
+"""
+
+from app.services.search.grls_registry import GRLSProduct, GRLSRegistry
+
+
+def _snapshot():
+    return [
+        GRLSProduct("П N011451/01", "Норваск®", "Амлодипин", "Пфайзер", "США", reg_date="2008-04-21"),
+        GRLSProduct("ЛП-000001", "Амлодипин-Тева", "Амлодипин", "Тева", "Израиль", reg_date="2012-01-10"),
+        GRLSProduct("ЛП-000002", "Лозап", "Лозартан", "Зентива", "Чехия", reg_date="2005-06-01"),
+    ]
+
+
+def _names(registry, query, kind="trade"):
+    return [r["name"] for r in registry.search(query, kind)]
+
+
+def test_first_import(tmp_path):
+    registry = GRLSRegistry(str(tmp_path / "grls.db"))
+    assert registry.apply_snapshot(_snapshot()) == {"added": 3, "updated": 0, "removed": 0, "unchanged": 0}
+    assert _names(registry, "норв") == ["Норваск®"]
+    # Опечатка — нечёткий поиск по триграммам
+    assert _names(registry, "нарваск") == ["Норваск®"]
+    assert registry.product("норваск", "амлодипин").reg_number == "П N011451/01"
+
+
+def test_incremental_reimport(tmp_path):
+    registry = GRLSRegistry(str(tmp_path / "grls.db"))
+    registry.apply_snapshot(_snapshot())
+
+    snapshot = _snapshot()
+    snapshot[1].holder = "Тева Фармацевтические Предприятия"   # изменилось
+    del snapshot[2]                                              # исчезло
+    snapshot.append(GRLSProduct("ЛП-000003", "Козаар", "Лозартан", "Органон", "Нидерланды"))
+    stats = registry.apply_snapshot(snapshot)
+
+    assert stats == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1}
+    assert registry.product("Амлодипин-Тева").holder == "Тева Фармацевтические Предприятия"
+    assert _names(registry, "лозап") == []
+    assert _names(registry, "козаар") == ["Козаар"]
+    assert [p.trade_name for p in registry.products_for_inn("лозартан")] == ["Козаар"]
+    assert registry.stats()["products"] == 3
+
+    # Та же выгрузка повторно — ничего не меняется
+    assert registry.apply_snapshot(snapshot) == {"added": 0, "updated": 0, "removed": 0, "unchanged": 3}
+
+
+def test_reimport_without_prune_keeps_missing(tmp_path):
+    registry = GRLSRegistry(str(tmp_path / "grls.db"))
+    registry.apply_snapshot(_snapshot())
+    stats = registry.apply_snapshot(_snapshot()[:1], prune=False)
+    assert stats["removed"] == 0
+    assert _names(registry, "лозап") == ["Лозап"]
+
+
+def test_active_registration_wins_over_cancelled(tmp_path):
+    registry = GRLSRegistry(str(tmp_path / "grls.db"))
+    registry.apply_snapshot([
+        GRLSProduct("ЛП-000002", "Лозап", "Лозартан", status="active"),
+        GRLSProduct("ЛП-000002", "Лозап", "Лозартан", status="cancelled"),
+    ])
+    assert registry.product("Лозап").active
+
+
+def test_imported_files_journal(tmp_path):
+    registry = GRLSRegistry(str(tmp_path / "grls.db"))
+    assert not registry.is_imported("grls.zip", 100, 1.0)
+    registry.mark_imported("grls.zip", 100, 1.0, products=3)
+    assert registry.is_imported("grls.zip", 100, 1.0)
+    # Новая выгрузка под тем же именем импортируется заново
+    assert not registry.is_imported("grls.zip", 120, 2.0)
@@ -0,0 +1,45 @@
+"""
+Дублирующие запросы GenSearch: прерванные попытки не занижают задержку
+дубля, оценка задержки без дублей учитывает тайм-ауты.
+
+Запуск: python -m pytest -q test_hedge_policy.py
+"""
+
+from app.services.search.gensearch_client import HedgePolicy
+
+
+def _policy(samples):
+    policy = HedgePolicy(enabled=True, percentile=95, min_delay_s=0.1, min_samples=len(samples))
+    for latency in samples:
+        policy.record_sample(latency)
+    return policy
+
+
+def test_censored_attempts_do_not_lower_delay():
+    policy = _policy([1.0] * 19 + [4.0])
+    delay = policy.delay()
+    # Тайм-аут дубля (timeout - delay) и отменённый проигравший — не задержки
+    policy.record_censored(2.0, timed_out=True)
+    for _ in range(20):
+        policy.record_censored(0.5, timed_out=False)
+    assert policy.delay() == delay
+    assert (policy.stats["timeouts"], policy.stats["cancelled"]) == (1, 20)
+
+
+def test_unhedged_estimate_counts_timeouts():
+    policy = _policy([1.0] * 20)
+    for _ in range(3):
+        policy.record_censored(15.0, timed_out=True)
+    # Основной запрос отменён на 3 с: дольше шли только оборвавшиеся по тайм-ауту
+    policy.record_call(3.0, hedge_won=True, timeout=15.0)
+    snapshot = policy.snapshot()
+    assert snapshot["hedge_wins"] == 1
+    assert snapshot["p99_s"] == 3.0
+    assert snapshot["p99_unhedged_s"] == 15.0
+
+
+def test_unhedged_estimate_uses_slower_completed():
+    policy = _policy([1.0] * 10 + [5.0, 6.0, 7.0])
+    policy.record_censored(0.8, timed_out=True)   # быстрее основного — не учитывается
+    policy.record_call(3.0, hedge_won=True, timeout=15.0)
+    assert policy.snapshot()["p99_unhedged_s"] == 6.0
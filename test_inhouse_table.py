@@ -0,0 +1,87 @@
+"""
+Своя таблица ФК: перечитывание файла при изменении mtime без перезапуска,
+выбор самой точной строки по форме и типу высвобождения.
+
+Запуск: python -m pytest -q test_inhouse_table.py
+"""
+
+import os
+
+from app.services.pk.inhouse_table import InhousePKTable
+
+
+HEADER = "inn,inn_en,form,release,cv_intra,t_half_hours,study\n"
+
+
+def _write(path, body, mtime):
+    path.write_text(HEADER + body, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_on_mtime_change(tmp_path):
+    path = tmp_path / "inhouse_pk.csv"
+    _write(path, "амлодипин,amlodipine,,,14.2,41,IF-BE-2023-014\n", 1_000_000)
+    table = InhousePKTable(str(path), check_interval_s=0)
+
+    assert table.lookup("Амлодипина безилат").cv_intra == 14.2
+    _write(path, "амлодипин,amlodipine,,,18.5,41,IF-BE-2024-002\n", 1_000_010)
+    result = table.lookup("amlodipine")
+    assert result.cv_intra == 18.5
+    assert "IF-BE-2024-002" in result.provenance["cv_intra"]
+    assert table.stats["loads"] == 2
+
+
+def test_unchanged_file_is_not_reread(tmp_path):
+    path = tmp_path / "inhouse_pk.csv"
+    _write(path, "амлодипин,amlodipine,,,14.2,41,\n", 1_000_000)
+    table = InhousePKTable(str(path), check_interval_s=0)
+    table.lookup("амлодипин")
+    table.lookup("амлодипин")
+    assert table.stats["loads"] == 1
+
+
+def test_check_interval_delays_reload(tmp_path):
+    path = tmp_path / "inhouse_pk.csv"
+    _write(path, "амлодипин,amlodipine,,,14.2,41,\n", 1_000_000)
+    table = InhousePKTable(str(path), check_interval_s=3600)
+    table.lookup("амлодипин")
+    _write(path, "амлодипин,amlodipine,,,18.5,41,\n", 1_000_010)
+    assert table.lookup("амлодипин").cv_intra == 14.2
+
+
+def test_broken_file_keeps_previous_table(tmp_path):
+    path = tmp_path / "inhouse_pk.csv"
+    _write(path, "амлодипин,amlodipine,,,14.2,41,\n", 1_000_000)
+    table = InhousePKTable(str(path), check_interval_s=0)
+    table.lookup("амлодипин")
+
+    path.write_bytes(b"\xff\xfe\x00broken")
+    os.utime(path, (1_000_010, 1_000_010))
+    assert table.lookup("амлодипин").cv_intra == 14.2
+    assert table.stats["errors"] == 1
+
+    # Исправленный файл подхватывается при следующей проверке
+    _write(path, "амлодипин,amlodipine,,,16.0,41,\n", 1_000_020)
+    assert table.lookup("амлодипин").cv_intra == 16.0
+
+
+def test_deleted_file_empties_table(tmp_path):
+    path = tmp_path / "inhouse_pk.csv"
+    _write(path, "амлодипин,amlodipine,,,14.2,41,\n", 1_000_000)
+    table = InhousePKTable(str(path), check_interval_s=0)
+    assert table.lookup("амлодипин") is not None
+    path.unlink()
+    assert table.lookup("амлодипин") is None
+
+
+def test_most_specific_row_wins(tmp_path):
+    path = tmp_path / "inhouse_pk.csv"
+    _write(path, (
+        "нифедипин,nifedipine,,,20,2,общая\n"
+        "нифедипин,nifedipine,таблетки,пролонгированного действия,28,,ретард\n"
+    ), 1_000_000)
+    table = InhousePKTable(str(path), check_interval_s=0)
+
+    retard = table.lookup("нифедипин", form="таблетки, покрытые оболочкой", release="modified")
+    assert (retard.cv_intra, retard.t_half_hours) == (28, 2)
+    assert table.lookup("нифедипин", form="капсулы").cv_intra == 20
@@ -0,0 +1,66 @@
+"""
+Словарь МНН: префиксный поиск, точный lookup по солям и падежам,
+нечёткий поиск при опечатках.
+
+Запуск: python -m pytest -q test_inn_dictionary.py
+"""
+
+import json
+
+from app.utils.inn_dictionary import InnDictionary, InnEntry, load_inn_dictionary
+
+
+def _dictionary():
+    return InnDictionary([
+        InnEntry("Амлодипин", "Amlodipine", salt_forms=["амлодипина безилат"], trade_names=["Норваск"]),
+        InnEntry("Аторвастатин", "Atorvastatin", trade_names=["Липримар"]),
+        InnEntry("Метформин", "Metformin", salt_forms=["метформина гидрохлорид"]),
+        InnEntry("Тенофовира алафенамид", "Tenofovir alafenamide"),
+    ])
+
+
+def _ru(suggestions):
+    return [s["ru"] for s in suggestions]
+
+
+def test_prefix_completion():
+    d = _dictionary()
+    assert _ru(d.complete("амло")) == ["Амлодипин"]
+    assert _ru(d.complete("ALAFEN")) == ["Тенофовира алафенамид"]
+    assert d.complete("норв") == [{"ru": "Амлодипин", "en": "Amlodipine", "trade": "Норваск"}]
+
+
+def test_lookup_by_salt_and_genitive():
+    d = _dictionary()
+    assert d.lookup("Амлодипина безилат").en == "Amlodipine"
+    assert d.lookup("метформина").en == "Metformin"
+    assert d.lookup("Норваск") is None
+    assert d.lookup_trade("норваск®").ru == "Амлодипин"
+
+
+def test_fuzzy_lookup_with_typos():
+    d = _dictionary()
+    # Одна опечатка в коротком запросе
+    assert _ru(d.complete("амлад")) == ["Амлодипин"]
+    # Опечатка в первом символе — кандидат по второму символу
+    assert _ru(d.complete("нетформ")) == ["Метформин"]
+    # Две опечатки допустимы только для длинных запросов
+    assert _ru(d.complete("аторвастотен")) == ["Аторвастатин"]
+    assert d.complete("амлад", typos=False) == []
+
+
+def test_fuzzy_lookup_limits():
+    d = _dictionary()
+    assert d.complete("амлхх") == []         # две опечатки в коротком запросе
+    assert d.complete("амлх") != []          # одна опечатка — находится
+    assert d.complete("млх") == []           # нечёткий поиск — от 4 символов
+
+
+def test_load_skips_incomplete_entries(tmp_path):
+    path = tmp_path / "inn.json"
+    path.write_text(json.dumps({"entries": [
+        {"ru": "Амлодипин", "en": "Amlodipine"},
+        {"ru": "Без английского"},
+    ]}, ensure_ascii=False), encoding="utf-8")
+    assert len(load_inn_dictionary(str(path))) == 1
+    assert len(load_inn_dictionary(str(tmp_path / "missing.json"))) == 0
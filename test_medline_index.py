@@ -0,0 +1,121 @@
+"""
+Корпус MEDLINE: разбор XML, кандидаты значений и медиана по исследованиям.
+В кандидаты CVintra попадают только проценты с явным within/intra-subject
+контекстом.
+
+Запуск: python -m pytest -q test_medline_index.py
+"""
+
+from app.services.pk import medline_index
+from app.services.pk.medline_index import MedlineIndex, extract_batch, iter_medline
+
+
+def _kinds(rows):
+    return {(row[0], row[3]): row[4] for row in rows}
+
+
+def test_food_effect_and_demographics_are_not_cv_intra():
+    pmids, rows = extract_batch([
+        ("1", 2019, "Effect of food on the pharmacokinetics of amlodipine",
+         "Food decreased amlodipine AUC by 10% relative to the fasting state. "
+         "The terminal half-life was 35 hours.", ("amlodipine",)),
+        ("2", 2020, "Bioequivalence of two losartan formulations",
+         "Twenty-four healthy volunteers were enrolled; 45% of patients were female. "
+         "Cmax and AUC were compared.", ("losartan",)),
+    ])
+    found = _kinds(rows)
+    assert pmids == ["1", "2"]
+    assert ("amlodipine", "cv_intra") not in found
+    assert ("losartan", "cv_intra") not in found
+    assert found[("amlodipine", "t_half")] == 35.0
+
+
+def test_explicit_intra_subject_cv_is_kept(tmp_path):
+    _, rows = extract_batch([
+        ("3", 2021, "Bioequivalence of two valsartan tablets",
+         "In 36 healthy volunteers the intra-subject CV for Cmax was 27.5%. "
+         "Food decreased AUC by 10%.", ("valsartan",)),
+    ])
+    assert _kinds(rows)[("valsartan", "cv_intra")] == 27.5
+
+    index = MedlineIndex(str(tmp_path / "medline.db"))
+    index.replace(["3"], rows)
+    assert [r["value"] for r in index.candidates("valsartan", ("cv_intra",))] == [27.5]
+
+
+_XML = """<?xml version="1.0"?>
+<PubmedArticleSet>
+  <PubmedArticle><MedlineCitation>
+    <PMID>10</PMID>
+    <Article>
+      <Journal><JournalIssue><PubDate><Year>2018</Year></PubDate></JournalIssue></Journal>
+      <ArticleTitle>Bioequivalence of two amlodipine formulations</ArticleTitle>
+      <Abstract><AbstractText>In 24 healthy volunteers the 90% CI for Cmax was 91.2-108.7%.</AbstractText></Abstract>
+    </Article>
+    <ChemicalList>
+      <Chemical><RegistryNumber>0</RegistryNumber><NameOfSubstance>Calcium Channel Blockers</NameOfSubstance></Chemical>
+      <Chemical><RegistryNumber>865J5TX3S9</RegistryNumber><NameOfSubstance>Amlodipine Besylate</NameOfSubstance></Chemical>
+    </ChemicalList>
+  </MedlineCitation></PubmedArticle>
+  <PubmedArticle><MedlineCitation>
+    <PMID>11</PMID>
+    <Article>
+      <ArticleTitle>Amlodipine and hypertension</ArticleTitle>
+      <Abstract><AbstractText>Blood pressure decreased.</AbstractText></Abstract>
+    </Article>
+    <ChemicalList>
+      <Chemical><RegistryNumber>1J444QC288</RegistryNumber><NameOfSubstance>Amlodipine</NameOfSubstance></Chemical>
+    </ChemicalList>
+  </MedlineCitation></PubmedArticle>
+  <DeleteCitation><PMID>7</PMID></DeleteCitation>
+</PubmedArticleSet>
+"""
+
+
+def test_iter_medline_keeps_pk_articles_and_deletions(tmp_path):
+    path = tmp_path / "pubmed.xml"
+    path.write_text(_XML, encoding="utf-8")
+    events = list(iter_medline(str(path)))
+
+    # Реферат без ФК-контекста пропускается, класс веществ (RN "0") — не МНН
+    assert [kind for kind, _ in events] == ["article", "delete"]
+    pmid, year, _, _, inns = events[0][1]
+    assert (pmid, year, inns) == ("10", 2018, ("amlodipine",))
+    assert events[1] == ("delete", "7")
+
+
+def test_ci_candidate_and_median_lookup(tmp_path, monkeypatch):
+    articles = [
+        (str(pmid), 2015 + pmid, "Bioequivalence of amlodipine tablets",
+         f"In 24 healthy volunteers the Cmax ratio 90% CI: {lower}-{upper}%. "
+         f"The terminal half-life was {t_half} hours.", ("amlodipine",))
+        for pmid, lower, upper, t_half in ((1, 95.0, 105.0, 30), (2, 90.0, 111.0, 40), (3, 85.0, 118.0, 50))
+    ]
+    pmids, rows = extract_batch(articles)
+    kinds = sorted(row[3] for row in rows if row[1] == "1")
+    assert kinds == ["ci", "t_half"]
+
+    index = MedlineIndex(str(tmp_path / "medline.db"))
+    index.replace(pmids, rows)
+    monkeypatch.setattr(medline_index, "_index", index)
+
+    cv = medline_index.lookup_cv("amlodipine")
+    assert cv["source"] == "pubmed_ci"
+    assert cv["ci_data"]["pmid"] == "2"             # медиана трёх исследований
+    assert medline_index.lookup_pk("amlodipine")["t_half_hours"] == 40.0
+    # Комбинации корпус не обслуживает
+    assert medline_index.lookup_cv("amlodipine + valsartan") is None
+
+
+def test_replace_and_delete_pmids(tmp_path):
+    index = MedlineIndex(str(tmp_path / "medline.db"))
+    _, rows = extract_batch([
+        ("5", 2020, "Pharmacokinetics of losartan",
+         "The terminal half-life was 2 hours.", ("losartan",)),
+    ])
+    index.replace(["5"], rows)
+    index.replace(["5"], rows)      # повторно пришедший PMID не дублируется
+    assert len(index.candidates("losartan", ("t_half",))) == 1
+
+    index.delete_pmids(["5"])
+    assert index.candidates("losartan", ("t_half",)) == []
@@ -0,0 +1,61 @@
+"""
+Кэш организаций: устаревшая запись отдаётся сразу и обновляется в фоне,
+пустой ответ upstream не затирает прежние реквизиты.
+
+Запуск: python -m pytest -q test_org_info_cache.py
+"""
+
+import threading
+import time
+
+from app.services.cache.org_info_cache import OrgInfoCache
+from app.services.cache.sqlite_store import SQLiteStore
+
+
+OLD = {"name": "ИФАРМА", "address": "Москва, ул. Старая, 1", "phone": ""}
+NEW = {"name": "ИФАРМА", "address": "Москва, ул. Новая, 2", "phone": ""}
+
+
+def _cache(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = OrgInfoCache(SQLiteStore(str(tmp_path / "cache.db")), ttl_days=1)
+    cache.put('ООО «ИФАРМА»', "Россия", OLD)
+    now[0] += 2 * 86400
+    return cache
+
+
+def _wait_refresh(cache):
+    for _ in range(200):
+        if not cache._refreshing:
+            return
+        time.sleep(0.01)
+    raise AssertionError("фоновое обновление не завершилось")
+
+
+def test_stale_entry_refreshed_in_background(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    cached = cache.get("ИФАРМА", "Россия")
+    assert cached == {"info": OLD, "stale": True}
+
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        return NEW
+
+    cache.refresh_in_background("ИФАРМА", "Россия", fetch)
+    # Повторный запрос во время обновления второй поток не запускает
+    cache.refresh_in_background("ИФАРМА", "Россия", fetch)
+    assert cache.stats["refreshes"] == 1
+
+    release.set()
+    _wait_refresh(cache)
+    assert cache.get('ООО "ИФАРМА"', "Россия") == {"info": NEW, "stale": False}
+
+
+def test_empty_refresh_keeps_stale_entry(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    cache.refresh_in_background("ИФАРМА", "Россия", lambda: {"name": "ИФАРМА", "address": ""})
+    _wait_refresh(cache)
+    assert cache.get("ИФАРМА", "Россия")["info"] == OLD
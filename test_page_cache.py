@@ -0,0 +1,58 @@
+"""
+Кэш страниц: вытеснение текстов по LRU удаляет и их записи,
+истёкшие 404/410 не накапливаются.
+
+Запуск: python -m pytest -q test_page_cache.py
+"""
+
+import os
+import time
+
+from app.utils.page_cache import PageCache
+
+
+def _pages(cache):
+    return cache.stats()["pages"]
+
+
+def test_eviction_removes_meta_of_evicted_pages(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=2500)
+    for i in range(3):
+        url = f"https://www.vidal.ru/drugs/{i}"
+        cache.put(url, text=str(i) * 1000)
+        # Разное время доступа — вытесняется самая давняя страница
+        blob = cache._blob_path(cache._read_meta(url)["blob"])
+        os.utime(blob, (1_000_000 + i, 1_000_000 + i))
+
+    assert cache.evict() == 1
+    assert _pages(cache) == 2
+    assert cache.get("https://www.vidal.ru/drugs/0") is None
+    assert cache.get("https://www.vidal.ru/drugs/2")["text"] == "2" * 1000
+
+
+def test_expired_not_found_entries_are_swept(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = PageCache(str(tmp_path), negative_ttl_s=7 * 86400)
+    cache.put_not_found("https://www.rlsnet.ru/old", 404)
+    now[0] += 6 * 86400
+    cache.put_not_found("https://www.rlsnet.ru/new", 410)
+    cache.put("https://www.vidal.ru/drugs/amlodipine", text="Амлодипин")
+
+    now[0] += 2 * 86400
+    cache.evict()
+    assert _pages(cache) == 2
+    assert cache.get("https://www.rlsnet.ru/old") is None
+    assert cache.get("https://www.rlsnet.ru/new")["status"] == 410
+
+
+def test_sweep_runs_on_not_found_writes(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = PageCache(str(tmp_path), negative_ttl_s=60)
+    for i in range(19):
+        cache.put_not_found(f"https://www.rlsnet.ru/{i}")
+    now[0] += 120
+    # Двадцатая запись запускает обслуживание без put() страниц
+    cache.put_not_found("https://www.rlsnet.ru/last")
+    assert _pages(cache) == 1
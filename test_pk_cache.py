@@ -0,0 +1,62 @@
+"""
+PK-кэш: запись живёт PK_CACHE_TTL_DAYS, истёкшая считается промахом.
+
+Запуск: python -m pytest -q test_pk_cache.py
+"""
+
+import time
+
+from app.services.cache.pk_cache import PKEvidenceCache, pk_cache_key
+from app.services.cache.sqlite_store import SQLiteStore
+
+
+def _clock(monkeypatch, start):
+    now = [start]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def test_store_max_age(tmp_path, monkeypatch):
+    now = _clock(monkeypatch, 1_000_000.0)
+    store = SQLiteStore(str(tmp_path / "cache.db"))
+    store.set("ns", "k", {"v": 1})
+
+    now[0] += 59
+    assert store.get("ns", "k", max_age_s=60) == {"v": 1}
+    now[0] += 2
+    assert store.get("ns", "k", max_age_s=60) is None
+    # Без max_age запись по-прежнему читается
+    assert store.get("ns", "k") == {"v": 1}
+
+
+def test_pk_cache_ttl_expiry(tmp_path, monkeypatch):
+    now = _clock(monkeypatch, 1_000_000.0)
+    cache = PKEvidenceCache(SQLiteStore(str(tmp_path / "cache.db")), ttl_days=30)
+    key = pk_cache_key("амлодипина безилат", "Amlodipine besylate")
+    cache.put("cv_intra", key, {"cv_intra": 14.2})
+
+    now[0] += 29 * 86400
+    assert cache.get("cv_intra", key) == {"cv_intra": 14.2}
+    now[0] += 2 * 86400
+    assert cache.get("cv_intra", key) is None
+
+    stats = cache.stats()
+    assert stats["hits"]["cv_intra"] == 1
+    assert stats["misses"]["cv_intra"] == 1
+
+
+def test_pk_cache_rewrite_refreshes_ttl(tmp_path, monkeypatch):
+    now = _clock(monkeypatch, 1_000_000.0)
+    cache = PKEvidenceCache(SQLiteStore(str(tmp_path / "cache.db")), ttl_days=1)
+    cache.put("pk_params", "amlodipine", {"t_half_hours": 41})
+
+    now[0] += 2 * 86400
+    assert cache.get("pk_params", "amlodipine") is None
+    cache.put("pk_params", "amlodipine", {"t_half_hours": 40})
+    assert cache.get("pk_params", "amlodipine") == {"t_half_hours": 40}
+
+
+def test_pk_cache_disabled(tmp_path):
+    cache = PKEvidenceCache(SQLiteStore(str(tmp_path / "cache.db")), ttl_days=30, enabled=False)
+    cache.put("cv_intra", "amlodipine", {"cv_intra": 14.2})
+    assert cache.get("cv_intra", "amlodipine") is None
@@ -0,0 +1,116 @@
+"""
+single_flight: ожидающий не ждёт лидера дольше своего тайм-аута и
+не получает результат, который лидер пометил как «не для других».
+
+Запуск: python -m pytest -q test_single_flight.py
+"""
+
+import asyncio
+import threading
+import time
+
+from app.services.cache.single_flight import SingleFlight
+
+
+def _leader(flight, key, fn, *args, **kwargs):
+    """Запускает лидера в потоке и ждёт, пока он займёт ключ."""
+    out = {}
+    thread = threading.Thread(target=lambda: out.setdefault("result", flight.do(key, fn, *args, **kwargs)))
+    thread.start()
+    for _ in range(200):
+        if flight.leaders:
+            break
+        time.sleep(0.005)
+    return thread, out
+
+
+def test_follower_shares_leader_result():
+    release = threading.Event()
+    calls = []
+
+    def fn(tag):
+        calls.append(tag)
+        release.wait(5)
+        return {"value": 42}
+
+    flight = SingleFlight("fn")
+    thread, out = _leader(flight, "amlodipine", fn, "leader")
+    threading.Timer(0.05, release.set).start()
+    result = flight.do("amlodipine", fn, "follower")
+    thread.join()
+
+    assert calls == ["leader"]
+    assert result == out["result"] == {"value": 42}
+    assert result is not out["result"]   # ожидающий получает копию
+    assert flight.stats()["shared"] == 1
+
+
+def test_follower_timeout_runs_own_call():
+    release = threading.Event()
+    calls = []
+
+    def fn(tag, timeout=None):
+        calls.append(tag)
+        if tag == "leader":
+            release.wait(5)
+        return tag
+
+    flight = SingleFlight("fn", wait_timeout=lambda *a, timeout=None, **kw: timeout)
+    thread, _ = _leader(flight, "amlodipine", fn, "leader")
+    started = time.monotonic()
+    result = flight.do("amlodipine", fn, "follower", timeout=0.05)
+    elapsed = time.monotonic() - started
+    release.set()
+    thread.join()
+
+    assert result == "follower"
+    assert elapsed < 1
+    assert sorted(calls) == ["follower", "leader"]
+    assert flight.stats()["own"] == 1
+
+
+def test_unshareable_result_is_not_given_to_followers():
+    release = threading.Event()
+    calls = []
+
+    def fn(tag, truncated=False):
+        calls.append(tag)
+        if tag == "leader":
+            release.wait(5)
+        return {"tag": tag, "truncated": truncated}
+
+    flight = SingleFlight("fn", shareable=lambda result, *a, **kw: not result["truncated"])
+    thread, out = _leader(flight, "amlodipine", fn, "leader", truncated=True)
+    threading.Timer(0.05, release.set).start()
+    result = flight.do("amlodipine", fn, "follower")
+    thread.join()
+
+    assert out["result"]["tag"] == "leader"
+    assert result == {"tag": "follower", "truncated": False}
+    assert calls == ["leader", "follower"]
+
+
+def test_async_follower_timeout_keeps_leader_running():
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def fn(tag, timeout=None):
+            calls.append(tag)
+            if tag == "leader":
+                await release.wait()
+            return tag
+
+        flight = SingleFlight("fn", wait_timeout=lambda *a, timeout=None, **kw: timeout)
+        leader = asyncio.ensure_future(flight.do_async("amlodipine", fn, "leader"))
+        await asyncio.sleep(0)
+        follower = await flight.do_async("amlodipine", fn, "follower", timeout=0.05)
+        # Тайм-аут ожидающего не отменяет лидера
+        assert not leader.done()
+        release.set()
+        return follower, await leader, calls, flight.stats()
+
+    follower, leader, calls, stats = asyncio.run(scenario())
+    assert (follower, leader) == ("follower", "leader")
+    assert calls == ["leader", "follower"]
+    assert stats["own"] == 1 and stats["in_flight"] == 0
@@ -0,0 +1,101 @@
+"""
+Статистика источников CVintra: порядок шаблонов по результативности,
+отбрасывание бесполезных и исследовательские запуски отброшенных.
+
+Запуск: python -m pytest -q test_source_stats.py
+"""
+
+import random
+
+from app.services.pk.source_stats import (
+    QueryOutcome, SourceStats, drug_class_for, query_template,
+)
+
+
+TIER = "pubmed_ci"
+GOOD = "{term} intrasubject CV bioequivalence"
+DEAD = "{term} within-subject variability crossover"
+
+
+def _queries(term):
+    return [DEAD.format(term=term), GOOD.format(term=term)]
+
+
+def _train(stats, term, searches=10):
+    for _ in range(searches):
+        stats.record(term, [
+            QueryOutcome(TIER, GOOD, hit=True, latency_s=1.0),
+            QueryOutcome(TIER, DEAD, hit=False, latency_s=0.5),
+        ], found=True)
+
+
+def _stats(tmp_path, **kwargs):
+    kwargs.setdefault("min_attempts", 8)
+    kwargs.setdefault("prune_rate", 0.05)
+    return SourceStats(str(tmp_path / "stats.db"), **kwargs)
+
+
+def test_templates_and_classes():
+    assert query_template("losartan intrasubject CV", "losartan") == "{term} intrasubject CV"
+    assert drug_class_for("Losartan") == "sartan"
+    assert drug_class_for("аторвастатин") == "statin"
+    assert drug_class_for("xyz") == "other"
+
+
+def test_no_history_keeps_original_order(tmp_path):
+    stats = _stats(tmp_path)
+    queries = _queries("losartan")
+    assert stats.order("losartan", TIER, queries) == (queries, [])
+
+
+def test_dead_template_is_pruned(tmp_path):
+    stats = _stats(tmp_path, explore=0.0)
+    _train(stats, "losartan")
+    kept, pruned = stats.order("losartan", TIER, _queries("losartan"))
+    assert kept == [GOOD.format(term="losartan")]
+    assert pruned == [DEAD.format(term="losartan")]
+
+
+def test_exploration_keeps_pruned_template(tmp_path):
+    stats = _stats(tmp_path, explore=1.0)
+    _train(stats, "losartan")
+    kept, pruned = stats.order("losartan", TIER, _queries("losartan"))
+    # Результативный шаблон — первым, отброшенный всё же выполняется
+    assert kept == [GOOD.format(term="losartan"), DEAD.format(term="losartan")]
+    assert pruned == []
+
+
+def test_exploration_rate(tmp_path):
+    stats = _stats(tmp_path, explore=0.25, rng=random.Random(7))
+    _train(stats, "losartan")
+    explored = sum(
+        not stats.order("losartan", TIER, _queries("losartan"))[1]
+        for _ in range(400)
+    )
+    assert 60 < explored < 140
+
+
+def test_too_few_attempts_are_not_pruned(tmp_path):
+    stats = _stats(tmp_path, explore=0.0)
+    _train(stats, "losartan", searches=7)
+    assert stats.order("losartan", TIER, _queries("losartan"))[1] == []
+
+
+def test_class_falls_back_to_all_classes(tmp_path):
+    stats = _stats(tmp_path, explore=0.0)
+    _train(stats, "losartan")
+    # По статинам истории нет — решает общая статистика шаблона
+    kept, pruned = stats.order("atorvastatin", TIER, _queries("atorvastatin"))
+    assert pruned == [DEAD.format(term="atorvastatin")]
+
+    # История хранится в БД — другой процесс видит её при открытии
+    reopened = _stats(tmp_path, explore=0.0)
+    assert reopened.order("losartan", TIER, _queries("losartan"))[1] == [DEAD.format(term="losartan")]
+
+
+def test_disabled_stats_do_not_prune(tmp_path):
+    stats = _stats(tmp_path, enabled=False, explore=0.0)
+    _train(stats, "losartan")
+    queries = _queries("losartan")
+    assert stats.order("losartan", TIER, queries) == (queries, [])
+    assert stats.snapshot()["searches"] == 10
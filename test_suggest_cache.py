@@ -0,0 +1,61 @@
+"""
+Кэш подсказок: удлинённый запрос фильтруется по короткому, только если
+короткий ответ был полным.
+
+Запуск: python -m pytest -q test_suggest_cache.py
+"""
+
+import time
+
+from app.services.search.suggest_cache import PrefixSuggestCache
+
+
+ITEMS = ["Амлодипин", "Амлодипин + Валсартан", "Амлодипин + Лизиноприл", "Амлориб"]
+
+
+def test_complete_prefix_is_filtered():
+    cache = PrefixSuggestCache()
+    cache.put("inn", "амло", ITEMS, complete=True)
+
+    assert cache.get("inn", "амлод") == ITEMS[:3]
+    assert cache.get("inn", "Амлодипин + в") == ["Амлодипин + Валсартан"]
+    stats = cache.stats()
+    assert stats["prefix_hits"] == 2 and stats["misses"] == 0
+
+
+def test_truncated_prefix_goes_to_network():
+    cache = PrefixSuggestCache()
+    cache.put("inn", "амло", ITEMS, complete=False)
+
+    assert cache.get("inn", "амло") == ITEMS       # точный запрос — из кэша
+    assert cache.get("inn", "амлод") is None        # удлинённый — в сеть
+    assert cache.stats()["misses"] == 1
+
+
+def test_empty_filter_result_is_a_miss():
+    cache = PrefixSuggestCache()
+    cache.put("inn", "амло", ITEMS, complete=True)
+    assert cache.get("inn", "амлоз") is None
+
+
+def test_prefix_filter_can_be_disabled_and_namespaces_are_separate():
+    cache = PrefixSuggestCache()
+    cache.put("inn", "амло", ITEMS, complete=True)
+
+    assert cache.get("inn", "амлод", prefix=False) is None
+    assert cache.get("drug", "амлод") is None
+    assert cache.get("inn", "ам") is None           # префикс короче закэшированного
+
+
+def test_filtered_result_is_stored_under_exact_key(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = PrefixSuggestCache(ttl_s=60)
+    cache.put("inn", "амло", ITEMS, complete=True)
+    assert cache.get("inn", "амлод") == ITEMS[:3]
+    assert cache.stats()["entries"] == 2
+
+    # Отфильтрованная запись наследует время короткой — и истекает вместе с ней
+    now[0] += 61
+    assert cache.get("inn", "амлоди") is None
+    assert cache.stats()["entries"] == 0